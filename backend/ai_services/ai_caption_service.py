@@ -5,10 +5,11 @@ Generate captions, descriptions, and content for textile products and images
 import os
 import logging
 import time
-import random
 from typing import Dict, List, Any, Optional
 from django.conf import settings
 
+from .gemini_client import get_gemini_client, get_gemini_gateway, is_temporary_failure
+
 # Import Google GenAI
 try:
     from google import genai
@@ -30,8 +31,8 @@ class AICaptionService:
         """Initialize the AI caption service"""
         self.api_key = os.getenv("GEMINI_API_KEY") or getattr(settings, 'GEMINI_API_KEY', None)
         self.client = None
-        self.max_retries = 3  # Maximum number of retries for API calls
-        self.retry_delay_base = 1  # Base delay in seconds for exponential backoff
+        # Shared rate limiting, circuit breaking and retries for Gemini calls
+        self.gemini = get_gemini_gateway()
         
         if not GENAI_AVAILABLE:
             logger.error("Google GenAI library not available")
@@ -42,59 +43,12 @@ class AICaptionService:
             return
             
         try:
-            self.client = genai.Client(api_key=self.api_key)
+            self.client = get_gemini_client(self.api_key)
             logger.info("Gemini client initialized successfully for caption generation")
         except Exception as e:
             logger.error(f"Failed to initialize Gemini client: {str(e)}")
             self.client = None
     
-    def _retry_api_call(self, api_func, *args, **kwargs):
-        """
-        Retry API call with exponential backoff for transient errors
-        
-        Args:
-            api_func: The API function to call
-            *args: Positional arguments for the function
-            **kwargs: Keyword arguments for the function
-            
-        Returns:
-            The result from the API call
-            
-        Raises:
-            Exception: If all retries fail
-        """
-        last_exception = None
-        
-        for attempt in range(self.max_retries):
-            try:
-                return api_func(*args, **kwargs)
-            except Exception as e:
-                last_exception = e
-                error_str = str(e)
-                
-                # Check if it's a retryable error (500, 503, rate limit, etc.)
-                is_retryable = (
-                    '500' in error_str or 
-                    '503' in error_str or 
-                    'INTERNAL' in error_str or
-                    'rate limit' in error_str.lower() or
-                    'quota' in error_str.lower() or
-                    'temporarily unavailable' in error_str.lower()
-                )
-                
-                if not is_retryable or attempt == self.max_retries - 1:
-                    # Not retryable or last attempt
-                    raise
-                
-                # Calculate exponential backoff with jitter
-                delay = self.retry_delay_base * (2 ** attempt) + random.uniform(0, 1)
-                logger.warning(f"Caption API call failed (attempt {attempt + 1}/{self.max_retries}): {error_str}")
-                logger.info(f"Retrying in {delay:.2f} seconds...")
-                time.sleep(delay)
-        
-        # If we get here, all retries failed
-        raise last_exception
-    
     def generate_product_caption(self, 
                                 product_name: str, 
                                 product_type: str = "textile",
@@ -131,7 +85,7 @@ class AICaptionService:
             )
             
             try:
-                response = self._retry_api_call(
+                response = self.gemini.call(
                     self.client.models.generate_content,
                     model="gemini-2.5-flash",
                     contents=[prompt],
@@ -146,7 +100,7 @@ class AICaptionService:
                 logger.error(f"Product caption API call failed: {error_str}")
                 return {
                     "status": "error",
-                    "message": "Caption generation failed due to API error. Please try again." if ('500' in error_str or 'INTERNAL' in error_str) else f"Caption generation failed: {error_str}"
+                    "message": "Caption generation failed due to API error. Please try again." if is_temporary_failure(api_error) else f"Caption generation failed: {error_str}"
                 }
             
             # Process response with proper error handling
@@ -228,7 +182,7 @@ class AICaptionService:
             )
             
             try:
-                response = self._retry_api_call(
+                response = self.gemini.call(
                     self.client.models.generate_content,
                     model="gemini-2.5-flash",
                     contents=[prompt],
@@ -243,7 +197,7 @@ class AICaptionService:
                 logger.error(f"Caption API call failed after retries: {error_str}")
                 return {
                     "status": "error",
-                    "message": "Caption generation failed due to API error. Please try again." if ('500' in error_str or 'INTERNAL' in error_str) else f"Caption generation failed: {error_str}"
+                    "message": "Caption generation failed due to API error. Please try again." if is_temporary_failure(api_error) else f"Caption generation failed: {error_str}"
                 }
             
             # Process response with proper error handling
@@ -258,7 +212,7 @@ class AICaptionService:
                         logger.warning("Response truncated due to MAX_TOKENS limit - retrying with higher limit")
                         # Retry with higher token limit
                         try:
-                            response = self._retry_api_call(
+                            response = self.gemini.call(
                                 self.client.models.generate_content,
                                 model="gemini-2.5-flash",
                                 contents=[prompt],
@@ -342,7 +296,7 @@ class AICaptionService:
             )
             
             try:
-                response = self._retry_api_call(
+                response = self.gemini.call(
                     self.client.models.generate_content,
                     model="gemini-2.5-flash",
                     contents=[prompt],
@@ -357,7 +311,7 @@ class AICaptionService:
                 logger.error(f"Image caption API call failed: {error_str}")
                 return {
                     "status": "error",
-                    "message": "Caption generation failed due to API error. Please try again." if ('500' in error_str or 'INTERNAL' in error_str) else f"Caption generation failed: {error_str}"
+                    "message": "Caption generation failed due to API error. Please try again." if is_temporary_failure(api_error) else f"Caption generation failed: {error_str}"
                 }
             
             # Process response with proper error handling
@@ -443,7 +397,7 @@ Return ONLY a JSON array of hashtags (with # prefix), like this:
 Do not include any other text, just the JSON array."""
             
             try:
-                response = self._retry_api_call(
+                response = self.gemini.call(
                     self.client.models.generate_content,
                     model="gemini-2.5-flash",
                     contents=[hashtag_prompt],
@@ -458,7 +412,7 @@ Do not include any other text, just the JSON array."""
                 logger.error(f"Hashtag generation API call failed: {error_str}")
                 return {
                     "status": "error",
-                    "message": "Hashtag generation failed due to API error. Please try again." if ('500' in error_str or 'INTERNAL' in error_str) else f"Hashtag generation failed: {error_str}"
+                    "message": "Hashtag generation failed due to API error. Please try again." if is_temporary_failure(api_error) else f"Hashtag generation failed: {error_str}"
                 }
             
             # Process response
@@ -542,7 +496,7 @@ Do not include any other text, just the JSON array."""
             prompt = self._create_bulk_caption_prompt(products, caption_style, brand_voice)
             
             try:
-                response = self._retry_api_call(
+                response = self.gemini.call(
                     self.client.models.generate_content,
                     model="gemini-2.5-flash",
                     contents=[prompt],
@@ -557,7 +511,7 @@ Do not include any other text, just the JSON array."""
                 logger.error(f"Bulk caption API call failed: {error_str}")
                 return {
                     "status": "error",
-                    "message": "Bulk caption generation failed due to API error. Please try again." if ('500' in error_str or 'INTERNAL' in error_str) else f"Bulk caption generation failed: {error_str}"
+                    "message": "Bulk caption generation failed due to API error. Please try again." if is_temporary_failure(api_error) else f"Bulk caption generation failed: {error_str}"
                 }
             
             # Process response with proper error handling
@@ -2,21 +2,29 @@
 AI Poster Generation Service using Google Gemini 2.5 Flash
 Clean, production-ready implementation for textile poster generation
 """
+import contextvars
 import os
 import logging
 import time
 import uuid
-import random
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Any, Optional
 from io import BytesIO
 from PIL import Image
 from django.conf import settings
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
+from django.db import connections
 from .ai_caption_service import AICaptionService
+from .aspect_ratio import correct_aspect_ratio
 from .brand_overlay_service import BrandOverlayService
+from .caching import poster_render_cache
+from .gemini_client import (
+    GeminiUnavailableError, attempt_budget, get_gemini_client, get_gemini_gateway, is_temporary_failure
+)
 from .utils.cloudinary_utils import upload_to_cloudinary, create_shareable_html_page, upload_html_to_cloudinary
-from .utils.storage_handler import store_poster_image, create_and_store_shareable_page, upload_poster_image
+from .utils.poster_publisher import get_poster_publisher
+from .utils.storage_handler import get_domain_url, store_poster_image
 
 # Import Google GenAI
 try:
@@ -141,53 +149,6 @@ class AIPosterService:
             unique.append(c)
         return unique
 
-    def _retry_api_call(self, api_func, *args, **kwargs):
-        """
-        Retry API call with exponential backoff for transient errors
-        
-        Args:
-            api_func: The API function to call
-            *args: Positional arguments for the function
-            **kwargs: Keyword arguments for the function
-            
-        Returns:
-            The result from the API call
-            
-        Raises:
-            Exception: If all retries fail
-        """
-        last_exception = None
-        
-        for attempt in range(self.max_retries):
-            try:
-                return api_func(*args, **kwargs)
-            except Exception as e:
-                last_exception = e
-                error_str = str(e)
-                
-                # Check if it's a retryable error (500, 503, rate limit, etc.)
-                is_retryable = (
-                    '500' in error_str or 
-                    '503' in error_str or 
-                    'INTERNAL' in error_str or
-                    'rate limit' in error_str.lower() or
-                    'quota' in error_str.lower() or
-                    'temporarily unavailable' in error_str.lower()
-                )
-                
-                if not is_retryable or attempt == self.max_retries - 1:
-                    # Not retryable or last attempt
-                    raise
-                
-                # Calculate exponential backoff with jitter
-                delay = self.retry_delay_base * (2 ** attempt) + random.uniform(0, 1)
-                logger.warning(f"API call failed (attempt {attempt + 1}/{self.max_retries}): {error_str}")
-                logger.info(f"Retrying in {delay:.2f} seconds...")
-                time.sleep(delay)
-        
-        # If we get here, all retries failed
-        raise last_exception
-    
     @staticmethod
     def _parse_aspect_ratio(aspect_ratio: str) -> Optional[float]:
         """Parse aspect ratio like '16:9' or '1:1' or '4:5' into a float width/height.
@@ -254,38 +215,49 @@ class AIPosterService:
 
     @classmethod
     def _enforce_aspect_ratio(cls, image: Image.Image, aspect_ratio: str) -> Image.Image:
-        """Center-crop the PIL image to match the target aspect ratio.
+        """Fit the PIL image to the target aspect ratio with the local engine
+        (energy-guided crop or edge padding, whichever scores better), whatever its quality.
         If parsing fails, returns image unchanged.
         """
         target = cls._parse_aspect_ratio(aspect_ratio)
         if not target:
             return image
-        width, height = image.size
-        if width == 0 or height == 0:
+        try:
+            return correct_aspect_ratio(image, target).image
+        except Exception as e:
+            logger.warning(f"Local aspect ratio correction failed: {e}")
             return image
-        current = width / height
-        # Close enough: do nothing
-        if abs(current - target) < 1e-3:
+    
+    @classmethod
+    def _correct_aspect_ratio_locally(cls, image: Image.Image, aspect_ratio: str) -> Image.Image:
+        """
+        Correct a mismatched aspect ratio without calling Gemini again
+        
+        Args:
+            image: Generated image
+            aspect_ratio: Requested aspect ratio
+            
+        Returns:
+            The corrected image if its quality reaches POSTER_LOCAL_AR_MIN_QUALITY,
+            otherwise the original (which then goes through remote re-generation)
+        """
+        target = cls._parse_aspect_ratio(aspect_ratio)
+        if not target or cls._is_aspect_ratio_match(image, aspect_ratio):
             return image
-        # Need to crop: if current > target -> too wide => crop width; else crop height
-        if current > target:
-            # New width based on target
-            new_width = int(round(height * target))
-            left = (width - new_width) // 2
-            right = left + new_width
-            top = 0
-            bottom = height
-        else:
-            # Too tall -> crop height
-            new_height = int(round(width / target))
-            top = (height - new_height) // 2
-            bottom = top + new_height
-            left = 0
-            right = width
         try:
-            return image.crop((left, top, right, bottom))
-        except Exception:
+            correction = correct_aspect_ratio(image, target)
+        except Exception as e:
+            logger.warning(f"Local aspect ratio correction failed: {e}")
             return image
+        
+        threshold = getattr(settings, 'POSTER_LOCAL_AR_MIN_QUALITY', 0.85)
+        if correction.quality >= threshold:
+            logger.info(f"Aspect ratio corrected locally by {correction.method} (quality {correction.quality:.2f})")
+            return correction.image
+        logger.info(
+            f"Local aspect ratio {correction.method} scored {correction.quality:.2f} (< {threshold}); re-generating remotely"
+        )
+        return image
     
     @staticmethod
     def _ensure_min_short_side(image: Image.Image, min_short_side: int = 1080) -> Image.Image:
@@ -324,8 +296,8 @@ class AIPosterService:
         else:
             logger.info("Caption service initialized successfully")
         self.brand_overlay_service = BrandOverlayService()
-        self.max_retries = 3  # Maximum number of retries for API calls
-        self.retry_delay_base = 1  # Base delay in seconds for exponential backoff
+        # Shared rate limiting, circuit breaking and retries for Gemini calls
+        self.gemini = get_gemini_gateway()
         
         if not GENAI_AVAILABLE:
             logger.error("Google GenAI library not available")
@@ -336,41 +308,175 @@ class AIPosterService:
             return
             
         try:
-            self.client = genai.Client(api_key=self.api_key)
+            self.client = get_gemini_client(self.api_key)
             logger.info("Gemini client initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Gemini client: {str(e)}")
             self.client = None
     
-    def generate_from_prompt(self, prompt: str, aspect_ratio: str = "1:1", user=None) -> Dict[str, Any]:
+    @staticmethod
+    def _report_progress(progress_callback: Optional[Callable[[str, int], None]], stage: str, progress: int) -> None:
+        """Notify an optional progress listener; listener failures never break generation"""
+        if not progress_callback:
+            return
+        try:
+            progress_callback(stage, progress)
+        except Exception as e:
+            logger.warning(f"Progress callback failed at stage {stage}: {e}")
+    
+    @staticmethod
+    def _timed_stage(timings: Dict[str, float], stage: str, func: Callable, *args, **kwargs) -> Any:
+        """Run one pipeline stage, recording its duration in milliseconds under `stage`"""
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings[stage] = round((time.perf_counter() - started) * 1000, 1)
+    
+    def _background_stage(self, timings: Dict[str, float], stage: str, func: Callable, *args) -> Any:
+        """Run a pipeline stage on a worker thread"""
+        try:
+            return self._timed_stage(timings, stage, func, *args)
+        finally:
+            # Worker threads hold their own database connections
+            connections.close_all()
+    
+    def _store_generated_image(self, png_bytes: bytes, filename: str, output_path: str) -> tuple:
+        """
+        Store a generated poster PNG
+        
+        Args:
+            png_bytes: Encoded poster
+            filename: Poster filename
+            output_path: Storage path used if the storage handler fails
+            
+        Returns:
+            Tuple of (saved_path, image_url, public_url)
+        """
+        try:
+            saved_path, image_url, public_url = store_poster_image(png_bytes, filename=filename)
+            logger.info(f"Image stored: {saved_path} ({image_url})")
+            return saved_path, image_url, public_url
+        except Exception as e:
+            logger.error(f"Failed to store image: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            # Fallback to old method
+            saved_path = default_storage.save(output_path, ContentFile(png_bytes))
+            image_url = default_storage.url(saved_path)
+            if not image_url.startswith('http'):
+                request = getattr(self, '_request', None)
+                if request:
+                    image_url = request.build_absolute_uri(image_url)
+                else:
+                    image_url = f"http://localhost:8000{image_url}"
+            return saved_path, image_url, image_url
+    
+    def _cached_render(self, kind: str, prompt: str, aspect_ratio: str, render: Callable[[], Dict[str, Any]],
+                       image_paths: Optional[List[str]] = None, user=None, use_cache: bool = True,
+                       progress_callback: Optional[Callable[[str, int], None]] = None) -> Dict[str, Any]:
+        """
+        Serve a render from the content-addressed poster cache, or run it and cache the result
+        
+        Args:
+            kind: Render kind used in the cache key (prompt, image, composite)
+            prompt: Text prompt
+            aspect_ratio: Requested aspect ratio
+            render: Callable that performs the uncached generation
+            image_paths: Input images whose content is part of the key
+            user: Requesting user (tenant and branding profile)
+            use_cache: Set False to force a fresh generation
+            progress_callback: Optional progress listener
+            
+        Returns:
+            Render result dict
+        """
+        parameters = None
+        if use_cache and self.client:
+            parameters = poster_render_cache.render_parameters(
+                kind, self._normalize_aspect_ratio_value(aspect_ratio), image_paths, user
+            )
+        
+        if parameters is not None:
+            cached_result = poster_render_cache.get_render(prompt, parameters)
+            if cached_result is not None:
+                logger.info(f"Serving cached {kind} render for prompt: {prompt[:50]}...")
+                self._report_progress(progress_callback, 'cache_hit', 95)
+                return cached_result
+        
+        # Every Gemini call of one render (prompt variations, aspect-ratio retries,
+        # caption) shares a single attempt budget
+        with attempt_budget():
+            result = render()
+        
+        if parameters is not None and result.get('status') == 'success':
+            poster_render_cache.store_render(prompt, parameters, result)
+        return result
+    
+    def generate_from_prompt(self, prompt: str, aspect_ratio: str = "1:1", user=None,
+                             progress_callback: Optional[Callable[[str, int], None]] = None,
+                             use_cache: bool = True) -> Dict[str, Any]:
         """
         Generate poster image from text prompt only
         
         Args:
             prompt: Text description for the poster
             aspect_ratio: Image aspect ratio (1:1, 16:9, 4:5)
+            user: User object for automatic branding
+            progress_callback: Optional callable(stage, percent) invoked as the pipeline advances
+            use_cache: Reuse an identical earlier render if one is cached
             
         Returns:
             Dict containing status and image path
         """
+        return self._cached_render(
+            'prompt', prompt, aspect_ratio,
+            lambda: self._generate_from_prompt(prompt, aspect_ratio, user, progress_callback),
+            user=user, use_cache=use_cache, progress_callback=progress_callback
+        )
+    
+    def _generate_from_prompt(self, prompt: str, aspect_ratio: str = "1:1", user=None,
+                              progress_callback: Optional[Callable[[str, int], None]] = None) -> Dict[str, Any]:
+        """
+        Uncached generate_from_prompt pipeline
+        
+        The caption depends only on the prompt, so it is generated on a worker
+        thread while Gemini renders the image; storage and brand overlay then run
+        side by side. Stage durations are returned in stage_timings_ms.
+        """
+        pool = None
         try:
             if not self.client:
                 return {"status": "error", "message": "Gemini client not available"}
             
             logger.info(f"Generating poster from prompt: {prompt[:50]}...")
+            pipeline_started = time.perf_counter()
+            timings = {}
             
             # Check if user has company profile for branding
             has_branding = False
+            branding_profile = None
             if user:
                 try:
                     from users.models import CompanyProfile
                     company_profile = getattr(user, 'company_profile', None)
                     if company_profile and company_profile.has_complete_profile:
                         has_branding = True
+                        branding_profile = company_profile
                         logger.info("User has complete company profile - will apply branding")
+                    elif company_profile:
+                        logger.warning("Company profile is not complete - skipping branding")
+                    else:
+                        logger.warning("No company profile found for user")
                 except Exception as e:
                     logger.warning(f"Error checking company profile: {e}")
             
+            pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix='poster-pipeline')
+            caption_future = pool.submit(
+                contextvars.copy_context().run,
+                self._background_stage, timings, 'caption', self.generate_caption_and_hashtags, prompt, None, user
+            )
+            
             # Create base prompt with enhanced instructions for better image generation
             normalized_ar = self._normalize_aspect_ratio_value(aspect_ratio)
             ar_directive = f"Strict aspect ratio: {normalized_ar}. Generate the canvas at {normalized_ar} without padding, borders, or letterboxing."
@@ -428,6 +534,9 @@ class AIPosterService:
                 f"Design an image: {base_prompt}"
             ]
             
+            self._report_progress(progress_callback, 'generating_image', 10)
+            image_started = time.perf_counter()
+            
             for attempt, current_prompt in enumerate(prompts_to_try):
                 logger.info(f"Attempt {attempt + 1}: Trying prompt: {current_prompt[:50]}...")
                 
@@ -442,7 +551,7 @@ class AIPosterService:
                     logger.info("Image generation: image_config not available; relying on prompt directive for aspect ratio")
                 
                 try:
-                    response = self._retry_api_call(
+                    response = self.gemini.call(
                         self.client.models.generate_content,
                         model="gemini-2.5-flash-image",
                         contents=[current_prompt],
@@ -452,11 +561,11 @@ class AIPosterService:
                     error_str = str(api_error)
                     logger.error(f"API call failed after retries: {error_str}")
                     
-                    # Check for specific error types
-                    if '500' in error_str or 'INTERNAL' in error_str:
-                        if attempt < len(prompts_to_try) - 1:
+                    # Transient API errors get the next prompt variation (the gateway already
+                    # backed off); refused calls (open circuit, spent attempt budget) end here
+                    if is_temporary_failure(api_error):
+                        if attempt < len(prompts_to_try) - 1 and not isinstance(api_error, GeminiUnavailableError):
                             logger.info(f"Retrying with different prompt variation...")
-                            time.sleep(2)  # Wait before trying next prompt
                             continue
                         return {
                             "status": "error",
@@ -501,11 +610,15 @@ class AIPosterService:
                         try:
                             image = Image.open(BytesIO(part.inline_data.data))
 
+                            # Fix the ratio locally first; re-generate only if that would lose too much
+                            image = self._correct_aspect_ratio_locally(image, normalized_ar)
+
                             # Strict AR enforcement with retries
                             max_retries = 2
                             attempt_idx = 0
                             while not self._is_aspect_ratio_match(image, normalized_ar) and attempt_idx < max_retries:
                                 logger.warning(f"Generated image AR mismatch (attempt {attempt_idx+1}); retrying with strict dimensions")
+                                self._report_progress(progress_callback, 'correcting_aspect_ratio', 30)
                                 # Build a series of image_config attempts with escalating dimensions
                                 dim_configs = self._build_best_dimension_configs(types, normalized_ar) or [self._build_image_config(types, normalized_ar)]
                                 # Include exact pixel directive in prompt
@@ -518,7 +631,7 @@ class AIPosterService:
                                     if dim_config is not None:
                                         retry_kwargs["image_config"] = dim_config
                                     try:
-                                        response_retry = self._retry_api_call(
+                                        response_retry = self.gemini.call(
                                             self.client.models.generate_content,
                                             model="gemini-2.5-flash-image",
                                             contents=[stricter_prompt],
@@ -526,6 +639,8 @@ class AIPosterService:
                                         )
                                     except Exception as retry_error:
                                         logger.warning(f"Retry attempt failed: {retry_error}")
+                                        if isinstance(retry_error, GeminiUnavailableError):
+                                            break
                                         continue
                                     for retry_part in response_retry.candidates[0].content.parts:
                                         if getattr(retry_part, 'inline_data', None) is not None:
@@ -537,9 +652,9 @@ class AIPosterService:
                                     if retry_succeeded:
                                         break
                                 attempt_idx += 1
-                            # Fallback: if still mismatched after retries, enforce by center-cropping
+                            # Fallback: if still mismatched after retries, use the best local correction
                             if not self._is_aspect_ratio_match(image, normalized_ar):
-                                logger.warning("Model did not honor aspect ratio after strict retries; enforcing via cropping")
+                                logger.warning("Model did not honor aspect ratio after strict retries; enforcing locally")
                                 image = self._enforce_aspect_ratio(image, normalized_ar)
 
                             # Generate unique filename
@@ -556,39 +671,29 @@ class AIPosterService:
                             image_bytes.seek(0)
                             
                             final_w, final_h = image.size
+                            timings['generate_image'] = round((time.perf_counter() - image_started) * 1000, 1)
                             logger.info(f"Poster generated successfully on attempt {attempt + 1}; size={final_w}x{final_h}")
                             
-                            # Store image using dual-mode storage handler
-                            logger.info(f"=== STARTING IMAGE STORAGE ===")
-                            try:
-                                saved_path, image_url, public_url = store_poster_image(
-                                    image_bytes.getvalue(),
-                                    filename=filename
+                            # Storing the PNG and the brand overlay both work from the in-memory image and
+                            # run side by side; the caption has been running since the start. Publishing
+                            # the CDN copy and share page needs all three and runs in the background.
+                            self._report_progress(progress_callback, 'storing_image', 50)
+                            png_bytes = image_bytes.getvalue()
+                            store_future = pool.submit(
+                                self._background_stage, timings, 'store_image',
+                                self._store_generated_image, png_bytes, filename, output_path
+                            )
+                            brand_future = None
+                            if branding_profile is not None:
+                                brand_future = pool.submit(
+                                    self._background_stage, timings, 'brand_overlay',
+                                    self.brand_overlay_service.create_branded_poster,
+                                    output_path, branding_profile, None, image
                                 )
-                                logger.info(f"Image stored successfully:")
-                                logger.info(f"  saved_path: {saved_path}")
-                                logger.info(f"  image_url: {image_url}")
-                                logger.info(f"  public_url: {public_url}")
-                            except Exception as e:
-                                logger.error(f"Failed to store image: {str(e)}")
-                                import traceback
-                                traceback.print_exc()
-                                # Fallback to old method
-                                saved_path = default_storage.save(output_path, ContentFile(image_bytes.getvalue()))
-                                image_url = default_storage.url(saved_path)
-                                if not image_url.startswith('http'):
-                                    request = getattr(self, '_request', None)
-                                    if request:
-                                        image_url = request.build_absolute_uri(image_url)
-                                    else:
-                                        image_url = f"http://localhost:8000{image_url}"
-                                public_url = image_url
+                            saved_path, image_url, public_url = store_future.result()
                             
-                            logger.info(f"=== END IMAGE STORAGE ===")
-                            
-                            # Generate caption and hashtags for the poster
-                            logger.info("Starting caption generation...")
-                            caption_result = self.generate_caption_and_hashtags(prompt, image_url, user)
+                            self._report_progress(progress_callback, 'generating_caption', 65)
+                            caption_result = caption_future.result()
                             logger.info(f"Caption generation result status: {caption_result.get('status')}")
                             
                             # Check if caption generation failed
@@ -598,70 +703,14 @@ class AIPosterService:
                                 # Still continue with poster generation, but log the error
                                 # The frontend can handle empty captions
                             
-                            # Create shareable HTML page with Open Graph tags for Facebook
-                            # This allows Facebook to automatically fetch both image and caption
-                            shareable_page_url = None
-                            logger.info(f"=== HTML PAGE CREATION DEBUG ===")
-                            logger.info(f"public_url available: {bool(public_url)}")
-                            if public_url:
-                                logger.info(f"public_url value: {public_url}")
-                                try:
-                                    caption_text = caption_result.get("caption", "")
-                                    full_caption_text = caption_result.get("full_caption", caption_text)
-                                    logger.info(f"Caption text available: {bool(caption_text)}")
-                                    logger.info(f"Full caption text available: {bool(full_caption_text)}")
-                                    
-                                    if caption_text or full_caption_text:
-                                        logger.info("Creating and storing shareable HTML page...")
-                                        shareable_page_url = create_and_store_shareable_page(
-                                            public_url,
-                                            caption_text,
-                                            full_caption_text
-                                        )
-                                        if shareable_page_url:
-                                            logger.info(f"SUCCESS: Shareable HTML page created successfully: {shareable_page_url}")
-                                        else:
-                                            logger.error("FAILED: Failed to create shareable HTML page, using image URL directly")
-                                            shareable_page_url = public_url  # Fallback to image URL
-                                    else:
-                                        logger.warning("WARNING: No caption available, using image URL directly")
-                                        shareable_page_url = public_url  # Fallback to image URL
-                                except Exception as html_error:
-                                    logger.error(f"ERROR: Error creating shareable HTML page: {html_error}")
-                                    import traceback
-                                    traceback.print_exc()
-                                    shareable_page_url = public_url  # Fallback to image URL
-                            else:
-                                logger.error("ERROR: No public_url available, cannot create HTML page")
-                            
-                            logger.info(f"Final shareable_page_url: {shareable_page_url}")
-                            logger.info(f"=== END HTML PAGE CREATION DEBUG ===")
-                            
-                            # Ensure public_url is always set - prioritize HTML page, then image URL
-                            final_public_url = shareable_page_url or public_url or image_url
-                            
-                            if not final_public_url:
-                                logger.error("CRITICAL: No public_url available at all! Using image_url as fallback")
-                                final_public_url = image_url
-                            
-                            logger.info(f"=== FINAL RESULT DEBUG ===")
-                            logger.info(f"shareable_page_url: {shareable_page_url}")
-                            logger.info(f"public_url (image): {public_url}")
-                            logger.info(f"final_public_url: {final_public_url}")
-                            logger.info(f"image_url: {image_url}")
-                            
-                            # Add brand overlay if user has company profile
-                            # CRITICAL: Set public_url in final_result - this is what gets returned to the API
-                            # Ensure public_url is always set (even if empty)
-                            # Also include cloudinary_url as the direct image URL (not HTML page)
-                            cloudinary_image_url = public_url if public_url and not shareable_page_url else (public_url if public_url else '')
-                            
+                            # The local URL is served until the CDN copy is published; saved
+                            # posters are then updated with the CDN/share page URLs
                             final_result = {
                                 "status": "success", 
                                 "image_path": saved_path,
                                 "image_url": image_url,
-                                "public_url": final_public_url if final_public_url else '',  # Always set, even if empty (may be HTML page)
-                                "cloudinary_url": cloudinary_image_url,  # Direct Cloudinary image URL (not HTML page)
+                                "public_url": public_url or image_url,
+                                "cloudinary_url": '',  # Direct CDN image URL, set once published
                                 "filename": filename,
                                 "width": final_w,
                                 "height": final_h,
@@ -675,349 +724,45 @@ class AIPosterService:
                                 "branding_applied": False
                             }
                             
-                            # CRITICAL: Ensure public_url key exists
-                            if 'public_url' not in final_result:
-                                logger.error("CRITICAL: public_url key missing from final_result!")
-                                final_result['public_url'] = ''
-                            
-                            # Final verification before returning
-                            logger.info(f"Final result public_url: {final_result.get('public_url')}")
-                            logger.info(f"Final result keys: {list(final_result.keys())}")
-                            if not final_result.get('public_url'):
-                                logger.error("CRITICAL: public_url missing in final_result! Setting to image_url")
-                                final_result['public_url'] = image_url
-                            logger.info(f"=== END FINAL RESULT DEBUG ===")
-                            
-                            # Apply brand overlay if user is provided and has company profile
-                            logger.info(f"=== BRANDING DEBUG ===")
-                            logger.info(f"User provided: {user}")
-                            if user:
-                                logger.info(f"User details: {user.username} ({user.email})")
-                                try:
-                                    from users.models import CompanyProfile
-                                    company_profile = getattr(user, 'company_profile', None)
-                                    logger.info(f"Company profile: {company_profile}")
-                                    
-                                    if company_profile:
-                                        logger.info(f"Company name: {company_profile.company_name}")
-                                        logger.info(f"Has logo: {bool(company_profile.logo)}")
-                                        if company_profile.logo:
-                                            logger.info(f"Logo path: {company_profile.logo.path}")
-                                            logger.info(f"Logo file exists: {os.path.exists(company_profile.logo.path)}")
-                                        else:
-                                            logger.info("No logo uploaded")
-                                        logger.info(f"Contact info: {company_profile.get_contact_info()}")
-                                        logger.info(f"Profile complete: {company_profile.has_complete_profile}")
-                                        
-                                        if company_profile.has_complete_profile:
-                                            logger.info("Applying brand overlay...")
-                                            brand_result = self.brand_overlay_service.create_branded_poster(
-                                                saved_path, company_profile
-                                            )
-                                            logger.info(f"Brand overlay result: {brand_result}")
-                                            
-                                            if brand_result.get('status') == 'success':
-                                                logger.info("Brand overlay applied successfully!")
-                                                branded_path = brand_result.get("image_path", saved_path)
-                                                
-                                                # Upload branded poster to Cloudinary (replaces original upload)
-                                                # CRITICAL: This must succeed for Facebook sharing to work
-                                                branded_public_url = None
-                                                max_upload_retries = 3
-                                                for retry_attempt in range(max_upload_retries):
-                                                    try:
-                                                        logger.info(f"Uploading branded poster to Cloudinary (attempt {retry_attempt + 1}/{max_upload_retries})...")
-                                                        branded_public_url = upload_to_cloudinary(branded_path)
-                                                        if branded_public_url:
-                                                            logger.info(f"✅ Branded poster uploaded to Cloudinary: {branded_public_url}")
-                                                            break
-                                                        else:
-                                                            logger.warning(f"⚠️  Cloudinary upload attempt {retry_attempt + 1} returned None")
-                                                            if retry_attempt < max_upload_retries - 1:
-                                                                import time
-                                                                time.sleep(2)  # Wait before retry
-                                                    except Exception as e:
-                                                        logger.error(f"❌ Error uploading branded poster to Cloudinary (attempt {retry_attempt + 1}): {str(e)}")
-                                                        if retry_attempt < max_upload_retries - 1:
-                                                            import time
-                                                            time.sleep(2)  # Wait before retry
-                                                
-                                                # If branded upload failed, try to use original upload
-                                                if not branded_public_url:
-                                                    logger.error("❌ CRITICAL: All Cloudinary upload attempts failed for branded poster!")
-                                                    logger.error("Falling back to original upload...")
-                                                    branded_public_url = public_url if public_url else ''
-                                                    if not branded_public_url:
-                                                        logger.error("❌ CRITICAL: Original upload also failed! Facebook sharing will NOT work!")
-                                                else:
-                                                    logger.info(f"✅ Successfully uploaded branded poster to Cloudinary: {branded_public_url}")
-                                                
-                                                # Create shareable HTML page for branded poster
-                                                logger.info(f"=== BRANDED HTML PAGE CREATION DEBUG ===")
-                                                branded_shareable_url = None
-                                                if branded_public_url:
-                                                    logger.info(f"branded_public_url available: {branded_public_url}")
-                                                    try:
-                                                        caption_text = final_result.get("caption", "")
-                                                        full_caption_text = final_result.get("full_caption", caption_text)
-                                                        logger.info(f"Caption available for branded: {bool(caption_text or full_caption_text)}")
-                                                        
-                                                        if caption_text or full_caption_text:
-                                                            logger.info("Creating branded HTML page content...")
-                                                            html_content = create_shareable_html_page(
-                                                                branded_public_url,
-                                                                caption_text,
-                                                                full_caption_text
-                                                            )
-                                                            logger.info(f"Branded HTML content created, length: {len(html_content)}")
-                                                            
-                                                            logger.info("Uploading branded HTML page to Cloudinary...")
-                                                            branded_shareable_url = upload_html_to_cloudinary(
-                                                                html_content,
-                                                                filename=f"branded_poster_{int(time.time())}"
-                                                            )
-                                                            if branded_shareable_url:
-                                                                logger.info(f"✅ Branded shareable HTML page created: {branded_shareable_url}")
-                                                            else:
-                                                                logger.error("❌ Failed to create branded HTML page, using image URL")
-                                                                branded_shareable_url = branded_public_url
-                                                        else:
-                                                            logger.warning("⚠️  No caption for branded poster, using image URL")
-                                                            branded_shareable_url = branded_public_url
-                                                    except Exception as html_error:
-                                                        logger.error(f"❌ Error creating branded shareable HTML page: {html_error}")
-                                                        import traceback
-                                                        traceback.print_exc()
-                                                        branded_shareable_url = branded_public_url
-                                                else:
-                                                    logger.error("❌ No branded_public_url, cannot create HTML page")
-                                                
-                                                final_branded_url = branded_shareable_url or branded_public_url or shareable_page_url or public_url
-                                                logger.info(f"Final branded public_url: {final_branded_url}")
-                                                
-                                                # CRITICAL: Verify final_branded_url is a Cloudinary URL, not a local URL
-                                                if final_branded_url and not final_branded_url.startswith('http'):
-                                                    logger.error(f"CRITICAL: final_branded_url is not a Cloudinary URL: {final_branded_url}")
-                                                    logger.error("Attempting emergency upload of branded poster...")
-                                                    # Try to upload the branded image now
-                                                    try:
-                                                        emergency_branded_url = upload_to_cloudinary(branded_path)
-                                                        if emergency_branded_url:
-                                                            logger.info(f"SUCCESS: Emergency branded upload succeeded: {emergency_branded_url}")
-                                                            final_branded_url = emergency_branded_url
-                                                            # Also create HTML page
-                                                            caption_text = final_result.get("caption", "")
-                                                            full_caption_text = final_result.get("full_caption", caption_text)
-                                                            if caption_text or full_caption_text:
-                                                                html_content = create_shareable_html_page(
-                                                                    emergency_branded_url,
-                                                                    caption_text,
-                                                                    full_caption_text
-                                                                )
-                                                                emergency_html_url = upload_html_to_cloudinary(
-                                                                    html_content,
-                                                                    filename=f"branded_emergency_{int(time.time())}"
-                                                                )
-                                                                if emergency_html_url:
-                                                                    final_branded_url = emergency_html_url
-                                                                    logger.info(f"SUCCESS: Emergency HTML page created: {emergency_html_url}")
-                                                        else:
-                                                            logger.error("ERROR: Emergency branded upload failed")
-                                                    except Exception as emergency_error:
-                                                        logger.error(f"ERROR: Emergency branded upload exception: {emergency_error}")
-                                                
-                                                logger.info(f"=== END BRANDED HTML PAGE CREATION DEBUG ===")
-                                                
-                                                # CRITICAL: Ensure public_url is always set (even if empty)
-                                                final_branded_url = final_branded_url if final_branded_url else ''
-                                                
-                                                # Extract cloudinary_url for branded poster (direct image URL, not HTML page)
-                                                # CRITICAL: Ensure we always have a valid Cloudinary URL
-                                                branded_cloudinary_url = branded_public_url if branded_public_url and branded_public_url.startswith('http') else ''
-                                                
-                                                # If branded upload failed, try multiple fallbacks
-                                                if not branded_cloudinary_url:
-                                                    # Fallback 1: Use original public_url if it's a Cloudinary URL (not HTML)
-                                                    if public_url and public_url.startswith('http') and 'cloudinary' in public_url and not public_url.endswith('.html'):
-                                                        branded_cloudinary_url = public_url
-                                                        logger.warning("⚠️  Using original Cloudinary URL as fallback for branded poster")
-                                                    # Fallback 2: Try to get from final_result's existing cloudinary_url
-                                                    elif final_result.get('cloudinary_url') and final_result.get('cloudinary_url').startswith('http'):
-                                                        branded_cloudinary_url = final_result.get('cloudinary_url')
-                                                        logger.warning("⚠️  Using existing cloudinary_url from final_result as fallback")
-                                                    # Fallback 3: Try emergency upload one more time
-                                                    else:
-                                                        logger.warning("⚠️  Attempting one final emergency upload for cloudinary_url...")
-                                                        try:
-                                                            emergency_cloudinary = upload_to_cloudinary(branded_path)
-                                                            if emergency_cloudinary:
-                                                                branded_cloudinary_url = emergency_cloudinary
-                                                                logger.info(f"✅ Emergency upload succeeded for cloudinary_url: {branded_cloudinary_url}")
-                                                        except Exception as e:
-                                                            logger.error(f"❌ Emergency upload failed: {e}")
-                                                
-                                                # Ensure final_branded_url is always a valid Cloudinary URL (not empty, not local)
-                                                if not final_branded_url or not final_branded_url.startswith('http'):
-                                                    logger.error(f"❌ CRITICAL: final_branded_url is invalid: {final_branded_url}")
-                                                    # Use branded_cloudinary_url if available
-                                                    if branded_cloudinary_url:
-                                                        final_branded_url = branded_cloudinary_url
-                                                        logger.info(f"✅ Using branded_cloudinary_url as final_branded_url: {final_branded_url}")
-                                                    # Fallback to original public_url if it's valid
-                                                    elif public_url and public_url.startswith('http'):
-                                                        final_branded_url = public_url
-                                                        logger.warning("⚠️  Using original public_url as final_branded_url fallback")
-                                                    else:
-                                                        logger.error("❌ CRITICAL: No valid Cloudinary URL available for branded poster!")
-                                                        final_branded_url = ''
-                                                
-                                                # CRITICAL: Ensure both URLs are set before updating final_result
-                                                if not branded_cloudinary_url and final_branded_url and final_branded_url.startswith('http') and not final_branded_url.endswith('.html'):
-                                                    # If cloudinary_url is still empty but we have a valid non-HTML public_url, use it
-                                                    branded_cloudinary_url = final_branded_url
-                                                    logger.info(f"✅ Using final_branded_url as cloudinary_url: {branded_cloudinary_url}")
-                                                
-                                                final_result.update({
-                                                    "image_path": branded_path,
-                                                    "image_url": brand_result.get("image_url", image_url),
-                                                    "public_url": final_branded_url if final_branded_url else '',  # Use HTML page URL if available, or Cloudinary image URL
-                                                    "cloudinary_url": branded_cloudinary_url if branded_cloudinary_url else '',  # Direct Cloudinary image URL (not HTML page)
-                                                    "filename": brand_result.get("filename", filename),
-                                                    "branding_applied": True,
-                                                    "logo_added": brand_result.get("logo_added", False),
-                                                    "contact_info_added": brand_result.get("contact_info_added", False),
-                                                    "branding_metadata": brand_result.get("branding_metadata", {})
-                                                })
-                                                
-                                                # CRITICAL: Verify both URLs are set
-                                                if not final_result.get('cloudinary_url'):
-                                                    logger.error("❌ CRITICAL: cloudinary_url is empty after branding update!")
-                                                if not final_result.get('public_url'):
-                                                    logger.error("❌ CRITICAL: public_url is empty after branding update!")
-                                                
-                                                # CRITICAL: Ensure public_url key exists after update
-                                                if 'public_url' not in final_result:
-                                                    logger.error("CRITICAL: public_url key missing after branding update!")
-                                                    final_result['public_url'] = ''
-                                                elif final_result.get('public_url') is None:
-                                                    logger.error("CRITICAL: public_url is None after branding update!")
-                                                    final_result['public_url'] = ''
-                                            else:
-                                                logger.warning(f"Brand overlay failed: {brand_result.get('message')}")
-                                        else:
-                                            logger.warning("Company profile is not complete - skipping branding")
-                                            logger.warning(f"Missing: logo={not company_profile.logo}, contact={not company_profile.get_contact_info()}")
-                                    else:
-                                        logger.warning("No company profile found for user")
-                                except Exception as brand_error:
-                                    logger.error(f"Brand overlay error: {str(brand_error)}")
-                                    import traceback
-                                    traceback.print_exc()
-                            else:
-                                logger.warning("No user provided - skipping branding")
-                            
-                            # Final check before returning - ENSURE public_url is ALWAYS set and is a Cloudinary URL
-                            current_public_url = final_result.get('public_url')
-                            
-                            # Check if public_url is missing OR is a local URL (not Cloudinary)
-                            if not current_public_url or (current_public_url and not current_public_url.startswith('http')):
-                                logger.error("CRITICAL ERROR: public_url is missing or is not a Cloudinary URL!")
-                                logger.error(f"Current public_url: {current_public_url}")
-                                logger.error(f"Available keys: {list(final_result.keys())}")
-                                logger.error(f"shareable_page_url: {shareable_page_url}")
-                                logger.error(f"public_url (image): {public_url}")
-                                logger.error(f"image_url: {image_url}")
-                                
-                                # Determine which file to upload (branded or original)
-                                file_to_upload = None
-                                if final_result.get('branding_applied') and final_result.get('image_path'):
-                                    file_to_upload = final_result.get('image_path')
-                                    logger.info(f"Using branded image path for emergency upload: {file_to_upload}")
-                                elif saved_path:
-                                    file_to_upload = saved_path
-                                    logger.info(f"Using original image path for emergency upload: {file_to_upload}")
-                                
-                                # Last resort: try to upload again if we have a file path
-                                if file_to_upload and default_storage.exists(file_to_upload):
-                                    logger.warning("WARNING: Attempting emergency Cloudinary upload...")
-                                    try:
-                                        emergency_url = upload_to_cloudinary(file_to_upload)
-                                        if emergency_url:
-                                            logger.info(f"SUCCESS: Emergency upload succeeded: {emergency_url}")
-                                            # Try to create HTML page too
-                                            caption_text = final_result.get("caption", "")
-                                            full_caption_text = final_result.get("full_caption", caption_text)
-                                            if caption_text or full_caption_text:
-                                                html_content = create_shareable_html_page(
-                                                    emergency_url,
-                                                    caption_text,
-                                                    full_caption_text
-                                                )
-                                                emergency_html_url = upload_html_to_cloudinary(
-                                                    html_content,
-                                                    filename=f"emergency_{int(time.time())}"
-                                                )
-                                                if emergency_html_url:
-                                                    final_result['public_url'] = emergency_html_url
-                                                    final_result['cloudinary_url'] = emergency_url  # Direct image URL
-                                                    logger.info(f"SUCCESS: Emergency HTML page created: {emergency_html_url}")
-                                                else:
-                                                    final_result['public_url'] = emergency_url
-                                                    final_result['cloudinary_url'] = emergency_url
-                                            else:
-                                                final_result['public_url'] = emergency_url
-                                                final_result['cloudinary_url'] = emergency_url
-                                        else:
-                                            logger.error("ERROR: Emergency upload also failed")
-                                            logger.error("WARNING: Setting public_url to empty - Facebook sharing will not work")
-                                            final_result['public_url'] = ''
-                                            final_result['cloudinary_url'] = ''
-                                    except Exception as emergency_error:
-                                        logger.error(f"ERROR: Emergency upload exception: {emergency_error}")
-                                        import traceback
-                                        traceback.print_exc()
-                                        final_result['public_url'] = ''
-                                        final_result['cloudinary_url'] = ''
+                            if brand_future is not None:
+                                self._report_progress(progress_callback, 'applying_branding', 85)
+                                brand_result = brand_future.result()
+                                if brand_result.get('status') == 'success':
+                                    branded_url = brand_result.get("image_url", image_url)
+                                    if branded_url and not branded_url.startswith('http'):
+                                        branded_url = f"{get_domain_url()}{branded_url}"
+                                    final_result.update({
+                                        "image_path": brand_result.get("image_path", saved_path),
+                                        "image_url": branded_url,
+                                        "public_url": branded_url,
+                                        "filename": brand_result.get("filename", filename),
+                                        "branding_applied": True,
+                                        "logo_added": brand_result.get("logo_added", False),
+                                        "contact_info_added": brand_result.get("contact_info_added", False),
+                                        "branding_metadata": brand_result.get("branding_metadata", {})
+                                    })
                                 else:
-                                    logger.error(f"ERROR: No file to upload. saved_path: {saved_path}, file_to_upload: {file_to_upload}")
-                                    final_result['public_url'] = ''
-                                    final_result['cloudinary_url'] = ''
-                                
-                                logger.info(f"Final public_url after emergency fix: {final_result.get('public_url')}")
-                            
-                            # CRITICAL: Final verification - ensure public_url and cloudinary_url keys exist and are strings
-                            if 'public_url' not in final_result:
-                                logger.error("CRITICAL: public_url key missing from final_result!")
-                                final_result['public_url'] = ''
-                            elif final_result.get('public_url') is None:
-                                logger.error("CRITICAL: public_url is None in final_result!")
-                                final_result['public_url'] = ''
-                            else:
-                                # Ensure it's a string
-                                final_result['public_url'] = str(final_result.get('public_url', ''))
+                                    logger.warning(f"Brand overlay failed: {brand_result.get('message')}")
                             
-                            # Ensure cloudinary_url is also set (use public_url if it's a direct image URL, not HTML page)
-                            if 'cloudinary_url' not in final_result:
-                                # If public_url is a Cloudinary image URL (not HTML), use it
-                                current_public = final_result.get('public_url', '')
-                                if current_public and current_public.startswith('http') and 'cloudinary' in current_public and not current_public.endswith('.html'):
-                                    final_result['cloudinary_url'] = current_public
-                                else:
-                                    final_result['cloudinary_url'] = ''
-                            elif final_result.get('cloudinary_url') is None:
-                                final_result['cloudinary_url'] = ''
-                            
-                            # Verify public_url is actually set
-                            if not final_result.get('public_url'):
-                                logger.error("CRITICAL: public_url is STILL empty after all attempts!")
-                                logger.error("This will cause Facebook sharing to fail!")
+                            # Publish the final (branded or original) image: CDN upload, delivery
+                            # copy and shareable HTML page run in the background
+                            self._report_progress(progress_callback, 'creating_share_page', 90)
+                            try:
+                                self._timed_stage(
+                                    timings, 'schedule_publish', get_poster_publisher().publish,
+                                    final_result["image_path"],
+                                    final_result["caption"],
+                                    final_result["full_caption"] or final_result["caption"],
+                                    image_bytes=None if final_result["branding_applied"] else png_bytes
+                                )
+                                final_result["publish_status"] = "pending"
+                            except Exception as publish_error:
+                                logger.error(f"Failed to schedule poster publishing: {str(publish_error)}")
+                                final_result["publish_status"] = "failed"
                             
-                            logger.info(f"=== RETURNING RESULT ===")
-                            logger.info(f"public_url: {final_result.get('public_url')}")
-                            logger.info(f"public_url type: {type(final_result.get('public_url'))}")
-                            logger.info(f"public_url in final_result: {'public_url' in final_result}")
-                            logger.info(f"status: {final_result.get('status')}")
-                            logger.info(f"All result keys: {list(final_result.keys())}")
+                            timings['total'] = round((time.perf_counter() - pipeline_started) * 1000, 1)
+                            final_result["stage_timings_ms"] = dict(timings)
+                            logger.info(f"Poster pipeline timings (ms): {final_result['stage_timings_ms']}")
                             return final_result
                         except Exception as img_error:
                             logger.error(f"Error processing image: {str(img_error)}")
@@ -1034,8 +779,13 @@ class AIPosterService:
         except Exception as e:
             logger.error(f"Error generating poster from prompt: {str(e)}")
             return {"status": "error", "message": str(e)}
+        finally:
+            if pool is not None:
+                # A caption still running after an early error return is left to finish on its own
+                pool.shutdown(wait=False)
     
-    def generate_with_image(self, prompt: str, image_path: str, aspect_ratio: str = "1:1", user=None) -> Dict[str, Any]:
+    def generate_with_image(self, prompt: str, image_path: str, aspect_ratio: str = "1:1", user=None,
+                            use_cache: bool = True) -> Dict[str, Any]:
         """
         Generate edited poster using prompt + uploaded image with branding
         
@@ -1044,10 +794,19 @@ class AIPosterService:
             image_path: Path to uploaded image (Django storage path)
             aspect_ratio: Image aspect ratio (1:1, 16:9, 4:5)
             user: User object for automatic branding
+            use_cache: Reuse an identical earlier render if one is cached
             
         Returns:
             Dict containing status and image path
         """
+        return self._cached_render(
+            'image', prompt, aspect_ratio,
+            lambda: self._generate_with_image(prompt, image_path, aspect_ratio, user),
+            image_paths=[image_path], user=user, use_cache=use_cache
+        )
+    
+    def _generate_with_image(self, prompt: str, image_path: str, aspect_ratio: str = "1:1", user=None) -> Dict[str, Any]:
+        """Uncached generate_with_image pipeline"""
         try:
             if not self.client:
                 return {"status": "error", "message": "Gemini client not available"}
@@ -1150,7 +909,7 @@ class AIPosterService:
                 logger.info("Image generation: image_config not available; relying on prompt directive for aspect ratio")
             
             try:
-                response = self._retry_api_call(
+                response = self.gemini.call(
                     self.client.models.generate_content,
                     model="gemini-2.5-flash-image",
                     contents=[image_part, base_prompt],
@@ -1161,7 +920,7 @@ class AIPosterService:
                 logger.error(f"API call failed after retries: {error_str}")
                 return {
                     "status": "error",
-                    "message": "Google API is experiencing temporary issues. Please try again in a few moments." if ('500' in error_str or 'INTERNAL' in error_str) else f"Image generation failed: {error_str}"
+                    "message": "Google API is experiencing temporary issues. Please try again in a few moments." if is_temporary_failure(api_error) else f"Image generation failed: {error_str}"
                 }
             
             # Process response and save image
@@ -1178,6 +937,9 @@ class AIPosterService:
                 if part.inline_data is not None:
                     edited_image = Image.open(BytesIO(part.inline_data.data))
 
+                    # Fix the ratio locally first; re-generate only if that would lose too much
+                    edited_image = self._correct_aspect_ratio_locally(edited_image, normalized_ar)
+
                     # Strict AR enforcement with retries
                     max_retries = 2
                     attempt_idx = 0
@@ -1193,7 +955,7 @@ class AIPosterService:
                             if dim_config is not None:
                                 retry_kwargs["image_config"] = dim_config
                             try:
-                                response_retry = self._retry_api_call(
+                                response_retry = self.gemini.call(
                                     self.client.models.generate_content,
                                     model="gemini-2.5-flash-image",
                                     contents=[image_part, stricter_prompt],
@@ -1201,6 +963,8 @@ class AIPosterService:
                                 )
                             except Exception as retry_error:
                                 logger.warning(f"Aspect ratio retry failed: {retry_error}")
+                                if isinstance(retry_error, GeminiUnavailableError):
+                                    break
                                 continue
                             if not response_retry.candidates or len(response_retry.candidates) == 0:
                                 continue
@@ -1216,9 +980,9 @@ class AIPosterService:
                             if retry_succeeded:
                                 break
                         attempt_idx += 1
-                    # Fallback: if still mismatched after retries, enforce by center-cropping
+                    # Fallback: if still mismatched after retries, use the best local correction
                     if not self._is_aspect_ratio_match(edited_image, normalized_ar):
-                        logger.warning("Model did not honor aspect ratio for edit after strict retries; enforcing via cropping")
+                        logger.warning("Model did not honor aspect ratio for edit after strict retries; enforcing locally")
                         edited_image = self._enforce_aspect_ratio(edited_image, normalized_ar)
                     
                     # Generate unique filename
@@ -1460,7 +1224,8 @@ class AIPosterService:
             logger.error(f"Error generating edited poster: {str(e)}")
             return {"status": "error", "message": str(e)}
     
-    def generate_composite(self, prompt: str, image_paths: List[str], aspect_ratio: str = "16:9") -> Dict[str, Any]:
+    def generate_composite(self, prompt: str, image_paths: List[str], aspect_ratio: str = "16:9", user=None,
+                           use_cache: bool = True) -> Dict[str, Any]:
         """
         Generate composite poster combining multiple images + text prompt
         
@@ -1468,10 +1233,20 @@ class AIPosterService:
             prompt: Text description for the composite
             image_paths: List of image file paths
             aspect_ratio: Image aspect ratio (1:1, 16:9, 4:5)
+            user: Requesting user (scopes the render cache to its tenant)
+            use_cache: Reuse an identical earlier render if one is cached
             
         Returns:
             Dict containing status and image path
         """
+        return self._cached_render(
+            'composite', prompt, aspect_ratio,
+            lambda: self._generate_composite(prompt, image_paths, aspect_ratio),
+            image_paths=image_paths, user=user, use_cache=use_cache
+        )
+    
+    def _generate_composite(self, prompt: str, image_paths: List[str], aspect_ratio: str = "16:9") -> Dict[str, Any]:
+        """Uncached generate_composite pipeline"""
         try:
             if not self.client:
                 return {"status": "error", "message": "Gemini client not available"}
@@ -1546,7 +1321,7 @@ class AIPosterService:
                 logger.info("Image generation: image_config not available; relying on prompt directive for aspect ratio")
             
             try:
-                response = self._retry_api_call(
+                response = self.gemini.call(
                     self.client.models.generate_content,
                     model="gemini-2.5-flash-image",
                     contents=contents,
@@ -1557,7 +1332,7 @@ class AIPosterService:
                 logger.error(f"API call failed after retries: {error_str}")
                 return {
                     "status": "error",
-                    "message": "Google API is experiencing temporary issues. Please try again in a few moments." if ('500' in error_str or 'INTERNAL' in error_str) else f"Image generation failed: {error_str}"
+                    "message": "Google API is experiencing temporary issues. Please try again in a few moments." if is_temporary_failure(api_error) else f"Image generation failed: {error_str}"
                 }
             
             # Process response and save image
@@ -1569,6 +1344,9 @@ class AIPosterService:
                 if part.inline_data is not None:
                     composite_image = Image.open(BytesIO(part.inline_data.data))
 
+                    # Fix the ratio locally first; re-generate only if that would lose too much
+                    composite_image = self._correct_aspect_ratio_locally(composite_image, normalized_ar)
+
                     # Strict AR enforcement with retries
                     max_retries = 2
                     attempt_idx = 0
@@ -1584,7 +1362,7 @@ class AIPosterService:
                             if dim_config is not None:
                                 retry_kwargs["image_config"] = dim_config
                             try:
-                                response_retry = self._retry_api_call(
+                                response_retry = self.gemini.call(
                                     self.client.models.generate_content,
                                     model="gemini-2.5-flash-image",
                                     contents=contents[:-1] + [stricter_prompt],
@@ -1592,6 +1370,8 @@ class AIPosterService:
                                 )
                             except Exception as retry_error:
                                 logger.warning(f"Composite aspect ratio retry failed: {retry_error}")
+                                if isinstance(retry_error, GeminiUnavailableError):
+                                    break
                                 continue
                             if not response_retry.candidates or len(response_retry.candidates) == 0:
                                 continue
@@ -1605,9 +1385,9 @@ class AIPosterService:
                             if retry_succeeded:
                                 break
                         attempt_idx += 1
-                    # Fallback: if still mismatched after retries, enforce by center-cropping
+                    # Fallback: if still mismatched after retries, use the best local correction
                     if not self._is_aspect_ratio_match(composite_image, normalized_ar):
-                        logger.warning("Model did not honor aspect ratio for composite after strict retries; enforcing via cropping")
+                        logger.warning("Model did not honor aspect ratio for composite after strict retries; enforcing locally")
                         composite_image = self._enforce_aspect_ratio(composite_image, normalized_ar)
                     
                     # Generate unique filename
@@ -1652,7 +1432,7 @@ class AIPosterService:
                             retry_kwargs["image_config"] = dim_config
                             logger.info("Retry (composite) with dimension-based image_config")
                         try:
-                            response_retry = self._retry_api_call(
+                            response_retry = self.gemini.call(
                                 self.client.models.generate_content,
                                 model="gemini-2.5-flash-image",
                                 contents=contents[:-1] + [stricter_prompt],
@@ -1660,6 +1440,8 @@ class AIPosterService:
                             )
                         except Exception as retry_error:
                             logger.warning(f"Composite dimension retry failed: {retry_error}")
+                            if isinstance(retry_error, GeminiUnavailableError):
+                                break
                             continue
                         if not response_retry.candidates or len(response_retry.candidates) == 0:
                             continue
@@ -1800,7 +1582,7 @@ class AIPosterService:
                 config_kwargs["image_config"] = image_config
             
             try:
-                response = self._retry_api_call(
+                response = self.gemini.call(
                     self.client.models.generate_content,
                     model="gemini-2.5-flash-image",
                     contents=[image_part, enhanced_prompt],
@@ -1811,7 +1593,7 @@ class AIPosterService:
                 logger.error(f"API call failed after retries: {error_str}")
                 return {
                     "status": "error",
-                    "message": "Google API is experiencing temporary issues. Please try again in a few moments." if ('500' in error_str or 'INTERNAL' in error_str) else f"Text overlay failed: {error_str}"
+                    "message": "Google API is experiencing temporary issues. Please try again in a few moments." if is_temporary_failure(api_error) else f"Text overlay failed: {error_str}"
                 }
             
             # Process response and save image
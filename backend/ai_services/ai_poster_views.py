@@ -3,25 +3,171 @@ AI Poster Generation API Views
 Django REST Framework views for poster generation endpoints
 """
 import os
+import json
 import time
 import logging
+from urllib.parse import urlencode
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework import status
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from django.conf import settings
-from django.db.models import Q
 from .ai_poster_service import AIPosterService
 from .models import GeneratedPoster
+from .pagination import decode_cursor
+from .poster_history import COUNT_MODES, list_poster_history, parse_fields
+from .poster_jobs import (
+    apply_published_urls, enqueue_poster_job, get_poster_job, resolve_user_organization,
+    save_generated_poster, serialize_poster_job,
+)
 
 logger = logging.getLogger(__name__)
 
 # Initialize the AI poster service
 ai_poster_service = AIPosterService()
 
+VALID_ASPECT_RATIOS = ['1:1', '16:9', '9:16', '4:5', '5:4', '3:2', '2:3']
+MAX_LIST_LIMIT = 100
+
+# Hard ceiling on one SSE connection; each open stream occupies a sync worker
+SSE_MAX_DURATION_LIMIT = 30
+
+
+def _resolve_poster_user(request):
+    """
+    Resolve the user a poster is generated for.
+    Falls back to development headers, then to the first user with a complete
+    company profile so branding can still be applied in local setups.
+    """
+    user = getattr(request, 'user', None) if hasattr(request, 'user') else None
+    
+    # Enhanced debugging for user context
+    logger.info(f"=== POSTER GENERATION DEBUG ===")
+    logger.info(f"Request user: {user}")
+    logger.info(f"User authenticated: {hasattr(request, 'user') and request.user.is_authenticated}")
+    logger.info(f"Request headers: {dict(request.META)}")
+    
+    # Check for authentication headers
+    auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+    logger.info(f"Authorization header: {auth_header}")
+    
+    # Try to get user from different authentication methods
+    if not user or not user.is_authenticated:
+        logger.warning("No authenticated user found - trying fallback methods")
+        
+        # Check if we can get user from development headers
+        dev_user_id = request.META.get('HTTP_X_DEV_USER_ID')
+        if dev_user_id:
+            try:
+                from django.contrib.auth import get_user_model
+                User = get_user_model()
+                user = User.objects.get(id=dev_user_id)
+                logger.info(f"Found user from development headers: {user}")
+            except Exception as e:
+                logger.error(f"Failed to get user from dev headers: {e}")
+        
+        # Fallback: Try to get the first user with a complete company profile
+        if not user:
+            try:
+                from users.models import CompanyProfile
+                from django.contrib.auth import get_user_model
+                User = get_user_model()
+                
+                # Get the first user with a complete company profile
+                company_profiles = CompanyProfile.objects.filter(
+                    logo__isnull=False,
+                    company_name__isnull=False
+                ).exclude(company_name='').exclude(logo='')
+                
+                if company_profiles.exists():
+                    user = company_profiles.first().user
+                    logger.info(f"Using fallback user with complete profile: {user.username}")
+                else:
+                    logger.warning("No users with complete company profiles found")
+            except Exception as e:
+                logger.error(f"Error in fallback user selection: {e}")
+    else:
+        logger.info(f"Authenticated user found: {user.username} ({user.email})")
+        
+        # Check if user has company profile
+        try:
+            from users.models import CompanyProfile
+            company_profile = getattr(user, 'company_profile', None)
+            if company_profile:
+                logger.info(f"Company profile found: {company_profile.company_name}")
+                logger.info(f"Has logo: {bool(company_profile.logo)}")
+                logger.info(f"Has contact info: {bool(company_profile.get_contact_info())}")
+                logger.info(f"Profile complete: {company_profile.has_complete_profile}")
+            else:
+                logger.warning("No company profile found for user")
+        except Exception as e:
+            logger.error(f"Error checking company profile: {e}")
+    
+    return user
+
+
+def _authenticate_plain_request(request):
+    """Run the DRF authenticators for a plain Django view and return the user"""
+    drf_request = Request(request, authenticators=[
+        authenticator() for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    ])
+    try:
+        return drf_request.user
+    except Exception as e:
+        logger.warning(f"Could not authenticate request: {e}")
+        return None
+
+
+def _is_truthy(value) -> bool:
+    """Interpret JSON/form booleans ("true", "1", True)"""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+
+def _queue_poster_job(request, prompt, aspect_ratio, branding_user):
+    """
+    Queue a background poster job and build the 202 response
+    
+    The job is owned by the authenticated requester. Anonymous requesters get an
+    access_token instead, which they must send (X-Poster-Job-Token header or
+    ?token= query parameter) to poll the job; branding_user only brands the poster.
+    """
+    try:
+        job, access_token = enqueue_poster_job(prompt, aspect_ratio, request.user, branding_user)
+    except Exception:
+        return Response({
+            "success": False,
+            "error": "Could not queue poster generation job. Please try again later."
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    
+    job_id = str(job.id)
+    query = f"?{urlencode({'token': access_token})}" if access_token else ""
+    data = {
+        "success": True,
+        "message": "Poster generation queued",
+        "job_id": job_id,
+        "status": job.status,
+        "status_url": f"/api/ai/ai-poster/jobs/{job_id}/{query}",
+        "events_url": f"/api/ai/ai-poster/jobs/{job_id}/events/{query}",
+    }
+    if access_token:
+        data["access_token"] = access_token
+    return Response(data, status=status.HTTP_202_ACCEPTED)
+
+
+def _poster_job_token(request):
+    """Access token of an anonymous poster job, from the header or query string"""
+    return request.META.get('HTTP_X_POSTER_JOB_TOKEN') or request.GET.get('token')
+
 
 @csrf_exempt
 @api_view(['POST'])
@@ -33,7 +179,8 @@ def generate_poster(request):
     
     Body: {
         "prompt": "Create a modern textile poster for a silk saree brand",
-        "aspect_ratio": "4:5"  // Optional: 1:1, 16:9, 4:5
+        "aspect_ratio": "4:5",  // Optional: 1:1, 16:9, 4:5
+        "async": true  // Optional: queue a background job and return its id (202)
     }
     """
     try:
@@ -48,8 +195,7 @@ def generate_poster(request):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Validate aspect ratio (broaden supported list)
-        valid_ratios = ['1:1', '16:9', '9:16', '4:5', '5:4', '3:2', '2:3']
-        if aspect_ratio not in valid_ratios:
+        if aspect_ratio not in VALID_ASPECT_RATIOS:
             aspect_ratio = '1:1'
         
         logger.info(f"Generating poster with prompt: {prompt[:50]}...")
@@ -62,76 +208,22 @@ def generate_poster(request):
             }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         
         # Generate poster using AI service
-        user = getattr(request, 'user', None) if hasattr(request, 'user') else None
-        
-        # Enhanced debugging for user context
-        logger.info(f"=== POSTER GENERATION DEBUG ===")
-        logger.info(f"Request user: {user}")
-        logger.info(f"User authenticated: {hasattr(request, 'user') and request.user.is_authenticated}")
-        logger.info(f"Request headers: {dict(request.META)}")
+        user = _resolve_poster_user(request)
         
-        # Check for authentication headers
-        auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-        logger.info(f"Authorization header: {auth_header}")
-        
-        # Try to get user from different authentication methods
-        if not user or not user.is_authenticated:
-            logger.warning("No authenticated user found - trying fallback methods")
-            
-            # Check if we can get user from development headers
-            dev_user_id = request.META.get('HTTP_X_DEV_USER_ID')
-            if dev_user_id:
-                try:
-                    from django.contrib.auth import get_user_model
-                    User = get_user_model()
-                    user = User.objects.get(id=dev_user_id)
-                    logger.info(f"Found user from development headers: {user}")
-                except Exception as e:
-                    logger.error(f"Failed to get user from dev headers: {e}")
-            
-            # Fallback: Try to get the first user with a complete company profile
-            if not user:
-                try:
-                    from users.models import CompanyProfile
-                    from django.contrib.auth import get_user_model
-                    User = get_user_model()
-                    
-                    # Get the first user with a complete company profile
-                    company_profiles = CompanyProfile.objects.filter(
-                        logo__isnull=False,
-                        company_name__isnull=False
-                    ).exclude(company_name='').exclude(logo='')
-                    
-                    if company_profiles.exists():
-                        user = company_profiles.first().user
-                        logger.info(f"Using fallback user with complete profile: {user.username}")
-                    else:
-                        logger.warning("No users with complete company profiles found")
-                except Exception as e:
-                    logger.error(f"Error in fallback user selection: {e}")
-        else:
-            logger.info(f"Authenticated user found: {user.username} ({user.email})")
-            
-            # Check if user has company profile
-            try:
-                from users.models import CompanyProfile
-                company_profile = getattr(user, 'company_profile', None)
-                if company_profile:
-                    logger.info(f"Company profile found: {company_profile.company_name}")
-                    logger.info(f"Has logo: {bool(company_profile.logo)}")
-                    logger.info(f"Has contact info: {bool(company_profile.get_contact_info())}")
-                    logger.info(f"Profile complete: {company_profile.has_complete_profile}")
-                else:
-                    logger.warning("No company profile found for user")
-            except Exception as e:
-                logger.error(f"Error checking company profile: {e}")
+        # Async mode: queue a background job and return immediately
+        if _is_truthy(data.get('async')):
+            return _queue_poster_job(request, prompt, aspect_ratio, user)
         
         # Pass request context to service for proper URL generation
         ai_poster_service._request = request
         logger.info(f"=== STARTING POSTER GENERATION ===")
         logger.info(f"Prompt: {prompt[:50]}...")
         logger.info(f"Aspect Ratio: {aspect_ratio}")
-        result = ai_poster_service.generate_from_prompt(prompt, aspect_ratio, user)
+        # The render cache is scoped to the user's tenant; only trust it for the
+        # authenticated requester, never for a fallback user
+        result = ai_poster_service.generate_from_prompt(
+            prompt, aspect_ratio, user, use_cache=request.user.is_authenticated
+        )
         logger.info(f"Generation result status: {result.get('status')}")
         logger.info(f"Generation result keys: {list(result.keys())}")
         logger.info(f"public_url in result: {result.get('public_url')}")
@@ -139,50 +231,11 @@ def generate_poster(request):
         
         if result.get('status') == 'success':
             # Get organization from user if available
-            organization = None
-            if user and hasattr(user, 'organization'):
-                organization = user.organization
-            elif user:
-                # Try to get organization from user's company profile
-                try:
-                    from users.models import CompanyProfile
-                    company_profile = getattr(user, 'company_profile', None)
-                    if company_profile and hasattr(company_profile, 'organization'):
-                        organization = company_profile.organization
-                except Exception as e:
-                    logger.warning(f"Could not get organization: {e}")
+            organization = resolve_user_organization(user)
             
             # Save the generated poster to database
             try:
-                public_url = result.get('public_url')
-                logger.info(f"Poster result - public_url: {public_url}")
-                logger.info(f"Poster result keys: {list(result.keys())}")
-                
-                # Ensure public_url is set - use image_url as fallback
-                if not public_url:
-                    logger.warning("public_url is None, using image_url as fallback")
-                    public_url = result.get('image_url', '')
-                
-                poster = GeneratedPoster.objects.create(
-                    organization=organization,
-                    user=user,
-                    image_url=result.get('image_url', ''),
-                    image_path=result.get('image_path', ''),
-                    public_url=public_url or result.get('image_url', ''),  # Cloudinary URL for sharing (fallback to image_url)
-                    caption=result.get('caption', ''),
-                    full_caption=result.get('full_caption', ''),
-                    prompt=prompt,
-                    aspect_ratio=result.get('aspect_ratio_final', aspect_ratio),
-                    width=result.get('width'),
-                    height=result.get('height'),
-                    hashtags=result.get('hashtags', []),
-                    emoji=result.get('emoji', ''),
-                    call_to_action=result.get('call_to_action', ''),
-                    branding_applied=result.get('branding_applied', False),
-                    logo_added=result.get('logo_added', False),
-                    contact_info_added=result.get('contact_info_added', False),
-                    branding_metadata=result.get('branding_metadata', {})
-                )
+                poster = save_generated_poster(result, prompt, aspect_ratio, user, organization)
                 logger.info(f"Poster saved to database with ID: {poster.id}")
             except Exception as e:
                 logger.error(f"Failed to save poster to database: {str(e)}")
@@ -455,6 +508,109 @@ def generate_poster(request):
             }, status=500)
 
 
+@csrf_exempt
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def create_poster_job(request):
+    """
+    POST /api/ai/ai-poster/jobs/
+    Queue poster generation in the background and return a job id immediately
+    
+    Body: {
+        "prompt": "Create a modern textile poster for a silk saree brand",
+        "aspect_ratio": "4:5"  // Optional: 1:1, 16:9, 4:5
+    }
+    """
+    prompt = request.data.get('prompt')
+    aspect_ratio = request.data.get('aspect_ratio', '1:1')
+    
+    if not prompt:
+        return Response({
+            "success": False,
+            "error": "Prompt is required"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if aspect_ratio not in VALID_ASPECT_RATIOS:
+        aspect_ratio = '1:1'
+    
+    if not ai_poster_service.is_available():
+        return Response({
+            "success": False,
+            "error": "AI poster service is not available. Please check configuration."
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    
+    return _queue_poster_job(request, prompt, aspect_ratio, _resolve_poster_user(request))
+
+
+@csrf_exempt
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def poster_job_status(request, job_id):
+    """
+    GET /api/ai/ai-poster/jobs/<job_id>/
+    Poll the progress of a background poster job (the recommended transport).
+    Only the job owner and members of its organization can see it; anonymous
+    jobs need the access token returned when they were queued.
+    """
+    job = get_poster_job(job_id, request.user, _poster_job_token(request))
+    if job is None:
+        return Response({
+            "success": False,
+            "error": "Job not found"
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({"success": True, **serialize_poster_job(job)}, status=status.HTTP_200_OK)
+
+
+@require_GET
+def poster_job_events(request, job_id):
+    """
+    GET /api/ai/ai-poster/jobs/<job_id>/events/
+    Server-Sent Events stream of job progress; closes once the job finishes.
+    Plain Django view so EventSource's Accept: text/event-stream is not rejected
+    by DRF content negotiation.
+    
+    Each open stream holds a sync worker while it polls, so a connection lasts
+    at most POSTER_JOB_SSE_MAX_DURATION (never more than SSE_MAX_DURATION_LIMIT
+    seconds) and then ends with a "timeout" event; EventSource reconnects on
+    its own, other clients should poll the status endpoint instead.
+    """
+    user = _authenticate_plain_request(request)
+    access_token = _poster_job_token(request)
+    job = get_poster_job(job_id, user, access_token)
+    if job is None:
+        return JsonResponse({"success": False, "error": "Job not found"}, status=404)
+    
+    poll_interval = getattr(settings, 'POSTER_JOB_SSE_POLL_INTERVAL', 1.0)
+    max_duration = min(getattr(settings, 'POSTER_JOB_SSE_MAX_DURATION', 20), SSE_MAX_DURATION_LIMIT)
+    
+    def event_stream():
+        last_update = None
+        deadline = time.monotonic() + max_duration
+        current = job
+        while True:
+            if current.updated_at != last_update:
+                last_update = current.updated_at
+                payload = json.dumps(serialize_poster_job(current), cls=DjangoJSONEncoder)
+                yield f"event: progress\ndata: {payload}\n\n"
+            if current.is_finished:
+                yield "event: end\ndata: {}\n\n"
+                return
+            if time.monotonic() >= deadline:
+                # Client reconnects (EventSource does this automatically) or falls back to polling
+                yield "event: timeout\ndata: {}\n\n"
+                return
+            time.sleep(poll_interval)
+            current = get_poster_job(job_id, user, access_token)
+            if current is None:
+                return
+    
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable nginx buffering for SSE
+    return response
+
+
 @csrf_exempt
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -575,7 +731,9 @@ def edit_poster(request):
             
             # Generate edited poster using AI service with user for branding
             logger.info(f"Calling generate_with_image with path: {saved_path}")
-            result = ai_poster_service.generate_with_image(prompt, saved_path, aspect_ratio, user)
+            result = ai_poster_service.generate_with_image(
+                prompt, saved_path, aspect_ratio, user, use_cache=request.user.is_authenticated
+            )
             logger.info(f"generate_with_image returned: {result.get('status')}")
             
             if result.get('status') == 'success':
@@ -625,6 +783,7 @@ def edit_poster(request):
                         contact_info_added=result.get('contact_info_added', False),
                         branding_metadata=result.get('branding_metadata', {})
                     )
+                    apply_published_urls(poster)
                     logger.info(f"Edited poster saved to database with ID: {poster.id}")
                 except Exception as e:
                     logger.error(f"Failed to save edited poster to database: {str(e)}")
@@ -1043,49 +1202,16 @@ def composite_poster(request):
             
             logger.info(f"Creating composite poster with {len(temp_paths)} images and prompt: {prompt[:50]}...")
             
+            user = _resolve_poster_user(request)
+            
+            # The render cache is scoped to the requester's tenant; the anonymous
+            # fallback user belongs to someone else, so it must not pick the tenant
+            cache_user = request.user if request.user.is_authenticated else None
+            
             # Generate composite poster using AI service
-            result = ai_poster_service.generate_composite(prompt, temp_paths, aspect_ratio)
+            result = ai_poster_service.generate_composite(prompt, temp_paths, aspect_ratio, cache_user)
             
             if result.get('status') == 'success':
-                # Get user and organization for saving (same logic as generate_poster)
-                user = getattr(request, 'user', None) if hasattr(request, 'user') else None
-                
-                # Try to get user from different authentication methods
-                if not user or not user.is_authenticated:
-                    logger.warning("No authenticated user found in composite_poster - trying fallback methods")
-                    
-                    # Check if we can get user from development headers
-                    dev_user_id = request.META.get('HTTP_X_DEV_USER_ID')
-                    if dev_user_id:
-                        try:
-                            from django.contrib.auth import get_user_model
-                            User = get_user_model()
-                            user = User.objects.get(id=dev_user_id)
-                            logger.info(f"Found user from development headers: {user}")
-                        except Exception as e:
-                            logger.error(f"Failed to get user from dev headers: {e}")
-                    
-                    # Fallback: Try to get the first user with a complete company profile
-                    if not user:
-                        try:
-                            from users.models import CompanyProfile
-                            from django.contrib.auth import get_user_model
-                            User = get_user_model()
-                            
-                            # Get the first user with a complete company profile
-                            company_profiles = CompanyProfile.objects.filter(
-                                logo__isnull=False,
-                                company_name__isnull=False
-                            ).exclude(company_name='').exclude(logo='')
-                            
-                            if company_profiles.exists():
-                                user = company_profiles.first().user
-                                logger.info(f"Using fallback user with complete profile: {user.username}")
-                            else:
-                                logger.warning("No users with complete company profiles found")
-                        except Exception as e:
-                            logger.error(f"Error in fallback user selection: {e}")
-                
                 # Get organization from user if available
                 organization = None
                 if user and hasattr(user, 'organization'):
@@ -1122,6 +1248,7 @@ def composite_poster(request):
                         contact_info_added=result.get('contact_info_added', False),
                         branding_metadata=result.get('branding_metadata', {})
                     )
+                    apply_published_urls(poster)
                     logger.info(f"Composite poster saved to database with ID: {poster.id}")
                 except Exception as e:
                     logger.error(f"Failed to save composite poster to database: {str(e)}")
@@ -1286,6 +1413,7 @@ def add_text_overlay(request):
                         contact_info_added=result.get('contact_info_added', False),
                         branding_metadata=result.get('branding_metadata', {})
                     )
+                    apply_published_urls(poster)
                     logger.info(f"Poster with text overlay saved to database with ID: {poster.id}")
                 except Exception as e:
                     logger.error(f"Failed to save poster with text overlay to database: {str(e)}")
@@ -1337,11 +1465,14 @@ def add_text_overlay(request):
 def list_posters(request):
     """
     GET /api/ai/ai-poster/posters/
-    List all generated posters for the current user/organization
+    List generated posters for the current user/organization, newest first
     
     Query params:
-    - limit: Number of posters to return (default: 50)
-    - offset: Offset for pagination (default: 0)
+    - limit: Number of posters to return (default: 50, max: 100)
+    - cursor: next_cursor of the previous page; pages by (created_at, id)
+    - offset: Legacy offset pagination, ignored when a cursor is given
+    - fields: Comma separated fields to return (default: all)
+    - count: exact, approximate or none (default: exact on the first page, none with a cursor)
     """
     # Handle CORS preflight requests
     if request.method == 'OPTIONS':
@@ -1361,144 +1492,59 @@ def list_posters(request):
             not request.user.is_anonymous
         )
         
-        logger.info(f"List posters - Request user: {request.user}, is_authenticated: {is_authenticated}, is_anonymous: {getattr(request.user, 'is_anonymous', 'N/A')}")
-        
         if is_authenticated:
             user = request.user
-            logger.info(f"List posters - Authenticated user: {user.email if hasattr(user, 'email') else user.username}")
-            # Try to get organization from user
-            if hasattr(user, 'organization'):
-                organization = user.organization
-                logger.info(f"List posters - Found organization from user: {organization}")
-            else:
-                try:
-                    from users.models import CompanyProfile
-                    company_profile = getattr(user, 'company_profile', None)
-                    if company_profile and hasattr(company_profile, 'organization'):
-                        organization = company_profile.organization
-                        logger.info(f"List posters - Found organization from company profile: {organization}")
-                except Exception as e:
-                    logger.warning(f"List posters - Could not get organization: {e}")
+            organization = resolve_user_organization(user)
         else:
             logger.warning("List posters - No authenticated user found")
         
         # Get query parameters
-        limit = int(request.GET.get('limit', 50))
+        limit = min(int(request.GET.get('limit', 50)), MAX_LIST_LIMIT)
         offset = int(request.GET.get('offset', 0))
+        cursor = request.GET.get('cursor')
+        count_mode = request.GET.get('count') or ('none' if cursor else 'exact')
         
-        logger.info(f"List posters - Query params: limit={limit}, offset={offset}")
-        
-        # Build queryset
-        queryset = GeneratedPoster.objects.all()
-        logger.info(f"List posters - Total posters in DB: {queryset.count()}")
-        
-        # Filter by organization and/or user
-        # Use OR condition to match items that belong to either the organization OR the user
-        # Also include items with user=None and organization=None in DEBUG mode or if no user/org is found
-        if organization and user:
-            # If both organization and user are available, show items that match either
-            # Also include items with no user/org association (for backward compatibility)
-            from django.conf import settings
-            if settings.DEBUG:
-                queryset = queryset.filter(
-                    Q(organization=organization) | Q(user=user) | 
-                    (Q(organization__isnull=True) & Q(user__isnull=True))
-                )
-            else:
-                queryset = queryset.filter(Q(organization=organization) | Q(user=user))
-        elif organization:
-            # If only organization is available, filter by organization
-            # Also include items with no org association in DEBUG mode
-            from django.conf import settings
-            if settings.DEBUG:
-                queryset = queryset.filter(Q(organization=organization) | Q(organization__isnull=True))
-            else:
-                queryset = queryset.filter(organization=organization)
-        elif user:
-            # If only user is available, filter by user
-            # Also include items with no user association in DEBUG mode
-            from django.conf import settings
-            if settings.DEBUG:
-                queryset = queryset.filter(Q(user=user) | Q(user__isnull=True))
-            else:
-                queryset = queryset.filter(user=user)
-        else:
-            # If no user or organization, show all in DEBUG mode, empty in production
-            from django.conf import settings
-            if not settings.DEBUG:
-                queryset = queryset.none()
-        
-        # Order by created_at descending
-        queryset = queryset.order_by('-created_at')
-        
-        # Apply pagination
-        total_count = queryset.count()
-        logger.info(f"List posters - Filtered count: {total_count}")
-        posters = queryset[offset:offset + limit]
-        logger.info(f"List posters - Returning {len(posters)} posters (total: {total_count})")
-        
-        # Serialize posters
-        posters_data = []
-        for poster in posters:
-            # Ensure image_url is absolute
-            image_url = poster.image_url
-            if image_url and not image_url.startswith('http'):
-                # Convert relative URL to absolute
-                if image_url.startswith('/'):
-                    # Use request to build absolute URI
-                    try:
-                        image_url = request.build_absolute_uri(image_url)
-                    except Exception:
-                        # Fallback if request.build_absolute_uri fails
-                        from django.conf import settings
-                        base_url = getattr(settings, 'BASE_URL', 'http://localhost:8000')
-                        image_url = f"{base_url}{image_url}"
-                else:
-                    # Prepend base URL for relative paths without leading slash
-                    from django.conf import settings
-                    base_url = getattr(settings, 'BASE_URL', 'http://localhost:8000')
-                    image_url = f"{base_url}/{image_url}"
-            
-            # Ensure hashtags is a list
-            hashtags = poster.hashtags
-            if hashtags is None:
-                hashtags = []
-            elif isinstance(hashtags, str):
-                # If it's a string, try to parse it or convert to list
-                try:
-                    import json
-                    hashtags = json.loads(hashtags) if hashtags else []
-                except:
-                    hashtags = [hashtags] if hashtags else []
-            elif not isinstance(hashtags, list):
-                hashtags = list(hashtags) if hashtags else []
-            
-            posters_data.append({
-                'id': str(poster.id),
-                'image_url': image_url or '',
-                'public_url': poster.public_url or '',  # Cloudinary URL for sharing
-                'caption': poster.caption or '',
-                'full_caption': poster.full_caption or '',
-                'prompt': poster.prompt or '',
-                'aspect_ratio': poster.aspect_ratio or '1:1',
-                'width': poster.width,
-                'height': poster.height,
-                'hashtags': hashtags,
-                'emoji': poster.emoji or '',
-                'call_to_action': poster.call_to_action or '',
-                'branding_applied': poster.branding_applied or False,
-                'logo_added': poster.logo_added or False,
-                'contact_info_added': poster.contact_info_added or False,
-                'created_at': poster.created_at.isoformat() if poster.created_at else '',
-                'updated_at': poster.updated_at.isoformat() if poster.updated_at else '',
-            })
+        try:
+            fields = parse_fields(request.GET.get('fields'))
+            after = decode_cursor(cursor) if cursor else None
+            if count_mode not in COUNT_MODES:
+                raise ValueError(f"count must be one of {', '.join(COUNT_MODES)}")
+        except ValueError as e:
+            return Response({
+                "success": False,
+                "error": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        logger.info(f"List posters - Query params: limit={limit}, offset={offset}, cursor={cursor}, count={count_mode}")
+        
+        page = list_poster_history(
+            user=user,
+            organization=organization,
+            fields=fields,
+            limit=limit,
+            after=after,
+            offset=offset,
+            count_mode=count_mode,
+        )
+        
+        # Ensure image URLs are absolute (stored paths may be relative)
+        results = page['results']
+        if 'image_url' in fields:
+            results = [
+                {**poster, 'image_url': _absolute_image_url(request, poster['image_url'])}
+                if poster['image_url'] and not poster['image_url'].startswith('http') else poster
+                for poster in results
+            ]
+        
+        logger.info(f"List posters - Returning {len(results)} posters (total: {page['count']})")
         
         return Response({
             "success": True,
-            "count": total_count,
-            "results": posters_data,
+            "count": page['count'],
+            "results": results,
             "limit": limit,
-            "offset": offset
+            "offset": offset,
+            "next_cursor": page['next_cursor']
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -1511,6 +1557,18 @@ def list_posters(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _absolute_image_url(request, image_url):
+    """Convert a relative poster image URL to an absolute one"""
+    if image_url.startswith('/'):
+        try:
+            return request.build_absolute_uri(image_url)
+        except Exception:
+            # Fallback if request.build_absolute_uri fails
+            return f"{getattr(settings, 'BASE_URL', 'http://localhost:8000')}{image_url}"
+    # Prepend base URL for relative paths without leading slash
+    return f"{getattr(settings, 'BASE_URL', 'http://localhost:8000')}/{image_url}"
+
+
 @csrf_exempt
 @api_view(['DELETE'])
 @permission_classes([AllowAny])
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AiServicesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "ai_services"
+
+    def ready(self):
+        """Import signal handlers when the app is ready"""
+        import ai_services.signals  # noqa
@@ -0,0 +1,160 @@
+"""
+Local aspect-ratio engine for generated posters.
+When Gemini returns a canvas with the wrong aspect ratio the poster is first
+corrected here, without another API call: either an edge-energy guided crop
+that keeps the busiest (most detailed) window of the image, or padding whose
+bands are filled with the stretched, blurred image edges. Each candidate gets
+a quality score in [0, 1] and the caller only pays for a remote re-generation
+when the best local score is below its threshold.
+"""
+import logging
+from typing import NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Energy maps are computed on a copy whose long side is at most this many pixels
+ENERGY_MAX_SIDE = 256
+# Share of each padded side's border used to judge how visible a padding seam would be
+EDGE_STRIP_RATIO = 0.05
+# Padding costs at least this share of the padded area even when the edges are flat
+PAD_BASE_PENALTY = 0.25
+# Padding bands are blurred at 1/PAD_BLUR_DOWNSCALE resolution
+PAD_BLUR_DOWNSCALE = 8
+
+
+class AspectRatioCorrection(NamedTuple):
+    """A locally corrected poster"""
+    image: Image.Image
+    method: str  # 'none', 'crop' or 'pad'
+    quality: float  # 1.0 keeps everything that matters; lower loses detail or shows seams
+
+
+def energy_map(image: Image.Image) -> np.ndarray:
+    """
+    Edge energy of a downscaled grayscale copy of the image.
+
+    Args:
+        image: Poster image
+
+    Returns:
+        float32 array (rows, cols) of smoothed Sobel gradient magnitudes
+    """
+    gray = np.asarray(image.convert('L'), dtype=np.float32)
+    height, width = gray.shape
+    scale = min(1.0, ENERGY_MAX_SIDE / float(max(height, width)))
+    if scale < 1.0:
+        gray = cv2.resize(gray, (max(1, int(round(width * scale))), max(1, int(round(height * scale)))),
+                          interpolation=cv2.INTER_AREA)
+    energy = np.abs(cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3)) + np.abs(cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3))
+    return cv2.GaussianBlur(energy, (0, 0), sigmaX=2)
+
+
+def _target_size(size: Tuple[int, int], target_ratio: float, mode: str) -> Tuple[int, int]:
+    width, height = size
+    if (width / height > target_ratio) == (mode == 'crop'):
+        return max(1, int(round(height * target_ratio))), height
+    return width, max(1, int(round(width / target_ratio)))
+
+
+def best_crop(image: Image.Image, target_ratio: float, energy: Optional[np.ndarray] = None) -> AspectRatioCorrection:
+    """
+    Crop to `target_ratio`, keeping the window that holds the most edge energy.
+
+    Only the too-long axis is cropped. Among equally good windows the one
+    nearest the centre wins, so flat images are centre-cropped.
+
+    Returns:
+        Correction whose quality is the share of the image's energy kept
+    """
+    width, height = image.size
+    new_width, new_height = _target_size(image.size, target_ratio, 'crop')
+    if energy is None:
+        energy = energy_map(image)
+
+    crop_columns = new_width < width
+    profile = energy.sum(axis=0 if crop_columns else 1).astype(np.float64)
+    full_length, kept_length = (width, new_width) if crop_columns else (height, new_height)
+    total = profile.sum()
+
+    window = max(1, min(len(profile), int(round(len(profile) * kept_length / full_length))))
+    sums = np.convolve(profile, np.ones(window), mode='valid')
+    starts = np.arange(len(sums))
+    centre = (len(profile) - window) / 2.0
+    # Ties (within 0.1% of the energy) go to the window closest to the centre
+    score = sums - 1e-3 * total * np.abs(starts - centre) / max(1.0, centre)
+    best = int(np.argmax(score))
+
+    offset = int(round(best * full_length / len(profile)))
+    offset = max(0, min(full_length - kept_length, offset))
+    box = (offset, 0, offset + new_width, height) if crop_columns else (0, offset, width, offset + new_height)
+    quality = float(sums[best] / total) if total > 0 else 1.0
+    return AspectRatioCorrection(image.crop(box), 'crop', min(1.0, quality))
+
+
+def pad_to_ratio(image: Image.Image, target_ratio: float, energy: Optional[np.ndarray] = None) -> AspectRatioCorrection:
+    """
+    Pad to `target_ratio` with bands made of the stretched, blurred image edges.
+
+    Returns:
+        Correction whose quality drops with the padded share of the canvas,
+        more so when the padded edges are busy (busy edges leave visible seams)
+    """
+    width, height = image.size
+    new_width, new_height = _target_size(image.size, target_ratio, 'pad')
+    if energy is None:
+        energy = energy_map(image)
+
+    left = (new_width - width) // 2
+    top = (new_height - height) // 2
+    right, bottom = new_width - width - left, new_height - height - top
+
+    # How busy the sides that touch the padding are, relative to the whole image
+    rows, cols = energy.shape
+    strip_rows = max(1, int(round(rows * EDGE_STRIP_RATIO)))
+    strip_cols = max(1, int(round(cols * EDGE_STRIP_RATIO)))
+    strips = [energy[:strip_rows], energy[-strip_rows:]] if new_height > height else [energy[:, :strip_cols], energy[:, -strip_cols:]]
+    mean_energy = float(energy.mean())
+    activity = min(1.0, float(np.mean([strip.mean() for strip in strips])) / mean_energy) if mean_energy > 0 else 0.0
+    padded_share = 1.0 - (width * height) / float(new_width * new_height)
+    quality = 1.0 - padded_share * (PAD_BASE_PENALTY + (1.0 - PAD_BASE_PENALTY) * activity)
+
+    mode = image.mode if image.mode in ('RGB', 'RGBA') else 'RGB'
+    pixels = np.asarray(image.convert(mode))
+    canvas = cv2.copyMakeBorder(pixels, top, bottom, left, right, cv2.BORDER_REPLICATE)
+    sigma = max(top, bottom, left, right) / 3.0
+    if sigma > 0:
+        # Blur the stretched edges on a small copy; the original is pasted back on top
+        small = cv2.resize(canvas, (max(1, new_width // PAD_BLUR_DOWNSCALE), max(1, new_height // PAD_BLUR_DOWNSCALE)),
+                           interpolation=cv2.INTER_AREA)
+        small = cv2.GaussianBlur(small, (0, 0), sigmaX=max(1.0, sigma / PAD_BLUR_DOWNSCALE))
+        canvas = cv2.resize(small, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+        canvas[top:top + height, left:left + width] = pixels
+    return AspectRatioCorrection(Image.fromarray(canvas), 'pad', max(0.0, quality))
+
+
+def correct_aspect_ratio(image: Image.Image, target_ratio: float, tolerance: float = 0.005) -> AspectRatioCorrection:
+    """
+    Best local correction of an image to `target_ratio` (width / height).
+
+    Args:
+        image: Poster image
+        target_ratio: Requested width / height
+        tolerance: Ratios this close already match
+
+    Returns:
+        The crop or pad candidate with the higher quality (method 'none' if no change is needed)
+    """
+    width, height = image.size
+    if not target_ratio or not width or not height or abs(width / height - target_ratio) <= tolerance:
+        return AspectRatioCorrection(image, 'none', 1.0)
+
+    energy = energy_map(image)
+    crop = best_crop(image, target_ratio, energy)
+    pad = pad_to_ratio(image, target_ratio, energy)
+    best = crop if crop.quality >= pad.quality else pad
+    logger.debug(f"Aspect ratio correction: crop={crop.quality:.3f} pad={pad.quality:.3f} -> {best.method}")
+    return best
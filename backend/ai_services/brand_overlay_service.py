@@ -8,7 +8,7 @@ import logging
 import math
 from typing import Dict, Any, Optional, Tuple, List
 from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
+from PIL import Image, ImageChops, ImageDraw, ImageFont, ImageFilter
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from django.conf import settings
@@ -33,7 +33,8 @@ class BrandOverlayService:
     def add_brand_overlay(self, 
                          poster_path: str, 
                          company_profile, 
-                         output_filename: Optional[str] = None) -> Dict[str, Any]:
+                         output_filename: Optional[str] = None,
+                         poster_image: Optional[Image.Image] = None) -> Dict[str, Any]:
         """
         Add brand overlay to AI-generated poster.
         
@@ -41,6 +42,7 @@ class BrandOverlayService:
             poster_path: Path to the AI-generated poster image
             company_profile: CompanyProfile instance with branding info
             output_filename: Optional custom filename for output
+            poster_image: The poster if already in memory (poster_path is then not read)
             
         Returns:
             Dict containing status and final image path
@@ -49,8 +51,9 @@ class BrandOverlayService:
             if not company_profile:
                 return {"status": "error", "message": "Company profile not found"}
             
-            # Load the poster image
-            poster_image = self._load_image(poster_path)
+            # Load the poster image unless it was passed in
+            if poster_image is None:
+                poster_image = self._load_image(poster_path)
             if not poster_image:
                 return {"status": "error", "message": "Failed to load poster image"}
             
@@ -110,28 +113,20 @@ class BrandOverlayService:
             img = image
 
         width, height = img.size
-        pixels = img.load()
+        red, green, blue, alpha = img.split()
 
-        def is_bg(px):
-            r, g, b, a = px
-            # treat fully transparent as background too
-            if a < 5:
-                return True
-            return r >= threshold and g >= threshold and b >= threshold
+        # content pixel: darkest RGB channel below threshold and not fully transparent
+        darkest = ImageChops.darker(ImageChops.darker(red, green), blue)
+        content_mask = ImageChops.darker(
+            darkest.point([255 if value < threshold else 0 for value in range(256)]),
+            alpha.point([0 if value < 5 else 255 for value in range(256)])
+        )
 
-        # scan borders inwards to find first non-background pixel rows/cols
-        top = 0
-        while top < height and all(is_bg(pixels[x, top]) for x in range(width)):
-            top += 1
-        bottom = height - 1
-        while bottom >= 0 and all(is_bg(pixels[x, bottom]) for x in range(width)):
-            bottom -= 1
-        left = 0
-        while left < width and all(is_bg(pixels[left, y]) for y in range(height)):
-            left += 1
-        right = width - 1
-        while right >= 0 and all(is_bg(pixels[right, y]) for y in range(height)):
-            right -= 1
+        # bounding box of the content mask gives the first/last non-background rows and columns
+        bbox = content_mask.getbbox()
+        if bbox is None:
+            return image
+        left, top, right, bottom = bbox[0], bbox[1], bbox[2] - 1, bbox[3] - 1
 
         # If no crop detected, return original
         if left == 0 and top == 0 and right == width - 1 and bottom == height - 1:
@@ -725,7 +720,8 @@ class BrandOverlayService:
     def create_branded_poster(self, 
                             poster_path: str, 
                             company_profile,
-                            output_filename: Optional[str] = None) -> Dict[str, Any]:
+                            output_filename: Optional[str] = None,
+                            poster_image: Optional[Image.Image] = None) -> Dict[str, Any]:
         """
         Create a branded poster with company logo and contact information.
         
@@ -733,6 +729,7 @@ class BrandOverlayService:
             poster_path: Path to the AI-generated poster
             company_profile: CompanyProfile instance
             output_filename: Optional custom filename
+            poster_image: The poster if already in memory (poster_path is then not read)
             
         Returns:
             Dict containing status and final image details
@@ -749,7 +746,7 @@ class BrandOverlayService:
                 }
             
             # Add brand overlay
-            result = self.add_brand_overlay(poster_path, company_profile, output_filename)
+            result = self.add_brand_overlay(poster_path, company_profile, output_filename, poster_image)
             
             if result.get('status') == 'success':
                 logger.info("Branded poster created successfully")
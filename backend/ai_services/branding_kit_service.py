@@ -6,10 +6,14 @@ import os
 import logging
 import re
 import base64
-from typing import Dict, Any, List, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
 from django.conf import settings
 from PIL import Image
 from io import BytesIO
+from .color_quantizer import dedupe_colors, rgb_to_hsv
 
 try:
     from google import genai
@@ -22,6 +26,57 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Minimum CIEDE2000 difference between two extracted palette colors
+PALETTE_DEDUP_DELTA_E = 10.0
+
+PALETTE_CANVAS_SIZE = 1024
+PALETTE_TITLE_Y = 100
+
+# The labeled palette's fonts and titled background never change: build them once
+_palette_canvas = None
+_palette_canvas_lock = threading.Lock()
+
+
+def _load_palette_fonts():
+    from PIL import ImageFont
+
+    try:
+        return ImageFont.truetype("arial.ttf", 52), ImageFont.truetype("arial.ttf", 22)
+    except Exception:
+        try:
+            # Try alternative font paths for different OS
+            return ImageFont.truetype("Arial.ttf", 52), ImageFont.truetype("Arial.ttf", 22)
+        except Exception:
+            return ImageFont.load_default(), ImageFont.load_default()
+
+
+def get_palette_canvas() -> Dict[str, Any]:
+    """
+    Return the shared palette background: the titled canvas, its fonts and
+    the title height. Callers must copy the image before drawing on it.
+    """
+    global _palette_canvas
+    if _palette_canvas is not None:
+        return _palette_canvas
+
+    with _palette_canvas_lock:
+        if _palette_canvas is None:
+            from PIL import ImageDraw
+
+            font_title, font_hex = _load_palette_fonts()
+            canvas = Image.new('RGB', (PALETTE_CANVAS_SIZE, PALETTE_CANVAS_SIZE), color='#EFEFEF')
+            draw = ImageDraw.Draw(canvas)
+
+            # Title: "Color Palette" only
+            title_text = 'Color Palette'
+            title_bbox = draw.textbbox((0, 0), title_text, font=font_title)
+            title_w = title_bbox[2] - title_bbox[0]
+            title_h = title_bbox[3] - title_bbox[1]
+            draw.text(((PALETTE_CANVAS_SIZE - title_w) / 2, PALETTE_TITLE_Y), title_text, fill='#1a1a1a', font=font_title)
+
+            _palette_canvas = {'image': canvas, 'font_hex': font_hex, 'title_h': title_h}
+    return _palette_canvas
+
 
 class BrandingKitService:
     """
@@ -66,8 +121,35 @@ class BrandingKitService:
             }
         
         try:
-            # Enhanced prompt for logo generation
-            enhanced_prompt = f"""
+            image, png_bytes = self._request_logo(prompt, style)
+            if image is None:
+                return {
+                    'success': False,
+                    'error': 'No image generated'
+                }
+            
+            return self._logo_result(image, png_bytes, prompt, style)
+            
+        except Exception as e:
+            logger.error(f"Error generating logo: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def _request_logo(self, prompt: str, style: str) -> Tuple[Optional[Image.Image], Optional[bytes]]:
+        """
+        Ask Gemini for a logo image.
+        
+        Args:
+            prompt: Description of the logo
+            style: Style preference
+            
+        Returns:
+            Tuple of (decoded image, PNG bytes), or (None, None) if no image came back
+        """
+        # Enhanced prompt for logo generation
+        enhanced_prompt = f"""
             Create a professional logo for: {prompt}
             
             Style: {style}
@@ -83,51 +165,45 @@ class BrandingKitService:
             
             The logo should be centered and well-composed.
             """
-            
-            response = self.client.models.generate_content(
-                model="gemini-2.5-flash-image",
-                contents=enhanced_prompt
-            )
-            
-            # Extract image data
-            image_parts = [
-                part.inline_data.data
-                for part in response.candidates[0].content.parts
-                if part.inline_data
-            ]
-            
-            if not image_parts:
-                return {
-                    'success': False,
-                    'error': 'No image generated'
-                }
-            
-            # Convert to PIL Image
-            image = Image.open(BytesIO(image_parts[0]))
-            
-            # Convert to base64 for API response
+        
+        response = self.client.models.generate_content(
+            model="gemini-2.5-flash-image",
+            contents=enhanced_prompt
+        )
+        
+        # Extract image data
+        image_parts = [
+            part.inline_data.data
+            for part in response.candidates[0].content.parts
+            if part.inline_data
+        ]
+        
+        if not image_parts:
+            return None, None
+        
+        image = Image.open(BytesIO(image_parts[0]))
+        if image.format == 'PNG':
+            # Already PNG: keep the bytes instead of re-encoding
+            png_bytes = image_parts[0]
+        else:
             buffered = BytesIO()
             image.save(buffered, format="PNG")
-            img_str = base64.b64encode(buffered.getvalue()).decode()
-            
-            return {
-                'success': True,
-                'logo': {
-                    'data': img_str,
-                    'format': 'PNG',
-                    'width': image.width,
-                    'height': image.height
-                },
-                'prompt': prompt,
-                'style': style
-            }
-            
-        except Exception as e:
-            logger.error(f"Error generating logo: {str(e)}")
-            return {
-                'success': False,
-                'error': str(e)
-            }
+            png_bytes = buffered.getvalue()
+        return image, png_bytes
+    
+    def _logo_result(self, image: Image.Image, png_bytes: bytes, prompt: str, style: str) -> Dict[str, Any]:
+        """Build the generate_logo response for a logo image"""
+        return {
+            'success': True,
+            'logo': {
+                'data': base64.b64encode(png_bytes).decode(),
+                'format': 'PNG',
+                'width': image.width,
+                'height': image.height
+            },
+            'prompt': prompt,
+            'style': style
+        }
     
     def generate_color_palette(self, prompt: str, num_colors: int = 5) -> Dict[str, Any]:
         """
@@ -239,28 +315,9 @@ class BrandingKitService:
                 }
 
             image_bytes = base64.b64decode(logo_base64)
-            image = Image.open(BytesIO(image_bytes)).convert('RGBA')
-
-            hex_colors, _ = self._extract_palette_image(image, max(1, int(num_colors)))
+            image = Image.open(BytesIO(image_bytes))
 
-            labeled_image = self._render_labeled_palette(title, hex_colors)
-
-            buffered = BytesIO()
-            labeled_image.save(buffered, format="PNG")
-            img_str = base64.b64encode(buffered.getvalue()).decode()
-
-            return {
-                'success': True,
-                'palette': {
-                    'data': img_str,
-                    'format': 'PNG',
-                    'width': labeled_image.width,
-                    'height': labeled_image.height,
-                    'colors': hex_colors
-                },
-                'num_colors': len(hex_colors),
-                'generation_method': 'logo_extraction'
-            }
+            return self._palette_from_image(image, num_colors, title)
         except Exception as e:
             logger.error(f"Error generating palette from logo: {str(e)}")
             return {
@@ -268,6 +325,39 @@ class BrandingKitService:
                 'error': str(e)
             }
 
+    def _palette_from_image(self, image: Image.Image, num_colors: int = 5, title: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Extract a palette from a decoded logo and render the labeled palette image.
+        
+        Args:
+            image: Logo image
+            num_colors: Maximum number of colors
+            title: Palette title (currently unused by the renderer)
+            
+        Returns:
+            Dict in the generate_color_palette_from_logo response format
+        """
+        hex_colors, _ = self._extract_palette_image(image.convert('RGBA'), max(1, int(num_colors)))
+
+        labeled_image = self._render_labeled_palette(title, hex_colors)
+
+        buffered = BytesIO()
+        labeled_image.save(buffered, format="PNG")
+        img_str = base64.b64encode(buffered.getvalue()).decode()
+
+        return {
+            'success': True,
+            'palette': {
+                'data': img_str,
+                'format': 'PNG',
+                'width': labeled_image.width,
+                'height': labeled_image.height,
+                'colors': hex_colors
+            },
+            'num_colors': len(hex_colors),
+            'generation_method': 'logo_extraction'
+        }
+
     def _extract_palette_image(self, image: Image.Image, num_colors: Optional[int]) -> (List[str], Image.Image):
         """
         Extract dominant colors from an image using adaptive quantization.
@@ -289,62 +379,36 @@ class BrandingKitService:
         initial_palette_size = 128
         quantized = image_opaque.convert('RGB').convert('P', palette=PILImage.ADAPTIVE, colors=initial_palette_size)
 
-        palette = quantized.getpalette()
-        color_counts = quantized.getcolors() or []
-
-        index_to_rgb = []
-        for i in range(0, len(palette), 3):
-            r, g, b = palette[i:i+3]
-            index_to_rgb.append((r, g, b))
-
-        freq_by_rgb = {}
-        for count, idx in color_counts:
-            if idx < len(index_to_rgb):
-                rgb = index_to_rgb[idx]
-                freq_by_rgb[rgb] = freq_by_rgb.get(rgb, 0) + count
+        # Pixel count per palette entry, merging entries that share an RGB value
+        palette = np.array(quantized.getpalette(), dtype=np.int64).reshape(-1, 3)
+        counts = np.bincount(np.asarray(quantized).ravel(), minlength=len(palette))[:len(palette)]
+        used = np.flatnonzero(counts)
+        rgbs, first_index, inverse = np.unique(palette[used], axis=0, return_index=True, return_inverse=True)
+        freqs = np.bincount(inverse.ravel(), weights=counts[used])
 
-        sorted_rgbs = sorted(freq_by_rgb.items(), key=lambda x: x[1], reverse=True)
+        # Most frequent first; ties keep palette order
+        order = np.lexsort((used[first_index], -freqs))
+        rgbs = rgbs[order]
 
-        def rgb_to_hsv(r: int, g: int, b: int):
-            import colorsys
-            return colorsys.rgb_to_hsv(r/255.0, g/255.0, b/255.0)
+        r, g, b = rgbs.T
+        near_white = (r >= 240) & (g >= 240) & (b >= 240)
+        near_black = (r <= 20) & (g <= 20) & (b <= 20)
+        near_gray = (np.abs(r - g) < 15) & (np.abs(r - b) < 15) & (np.abs(g - b) < 15)
+        saturation = rgb_to_hsv(rgbs)[:, 1] / 100.0
 
-        def is_near_gray(r: int, g: int, b: int, delta: int = 15) -> bool:
-            return abs(r-g) < delta and abs(r-b) < delta and abs(g-b) < delta
-
-        def is_near_white(r: int, g: int, b: int, thr: int = 240) -> bool:
-            return r >= thr and g >= thr and b >= thr
-
-        def is_near_black(r: int, g: int, b: int, thr: int = 20) -> bool:
-            return r <= thr and g <= thr and b <= thr
-
-        # Filter to keep important colors but be less aggressive
-        filtered: List[tuple] = []
-        for rgb, cnt in sorted_rgbs:
-            r, g, b = rgb
-            # Only exclude pure white and pure black
-            if is_near_white(r, g, b) or is_near_black(r, g, b):
-                continue
-            h, s, v = rgb_to_hsv(r, g, b)
-            # Accept more colors - lower saturation threshold
-            if is_near_gray(r, g, b) and s < 0.08:  # Only exclude very gray colors
-                continue
-            filtered.append((rgb, cnt))
+        # Only exclude pure white, pure black and very gray colors
+        filtered = rgbs[~(near_white | near_black | (near_gray & (saturation < 0.08)))]
 
         # If filtering removed everything, use top colors by frequency
-        if not filtered:
-            filtered = sorted_rgbs[:min(10, len(sorted_rgbs))]
+        if len(filtered) == 0:
+            filtered = rgbs[:10]
 
-        # Deduplicate similar colors with wider threshold for more variety
-        deduped: List[tuple] = []
-        SIMILARITY_THRESHOLD = 35.0
-        for rgb, cnt in filtered:
-            if not any(((rgb[0]-kr)**2 + (rgb[1]-kg)**2 + (rgb[2]-kb)**2) ** 0.5 < SIMILARITY_THRESHOLD for (kr, kg, kb), _ in deduped):
-                deduped.append((rgb, cnt))
+        # Deduplicate perceptually similar colors (CIEDE2000), most frequent wins
+        deduped = filtered[dedupe_colors(filtered, PALETTE_DEDUP_DELTA_E)]
 
-        selected_rgbs = [rgb for rgb, _ in deduped][:max(1, int(num_colors))] if num_colors is not None else [rgb for rgb, _ in deduped]
+        selected_rgbs = deduped[:max(1, int(num_colors))] if num_colors is not None else deduped
 
-        hex_colors = [f"#{r:02x}{g:02x}{b:02x}" for (r, g, b) in selected_rgbs]
+        hex_colors = [f"#{r:02x}{g:02x}{b:02x}" for (r, g, b) in selected_rgbs.tolist()]
 
         section_width = 120
         section_height = 120
@@ -364,38 +428,20 @@ class BrandingKitService:
         """
         Render a 1:1 square palette with title and color swatches with hex codes.
         """
-        from PIL import Image as PILImage
-        from PIL import ImageDraw, ImageFont
+        from PIL import ImageDraw
 
         # Use all extracted colors (not just 5)
         colors = hex_colors if hex_colors else ['#CCCCCC']
         num = len(colors)
 
-        # Create 1:1 square canvas (1024x1024)
-        canvas_size = 1024
-        img = PILImage.new('RGB', (canvas_size, canvas_size), color='#EFEFEF')
+        # 1:1 square canvas (1024x1024) with the title already drawn
+        base = get_palette_canvas()
+        canvas_size = PALETTE_CANVAS_SIZE
+        img = base['image'].copy()
         draw = ImageDraw.Draw(img)
-
-        # Load fonts with fallback
-        try:
-            font_title = ImageFont.truetype("arial.ttf", 52)
-            font_hex = ImageFont.truetype("arial.ttf", 22)
-        except Exception:
-            try:
-                # Try alternative font paths for different OS
-                font_title = ImageFont.truetype("Arial.ttf", 52)
-                font_hex = ImageFont.truetype("Arial.ttf", 22)
-            except Exception:
-                font_title = ImageFont.load_default()
-                font_hex = ImageFont.load_default()
-
-        # Title: "Color Palette" only
-        title_text = 'Color Palette'
-        title_bbox = draw.textbbox((0, 0), title_text, font=font_title)
-        title_w = title_bbox[2] - title_bbox[0]
-        title_h = title_bbox[3] - title_bbox[1]
-        title_y = 100
-        draw.text(((canvas_size - title_w) / 2, title_y), title_text, fill='#1a1a1a', font=font_title)
+        font_hex = base['font_hex']
+        title_y = PALETTE_TITLE_Y
+        title_h = base['title_h']
 
         # Calculate swatch layout - use full width efficiently
         margin_x = 60
@@ -546,19 +592,15 @@ class BrandingKitService:
             }
         
         try:
-            # Generate logo
-            logo_result = self.generate_logo(prompt, style)
-            if not logo_result.get('success'):
-                return logo_result
+            image, png_bytes = self._request_logo(prompt, style)
+            if image is None:
+                return {
+                    'success': False,
+                    'error': 'No image generated'
+                }
             
-            # Generate primary color palette from the generated logo image
-            palette_result = self.generate_color_palette_from_logo(
-                logo_result['logo']['data'],
-                5,
-                title=prompt
-            )
-            if not palette_result.get('success'):
-                return palette_result
+            logo_result = self._logo_result(image, png_bytes, prompt, style)
+            palette_result = self._palette_from_image(image, 5, title=prompt)
             
             return {
                 'success': True,
@@ -579,6 +621,27 @@ class BrandingKitService:
                 'error': str(e)
             }
     
+    def generate_branding_kit_variants(self, prompt: str, styles: List[str],
+                                       max_concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Generate one branding kit per style concurrently
+        
+        Args:
+            prompt: Description of the brand
+            styles: Style preferences, one kit each
+            max_concurrency: Kits generated at once (defaults to BRANDING_KIT_MAX_CONCURRENCY)
+            
+        Returns:
+            List of generate_branding_kit results, in the order of styles
+        """
+        if not styles:
+            return []
+        
+        max_concurrency = max_concurrency or getattr(settings, 'BRANDING_KIT_MAX_CONCURRENCY', 3)
+        workers = max(1, min(len(styles), max_concurrency))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='branding-kit-variant') as pool:
+            return list(pool.map(lambda style: self.generate_branding_kit(prompt, style), styles))
+    
     def is_available(self) -> bool:
         """Check if the service is available"""
         return self.client is not None and GENAI_AVAILABLE
@@ -0,0 +1,95 @@
+"""
+Branding kit image storage
+
+Generated logos and color palettes used to live in GeneratedBrandingKit rows
+as base64 text. They are now written to media storage with a thumbnail, and
+rows keep only URLs and storage paths. Migration 0010 uses its own frozen
+offload/inline helpers, so the helpers here only handle the current model.
+"""
+import base64
+import binascii
+import logging
+from typing import Any, Dict, List, Optional
+
+from .utils.storage_handler import delete_branding_kit_images, store_branding_kit_image
+
+logger = logging.getLogger(__name__)
+
+IMAGE_KINDS = ('logo', 'color_palette')
+
+# Columns list views read; the legacy base64 columns are never loaded in bulk
+LIST_FIELDS = (
+    'id', 'prompt', 'style', 'colors', 'created_at', 'updated_at',
+    'organization_id', 'user_id',
+    'logo_format', 'logo_url', 'logo_thumbnail_url',
+    'color_palette_format', 'color_palette_url', 'color_palette_thumbnail_url',
+)
+
+
+def decode_image_data(data: str) -> bytes:
+    """Decode base64 image data, with or without a data: URL prefix"""
+    if data.startswith('data:') and ',' in data:
+        data = data.split(',', 1)[1]
+    return base64.b64decode(data)
+
+
+def offload_branding_kit_images(kit) -> List[str]:
+    """
+    Move a kit's inline base64 images to media storage.
+
+    Args:
+        kit: GeneratedBrandingKit instance; not saved
+
+    Returns:
+        Names of the fields that changed
+    """
+    updated_fields = []
+    for kind in IMAGE_KINDS:
+        data = getattr(kit, f'{kind}_data')
+        if not data:
+            continue
+        try:
+            image_bytes = decode_image_data(data)
+            stored = store_branding_kit_image(image_bytes, kit.id, kind, getattr(kit, f'{kind}_format') or 'png')
+        except (binascii.Error, ValueError, OSError) as e:
+            logger.error(f"Could not offload {kind} of branding kit {kit.id}: {str(e)}")
+            continue
+
+        setattr(kit, f'{kind}_url', stored['url'])
+        setattr(kit, f'{kind}_thumbnail_url', stored['thumbnail_url'])
+        setattr(kit, f'{kind}_path', stored['path'])
+        setattr(kit, f'{kind}_data', '')
+        updated_fields += [f'{kind}_url', f'{kind}_thumbnail_url', f'{kind}_path', f'{kind}_data']
+    return updated_fields
+
+
+def delete_stored_images(kit) -> None:
+    """Delete a kit's images from media storage"""
+    if any(getattr(kit, f'{kind}_path', '') for kind in IMAGE_KINDS):
+        delete_branding_kit_images(kit.id)
+
+
+def image_payload(kit, kind: str, inline_data: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    API representation of one kit image.
+
+    Args:
+        kit: GeneratedBrandingKit instance
+        kind: 'logo' or 'color_palette'
+        inline_data: Base64 data of a legacy row that has not been offloaded
+
+    Returns:
+        Dict with format, url and thumbnail_url (plus data for legacy rows), or None
+    """
+    url = getattr(kit, f'{kind}_url')
+    if not url and not inline_data:
+        return None
+
+    payload = {
+        'format': getattr(kit, f'{kind}_format'),
+        'url': url,
+        'thumbnail_url': getattr(kit, f'{kind}_thumbnail_url') or url,
+    }
+    if inline_data:
+        payload['data'] = inline_data
+    return payload
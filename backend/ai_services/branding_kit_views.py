@@ -12,13 +12,86 @@ from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
 from django.db.models import Q
 from .branding_kit_service import BrandingKitService
+from .branding_kit_storage import LIST_FIELDS, delete_stored_images, image_payload, offload_branding_kit_images
 from .models import GeneratedBrandingKit
+from .pagination import ORDERING, decode_cursor, encode_cursor, rows_before
 
 logger = logging.getLogger(__name__)
 
 # Initialize the branding kit service
 branding_kit_service = BrandingKitService()
 
+MAX_LIST_LIMIT = 100
+MAX_STYLE_VARIANTS = 6
+
+
+def serialize_branding_kit(kit, logo_data=None, palette_data=None):
+    """
+    Serialize a branding kit with image URLs.
+    
+    Args:
+        kit: GeneratedBrandingKit instance
+        logo_data: Inline base64 logo of a legacy row, if any
+        palette_data: Inline base64 palette of a legacy row, if any
+    """
+    return {
+        'id': str(kit.id),
+        'prompt': kit.prompt,
+        'style': kit.style,
+        'logo': image_payload(kit, 'logo', logo_data),
+        'color_palette': image_payload(kit, 'color_palette', palette_data),
+        'colors': kit.colors,
+        'created_at': kit.created_at.isoformat(),
+        'updated_at': kit.updated_at.isoformat()
+    }
+
+
+def save_branding_kit(result, prompt, style, user=None, organization=None):
+    """
+    Save a generated branding kit, moving its images to media storage.
+    
+    Args:
+        result: BrandingKitService.generate_branding_kit result
+        prompt: Prompt the kit was generated from
+        style: Style of the kit
+        user: Requesting user, if authenticated
+        organization: Organization of the user, if any
+    
+    Returns:
+        Saved GeneratedBrandingKit, or None if saving failed
+    """
+    try:
+        branding_kit_data = result.get('branding_kit', {})
+        logo_data = branding_kit_data.get('logo', {})
+        palette_data = branding_kit_data.get('color_palette', {})
+        
+        # Check if logo and palette data exist
+        logo_data_str = logo_data.get('data', '') if logo_data else ''
+        palette_data_str = palette_data.get('data', '') if palette_data else ''
+        
+        logger.info(f"Saving branding kit - Logo data length: {len(logo_data_str)}, Palette data length: {len(palette_data_str)}")
+        
+        branding_kit = GeneratedBrandingKit(
+            organization=organization,
+            user=user,
+            prompt=prompt,
+            style=style,
+            logo_data=logo_data_str,
+            logo_format=logo_data.get('format', 'png') if logo_data else 'png',
+            color_palette_data=palette_data_str,
+            color_palette_format=palette_data.get('format', 'png') if palette_data else 'png',
+            colors=result.get('used_colors', [])
+        )
+        # Images go to media storage; the row keeps only URLs
+        offload_branding_kit_images(branding_kit)
+        branding_kit.save()
+        logger.info(f"Branding kit saved to database with ID: {branding_kit.id}, User: {user.email if user and hasattr(user, 'email') else 'None'}")
+        return branding_kit
+    except Exception as e:
+        logger.error(f"Failed to save branding kit to database: {str(e)}", exc_info=True)
+        # Continue even if save fails
+        return None
+
 
 @csrf_exempt
 @api_view(['POST'])
@@ -30,13 +103,15 @@ def generate_branding_kit(request):
     
     Body: {
         "prompt": "describe your logo idea",
-        "style": "modern"  // Optional: modern, vintage, minimalist, etc.
+        "style": "modern",  // Optional: modern, vintage, minimalist, etc.
+        "styles": ["modern", "vintage"]  // Optional: one kit per style, generated concurrently
     }
     """
     try:
         data = request.data
         prompt = data.get('prompt')
         style = data.get('style', 'modern')
+        styles = data.get('styles')
         
         if not prompt:
             return Response({
@@ -44,14 +119,32 @@ def generate_branding_kit(request):
                 'error': 'Prompt is required'
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        if styles is not None and (
+            not isinstance(styles, list) or not styles or len(styles) > MAX_STYLE_VARIANTS
+            or not all(isinstance(item, str) and item.strip() for item in styles)
+        ):
+            return Response({
+                'success': False,
+                'error': f'styles must be a list of 1 to {MAX_STYLE_VARIANTS} style names'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
         if not branding_kit_service.is_available():
             return Response({
                 'success': False,
                 'error': 'Branding kit service not available'
             }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         
-        # Generate the branding kit
-        result = branding_kit_service.generate_branding_kit(prompt, style)
+        # Generate the branding kit, or one per style variant
+        if styles:
+            variants = branding_kit_service.generate_branding_kit_variants(prompt, styles)
+            successful = [variant for variant in variants if variant.get('success')]
+            result = {
+                'success': bool(successful),
+                'variants': variants,
+                'error': None if successful else variants[0].get('error')
+            }
+        else:
+            result = branding_kit_service.generate_branding_kit(prompt, style)
         
         if result.get('success'):
             # Get user and organization from request if available
@@ -81,33 +174,10 @@ def generate_branding_kit(request):
             else:
                 logger.warning("No authenticated user found - branding kit will be saved without user association")
             
-            # Save the generated branding kit to database
-            try:
-                branding_kit_data = result.get('branding_kit', {})
-                logo_data = branding_kit_data.get('logo', {})
-                palette_data = branding_kit_data.get('color_palette', {})
-                
-                # Check if logo and palette data exist
-                logo_data_str = logo_data.get('data', '') if logo_data else ''
-                palette_data_str = palette_data.get('data', '') if palette_data else ''
-                
-                logger.info(f"Saving branding kit - Logo data length: {len(logo_data_str)}, Palette data length: {len(palette_data_str)}")
-                
-                branding_kit = GeneratedBrandingKit.objects.create(
-                    organization=organization,
-                    user=user,
-                    prompt=prompt,
-                    style=style,
-                    logo_data=logo_data_str,
-                    logo_format=logo_data.get('format', 'png') if logo_data else 'png',
-                    color_palette_data=palette_data_str,
-                    color_palette_format=palette_data.get('format', 'png') if palette_data else 'png',
-                    colors=result.get('used_colors', [])
-                )
-                logger.info(f"Branding kit saved to database with ID: {branding_kit.id}, User: {user.email if user and hasattr(user, 'email') else 'None'}")
-            except Exception as e:
-                logger.error(f"Failed to save branding kit to database: {str(e)}", exc_info=True)
-                # Continue even if save fails
+            # Save the generated branding kit(s) to database
+            for variant in (result['variants'] if styles else [result]):
+                if variant.get('success'):
+                    save_branding_kit(variant, prompt, variant.get('style', style), user, organization)
             
             return Response({
                 'success': True,
@@ -276,8 +346,10 @@ def list_branding_kits(request):
     List all generated branding kits for the current user/organization
     
     Query params:
-    - limit: Number of branding kits to return (default: 50)
+    - limit: Number of branding kits to return (default: 50, max: 100)
     - offset: Offset for pagination (default: 0)
+    - cursor: next_cursor of the previous page; pages by (created_at, id)
+      instead of offset and skips the total count
     """
     try:
         # Get user from request if authenticated
@@ -314,14 +386,14 @@ def list_branding_kits(request):
                     logger.warning(f"Could not get organization: {e}")
         
         # Get query parameters
-        limit = int(request.GET.get('limit', 50))
+        limit = min(int(request.GET.get('limit', 50)), MAX_LIST_LIMIT)
         offset = int(request.GET.get('offset', 0))
+        cursor = request.GET.get('cursor')
         
-        logger.info(f"List branding kits - Query params: limit={limit}, offset={offset}")
+        logger.info(f"List branding kits - Query params: limit={limit}, offset={offset}, cursor={cursor}")
         
-        # Build queryset
-        queryset = GeneratedBrandingKit.objects.all()
-        logger.info(f"List branding kits - Total branding kits in DB: {queryset.count()}")
+        # Build queryset without the legacy base64 columns
+        queryset = GeneratedBrandingKit.objects.only(*LIST_FIELDS)
         
         # Filter by organization and/or user
         # Use OR condition to match items that belong to either the organization OR the user
@@ -337,7 +409,7 @@ def list_branding_kits(request):
                 )
             else:
                 queryset = queryset.filter(Q(organization=organization) | Q(user=user))
-            logger.info(f"List branding kits - Filtered by organization OR user: {queryset.count()} kits")
+            logger.info("List branding kits - Filtered by organization OR user")
         elif organization:
             # If only organization is available, filter by organization
             # Also include items with no org association in DEBUG mode
@@ -345,7 +417,7 @@ def list_branding_kits(request):
                 queryset = queryset.filter(Q(organization=organization) | Q(organization__isnull=True))
             else:
                 queryset = queryset.filter(organization=organization)
-            logger.info(f"List branding kits - Filtered by organization: {queryset.count()} kits")
+            logger.info("List branding kits - Filtered by organization")
         elif user:
             # If only user is available, filter by user
             # Also include items with no user association in DEBUG mode
@@ -353,7 +425,7 @@ def list_branding_kits(request):
                 queryset = queryset.filter(Q(user=user) | Q(user__isnull=True))
             else:
                 queryset = queryset.filter(user=user)
-            logger.info(f"List branding kits - Filtered by user: {queryset.count()} kits")
+            logger.info("List branding kits - Filtered by user")
         else:
             # In development, if no user is authenticated, show all kits
             # In production, this should return empty
@@ -363,42 +435,53 @@ def list_branding_kits(request):
                 queryset = queryset.none()
                 logger.warning("List branding kits - No authenticated user, returning empty (PRODUCTION mode)")
         
-        # Order by created_at descending
-        queryset = queryset.order_by('-created_at')
+        # Order by created_at descending, id breaking ties for stable keyset pages
+        queryset = queryset.order_by(*ORDERING)
+        
+        # Apply pagination: keyset when a cursor is given, offset otherwise
+        total_count = None
+        if cursor:
+            try:
+                created_at, kit_id = decode_cursor(cursor)
+            except ValueError:
+                return Response({
+                    'success': False,
+                    'error': 'Invalid cursor'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            branding_kits = list(queryset.filter(rows_before(created_at, kit_id))[:limit + 1])
+        else:
+            total_count = queryset.count()
+            branding_kits = list(queryset[offset:offset + limit + 1])
         
-        # Apply pagination
-        total_count = queryset.count()
-        branding_kits = queryset[offset:offset + limit]
+        has_more = len(branding_kits) > limit
+        branding_kits = branding_kits[:limit]
         logger.info(f"List branding kits - Returning {len(branding_kits)} kits (total: {total_count})")
         
+        # Legacy rows that were never offloaded still carry inline data: fetch it in one query
+        legacy_ids = [
+            kit.id for kit in branding_kits
+            if not kit.logo_url or not kit.color_palette_url
+        ]
+        inline_data = {
+            kit_id: (logo_data, palette_data)
+            for kit_id, logo_data, palette_data in GeneratedBrandingKit.objects.filter(
+                id__in=legacy_ids
+            ).values_list('id', 'logo_data', 'color_palette_data')
+        } if legacy_ids else {}
+        
         # Serialize branding kits
-        branding_kits_data = []
-        for kit in branding_kits:
-            branding_kits_data.append({
-                'id': str(kit.id),
-                'prompt': kit.prompt,
-                'style': kit.style,
-                'logo': {
-                    'data': kit.logo_data,
-                    'format': kit.logo_format,
-                    'url': kit.logo_url
-                } if kit.logo_data else None,
-                'color_palette': {
-                    'data': kit.color_palette_data,
-                    'format': kit.color_palette_format,
-                    'url': kit.color_palette_url
-                } if kit.color_palette_data else None,
-                'colors': kit.colors,
-                'created_at': kit.created_at.isoformat(),
-                'updated_at': kit.updated_at.isoformat()
-            })
+        branding_kits_data = [
+            serialize_branding_kit(kit, *inline_data.get(kit.id, (None, None)))
+            for kit in branding_kits
+        ]
         
         return Response({
             'success': True,
             'results': branding_kits_data,
             'count': total_count,
             'limit': limit,
-            'offset': offset
+            'offset': offset,
+            'next_cursor': encode_cursor(branding_kits[-1].created_at, branding_kits[-1].id) if has_more else None
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -453,24 +536,7 @@ def get_branding_kit(request, kit_id):
         
         return Response({
             'success': True,
-            'branding_kit': {
-                'id': str(kit.id),
-                'prompt': kit.prompt,
-                'style': kit.style,
-                'logo': {
-                    'data': kit.logo_data,
-                    'format': kit.logo_format,
-                    'url': kit.logo_url
-                } if kit.logo_data else None,
-                'color_palette': {
-                    'data': kit.color_palette_data,
-                    'format': kit.color_palette_format,
-                    'url': kit.color_palette_url
-                } if kit.color_palette_data else None,
-                'colors': kit.colors,
-                'created_at': kit.created_at.isoformat(),
-                'updated_at': kit.updated_at.isoformat()
-            }
+            'branding_kit': serialize_branding_kit(kit, kit.logo_data, kit.color_palette_data)
         }, status=status.HTTP_200_OK)
         
     except GeneratedBrandingKit.DoesNotExist:
@@ -528,7 +594,8 @@ def delete_branding_kit(request, kit_id):
                     'error': 'Branding kit not found or access denied'
                 }, status=status.HTTP_404_NOT_FOUND)
         
-        # Delete the branding kit record
+        # Delete the stored images and the branding kit record
+        delete_stored_images(kit)
         kit.delete()
         logger.info(f"Deleted branding kit with ID: {kit_id}")
         
@@ -1,14 +1,30 @@
 import json
 import hashlib
 import logging
+import os
+from collections import OrderedDict
 from django.core.cache import cache
+from django.core.files.storage import default_storage
 from django.conf import settings
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import time
 
 logger = logging.getLogger(__name__)
 
 
+def provider_cache_key(provider_name: str) -> str:
+    """Cache key of an AIProvider lookup"""
+    return f"ai_provider:{provider_name}"
+
+
+def invalidate_provider_cache(provider_name: str) -> None:
+    """Forget a cached AIProvider so the next lookup reads the database"""
+    try:
+        cache.delete(provider_cache_key(provider_name))
+    except Exception as e:
+        logger.warning(f"Could not invalidate provider cache: {str(e)}")
+
+
 class AICachingService:
     """Service for caching AI generation results"""
     
@@ -189,6 +205,209 @@ class AICachingService:
             return False
 
 
+class PosterRenderCache(AICachingService):
+    """
+    Content-addressed cache for AIPosterService renders.
+    
+    Entries are keyed on the normalized prompt, aspect ratio, SHA-256 hashes of
+    any input images and the branding profile version, scoped per tenant. Each
+    tenant keeps at most `max_entries` renders (least recently used evicted)
+    and hit/miss counters are kept per render kind.
+    """
+    
+    STATS_FIELDS = ('hits', 'misses', 'stores')
+    
+    def __init__(self):
+        super().__init__()
+        self.cache_prefix = 'poster_render'
+        self.cache_timeout = getattr(settings, 'POSTER_RENDER_CACHE_TIMEOUT', 86400)
+        self.max_entries = getattr(settings, 'POSTER_RENDER_CACHE_MAX_ENTRIES', 200)
+        self._file_hashes = OrderedDict()  # (path, mtime, size) -> sha256
+        self._file_hashes_max = 512
+    
+    @staticmethod
+    def normalize_prompt(prompt: str) -> str:
+        """Collapse whitespace and case so trivially different prompts share renders"""
+        return ' '.join((prompt or '').split()).casefold()
+    
+    def hash_image(self, path: str) -> str:
+        """SHA-256 of an input image (local path or Django storage path)"""
+        digest = hashlib.sha256()
+        
+        if os.path.exists(path):
+            stat = os.stat(path)
+            memo_key = (path, stat.st_mtime_ns, stat.st_size)
+            if memo_key in self._file_hashes:
+                self._file_hashes.move_to_end(memo_key)
+                return self._file_hashes[memo_key]
+            
+            with open(path, 'rb') as image_file:
+                for chunk in iter(lambda: image_file.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            
+            self._file_hashes[memo_key] = digest.hexdigest()
+            if len(self._file_hashes) > self._file_hashes_max:
+                self._file_hashes.popitem(last=False)
+            return digest.hexdigest()
+        
+        with default_storage.open(path, 'rb') as image_file:
+            for chunk in image_file.chunks():
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def render_parameters(
+        self,
+        kind: str,
+        aspect_ratio: str,
+        image_paths: Optional[List[str]] = None,
+        user=None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Build the cache key parameters for a render
+        
+        Args:
+            kind: Render kind (prompt, image, composite)
+            aspect_ratio: Normalized aspect ratio
+            image_paths: Input image paths
+            user: Requesting user (determines tenant and branding)
+            
+        Returns:
+            Key parameters, or None if caching is disabled for this request or
+            no tenant can be resolved
+        """
+        if not getattr(settings, 'POSTER_RENDER_CACHE_ENABLED', True):
+            return None
+        
+        try:
+            organization = self._resolve_organization(user)
+            if organization is not None and not getattr(organization, 'poster_cache_enabled', True):
+                return None
+            
+            if organization is not None:
+                tenant = f"org:{organization.id}"
+            elif user is not None and getattr(user, 'is_authenticated', False):
+                tenant = f"user:{user.id}"
+            else:
+                # Without a tenant a cached render could be served across organizations
+                return None
+            
+            return {
+                'kind': kind,
+                'tenant': tenant,
+                'aspect_ratio': aspect_ratio,
+                'images': [self.hash_image(path) for path in (image_paths or [])],
+                'branding': self._branding_version(user),
+            }
+        except Exception as e:
+            logger.error(f"Error building render cache key: {str(e)}")
+            return None
+    
+    def get_render(self, prompt: str, parameters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return a cached render whose stored image still exists, recording hit/miss"""
+        cached_data = self.get_cached_result(self.normalize_prompt(prompt), parameters)
+        result = cached_data.get('result') if cached_data else None
+        
+        if result and result.get('image_path'):
+            try:
+                if not default_storage.exists(result['image_path']):
+                    logger.info(f"Cached render image missing: {result['image_path']}")
+                    self.invalidate_cache(self.normalize_prompt(prompt), parameters)
+                    result = None
+            except Exception as e:
+                logger.warning(f"Could not verify cached render image: {str(e)}")
+        
+        self._record_stat(parameters['kind'], 'hits' if result else 'misses')
+        if not result:
+            return None
+        
+        self._touch(parameters['tenant'], self._generate_cache_key(self.normalize_prompt(prompt), parameters))
+        return {**result, 'cached': True}
+    
+    def store_render(self, prompt: str, parameters: Dict[str, Any], result: Dict[str, Any]) -> bool:
+        """Cache a successful render and evict the tenant's least recently used entries"""
+        if result.get('status') != 'success':
+            return False
+        
+        stored = self.cache_result(self.normalize_prompt(prompt), parameters, result)
+        if stored:
+            self._touch(parameters['tenant'], self._generate_cache_key(self.normalize_prompt(prompt), parameters))
+            self._record_stat(parameters['kind'], 'stores')
+        return stored
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and hit rate per render kind"""
+        stats = super().get_cache_stats()
+        stats['max_entries_per_tenant'] = self.max_entries
+        
+        try:
+            kinds = {}
+            for kind in ('prompt', 'image', 'composite'):
+                values = cache.get_many([self._stats_key(kind, field) for field in self.STATS_FIELDS])
+                counters = {
+                    field: int(values.get(self._stats_key(kind, field)) or 0)
+                    for field in self.STATS_FIELDS
+                }
+                lookups = counters['hits'] + counters['misses']
+                counters['hit_rate'] = round(counters['hits'] / lookups, 4) if lookups else 0.0
+                kinds[kind] = counters
+            stats['renders'] = kinds
+        except Exception as e:
+            logger.error(f"Error getting render cache stats: {str(e)}")
+        
+        return stats
+    
+    def _touch(self, tenant: str, cache_key: str) -> None:
+        """Move a key to the most recently used end of the tenant index, evicting overflow"""
+        try:
+            index_key = f"{self.cache_prefix}:index:{tenant}"
+            index = [key for key in (cache.get(index_key) or []) if key != cache_key]
+            index.append(cache_key)
+            
+            if len(index) > self.max_entries:
+                evicted = index[:-self.max_entries]
+                index = index[-self.max_entries:]
+                cache.delete_many(evicted)
+                logger.info(f"Evicted {len(evicted)} poster renders for {tenant}")
+            
+            cache.set(index_key, index, self.cache_timeout)
+        except Exception as e:
+            logger.error(f"Error updating render cache index: {str(e)}")
+    
+    def _stats_key(self, kind: str, field: str) -> str:
+        return f"{self.cache_prefix}:stats:{kind}:{field}"
+    
+    def _record_stat(self, kind: str, field: str) -> None:
+        try:
+            stats_key = self._stats_key(kind, field)
+            cache.add(stats_key, 0, None)
+            cache.incr(stats_key)
+        except Exception as e:
+            logger.debug(f"Error recording render cache stat: {str(e)}")
+    
+    @staticmethod
+    def _resolve_organization(user):
+        if user is None or not getattr(user, 'is_authenticated', False):
+            return None
+        organization = getattr(user, 'current_organization', None)
+        if organization is None:
+            from .poster_jobs import resolve_user_organization
+            organization = resolve_user_organization(user)
+        return organization
+    
+    @staticmethod
+    def _branding_version(user) -> str:
+        """Identify the branding profile applied to a render; changes whenever the profile is edited"""
+        if user is None:
+            return 'none'
+        try:
+            company_profile = getattr(user, 'company_profile', None)
+        except Exception:
+            company_profile = None
+        if not company_profile or not company_profile.has_complete_profile:
+            return 'none'
+        return f"{company_profile.pk}:{company_profile.updated_at.isoformat() if company_profile.updated_at else ''}"
+
+
 class DesignCacheService:
     """Service for caching design-related data"""
     
@@ -278,5 +497,6 @@ class CollaborationCacheService:
 
 # Global cache service instances
 ai_cache_service = AICachingService()
+poster_render_cache = PosterRenderCache()
 design_cache_service = DesignCacheService()
 collaboration_cache_service = CollaborationCacheService()
@@ -1,42 +1,46 @@
 """
 Advanced Color Matching Algorithms for Phase 1 Week 4
-Implements K-Means clustering and LAB color similarity for fabric color analysis
+Implements dominant color extraction over selectable quantizer backends
+(K-Means by default, MiniBatch K-Means, median cut, histogram) and LAB color
+similarity for fabric color analysis
 """
 import logging
 import numpy as np
 import cv2
 from typing import Dict, List, Any, Optional, Tuple
-from sklearn.cluster import KMeans
-from PIL import Image
-import colorsys
-import requests
-from io import BytesIO
 from django.conf import settings
+from scipy.optimize import linear_sum_assignment
+from . import color_math, color_quantizer
+from .utils.image_fetcher import get_image_fetcher
 
 logger = logging.getLogger(__name__)
 
 
 class SmartColorMatcher:
-    """Advanced color matching service using K-Means clustering and LAB color space"""
+    """Advanced color matching service using pluggable color quantization and LAB color space"""
     
     def __init__(self):
         self.kmeans_clusters = 8  # Number of clusters for K-Means
         self.color_tolerance = 15  # LAB color difference tolerance
     
-    def extract_dominant_colors(self, image_url: str, num_colors: int = 8) -> List[Dict[str, Any]]:
+    def extract_dominant_colors(self, image_url: str, num_colors: int = 8,
+                                backend: Optional[str] = None) -> List[Dict[str, Any]]:
         """
-        Extract dominant colors from fabric image using K-Means clustering
+        Extract dominant colors from fabric image with the configured quantizer
+        backend (full K-Means by default; see color_quantizer)
         
         Args:
             image_url: URL of the fabric image
             num_colors: Number of dominant colors to extract
+            backend: Quantizer backend (kmeans, minibatch, median_cut, histogram);
+                defaults to the COLOR_QUANTIZER_BACKEND setting
             
         Returns:
             List of color dictionaries with hex, RGB, LAB, and percentage
         """
         try:
-            # Download and process image
-            image = self._download_image(image_url)
+            # Download and decode at reduced resolution; only the palette is needed
+            image = self._download_image(image_url, max_size=300)
             if image is None:
                 raise ValueError("Failed to download image")
             
@@ -46,52 +50,60 @@ class SmartColorMatcher:
             # Convert to RGB
             image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
             
-            # Reshape image for K-Means
-            pixels = image_rgb.reshape(-1, 3)
+            # Quantize the flattened pixels
+            backend = backend or getattr(settings, 'COLOR_QUANTIZER_BACKEND', 'kmeans')
+            color_palette = self.palette_from_pixels(image_rgb.reshape(-1, 3), num_colors, backend)
             
-            # Apply K-Means clustering
-            kmeans = KMeans(n_clusters=num_colors, random_state=42, n_init=10)
-            kmeans.fit(pixels)
-            
-            # Get cluster centers (dominant colors)
-            colors = kmeans.cluster_centers_.astype(int)
-            
-            # Get cluster labels and counts
-            labels = kmeans.labels_
-            unique_labels, counts = np.unique(labels, return_counts=True)
-            
-            # Calculate percentages
-            total_pixels = len(pixels)
-            percentages = (counts / total_pixels) * 100
-            
-            # Create color palette
-            color_palette = []
-            for i, (color, percentage) in enumerate(zip(colors, percentages)):
-                hex_color = self._rgb_to_hex(color)
-                lab_color = self._rgb_to_lab(color)
-                
-                color_info = {
-                    'hex': hex_color,
-                    'rgb': color.tolist(),
-                    'lab': lab_color,
-                    'percentage': round(percentage, 2),
-                    'cluster_id': int(unique_labels[i]),
-                    'name': self._get_color_name(color),
-                    'hsv': self._rgb_to_hsv(color),
-                    'hsl': self._rgb_to_hsl(color)
-                }
-                color_palette.append(color_info)
-            
-            # Sort by percentage (most dominant first)
-            color_palette.sort(key=lambda x: x['percentage'], reverse=True)
-            
-            logger.info(f"Extracted {len(color_palette)} dominant colors from {image_url}")
+            logger.info(f"Extracted {len(color_palette)} dominant colors from {image_url} ({backend})")
             return color_palette
             
         except Exception as e:
             logger.error(f"Failed to extract dominant colors: {str(e)}")
             return []
     
+    def palette_from_pixels(self, pixels: np.ndarray, num_colors: int = 8,
+                            backend: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Build the dominant color palette of already decoded pixels
+        
+        Args:
+            pixels: RGB uint8 array of shape (N, 3)
+            num_colors: Number of dominant colors to extract
+            backend: Quantizer backend; defaults to the COLOR_QUANTIZER_BACKEND setting
+            
+        Returns:
+            List of color dictionaries, most dominant first
+        """
+        # Quantize to the dominant colors
+        backend = backend or getattr(settings, 'COLOR_QUANTIZER_BACKEND', 'kmeans')
+        colors, percentages = color_quantizer.quantize_colors(pixels, num_colors, backend)
+        
+        # Convert all centers at once
+        described = color_math.describe_colors(colors)
+        rgb_colors = described['rgb'].tolist()
+        lab_colors = described['lab'].tolist()
+        hsv_colors = described['hsv'].tolist()
+        hsl_colors = described['hsl'].tolist()
+        
+        # Create color palette
+        color_palette = []
+        for i, percentage in enumerate(percentages):
+            color_info = {
+                'hex': described['hex'][i],
+                'rgb': rgb_colors[i],
+                'lab': lab_colors[i],
+                'percentage': round(float(percentage), 2),
+                'cluster_id': i,
+                'name': described['name'][i],
+                'hsv': hsv_colors[i],
+                'hsl': hsl_colors[i]
+            }
+            color_palette.append(color_info)
+        
+        # Sort by percentage (most dominant first)
+        color_palette.sort(key=lambda x: x['percentage'], reverse=True)
+        return color_palette
+    
     def match_colors(self, fabric_colors: List[Dict], design_colors: List[Dict]) -> Dict[str, Any]:
         """
         Match colors between fabric and design using LAB color similarity
@@ -105,48 +117,23 @@ class SmartColorMatcher:
         """
         try:
             matches = []
-            unmatched_fabric = []
-            unmatched_design = []
-            
-            # Create copies for tracking
-            fabric_remaining = fabric_colors.copy()
-            design_remaining = design_colors.copy()
-            
-            # Find matches using LAB color distance
-            for fabric_color in fabric_colors:
-                best_match = None
-                best_distance = float('inf')
-                best_design_idx = -1
-                
-                for i, design_color in enumerate(design_remaining):
-                    distance = self._calculate_lab_distance(
-                        fabric_color['lab'], 
-                        design_color['lab']
-                    )
-                    
-                    if distance < best_distance and distance <= self.color_tolerance:
-                        best_distance = distance
-                        best_match = design_color
-                        best_design_idx = i
-                
-                if best_match:
-                    match_info = {
-                        'fabric_color': fabric_color,
-                        'design_color': best_match,
-                        'distance': round(best_distance, 2),
-                        'similarity_score': round((1 - best_distance / 100) * 100, 1),
-                        'match_quality': self._get_match_quality(best_distance)
-                    }
-                    matches.append(match_info)
-                    
-                    # Remove matched design color
-                    if best_design_idx >= 0:
-                        design_remaining.pop(best_design_idx)
-                else:
-                    unmatched_fabric.append(fabric_color)
+            matched_fabric = set()
+            matched_design = set()
+            
+            # Optimal one-to-one assignment over the full LAB distance matrix
+            for fabric_idx, design_idx, distance in self._assign_colors(fabric_colors, design_colors):
+                matches.append({
+                    'fabric_color': fabric_colors[fabric_idx],
+                    'design_color': design_colors[design_idx],
+                    'distance': round(distance, 2),
+                    'similarity_score': round((1 - distance / 100) * 100, 1),
+                    'match_quality': self._get_match_quality(distance)
+                })
+                matched_fabric.add(fabric_idx)
+                matched_design.add(design_idx)
             
-            # Remaining design colors are unmatched
-            unmatched_design = design_remaining
+            unmatched_fabric = [c for i, c in enumerate(fabric_colors) if i not in matched_fabric]
+            unmatched_design = [c for i, c in enumerate(design_colors) if i not in matched_design]
             
             # Calculate overall matching score
             total_fabric_percentage = sum(c['percentage'] for c in fabric_colors)
@@ -192,19 +179,12 @@ class SmartColorMatcher:
         """
         try:
             suggestions = []
+            harmony = target_harmony if target_harmony in color_math.HARMONIES else 'complementary'
             
-            for color in fabric_colors:
-                if target_harmony == 'complementary':
-                    adj_colors = self._get_complementary_colors(color)
-                elif target_harmony == 'analogous':
-                    adj_colors = self._get_analogous_colors(color)
-                elif target_harmony == 'triadic':
-                    adj_colors = self._get_triadic_colors(color)
-                elif target_harmony == 'split_complementary':
-                    adj_colors = self._get_split_complementary_colors(color)
-                else:
-                    adj_colors = self._get_complementary_colors(color)
-                
+            # Build the harmony sets of all colors in one pass
+            harmony_sets = self._get_harmony_colors(fabric_colors, harmony)
+            
+            for color, adj_colors in zip(fabric_colors, harmony_sets):
                 suggestion = {
                     'original_color': color,
                     'target_harmony': target_harmony,
@@ -220,17 +200,13 @@ class SmartColorMatcher:
             logger.error(f"Failed to suggest color adjustments: {str(e)}")
             return []
     
-    def _download_image(self, image_url: str) -> Optional[np.ndarray]:
-        """Download image from URL and convert to OpenCV format"""
+    def _download_image(self, image_url: str, max_size: Optional[int] = None) -> Optional[np.ndarray]:
+        """Fetch image through the shared cached fetcher and convert to OpenCV format"""
         try:
-            response = requests.get(image_url, timeout=30)
-            response.raise_for_status()
-            
-            # Convert to PIL Image
-            image = Image.open(BytesIO(response.content))
+            image_rgb = get_image_fetcher().fetch_array(image_url, max_size=max_size)
             
             # Convert to OpenCV format
-            image_cv = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+            image_cv = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR)
             
             return image_cv
             
@@ -254,61 +230,35 @@ class SmartColorMatcher:
         
         return cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_AREA)
     
-    def _rgb_to_hex(self, rgb: np.ndarray) -> str:
-        """Convert RGB array to hex string"""
-        return f"#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}"
+    def _get_color_name(self, rgb: np.ndarray) -> str:
+        """Get the nearest named color for RGB values"""
+        return color_math.get_color_name_index().names_of(rgb)[0]
     
-    def _rgb_to_lab(self, rgb: np.ndarray) -> List[float]:
-        """Convert RGB to LAB color space"""
-        # Normalize RGB values
-        rgb_norm = rgb.astype(np.float32) / 255.0
+    def _assign_colors(self, fabric_colors: List[Dict], design_colors: List[Dict]) -> List[Tuple[int, int, float]]:
+        """
+        Pair fabric and design colors one-to-one within the LAB tolerance
         
-        # Convert to LAB using OpenCV
-        lab = cv2.cvtColor(np.uint8([[rgb_norm * 255]]), cv2.COLOR_RGB2LAB)[0][0]
+        Solves the assignment problem (Hungarian algorithm) so the matched
+        share of the fabric is as large as possible, and among such pairings
+        the total LAB distance is smallest.
         
-        return lab.tolist()
-    
-    def _rgb_to_hsv(self, rgb: np.ndarray) -> List[float]:
-        """Convert RGB to HSV"""
-        rgb_norm = rgb.astype(np.float32) / 255.0
-        hsv = colorsys.rgb_to_hsv(rgb_norm[0], rgb_norm[1], rgb_norm[2])
-        return [hsv[0] * 360, hsv[1] * 100, hsv[2] * 100]  # Convert to standard ranges
-    
-    def _rgb_to_hsl(self, rgb: np.ndarray) -> List[float]:
-        """Convert RGB to HSL"""
-        rgb_norm = rgb.astype(np.float32) / 255.0
-        hsl = colorsys.rgb_to_hls(rgb_norm[0], rgb_norm[1], rgb_norm[2])
-        return [hsl[0] * 360, hsl[2] * 100, hsl[1] * 100]  # Convert to standard ranges
-    
-    def _get_color_name(self, rgb: np.ndarray) -> str:
-        """Get approximate color name based on RGB values"""
-        r, g, b = rgb
-        
-        # Simple color name mapping based on RGB values
-        if r > 200 and g < 100 and b < 100:
-            return "Red"
-        elif r < 100 and g > 200 and b < 100:
-            return "Green"
-        elif r < 100 and g < 100 and b > 200:
-            return "Blue"
-        elif r > 200 and g > 200 and b < 100:
-            return "Yellow"
-        elif r > 200 and g < 100 and b > 200:
-            return "Magenta"
-        elif r < 100 and g > 200 and b > 200:
-            return "Cyan"
-        elif r > 200 and g > 200 and b > 200:
-            return "White"
-        elif r < 100 and g < 100 and b < 100:
-            return "Black"
-        elif r > 150 and g > 150 and b < 100:
-            return "Orange"
-        elif r > 150 and g < 100 and b > 150:
-            return "Purple"
-        elif r < 100 and g > 150 and b > 150:
-            return "Teal"
-        else:
-            return "Mixed"
+        Returns:
+            (fabric index, design index, distance) tuples in fabric order
+        """
+        if not fabric_colors or not design_colors:
+            return []
+        
+        fabric_lab = np.array([c['lab'] for c in fabric_colors], dtype=np.float64)
+        design_lab = np.array([c['lab'] for c in design_colors], dtype=np.float64)
+        distances = np.linalg.norm(fabric_lab[:, None, :] - design_lab[None, :, :], axis=2)
+        
+        # Matched coverage dominates the cost; distance only breaks ties between equal coverage
+        within = distances <= self.color_tolerance
+        coverage = np.array([c.get('percentage', 0) for c in fabric_colors], dtype=np.float64)[:, None] + 1.0
+        cost = np.where(within, distances - coverage * 1e6, 0.0)
+        rows, cols = linear_sum_assignment(cost)
+        
+        return [(int(i), int(j), float(distances[i, j])) for i, j in zip(rows, cols) if within[i, j]]
     
     def _calculate_lab_distance(self, lab1: List[float], lab2: List[float]) -> float:
         """Calculate Euclidean distance in LAB color space"""
@@ -343,16 +293,16 @@ class SmartColorMatcher:
                 'suggestion': f"Consider adjusting design to use {fabric_harmony['type']} harmony for better cohesion"
             })
         
-        # Suggest complementary colors for unmatched colors
-        for color in fabric_colors:
-            if color['percentage'] > 20:  # Only for dominant colors
-                complementary = self._get_complementary_colors(color)
-                suggestions.append({
-                    'type': 'complementary_suggestion',
-                    'base_color': color,
-                    'suggested_colors': complementary,
-                    'reason': f"Complementary colors for dominant {color['name']} ({color['percentage']}%)"
-                })
+        # Suggest complementary colors for unmatched colors (only for dominant colors)
+        dominant_colors = [color for color in fabric_colors if color['percentage'] > 20]
+        complementary_sets = self._get_harmony_colors(dominant_colors, 'complementary')
+        for color, complementary in zip(dominant_colors, complementary_sets):
+            suggestions.append({
+                'type': 'complementary_suggestion',
+                'base_color': color,
+                'suggested_colors': complementary,
+                'reason': f"Complementary colors for dominant {color['name']} ({color['percentage']}%)"
+            })
         
         return suggestions
     
@@ -444,6 +394,40 @@ class SmartColorMatcher:
         else:
             return 'neutral'
     
+    def _analyze_color_intensity(self, colors: List[Dict]) -> Dict[str, Any]:
+        """Classify palette intensity from its coverage-weighted saturation"""
+        total = sum(c['percentage'] for c in colors) or 1
+        saturation = sum(c['hsv'][1] * c['percentage'] for c in colors) / total
+        
+        if saturation >= 60:
+            intensity = 'high'
+        elif saturation >= 30:
+            intensity = 'medium'
+        else:
+            intensity = 'low'
+        
+        return {'intensity': intensity, 'score': round(saturation / 10, 1)}
+    
+    def _determine_fabric_mood(self, colors: List[Dict]) -> Dict[str, Any]:
+        """Determine the mood a palette conveys from its temperature, saturation and brightness"""
+        total = sum(c['percentage'] for c in colors) or 1
+        saturation = sum(c['hsv'][1] * c['percentage'] for c in colors) / total
+        brightness = sum(c['hsv'][2] * c['percentage'] for c in colors) / total
+        temperature = self._get_color_temperature(colors)
+        
+        if brightness < 35:
+            mood, confidence = 'rich', 0.8
+        elif saturation < 25:
+            mood, confidence = ('soft', 0.75) if brightness >= 70 else ('earthy', 0.65)
+        elif temperature == 'warm':
+            mood, confidence = ('vibrant', 0.8) if saturation >= 60 else ('warm', 0.7)
+        elif temperature == 'cool':
+            mood, confidence = ('fresh', 0.75) if brightness >= 60 else ('calm', 0.7)
+        else:
+            mood, confidence = 'balanced', 0.6
+        
+        return {'mood': mood, 'confidence': confidence}
+    
     def _analyze_saturation_balance(self, fabric_colors: List[Dict], design_colors: List[Dict]) -> Dict[str, Any]:
         """Analyze saturation balance between fabric and design"""
         fabric_sat = sum(c['hsv'][1] * c['percentage'] for c in fabric_colors) / 100
@@ -481,111 +465,58 @@ class SmartColorMatcher:
             'recommendation': f'{level.title()} contrast - {"Good for readability" if level == "high" else "Consider increasing contrast"}'
         }
     
+    def _get_harmony_colors(self, colors: List[Dict], harmony: str) -> List[List[Dict[str, Any]]]:
+        """
+        Get one harmony set per color, computed for all colors at once
+        
+        Args:
+            colors: Color dictionaries with 'hsv' and 'name'
+            harmony: Harmony type (complementary, analogous, triadic, split_complementary)
+            
+        Returns:
+            List of suggested color lists, aligned with colors
+        """
+        if not colors:
+            return []
+        
+        hsv = [color['hsv'] for color in colors]
+        suggested_hsv, suggested_rgb = color_math.harmony_colors(hsv, harmony)
+        hex_colors = color_math.rgb_to_hex(suggested_rgb.reshape(-1, 3))
+        suggested_hsv = suggested_hsv.tolist()
+        suggested_rgb = suggested_rgb.tolist()
+        label = color_math.HARMONIES[harmony]['label']
+        width = len(color_math.HARMONIES[harmony]['hue_offsets'])
+        
+        harmony_sets = []
+        for i, color in enumerate(colors):
+            name = f"{label} {color['name']}"
+            harmony_sets.append([
+                {
+                    'hex': hex_colors[i * width + k],
+                    'rgb': suggested_rgb[i][k],
+                    'hsv': suggested_hsv[i][k],
+                    'name': name,
+                    'relationship': harmony
+                }
+                for k in range(width)
+            ])
+        return harmony_sets
+    
     def _get_complementary_colors(self, color: Dict) -> List[Dict[str, Any]]:
         """Get complementary colors for a given color"""
-        hsv = color['hsv']
-        hue = hsv[0]
-        
-        # Calculate complementary hue (180 degrees opposite)
-        comp_hue = (hue + 180) % 360
-        
-        # Create complementary color variations
-        complementary_colors = []
-        
-        for sat_adj in [0.8, 1.0, 1.2]:
-            for val_adj in [0.7, 0.9, 1.1]:
-                new_sat = min(100, hsv[1] * sat_adj)
-                new_val = min(100, hsv[2] * val_adj)
-                
-                # Convert back to RGB
-                rgb = colorsys.hsv_to_rgb(comp_hue/360, new_sat/100, new_val/100)
-                rgb_array = np.array([int(c * 255) for c in rgb])
-                
-                comp_color = {
-                    'hex': self._rgb_to_hex(rgb_array),
-                    'rgb': rgb_array.tolist(),
-                    'hsv': [comp_hue, new_sat, new_val],
-                    'name': f"Complementary {color['name']}",
-                    'relationship': 'complementary'
-                }
-                complementary_colors.append(comp_color)
-        
-        return complementary_colors[:3]  # Return top 3 variations
+        return self._get_harmony_colors([color], 'complementary')[0]
     
     def _get_analogous_colors(self, color: Dict) -> List[Dict[str, Any]]:
         """Get analogous colors for a given color"""
-        hsv = color['hsv']
-        hue = hsv[0]
-        
-        analogous_colors = []
-        
-        # Create analogous colors (±30 degrees)
-        for hue_offset in [-30, -15, 15, 30]:
-            new_hue = (hue + hue_offset) % 360
-            
-            rgb = colorsys.hsv_to_rgb(new_hue/360, hsv[1]/100, hsv[2]/100)
-            rgb_array = np.array([int(c * 255) for c in rgb])
-            
-            analog_color = {
-                'hex': self._rgb_to_hex(rgb_array),
-                'rgb': rgb_array.tolist(),
-                'hsv': [new_hue, hsv[1], hsv[2]],
-                'name': f"Analogous {color['name']}",
-                'relationship': 'analogous'
-            }
-            analogous_colors.append(analog_color)
-        
-        return analogous_colors
+        return self._get_harmony_colors([color], 'analogous')[0]
     
     def _get_triadic_colors(self, color: Dict) -> List[Dict[str, Any]]:
         """Get triadic colors for a given color"""
-        hsv = color['hsv']
-        hue = hsv[0]
-        
-        triadic_colors = []
-        
-        # Create triadic colors (±120 degrees)
-        for hue_offset in [120, 240]:
-            new_hue = (hue + hue_offset) % 360
-            
-            rgb = colorsys.hsv_to_rgb(new_hue/360, hsv[1]/100, hsv[2]/100)
-            rgb_array = np.array([int(c * 255) for c in rgb])
-            
-            triadic_color = {
-                'hex': self._rgb_to_hex(rgb_array),
-                'rgb': rgb_array.tolist(),
-                'hsv': [new_hue, hsv[1], hsv[2]],
-                'name': f"Triadic {color['name']}",
-                'relationship': 'triadic'
-            }
-            triadic_colors.append(triadic_color)
-        
-        return triadic_colors
+        return self._get_harmony_colors([color], 'triadic')[0]
     
     def _get_split_complementary_colors(self, color: Dict) -> List[Dict[str, Any]]:
         """Get split complementary colors for a given color"""
-        hsv = color['hsv']
-        hue = hsv[0]
-        
-        split_comp_colors = []
-        
-        # Create split complementary colors (±150 degrees)
-        for hue_offset in [150, 210]:
-            new_hue = (hue + hue_offset) % 360
-            
-            rgb = colorsys.hsv_to_rgb(new_hue/360, hsv[1]/100, hsv[2]/100)
-            rgb_array = np.array([int(c * 255) for c in rgb])
-            
-            split_comp_color = {
-                'hex': self._rgb_to_hex(rgb_array),
-                'rgb': rgb_array.tolist(),
-                'hsv': [new_hue, hsv[1], hsv[2]],
-                'name': f"Split Complementary {color['name']}",
-                'relationship': 'split_complementary'
-            }
-            split_comp_colors.append(split_comp_color)
-        
-        return split_comp_colors
+        return self._get_harmony_colors([color], 'split_complementary')[0]
     
     def _calculate_harmony_confidence(self, color: Dict, harmony_type: str) -> float:
         """Calculate confidence score for harmony suggestion"""
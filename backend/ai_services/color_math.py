@@ -0,0 +1,225 @@
+"""
+Batched color math for palettes and color suggestions.
+Every function takes an (N, 3) array of colors and works on all of them at
+once: color space conversions, nearest named color (a KD-tree over the CIELAB
+coordinates of the name table, built once per process) and the hue-rotation
+harmony sets used by SmartColorMatcher.
+"""
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from . import color_quantizer
+
+# Named colors offered to users, as sRGB (names keep their base hue word where
+# one applies, so substring lookups like "blue" in "Navy Blue" still work)
+COLOR_NAME_TABLE = (
+    ('Black', (0, 0, 0)),
+    ('Charcoal', (54, 69, 79)),
+    ('Gray', (128, 128, 128)),
+    ('Silver', (192, 192, 192)),
+    ('White', (255, 255, 255)),
+    ('Ivory', (255, 255, 240)),
+    ('Cream', (255, 253, 208)),
+    ('Beige', (245, 245, 220)),
+    ('Khaki', (195, 176, 145)),
+    ('Tan', (210, 180, 140)),
+    ('Camel', (193, 154, 107)),
+    ('Brown', (139, 69, 19)),
+    ('Dark Brown', (101, 67, 33)),
+    ('Rust', (183, 65, 14)),
+    ('Maroon', (128, 0, 0)),
+    ('Burgundy', (128, 0, 32)),
+    ('Dark Red', (139, 0, 0)),
+    ('Red', (255, 0, 0)),
+    ('Crimson', (220, 20, 60)),
+    ('Coral', (255, 127, 80)),
+    ('Salmon', (250, 128, 114)),
+    ('Pink', (255, 192, 203)),
+    ('Hot Pink', (255, 105, 180)),
+    ('Magenta', (255, 0, 255)),
+    ('Orange', (255, 165, 0)),
+    ('Mustard Yellow', (225, 173, 1)),
+    ('Gold', (255, 215, 0)),
+    ('Yellow', (255, 255, 0)),
+    ('Olive Green', (128, 128, 0)),
+    ('Lime Green', (50, 205, 50)),
+    ('Green', (0, 128, 0)),
+    ('Forest Green', (34, 139, 34)),
+    ('Dark Green', (0, 100, 0)),
+    ('Mint Green', (152, 255, 152)),
+    ('Teal', (0, 128, 128)),
+    ('Turquoise', (64, 224, 208)),
+    ('Cyan', (0, 255, 255)),
+    ('Sky Blue', (135, 206, 235)),
+    ('Light Blue', (173, 216, 230)),
+    ('Blue', (0, 0, 255)),
+    ('Royal Blue', (65, 105, 225)),
+    ('Navy Blue', (0, 0, 128)),
+    ('Indigo', (75, 0, 130)),
+    ('Purple', (128, 0, 128)),
+    ('Violet', (238, 130, 238)),
+    ('Lavender', (230, 230, 250)),
+    ('Plum', (142, 69, 133)),
+    ('Mauve', (224, 176, 255)),
+)
+
+# Harmony sets: hue offsets in degrees, with the saturation and value scale of
+# each suggested color (complementary varies the value of one opposite hue)
+HARMONIES = {
+    'complementary': {'label': 'Complementary', 'hue_offsets': (180, 180, 180),
+                      'saturation_scale': (0.8, 0.8, 0.8), 'value_scale': (0.7, 0.9, 1.1)},
+    'analogous': {'label': 'Analogous', 'hue_offsets': (-30, -15, 15, 30)},
+    'triadic': {'label': 'Triadic', 'hue_offsets': (120, 240)},
+    'split_complementary': {'label': 'Split Complementary', 'hue_offsets': (150, 210)},
+}
+
+
+class ColorNameIndex:
+    """Nearest named color lookup in CIELAB"""
+
+    def __init__(self, table: Iterable[Tuple[str, Tuple[int, int, int]]] = COLOR_NAME_TABLE):
+        names, colors = zip(*table)
+        self.names = np.array(names)
+        self.colors = np.array(colors, dtype=np.int64)
+        self.tree = cKDTree(color_quantizer.rgb_to_cielab(self.colors))
+
+    def nearest(self, colors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the nearest named color of each color
+
+        Args:
+            colors: (N, 3) RGB colors (0-255)
+
+        Returns:
+            Tuple of (N,) indices into the name table and (N,) CIELAB distances
+        """
+        lab = color_quantizer.rgb_to_cielab(as_rgb_array(colors))
+        if not len(lab):
+            return np.zeros(0, dtype=int), np.zeros(0)
+        distances, indices = self.tree.query(lab)
+        return indices, distances
+
+    def names_of(self, colors: np.ndarray) -> List[str]:
+        """Nearest color name of each (N, 3) RGB color"""
+        indices, _ = self.nearest(colors)
+        return self.names[indices].tolist()
+
+
+def as_rgb_array(colors: Any) -> np.ndarray:
+    """Coerce a color or sequence of colors to an (N, 3) int RGB array"""
+    return np.asarray(colors, dtype=np.int64).reshape(-1, 3)
+
+
+def rgb_to_hex(colors: np.ndarray) -> List[str]:
+    """Convert (N, 3) RGB colors to '#rrggbb' strings"""
+    digits = np.clip(as_rgb_array(colors), 0, 255).astype(np.uint8).tobytes().hex()
+    return ['#' + digits[start:start + 6] for start in range(0, len(digits), 6)]
+
+
+def hsv_to_rgb(hsv: np.ndarray) -> np.ndarray:
+    """
+    Convert HSV colors (H in degrees, S and V in percent) to int RGB, like
+    colorsys.hsv_to_rgb followed by truncating each channel times 255
+
+    Args:
+        hsv: Array of shape (..., 3)
+
+    Returns:
+        Int array of the same shape
+    """
+    hsv = np.asarray(hsv, dtype=np.float64)
+    h, s, v = hsv[..., 0] / 360, hsv[..., 1] / 100, hsv[..., 2] / 100
+    sector = (h * 6.0).astype(int)
+    f = h * 6.0 - sector
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    sector = sector % 6
+
+    choices = [sector == index for index in range(6)]
+    r = np.select(choices, [v, q, p, p, t, v])
+    g = np.select(choices, [t, v, v, q, p, p])
+    b = np.select(choices, [p, p, t, v, v, q])
+    rgb = np.stack([r, g, b], axis=-1)
+    rgb = np.where((s == 0.0)[..., None], v[..., None], rgb)
+    return (rgb * 255).astype(int)
+
+
+def harmony_colors(hsv: np.ndarray, harmony: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build one harmony set for every color
+
+    Args:
+        hsv: (N, 3) base colors in HSV (H in degrees, S and V in percent)
+        harmony: Key of HARMONIES
+
+    Returns:
+        Tuple of (N, K, 3) HSV and (N, K, 3) int RGB suggested colors
+    """
+    spec = HARMONIES[harmony]
+    hsv = np.asarray(hsv, dtype=np.float64).reshape(-1, 3)
+    offsets = np.asarray(spec['hue_offsets'], dtype=np.float64)
+    suggested = np.empty((len(hsv), len(offsets), 3))
+    suggested[..., 0] = (hsv[:, None, 0] + offsets) % 360
+    suggested[..., 1] = hsv[:, None, 1]
+    suggested[..., 2] = hsv[:, None, 2]
+    if 'saturation_scale' in spec:
+        suggested[..., 1] = np.minimum(100, suggested[..., 1] * np.asarray(spec['saturation_scale']))
+    if 'value_scale' in spec:
+        suggested[..., 2] = np.minimum(100, suggested[..., 2] * np.asarray(spec['value_scale']))
+    return suggested, hsv_to_rgb(suggested)
+
+
+def describe_colors(colors: np.ndarray, harmonies: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Convert colors to every representation used by palettes in one pass
+
+    Args:
+        colors: (N, 3) RGB colors (0-255)
+        harmonies: HARMONIES keys to build suggestion sets for (none by default)
+
+    Returns:
+        Dictionary with (N, 3) arrays 'rgb', 'lab' (OpenCV 8-bit), 'hsv' and
+        'hsl', lists 'hex' and 'name', and 'harmonies' mapping each requested
+        harmony to its (N, K, 3) 'hsv' and 'rgb' arrays and (N, K) 'hex' lists
+    """
+    rgb = np.clip(as_rgb_array(colors), 0, 255)
+    hsv = color_quantizer.rgb_to_hsv(rgb)
+    description = {
+        'rgb': rgb,
+        'hex': rgb_to_hex(rgb),
+        'lab': color_quantizer.rgb_to_lab(rgb),
+        'hsv': hsv,
+        'hsl': color_quantizer.rgb_to_hsl(rgb),
+        'name': get_color_name_index().names_of(rgb),
+        'harmonies': {},
+    }
+    for harmony in harmonies or ():
+        suggested_hsv, suggested_rgb = harmony_colors(hsv, harmony)
+        hex_colors = rgb_to_hex(suggested_rgb.reshape(-1, 3))
+        width = suggested_rgb.shape[1]
+        description['harmonies'][harmony] = {
+            'hsv': suggested_hsv,
+            'rgb': suggested_rgb,
+            'hex': [hex_colors[start:start + width] for start in range(0, len(hex_colors), width)],
+        }
+    return description
+
+
+_color_name_index = None
+_color_name_index_lock = threading.Lock()
+
+
+def get_color_name_index() -> ColorNameIndex:
+    """Return the process-wide named color index"""
+    global _color_name_index
+    if _color_name_index is not None:
+        return _color_name_index
+
+    with _color_name_index_lock:
+        if _color_name_index is None:
+            _color_name_index = ColorNameIndex()
+    return _color_name_index
@@ -0,0 +1,227 @@
+"""
+Pluggable color quantization backends for dominant color extraction.
+Each backend reduces an (N, 3) RGB pixel array to a palette of cluster
+centers plus the share of pixels assigned to each, and the palette's color
+space conversions are done for all centers at once.
+"""
+import logging
+from typing import Callable, Dict, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+from sklearn.cluster import KMeans, MiniBatchKMeans
+
+logger = logging.getLogger(__name__)
+
+# Side of the color cube used by the histogram backend (32 bins per channel)
+HISTOGRAM_BINS = 32
+
+
+def _labels_to_palette(centers: np.ndarray, labels: np.ndarray, weights: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+    counts = np.bincount(labels, weights=weights, minlength=len(centers)).astype(np.float64)
+    return centers, counts / counts.sum() * 100
+
+
+def kmeans_quantize(pixels: np.ndarray, num_colors: int, random_state: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """Full scikit-learn K-Means over every pixel (the original behaviour)"""
+    kmeans = KMeans(n_clusters=num_colors, random_state=random_state, n_init=10)
+    kmeans.fit(pixels)
+    return _labels_to_palette(kmeans.cluster_centers_, kmeans.labels_)
+
+
+def minibatch_quantize(pixels: np.ndarray, num_colors: int, random_state: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """Mini-batch K-Means: fits on small random batches, then labels every pixel once"""
+    kmeans = MiniBatchKMeans(
+        n_clusters=num_colors,
+        random_state=random_state,
+        n_init=3,
+        batch_size=4096,
+    )
+    labels = kmeans.fit_predict(pixels)
+    return _labels_to_palette(kmeans.cluster_centers_, labels)
+
+
+def median_cut_quantize(pixels: np.ndarray, num_colors: int, random_state: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """PIL median-cut quantization"""
+    image = Image.fromarray(np.ascontiguousarray(pixels, dtype=np.uint8).reshape(1, -1, 3))
+    quantized = image.quantize(colors=num_colors, method=Image.Quantize.MEDIANCUT)
+    labels = np.asarray(quantized).ravel()
+    palette = np.asarray(quantized.getpalette()[:3 * (int(labels.max()) + 1)], dtype=np.float64).reshape(-1, 3)
+    centers, percentages = _labels_to_palette(palette, labels)
+    used = percentages > 0
+    return centers[used], percentages[used]
+
+
+def histogram_quantize(pixels: np.ndarray, num_colors: int, random_state: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    K-Means over a 32x32x32 color histogram.
+
+    Pixels are binned into the color cube, each occupied bin is represented by
+    the mean of its pixels, and weighted K-Means runs on those few thousand
+    bins instead of on every pixel.
+    """
+    pixels = np.asarray(pixels, dtype=np.uint8)
+    shift = 8 - int(np.log2(HISTOGRAM_BINS))
+    binned = (pixels >> shift).astype(np.int32)
+    bin_index = (binned[:, 0] * HISTOGRAM_BINS + binned[:, 1]) * HISTOGRAM_BINS + binned[:, 2]
+
+    occupied, inverse, weights = np.unique(bin_index, return_inverse=True, return_counts=True)
+    sums = np.zeros((len(occupied), 3), dtype=np.float64)
+    np.add.at(sums, inverse, pixels)
+    bin_means = sums / weights[:, None]
+
+    clusters = min(num_colors, len(occupied))
+    kmeans = KMeans(n_clusters=clusters, random_state=random_state, n_init=10)
+    kmeans.fit(bin_means, sample_weight=weights)
+    return _labels_to_palette(kmeans.cluster_centers_, kmeans.labels_, weights)
+
+
+QUANTIZER_BACKENDS: Dict[str, Callable[..., Tuple[np.ndarray, np.ndarray]]] = {
+    'kmeans': kmeans_quantize,
+    'minibatch': minibatch_quantize,
+    'median_cut': median_cut_quantize,
+    'histogram': histogram_quantize,
+}
+
+
+def quantize_colors(pixels: np.ndarray, num_colors: int, backend: str = 'kmeans',
+                    random_state: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce pixels to a palette of dominant colors.
+
+    Args:
+        pixels: (N, 3) uint8 RGB pixels
+        num_colors: Number of palette colors
+        backend: One of QUANTIZER_BACKENDS
+        random_state: Seed for the K-Means based backends
+
+    Returns:
+        (centers, percentages): (K, 3) integer RGB centers and the percentage
+        of pixels assigned to each
+    """
+    try:
+        quantizer = QUANTIZER_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown color quantizer backend: {backend}")
+
+    centers, percentages = quantizer(pixels, num_colors, random_state)
+    return np.clip(centers, 0, 255).astype(int), percentages
+
+
+def rgb_to_lab(colors: np.ndarray) -> np.ndarray:
+    """Convert (N, 3) RGB colors to OpenCV 8-bit LAB (L, a, b in 0-255)"""
+    rgb = np.asarray(colors, dtype=np.uint8).reshape(1, -1, 3)
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2LAB)[0].astype(int)
+
+
+def _hue_and_extremes(colors: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    rgb = np.asarray(colors, dtype=np.float64).reshape(-1, 3) / 255.0
+    maxc = rgb.max(axis=1)
+    minc = rgb.min(axis=1)
+    delta = maxc - minc
+    safe_delta = np.where(delta == 0, 1.0, delta)
+
+    r, g, b = rgb.T
+    rc = (maxc - r) / safe_delta
+    gc = (maxc - g) / safe_delta
+    bc = (maxc - b) / safe_delta
+    hue = np.select([r == maxc, g == maxc], [bc - gc, 2.0 + rc - bc], default=4.0 + gc - rc)
+    hue = np.where(delta == 0, 0.0, (hue / 6.0) % 1.0)
+    return hue, maxc, minc
+
+
+def rgb_to_hsv(colors: np.ndarray) -> np.ndarray:
+    """Convert (N, 3) RGB colors to HSV (H in degrees, S and V in percent), like colorsys"""
+    hue, maxc, minc = _hue_and_extremes(colors)
+    saturation = np.where(maxc == 0, 0.0, (maxc - minc) / np.where(maxc == 0, 1.0, maxc))
+    return np.stack([hue * 360, saturation * 100, maxc * 100], axis=1)
+
+
+def rgb_to_hsl(colors: np.ndarray) -> np.ndarray:
+    """Convert (N, 3) RGB colors to HSL (H in degrees, S and L in percent), like colorsys"""
+    hue, maxc, minc = _hue_and_extremes(colors)
+    lightness = (maxc + minc) / 2.0
+    spread = np.where(lightness <= 0.5, maxc + minc, 2.0 - maxc - minc)
+    saturation = np.where(maxc == minc, 0.0, (maxc - minc) / np.where(spread == 0, 1.0, spread))
+    return np.stack([hue * 360, saturation * 100, lightness * 100], axis=1)
+
+
+def rgb_to_cielab(colors: np.ndarray) -> np.ndarray:
+    """Convert (N, 3) sRGB colors (0-255) to float CIELAB under D65 (L in 0-100)"""
+    rgb = np.asarray(colors, dtype=np.float64).reshape(-1, 3) / 255.0
+    linear = np.where(rgb > 0.04045, ((rgb + 0.055) / 1.055) ** 2.4, rgb / 12.92)
+    xyz = linear @ np.array([
+        [0.4124564, 0.2126729, 0.0193339],
+        [0.3575761, 0.7151522, 0.1191920],
+        [0.1804375, 0.0721750, 0.9503041],
+    ])
+    xyz /= np.array([0.95047, 1.0, 1.08883])
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack([116 * f[:, 1] - 16, 500 * (f[:, 0] - f[:, 1]), 200 * (f[:, 1] - f[:, 2])], axis=1)
+
+
+def ciede2000(lab1: np.ndarray, lab2: np.ndarray) -> np.ndarray:
+    """
+    CIEDE2000 color difference between CIELAB colors, broadcasting like NumPy
+    arithmetic: pass (N, 1, 3) and (1, M, 3) for an N x M distance matrix.
+    """
+    lab1 = np.asarray(lab1, dtype=np.float64)
+    lab2 = np.asarray(lab2, dtype=np.float64)
+    L1, a1, b1 = np.moveaxis(lab1, -1, 0)
+    L2, a2, b2 = np.moveaxis(lab2, -1, 0)
+
+    c_bar = (np.hypot(a1, b1) + np.hypot(a2, b2)) / 2
+    g = 0.5 * (1 - np.sqrt(c_bar ** 7 / (c_bar ** 7 + 25.0 ** 7)))
+    a1p, a2p = a1 * (1 + g), a2 * (1 + g)
+    c1p, c2p = np.hypot(a1p, b1), np.hypot(a2p, b2)
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360
+    h2p = np.degrees(np.arctan2(b2, a2p)) % 360
+
+    delta_l = L2 - L1
+    delta_c = c2p - c1p
+    dh = h2p - h1p
+    dh = np.where(dh > 180, dh - 360, np.where(dh < -180, dh + 360, dh))
+    dh = np.where(c1p * c2p == 0, 0.0, dh)
+    delta_h = 2 * np.sqrt(c1p * c2p) * np.sin(np.radians(dh / 2))
+
+    l_bar = (L1 + L2) / 2
+    cp_bar = (c1p + c2p) / 2
+    h_sum = h1p + h2p
+    hp_bar = np.where(
+        c1p * c2p == 0, h_sum,
+        np.where(np.abs(h1p - h2p) <= 180, h_sum / 2, np.where(h_sum < 360, (h_sum + 360) / 2, (h_sum - 360) / 2))
+    )
+    t = (1 - 0.17 * np.cos(np.radians(hp_bar - 30)) + 0.24 * np.cos(np.radians(2 * hp_bar))
+         + 0.32 * np.cos(np.radians(3 * hp_bar + 6)) - 0.20 * np.cos(np.radians(4 * hp_bar - 63)))
+    s_l = 1 + 0.015 * (l_bar - 50) ** 2 / np.sqrt(20 + (l_bar - 50) ** 2)
+    s_c = 1 + 0.045 * cp_bar
+    s_h = 1 + 0.015 * cp_bar * t
+    r_t = (-2 * np.sqrt(cp_bar ** 7 / (cp_bar ** 7 + 25.0 ** 7))
+           * np.sin(np.radians(60 * np.exp(-(((hp_bar - 275) / 25) ** 2)))))
+
+    return np.sqrt(
+        (delta_l / s_l) ** 2 + (delta_c / s_c) ** 2 + (delta_h / s_h) ** 2
+        + r_t * (delta_c / s_c) * (delta_h / s_h)
+    )
+
+
+def dedupe_colors(colors: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    Greedy perceptual dedup: walk (N, 3) RGB colors in order (most important
+    first) and keep each one that is at least `threshold` CIEDE2000 away from
+    every color already kept. Returns the indices of the kept colors.
+    """
+    if len(colors) == 0:
+        return np.zeros(0, dtype=int)
+    lab = rgb_to_cielab(colors)
+    distances = ciede2000(lab[:, None, :], lab[None, :, :])
+
+    suppressed = np.zeros(len(lab), dtype=bool)
+    kept = []
+    for index in range(len(lab)):
+        if suppressed[index]:
+            continue
+        kept.append(index)
+        suppressed |= distances[index] < threshold
+    return np.array(kept, dtype=int)
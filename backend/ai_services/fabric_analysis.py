@@ -3,19 +3,23 @@ Fabric Analysis Service for Phase 1 Week 4
 Advanced fabric color extraction and texture pattern analysis using OpenCV and PIL
 """
 import logging
+import time
 import numpy as np
 import cv2
-from typing import Dict, List, Any, Optional, Tuple
-from PIL import Image, ImageStat
-import requests
-from io import BytesIO
+from typing import Dict, List, Any, Optional, Tuple, Union
 from django.conf import settings
+from .utils.image_fetcher import ImageFetcher, get_image_fetcher
+from . import texture_engine
+from .fabric_features import FabricFeatureGraph
 from .color_matching import SmartColorMatcher
 from .models import AIGenerationRequest, AIProvider
 from .services import AIGenerationService
 
 logger = logging.getLogger(__name__)
 
+# Version of the analysis output; bump it whenever results change so stored analyses are recomputed
+ANALYZER_VERSION = '4'
+
 
 class FabricAnalyzer:
     """Advanced fabric analysis service for color extraction and texture analysis"""
@@ -28,18 +32,76 @@ class FabricAnalyzer:
         """
         Comprehensive fabric analysis including colors, textures, and patterns
         
+        The image is decoded once; every stage reads its intermediates
+        (grayscale, edges, Gabor bank, LBP, GLCM, palette pixels) from one
+        shared FabricFeatureGraph, so nothing is computed twice.
+        
         Args:
             fabric_image_url: URL of the fabric image
             analysis_type: Type of analysis ('comprehensive', 'colors_only', 'texture_only')
             
         Returns:
-            Dictionary containing comprehensive fabric analysis
+            Dictionary containing comprehensive fabric analysis, with
+            'stage_timings_ms' (per stage) and 'feature_timings_ms' (per shared intermediate)
         """
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+        
+        # Download and process image
+        image = self._timed_stage(timings, 'decode', self._download_image, fabric_image_url)
+        if image is None:
+            logger.error("Failed to analyze fabric: Failed to download fabric image")
+            return {
+                'success': False,
+                'error': "Failed to download fabric image",
+                'image_url': fabric_image_url,
+                'analysis_type': analysis_type
+            }
+        
+        return self.analyze_image(image, fabric_image_url, analysis_type, timings=timings, started=started)
+    
+    def analyze_bytes(self, content: bytes, fabric_image_url: str, analysis_type: str = 'comprehensive') -> Dict[str, Any]:
+        """
+        Decode and analyze image bytes that were already fetched (see analyze_fabric)
+        
+        Args:
+            content: Encoded image bytes
+            fabric_image_url: URL the bytes came from, echoed in the result
+            analysis_type: Type of analysis ('comprehensive', 'colors_only', 'texture_only')
+            
+        Returns:
+            Dictionary containing the fabric analysis of exactly these bytes
+        """
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
         try:
-            # Download and process image
-            image = self._download_image(fabric_image_url)
-            if image is None:
-                raise ValueError("Failed to download fabric image")
+            image_rgb = self._timed_stage(timings, 'decode', ImageFetcher.decode, content)
+        except Exception as e:
+            logger.error(f"Failed to decode fabric image {fabric_image_url}: {str(e)}")
+            return {'success': False, 'error': str(e), 'image_url': fabric_image_url, 'analysis_type': analysis_type}
+        
+        image = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR)
+        return self.analyze_image(image, fabric_image_url, analysis_type, timings=timings, started=started)
+    
+    def analyze_image(self, image: np.ndarray, fabric_image_url: str, analysis_type: str = 'comprehensive',
+                      timings: Optional[Dict[str, float]] = None, started: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Analyze an already decoded fabric image (see analyze_fabric)
+        
+        Args:
+            image: BGR image array
+            fabric_image_url: URL the image came from, echoed in the result
+            analysis_type: Type of analysis ('comprehensive', 'colors_only', 'texture_only')
+            timings: Stage timings recorded so far (e.g. 'decode')
+            started: perf_counter() value the total is measured from
+            
+        Returns:
+            Dictionary containing the fabric analysis
+        """
+        try:
+            started = started if started is not None else time.perf_counter()
+            timings = timings if timings is not None else {}
+            features = FabricFeatureGraph(image)
             
             # Initialize result structure
             analysis_result = {
@@ -52,29 +114,38 @@ class FabricAnalyzer:
             
             # Color analysis
             if analysis_type in ['comprehensive', 'colors_only']:
-                color_analysis = self._analyze_fabric_colors(image, fabric_image_url)
-                analysis_result['color_analysis'] = color_analysis
+                analysis_result['color_analysis'] = self._timed_stage(
+                    timings, 'color_analysis', self._analyze_fabric_colors, features
+                )
             
             # Texture analysis
             if analysis_type in ['comprehensive', 'texture_only']:
-                texture_analysis = self._analyze_fabric_texture(image)
-                analysis_result['texture_analysis'] = texture_analysis
+                analysis_result['texture_analysis'] = self._timed_stage(
+                    timings, 'texture_analysis', self._analyze_fabric_texture, features
+                )
             
             # Pattern analysis
             if analysis_type == 'comprehensive':
-                pattern_analysis = self._analyze_fabric_patterns(image)
-                analysis_result['pattern_analysis'] = pattern_analysis
+                analysis_result['pattern_analysis'] = self._timed_stage(
+                    timings, 'pattern_analysis', self._analyze_fabric_patterns, features
+                )
             
             # Quality assessment
             if analysis_type == 'comprehensive':
-                quality_assessment = self._assess_fabric_quality(image)
-                analysis_result['quality_assessment'] = quality_assessment
+                analysis_result['quality_assessment'] = self._timed_stage(
+                    timings, 'quality_assessment', self._assess_fabric_quality, features
+                )
             
             # Generate recommendations
-            recommendations = self._generate_fabric_recommendations(analysis_result)
-            analysis_result['recommendations'] = recommendations
+            analysis_result['recommendations'] = self._timed_stage(
+                timings, 'recommendations', self._generate_fabric_recommendations, analysis_result
+            )
+            
+            timings['total'] = round((time.perf_counter() - started) * 1000, 2)
+            analysis_result['stage_timings_ms'] = timings
+            analysis_result['feature_timings_ms'] = features.stage_timings()
             
-            logger.info(f"Fabric analysis completed for {fabric_image_url}")
+            logger.info(f"Fabric analysis completed for {fabric_image_url} in {timings['total']:.0f} ms")
             return analysis_result
             
         except Exception as e:
@@ -157,14 +228,14 @@ class FabricAnalyzer:
             if image is None:
                 raise ValueError("Failed to download fabric image")
             
-            # Convert to grayscale for texture analysis
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            # Share grayscale and texture intermediates between both passes
+            features = FabricFeatureGraph(image)
             
             # Texture analysis
-            texture_features = self._extract_texture_features(gray)
+            texture_features = self._extract_texture_features(features)
             
             # Pattern detection
-            pattern_features = self._detect_patterns(gray)
+            pattern_features = self._detect_patterns(features)
             
             # Fabric type classification
             fabric_type = self._classify_fabric_type(image, texture_features, pattern_features)
@@ -190,17 +261,13 @@ class FabricAnalyzer:
                 'image_url': fabric_image_url
             }
     
-    def _download_image(self, image_url: str) -> Optional[np.ndarray]:
-        """Download image from URL and convert to OpenCV format"""
+    def _download_image(self, image_url: str, max_size: Optional[int] = None) -> Optional[np.ndarray]:
+        """Fetch image through the shared cached fetcher and convert to OpenCV format"""
         try:
-            response = requests.get(image_url, timeout=30)
-            response.raise_for_status()
-            
-            # Convert to PIL Image
-            image = Image.open(BytesIO(response.content))
+            image_rgb = get_image_fetcher().fetch_array(image_url, max_size=max_size)
             
             # Convert to OpenCV format
-            image_cv = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+            image_cv = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR)
             
             return image_cv
             
@@ -224,23 +291,25 @@ class FabricAnalyzer:
         from django.utils import timezone
         return timezone.now().isoformat()
     
-    def _analyze_fabric_colors(self, image: np.ndarray, image_url: str) -> Dict[str, Any]:
+    @staticmethod
+    def _timed_stage(timings: Dict[str, float], stage: str, func, *args, **kwargs) -> Any:
+        """Run one analysis stage, recording its duration in milliseconds under `stage`"""
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings[stage] = round((time.perf_counter() - started) * 1000, 2)
+    
+    @staticmethod
+    def _features(image: Union[np.ndarray, FabricFeatureGraph]) -> FabricFeatureGraph:
+        """Wrap a bare image array in a feature graph; graphs pass through unchanged"""
+        return image if isinstance(image, FabricFeatureGraph) else FabricFeatureGraph(image)
+    
+    def _analyze_fabric_colors(self, image: Union[np.ndarray, FabricFeatureGraph]) -> Dict[str, Any]:
         """Analyze fabric colors using the smart color matcher"""
         try:
-            # Convert to RGB for color analysis
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            
-            # Save temporary image for color extraction
-            temp_path = f"/tmp/temp_fabric_{hash(image_url)}.jpg"
-            cv2.imwrite(temp_path, image)
-            
-            # Use smart color matcher
-            color_palette = self.color_matcher.extract_dominant_colors(f"file://{temp_path}")
-            
-            # Clean up temp file
-            import os
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
+            # Quantize the already decoded pixels in memory
+            color_palette = self.color_matcher.palette_from_pixels(self._features(image).palette_pixels)
             
             # Analyze color properties
             color_analysis = {
@@ -250,7 +319,8 @@ class FabricAnalyzer:
                 'color_intensity': self._analyze_color_intensity(color_palette),
                 'fabric_mood': self._determine_fabric_mood(color_palette),
                 'complementary_colors': self._get_complementary_colors(color_palette[:2]) if len(color_palette) >= 2 else [],
-                'total_colors': len(color_palette)
+                'total_colors': len(color_palette),
+                'palette': color_palette
             }
             
             return color_analysis
@@ -259,14 +329,11 @@ class FabricAnalyzer:
             logger.error(f"Failed to analyze fabric colors: {str(e)}")
             return {'error': str(e)}
     
-    def _analyze_fabric_texture(self, image: np.ndarray) -> Dict[str, Any]:
+    def _analyze_fabric_texture(self, image: Union[np.ndarray, FabricFeatureGraph]) -> Dict[str, Any]:
         """Analyze fabric texture using computer vision techniques"""
         try:
-            # Convert to grayscale
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
             # Extract texture features
-            texture_features = self._extract_texture_features(gray)
+            texture_features = self._extract_texture_features(self._features(image))
             
             # Analyze texture properties
             texture_analysis = {
@@ -284,14 +351,11 @@ class FabricAnalyzer:
             logger.error(f"Failed to analyze fabric texture: {str(e)}")
             return {'error': str(e)}
     
-    def _analyze_fabric_patterns(self, image: np.ndarray) -> Dict[str, Any]:
+    def _analyze_fabric_patterns(self, image: Union[np.ndarray, FabricFeatureGraph]) -> Dict[str, Any]:
         """Analyze fabric patterns and motifs"""
         try:
-            # Convert to grayscale
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
             # Detect patterns
-            pattern_features = self._detect_patterns(gray)
+            pattern_features = self._detect_patterns(self._features(image))
             
             # Analyze pattern properties
             pattern_analysis = {
@@ -310,11 +374,10 @@ class FabricAnalyzer:
             logger.error(f"Failed to analyze fabric patterns: {str(e)}")
             return {'error': str(e)}
     
-    def _assess_fabric_quality(self, image: np.ndarray) -> Dict[str, Any]:
+    def _assess_fabric_quality(self, image: Union[np.ndarray, FabricFeatureGraph]) -> Dict[str, Any]:
         """Assess overall fabric quality"""
         try:
-            # Convert to grayscale
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            gray = self._features(image).gray
             
             # Calculate quality metrics
             sharpness = self._calculate_sharpness(gray)
@@ -339,17 +402,19 @@ class FabricAnalyzer:
             logger.error(f"Failed to assess fabric quality: {str(e)}")
             return {'error': str(e)}
     
-    def _extract_texture_features(self, gray_image: np.ndarray) -> Dict[str, float]:
+    def _extract_texture_features(self, gray_image: Union[np.ndarray, FabricFeatureGraph]) -> Dict[str, float]:
         """Extract texture features using various methods"""
         try:
+            features = self._features(gray_image)
+            
             # Calculate Local Binary Pattern (LBP) features
-            lbp_features = self._calculate_lbp_features(gray_image)
+            lbp_features = self._calculate_lbp_features(features)
             
             # Calculate Gabor filter responses
-            gabor_features = self._calculate_gabor_features(gray_image)
+            gabor_features = self._calculate_gabor_features(features)
             
             # Calculate statistical features
-            statistical_features = self._calculate_statistical_features(gray_image)
+            statistical_features = self._calculate_statistical_features(features)
             
             # Combine all features
             texture_features = {
@@ -369,120 +434,39 @@ class FabricAnalyzer:
             logger.error(f"Failed to extract texture features: {str(e)}")
             return {}
     
-    def _calculate_lbp_features(self, gray_image: np.ndarray) -> Dict[str, float]:
+    def _calculate_lbp_features(self, gray_image: Union[np.ndarray, FabricFeatureGraph]) -> Dict[str, float]:
         """Calculate Local Binary Pattern features"""
         try:
-            # Simple LBP implementation
-            height, width = gray_image.shape
-            lbp_image = np.zeros_like(gray_image)
-            
-            for i in range(1, height - 1):
-                for j in range(1, width - 1):
-                    center = gray_image[i, j]
-                    binary_string = ""
-                    
-                    # 8-neighborhood
-                    neighbors = [
-                        gray_image[i-1, j-1], gray_image[i-1, j], gray_image[i-1, j+1],
-                        gray_image[i, j+1], gray_image[i+1, j+1], gray_image[i+1, j],
-                        gray_image[i+1, j-1], gray_image[i, j-1]
-                    ]
-                    
-                    for neighbor in neighbors:
-                        binary_string += "1" if neighbor >= center else "0"
-                    
-                    lbp_image[i, j] = int(binary_string, 2)
-            
-            # Calculate texture features
-            lbp_hist = cv2.calcHist([lbp_image], [0], None, [256], [0, 256])
-            lbp_hist = lbp_hist.flatten()
-            
-            # Normalize histogram
-            lbp_hist = lbp_hist / np.sum(lbp_hist)
-            
-            # Calculate roughness and smoothness
-            roughness = np.sum(lbp_hist * np.arange(256)) / 255
-            smoothness = 1 - roughness
-            
-            return {
-                'roughness': float(roughness),
-                'smoothness': float(smoothness)
-            }
+            return self._features(gray_image).lbp_features
             
         except Exception as e:
             logger.error(f"Failed to calculate LBP features: {str(e)}")
             return {'roughness': 0.5, 'smoothness': 0.5}
     
-    def _calculate_gabor_features(self, gray_image: np.ndarray) -> Dict[str, float]:
+    def _calculate_gabor_features(self, gray_image: Union[np.ndarray, FabricFeatureGraph]) -> Dict[str, float]:
         """Calculate Gabor filter features"""
         try:
-            # Create Gabor filters
-            gabor_responses = []
-            
-            for angle in [0, 45, 90, 135]:
-                kernel = cv2.getGaborKernel((21, 21), 5, np.radians(angle), 10, 0.5, 0, ktype=cv2.CV_32F)
-                response = cv2.filter2D(gray_image, cv2.CV_8UC3, kernel)
-                gabor_responses.append(response)
-            
-            # Calculate regularity and directionality
-            response_variance = np.var([np.mean(resp) for resp in gabor_responses])
-            regularity = 1 / (1 + response_variance)
-            
-            # Find dominant direction
-            max_response_idx = np.argmax([np.mean(resp) for resp in gabor_responses])
-            directionality = max_response_idx * 45  # Convert to degrees
-            
-            return {
-                'regularity': float(regularity),
-                'directionality': float(directionality)
-            }
+            # Regularity from the spread of the bank's mean responses, direction from the strongest one
+            return self._features(gray_image).gabor_features
             
         except Exception as e:
             logger.error(f"Failed to calculate Gabor features: {str(e)}")
             return {'regularity': 0.5, 'directionality': 0}
     
-    def _calculate_statistical_features(self, gray_image: np.ndarray) -> Dict[str, float]:
+    def _calculate_statistical_features(self, gray_image: Union[np.ndarray, FabricFeatureGraph]) -> Dict[str, float]:
         """Calculate statistical texture features"""
         try:
-            # Calculate GLCM (Gray Level Co-occurrence Matrix) features
-            glcm = self._calculate_glcm(gray_image)
-            
-            # Calculate features from GLCM
-            contrast = np.sum(glcm * np.square(np.arange(glcm.shape[0])[:, np.newaxis] - np.arange(glcm.shape[1])))
-            homogeneity = np.sum(glcm / (1 + np.abs(np.arange(glcm.shape[0])[:, np.newaxis] - np.arange(glcm.shape[1]))))
-            energy = np.sum(glcm ** 2)
-            correlation = self._calculate_correlation(glcm)
-            
-            return {
-                'contrast': float(contrast),
-                'homogeneity': float(homogeneity),
-                'energy': float(energy),
-                'correlation': float(correlation)
-            }
+            # Features of the GLCM (Gray Level Co-occurrence Matrix)
+            return self._features(gray_image).statistical_features
             
         except Exception as e:
             logger.error(f"Failed to calculate statistical features: {str(e)}")
             return {'contrast': 0.5, 'homogeneity': 0.5, 'energy': 0.5, 'correlation': 0.5}
     
     def _calculate_glcm(self, gray_image: np.ndarray, levels: int = 8) -> np.ndarray:
-        """Calculate Gray Level Co-occurrence Matrix"""
+        """Calculate Gray Level Co-occurrence Matrix (right + down neighbours)"""
         try:
-            # Quantize image to reduce levels
-            quantized = (gray_image // (256 // levels)).astype(np.uint8)
-            
-            # Initialize GLCM
-            glcm = np.zeros((levels, levels), dtype=np.float32)
-            
-            # Calculate co-occurrence matrix
-            for i in range(quantized.shape[0] - 1):
-                for j in range(quantized.shape[1] - 1):
-                    glcm[quantized[i, j], quantized[i, j + 1]] += 1
-                    glcm[quantized[i, j], quantized[i + 1, j]] += 1
-            
-            # Normalize
-            glcm = glcm / np.sum(glcm)
-            
-            return glcm
+            return texture_engine.compute_glcm(gray_image, levels=levels)
             
         except Exception as e:
             logger.error(f"Failed to calculate GLCM: {str(e)}")
@@ -491,28 +475,17 @@ class FabricAnalyzer:
     def _calculate_correlation(self, glcm: np.ndarray) -> float:
         """Calculate correlation from GLCM"""
         try:
-            i, j = np.meshgrid(np.arange(glcm.shape[0]), np.arange(glcm.shape[1]), indexing='ij')
-            
-            mu_i = np.sum(i * glcm)
-            mu_j = np.sum(j * glcm)
-            
-            sigma_i = np.sqrt(np.sum(glcm * (i - mu_i) ** 2))
-            sigma_j = np.sqrt(np.sum(glcm * (j - mu_j) ** 2))
-            
-            if sigma_i == 0 or sigma_j == 0:
-                return 0
-            
-            correlation = np.sum(glcm * (i - mu_i) * (j - mu_j)) / (sigma_i * sigma_j)
-            
-            return float(correlation)
+            return texture_engine.glcm_properties(glcm)['correlation']
             
         except Exception as e:
             logger.error(f"Failed to calculate correlation: {str(e)}")
             return 0
     
-    def _detect_patterns(self, gray_image: np.ndarray) -> Dict[str, Any]:
+    def _detect_patterns(self, gray_image: Union[np.ndarray, FabricFeatureGraph]) -> Dict[str, Any]:
         """Detect patterns in fabric"""
         try:
+            gray_image = self._features(gray_image)
+            
             # Use template matching for pattern detection
             patterns = {
                 'type': 'unknown',
@@ -550,21 +523,23 @@ class FabricAnalyzer:
             logger.error(f"Failed to detect patterns: {str(e)}")
             return {'type': 'unknown', 'complexity': 'medium', 'regularity': 0.5}
     
-    def _detect_geometric_patterns(self, gray_image: np.ndarray) -> float:
+    def _detect_geometric_patterns(self, gray_image: Union[np.ndarray, FabricFeatureGraph]) -> float:
         """Detect geometric patterns"""
         try:
-            # Use edge detection
-            edges = cv2.Canny(gray_image, 50, 150)
+            features = self._features(gray_image)
             
-            # Detect lines
-            lines = cv2.HoughLines(edges, 1, np.pi/180, threshold=100)
+            # Detect lines on the shared edge map
+            lines = features.hough_lines
+            line_score = len(lines) if lines is not None else 0
             
-            # Detect circles
-            circles = cv2.HoughCircles(gray_image, cv2.HOUGH_GRADIENT, 1, 20, param1=50, param2=30, minRadius=0, maxRadius=0)
+            # Detect circles; skipped when the lines alone already saturate the score,
+            # since circle detection dominates the cost on busy textures
+            circle_score = 0
+            if line_score < 100:
+                circles = features.hough_circles
+                circle_score = len(circles[0]) if circles is not None else 0
             
             # Calculate geometric score
-            line_score = len(lines) if lines is not None else 0
-            circle_score = len(circles[0]) if circles is not None else 0
             
             geometric_score = (line_score + circle_score) / 100
             
@@ -574,7 +549,7 @@ class FabricAnalyzer:
             logger.error(f"Failed to detect geometric patterns: {str(e)}")
             return 0
     
-    def _detect_floral_patterns(self, gray_image: np.ndarray) -> float:
+    def _detect_floral_patterns(self, gray_image: Union[np.ndarray, FabricFeatureGraph]) -> float:
         """Detect floral patterns"""
         try:
             # Use blob detection for floral patterns
@@ -584,7 +559,7 @@ class FabricAnalyzer:
             params.maxArea = 10000
             
             detector = cv2.SimpleBlobDetector_create(params)
-            keypoints = detector.detect(gray_image)
+            keypoints = detector.detect(self._features(gray_image).gray)
             
             # Calculate floral score based on blob count and distribution
             floral_score = len(keypoints) / 50
@@ -595,10 +570,10 @@ class FabricAnalyzer:
             logger.error(f"Failed to detect floral patterns: {str(e)}")
             return 0
     
-    def _detect_abstract_patterns(self, gray_image: np.ndarray) -> float:
+    def _detect_abstract_patterns(self, gray_image: Union[np.ndarray, FabricFeatureGraph]) -> float:
         """Detect abstract patterns"""
         try:
-            # Use texture analysis for abstract patterns
+            # Use texture analysis for abstract patterns (memoized in the feature graph)
             texture_features = self._extract_texture_features(gray_image)
             
             # Abstract patterns typically have high contrast and irregularity
@@ -613,11 +588,11 @@ class FabricAnalyzer:
             logger.error(f"Failed to detect abstract patterns: {str(e)}")
             return 0
     
-    def _calculate_pattern_complexity(self, gray_image: np.ndarray) -> str:
+    def _calculate_pattern_complexity(self, gray_image: Union[np.ndarray, FabricFeatureGraph]) -> str:
         """Calculate pattern complexity"""
         try:
             # Use edge density as complexity measure
-            edges = cv2.Canny(gray_image, 50, 150)
+            edges = self._features(gray_image).edges
             edge_density = np.sum(edges > 0) / edges.size
             
             if edge_density < 0.1:
@@ -881,10 +856,7 @@ class FabricAnalyzer:
     
     def _analyze_color_temperature(self, color_palette: List[Dict]) -> Dict[str, Any]:
         """Analyze color temperature"""
-        if not color_palette:
-            return {'temperature': 'neutral', 'score': 0}
-        
-        return self.color_matcher._get_color_temperature(color_palette)
+        return {'temperature': self.color_matcher._get_color_temperature(color_palette)}
     
     def _analyze_color_intensity(self, color_palette: List[Dict]) -> Dict[str, Any]:
         """Analyze color intensity"""
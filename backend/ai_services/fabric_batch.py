@@ -0,0 +1,176 @@
+"""
+Batch fabric analysis
+Fans a catalog of fabric images out over a small process pool. The pool
+lives inside each web worker process, so it is capped (FABRIC_BATCH_WORKERS,
+at most one per CPU core) and the processes on a host add up to that times
+the number of web workers; size both together. Images are fetched on a
+small thread pool, stored analyses are served straight from the fabric
+analysis store, identical images in a batch are analyzed once, and results
+are yielded as soon as each one finishes.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from django.conf import settings
+
+from .fabric_store import FabricAnalysisStore, get_fabric_analysis_store
+from .fabric_worker import analyze_image_bytes, init_worker
+from .utils.image_fetcher import get_image_fetcher
+
+logger = logging.getLogger(__name__)
+
+
+def batch_worker_count() -> int:
+    """Analysis processes per web worker: FABRIC_BATCH_WORKERS, capped at the CPU core count"""
+    return max(1, min(getattr(settings, 'FABRIC_BATCH_WORKERS', 2), os.cpu_count() or 1))
+
+
+class FabricBatchAnalyzer:
+    """Streams analyses of many fabric images"""
+
+    def __init__(self, store: Optional[FabricAnalysisStore] = None, executor: Optional[Executor] = None,
+                 fetch_workers: Optional[int] = None):
+        """
+        Args:
+            store: Fabric analysis store (defaults to the process-wide one)
+            executor: Pool running analyze_image_bytes (defaults to the shared process pool)
+            fetch_workers: Threads fetching image bytes
+        """
+        self.store = store or get_fabric_analysis_store()
+        self.executor = executor
+        self.fetch_workers = fetch_workers or getattr(settings, 'FABRIC_BATCH_FETCH_WORKERS', 8)
+
+    def stream(self, organization, image_urls: Sequence[str], analysis_type: str = 'comprehensive') -> Iterator[Dict[str, Any]]:
+        """
+        Analyze a batch of images, yielding each result as it completes
+
+        Args:
+            organization: Tenant whose fabric analysis store is used
+            image_urls: Fabric image URLs
+            analysis_type: 'comprehensive', 'colors_only' or 'texture_only'
+
+        Yields:
+            Per-image dicts with 'index', 'image_url', 'success', 'cache_hit' and
+            either 'result' or 'error', in completion order
+        """
+        executor = self.executor or get_fabric_process_pool()
+        fetcher = get_image_fetcher()
+        fetch_pool = ThreadPoolExecutor(max_workers=self.fetch_workers, thread_name_prefix='fabric-fetch')
+        pending = {}
+        # Content hash -> indices of batch images with that content, first one analyzed
+        analyzing: Dict[str, List[int]] = {}
+        try:
+            for index, image_url in enumerate(image_urls):
+                pending[fetch_pool.submit(fetcher.fetch_bytes, image_url)] = ('fetch', index)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, key = pending.pop(future)
+                    if kind == 'analyze':
+                        yield from self._analyzed(organization, image_urls, key, future, analysis_type,
+                                                  analyzing, executor)
+                        continue
+
+                    index, image_url = key, image_urls[key]
+                    try:
+                        content, content_hash = future.result()
+                    except Exception as e:
+                        logger.error(f"Failed to fetch fabric image {image_url}: {str(e)}")
+                        yield self._failure(index, image_url, str(e))
+                        continue
+
+                    record = self.store.lookup(organization, content_hash, analysis_type)
+                    if record is not None:
+                        yield self._success(index, self.store.serve(record, image_url, analysis_type))
+                        continue
+
+                    if content_hash in analyzing:
+                        # Same content already being analyzed in this batch
+                        analyzing[content_hash].append(index)
+                        continue
+
+                    try:
+                        analysis = executor.submit(analyze_image_bytes, content, image_url, analysis_type)
+                    except BrokenProcessPool as e:
+                        reset_fabric_process_pool(executor)
+                        yield self._failure(index, image_url, f"Analysis worker pool failed: {str(e)}")
+                        continue
+                    analyzing[content_hash] = [index]
+                    pending[analysis] = ('analyze', content_hash)
+        finally:
+            fetch_pool.shutdown(wait=False, cancel_futures=True)
+            for future in pending:
+                future.cancel()
+
+    def _analyzed(self, organization, image_urls: Sequence[str], content_hash: str, future, analysis_type: str,
+                  analyzing: Dict[str, List[int]], executor: Executor) -> Iterator[Dict[str, Any]]:
+        """Store a finished analysis and yield it for every batch image with that content"""
+        indices = analyzing.pop(content_hash)
+        try:
+            result = future.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                reset_fabric_process_pool(executor)
+            logger.error(f"Fabric analysis worker failed for {image_urls[indices[0]]}: {str(e)}")
+            result = {'success': False, 'error': str(e)}
+
+        if not result.get('success'):
+            for index in indices:
+                yield self._failure(index, image_urls[index], result.get('error', 'Fabric analysis failed'))
+            return
+
+        processing_time = result.get('stage_timings_ms', {}).get('total', 0) / 1000.0
+        stored = self.store.store_result(organization, content_hash, analysis_type, result, processing_time)
+        yield self._success(indices[0], stored)
+        for index in indices[1:]:
+            yield self._success(index, {**stored, 'image_url': image_urls[index], 'cache_hit': True})
+
+    @staticmethod
+    def _success(index, result: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'index': index,
+            'image_url': result.get('image_url'),
+            'success': True,
+            'cache_hit': result.get('cache_hit', False),
+            'result': result
+        }
+
+    @staticmethod
+    def _failure(index, image_url: str, error: str) -> Dict[str, Any]:
+        return {'index': index, 'image_url': image_url, 'success': False, 'cache_hit': False, 'error': error}
+
+
+_fabric_process_pool = None
+_fabric_process_pool_lock = threading.Lock()
+
+
+def get_fabric_process_pool() -> ProcessPoolExecutor:
+    """Return the process-wide pool of fabric analysis workers, started on first use"""
+    global _fabric_process_pool
+    if _fabric_process_pool is not None:
+        return _fabric_process_pool
+
+    with _fabric_process_pool_lock:
+        if _fabric_process_pool is None:
+            # 'spawn' rather than fork: web servers are multi-threaded and fork only copies the calling thread
+            _fabric_process_pool = ProcessPoolExecutor(
+                max_workers=batch_worker_count(),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker
+            )
+    return _fabric_process_pool
+
+
+def reset_fabric_process_pool(pool: Optional[Executor] = None) -> None:
+    """Drop a broken process pool so the next batch starts a fresh one"""
+    global _fabric_process_pool
+    with _fabric_process_pool_lock:
+        if _fabric_process_pool is not None and (pool is None or pool is _fabric_process_pool):
+            _fabric_process_pool.shutdown(wait=False, cancel_futures=True)
+            _fabric_process_pool = None
@@ -0,0 +1,120 @@
+"""
+Memoized feature graph for fabric analysis
+Every intermediate (RGB/grayscale conversions, edge map, Gabor bank, LBP,
+GLCM, palette pixels) is computed at most once per decoded image and shared
+by all analysis stages, with the time spent on each node recorded.
+"""
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from . import texture_engine
+
+logger = logging.getLogger(__name__)
+
+# Gabor bank used for regularity / directionality (orientation in degrees)
+GABOR_ANGLES = (0, 45, 90, 135)
+# Longest side of the pixels handed to the colour quantizer
+PALETTE_MAX_SIZE = 300
+
+
+class FabricFeatureGraph:
+    """Lazily computed, memoized intermediates of one fabric image"""
+
+    def __init__(self, image: np.ndarray):
+        """
+        Args:
+            image: Decoded image, BGR (OpenCV order) or already grayscale
+        """
+        self.image = image
+        self.timings: Dict[str, float] = {}
+        self._values: Dict[str, Any] = {}
+
+    def _node(self, name: str, compute: Callable[[], Any]) -> Any:
+        """Return the memoized value of `name`, computing and timing it on first use"""
+        if name not in self._values:
+            started = time.perf_counter()
+            self._values[name] = compute()
+            self.timings[name] = round((time.perf_counter() - started) * 1000, 2)
+        return self._values[name]
+
+    @property
+    def gray(self) -> np.ndarray:
+        """uint8 grayscale image"""
+        if self.image.ndim == 2:
+            return self.image
+        return self._node('gray', lambda: cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def palette_pixels(self) -> np.ndarray:
+        """RGB pixels (N x 3) of a copy downscaled to PALETTE_MAX_SIZE, for colour quantization"""
+        def compute():
+            image = self.image
+            height, width = image.shape[:2]
+            if max(height, width) > PALETTE_MAX_SIZE:
+                scale = PALETTE_MAX_SIZE / float(max(height, width))
+                size = (max(1, int(width * scale)), max(1, int(height * scale)))
+                image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+            return cv2.cvtColor(image, cv2.COLOR_BGR2RGB).reshape(-1, 3)
+        return self._node('palette_pixels', compute)
+
+    @property
+    def edges(self) -> np.ndarray:
+        """Canny edge map of the grayscale image"""
+        return self._node('edges', lambda: cv2.Canny(self.gray, 50, 150))
+
+    @property
+    def hough_lines(self) -> Optional[np.ndarray]:
+        """Straight lines found on the edge map (None if there are none)"""
+        return self._node('hough_lines', lambda: cv2.HoughLines(self.edges, 1, np.pi / 180, threshold=100))
+
+    @property
+    def hough_circles(self) -> Optional[np.ndarray]:
+        """Circles found on the grayscale image (None if there are none); slow on busy textures"""
+        return self._node('hough_circles', lambda: cv2.HoughCircles(
+            self.gray, cv2.HOUGH_GRADIENT, 1, 20, param1=50, param2=30, minRadius=0, maxRadius=0
+        ))
+
+    @property
+    def gabor_responses(self) -> List[np.ndarray]:
+        """Responses of the Gabor bank, one per GABOR_ANGLES entry"""
+        def compute():
+            responses = []
+            for angle in GABOR_ANGLES:
+                kernel = cv2.getGaborKernel((21, 21), 5, np.radians(angle), 10, 0.5, 0, ktype=cv2.CV_32F)
+                responses.append(cv2.filter2D(self.gray, cv2.CV_8UC3, kernel))
+            return responses
+        return self._node('gabor', compute)
+
+    @property
+    def gabor_features(self) -> Dict[str, float]:
+        """Regularity and dominant direction (degrees) from the Gabor bank"""
+        def compute():
+            means = [float(np.mean(response)) for response in self.gabor_responses]
+            return {
+                'regularity': float(1 / (1 + np.var(means))),
+                'directionality': float(GABOR_ANGLES[int(np.argmax(means))])
+            }
+        return self._node('gabor_features', compute)
+
+    @property
+    def lbp_features(self) -> Dict[str, float]:
+        """Roughness / smoothness from the LBP histogram"""
+        return self._node('lbp', lambda: texture_engine.lbp_features(self.gray))
+
+    @property
+    def glcm(self) -> np.ndarray:
+        """8-level GLCM over right and down neighbours"""
+        return self._node('glcm', lambda: texture_engine.compute_glcm(self.gray, levels=8))
+
+    @property
+    def statistical_features(self) -> Dict[str, float]:
+        """Contrast, homogeneity, energy and correlation of the GLCM"""
+        return self._node('glcm_features', lambda: texture_engine.glcm_properties(self.glcm))
+
+    def stage_timings(self) -> Dict[str, float]:
+        """Milliseconds spent computing each node so far (including dependencies it computed first)"""
+        return dict(self.timings)
@@ -0,0 +1,206 @@
+"""
+Content-addressed store of fabric analysis results
+
+Results are keyed by (organization, SHA-256 of the image bytes, analyzer
+version, analysis type), so every user of a tenant who submits the same
+fabric - under any URL - gets the stored analysis back instead of a rerun.
+Partial requests are served from a stored comprehensive analysis, and
+concurrent identical requests are collapsed with a cache lock so the
+analyzer runs once while the others wait for its result.
+"""
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from .fabric_analysis import ANALYZER_VERSION, FabricAnalyzer
+from .models import FabricAnalysisResult
+from .utils.image_fetcher import get_image_fetcher
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'fabric_analysis'
+
+# Stored analysis types that can answer a request, best match first
+ANALYSIS_SOURCES = {
+    'comprehensive': ('comprehensive',),
+    'colors_only': ('colors_only', 'comprehensive'),
+    'texture_only': ('texture_only', 'comprehensive'),
+}
+
+# Result sections produced by each analysis type
+ANALYSIS_SECTIONS = {
+    'comprehensive': ('color_analysis', 'texture_analysis', 'pattern_analysis', 'quality_assessment'),
+    'colors_only': ('color_analysis',),
+    'texture_only': ('texture_analysis',),
+}
+
+
+class FabricAnalysisStore:
+    """Deduplicating front for FabricAnalyzer.analyze_fabric"""
+
+    def __init__(self, analyzer: Optional[FabricAnalyzer] = None, lock_timeout: Optional[int] = None,
+                 wait_timeout: Optional[float] = None, poll_interval: float = 0.05):
+        """
+        Args:
+            analyzer: Analyzer used on a miss
+            lock_timeout: Seconds a single-flight lock is held at most
+            wait_timeout: Seconds a follower waits for the leader before analyzing itself
+            poll_interval: Seconds between a follower's store lookups
+        """
+        self.analyzer = analyzer or FabricAnalyzer()
+        self.lock_timeout = lock_timeout or getattr(settings, 'FABRIC_ANALYSIS_LOCK_TIMEOUT', 120)
+        self.wait_timeout = wait_timeout if wait_timeout is not None else getattr(settings, 'FABRIC_ANALYSIS_WAIT_TIMEOUT', 60)
+        self.poll_interval = poll_interval
+
+    def analyze(self, organization, image_url: str, analysis_type: str = 'comprehensive') -> Dict[str, Any]:
+        """
+        Return the stored analysis of an image, running the analyzer only on a miss
+
+        Args:
+            organization: Tenant the result is stored for
+            image_url: URL of the fabric image
+            analysis_type: 'comprehensive', 'colors_only' or 'texture_only'
+
+        Returns:
+            Analysis result as returned by FabricAnalyzer.analyze_fabric, plus
+            'content_hash', 'fabric_analysis_id' and 'cache_hit'
+        """
+        started = time.perf_counter()
+        try:
+            content, content_hash = get_image_fetcher().fetch_bytes(image_url)
+        except Exception as e:
+            logger.error(f"Failed to fetch fabric image {image_url}: {str(e)}")
+            return {'success': False, 'error': str(e), 'image_url': image_url, 'analysis_type': analysis_type}
+        fetched = time.perf_counter()
+
+        record = self.lookup(organization, content_hash, analysis_type)
+        if record is not None:
+            return self._hit(record, image_url, analysis_type, started, fetched)
+
+        lock_key = self._lock_key(organization, content_hash, analysis_type)
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.wait_timeout
+        while not cache.add(lock_key, token, self.lock_timeout):
+            # Another request is analyzing the same image; wait for its result
+            if time.monotonic() >= deadline:
+                logger.warning(f"Timed out waiting for fabric analysis {content_hash[:12]}; analyzing without the lock")
+                return self._analyze_and_store(organization, image_url, analysis_type, content, content_hash)
+            time.sleep(self.poll_interval)
+            record = self.lookup(organization, content_hash, analysis_type)
+            if record is not None:
+                return self._hit(record, image_url, analysis_type, started, fetched)
+
+        try:
+            # The previous holder may have stored the result just before releasing the lock
+            record = self.lookup(organization, content_hash, analysis_type)
+            if record is not None:
+                return self._hit(record, image_url, analysis_type, started, fetched)
+            return self._analyze_and_store(organization, image_url, analysis_type, content, content_hash)
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    def lookup(self, organization, content_hash: str, analysis_type: str) -> Optional[FabricAnalysisResult]:
+        """Stored result able to answer `analysis_type` for this content, if any"""
+        sources = ANALYSIS_SOURCES[analysis_type]
+        records = FabricAnalysisResult.objects.filter(
+            organization=organization,
+            content_hash=content_hash,
+            analyzer_version=ANALYZER_VERSION,
+            analysis_type__in=sources
+        )
+        return min(records, key=lambda record: sources.index(record.analysis_type), default=None)
+
+    def _analyze_and_store(self, organization, image_url: str, analysis_type: str, content: bytes,
+                           content_hash: str) -> Dict[str, Any]:
+        """Analyze the bytes that were hashed (not a second fetch) and store a successful result"""
+        started = time.perf_counter()
+        result = self.analyzer.analyze_bytes(content, image_url, analysis_type)
+        if not result.get('success'):
+            return result
+        return self.store_result(organization, content_hash, analysis_type, result, time.perf_counter() - started)
+
+    def store_result(self, organization, content_hash: str, analysis_type: str, result: Dict[str, Any],
+                     processing_time: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Store a successful analysis (first writer wins)
+
+        Returns:
+            The result plus 'content_hash', 'fabric_analysis_id' and 'cache_hit'
+        """
+        record, _ = FabricAnalysisResult.objects.get_or_create(
+            organization=organization,
+            content_hash=content_hash,
+            analyzer_version=ANALYZER_VERSION,
+            analysis_type=analysis_type,
+            defaults={'result': result, 'processing_time': processing_time}
+        )
+        return {**result, 'content_hash': content_hash, 'fabric_analysis_id': str(record.id), 'cache_hit': False}
+
+    def _hit(self, record: FabricAnalysisResult, image_url: str, analysis_type: str,
+             started: float, fetched: float) -> Dict[str, Any]:
+        """Serve a stored result, recording how long the fetch and lookup took"""
+        result = self.serve(record, image_url, analysis_type)
+        result['stage_timings_ms'] = {
+            'fetch': round((fetched - started) * 1000, 2),
+            'lookup': round((time.perf_counter() - fetched) * 1000, 2),
+            'total': round((time.perf_counter() - started) * 1000, 2),
+        }
+        return result
+
+    def serve(self, record: FabricAnalysisResult, image_url: str, analysis_type: str) -> Dict[str, Any]:
+        """Serve a stored result, narrowed to the requested analysis type"""
+        FabricAnalysisResult.objects.filter(pk=record.pk).update(
+            hit_count=F('hit_count') + 1, last_used_at=timezone.now()
+        )
+
+        stored = record.result
+        if record.analysis_type == analysis_type:
+            result = {key: value for key, value in stored.items() if key not in ('stage_timings_ms', 'feature_timings_ms')}
+        else:
+            result = {
+                'success': True,
+                'image_info': stored.get('image_info'),
+                'timestamp': stored.get('timestamp'),
+            }
+            for section in ANALYSIS_SECTIONS[analysis_type]:
+                if section in stored:
+                    result[section] = stored[section]
+            result['recommendations'] = self.analyzer._generate_fabric_recommendations(result)
+
+        result.update({
+            'image_url': image_url,
+            'analysis_type': analysis_type,
+            'content_hash': record.content_hash,
+            'fabric_analysis_id': str(record.id),
+            'cache_hit': True
+        })
+        logger.info(f"Fabric analysis store hit for {record.content_hash[:12]} ({record.analysis_type} -> {analysis_type})")
+        return result
+
+    @staticmethod
+    def _lock_key(organization, content_hash: str, analysis_type: str) -> str:
+        return f"{CACHE_PREFIX}:lock:{organization.pk}:{content_hash}:{ANALYZER_VERSION}:{analysis_type}"
+
+
+_fabric_analysis_store = None
+_fabric_analysis_store_lock = threading.Lock()
+
+
+def get_fabric_analysis_store() -> FabricAnalysisStore:
+    """Return the process-wide fabric analysis store"""
+    global _fabric_analysis_store
+    if _fabric_analysis_store is not None:
+        return _fabric_analysis_store
+
+    with _fabric_analysis_store_lock:
+        if _fabric_analysis_store is None:
+            _fabric_analysis_store = FabricAnalysisStore()
+    return _fabric_analysis_store
@@ -2,15 +2,24 @@
 Fabric Analysis Views for Phase 1 Week 4
 API endpoints for fabric color extraction and texture analysis
 """
+import json
 import logging
+import time
+import uuid
+from typing import Optional
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from django.db import transaction
 
 from .models import AIGenerationRequest, AIProvider, AIUsageQuota
 from .fabric_analysis import FabricAnalyzer
+from .fabric_store import get_fabric_analysis_store
+from .fabric_batch import FabricBatchAnalyzer, batch_worker_count
+from .palette_index import get_palette_index
 from .color_matching import SmartColorMatcher
 from .services import AIGenerationService
 from organizations.middleware import get_current_organization
@@ -25,6 +34,7 @@ class FabricAnalysisViewSet(viewsets.ViewSet):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.fabric_analyzer = FabricAnalyzer()
+        self.fabric_store = get_fabric_analysis_store()
         self.color_matcher = SmartColorMatcher()
         self.ai_service = AIGenerationService()
     
@@ -34,6 +44,9 @@ class FabricAnalysisViewSet(viewsets.ViewSet):
         Comprehensive fabric analysis endpoint
         POST /api/ai-services/fabric/analyze-fabric/
         
+        Results are stored per organization by image content, so repeat
+        requests for the same fabric are answered from the store (cost 0).
+        
         Body:
         {
             "fabric_image_url": "https://example.com/fabric.jpg",
@@ -72,8 +85,8 @@ class FabricAnalysisViewSet(viewsets.ViewSet):
                     status=status.HTTP_429_TOO_MANY_REQUESTS
                 )
             
-            # Perform fabric analysis
-            analysis_result = self.fabric_analyzer.analyze_fabric(fabric_image_url, analysis_type)
+            # Perform fabric analysis (or reuse a stored one)
+            analysis_result = self.fabric_store.analyze(organization, fabric_image_url, analysis_type)
             
             if not analysis_result['success']:
                 return Response(
@@ -81,7 +94,9 @@ class FabricAnalysisViewSet(viewsets.ViewSet):
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR
                 )
             
-            # Create AI generation request record
+            cost = 0.0 if analysis_result.get('cache_hit') else 0.01  # Minimal cost for analysis
+            
+            # Create AI generation request record; the full result lives in the fabric analysis store
             with transaction.atomic():
                 provider = self._get_or_create_provider('fabric_analysis')
                 
@@ -95,18 +110,23 @@ class FabricAnalysisViewSet(viewsets.ViewSet):
                         'fabric_image_url': fabric_image_url,
                         'analysis_type': analysis_type
                     },
-                    result_data=analysis_result,
+                    result_data={
+                        'fabric_analysis_id': analysis_result.get('fabric_analysis_id'),
+                        'content_hash': analysis_result.get('content_hash'),
+                        'cache_hit': analysis_result.get('cache_hit', False),
+                        'summary': self._get_result_summary(analysis_result)
+                    },
                     status='completed',
                     completed_at=timezone.now(),
-                    cost=0.01  # Minimal cost for analysis
+                    cost=cost
                 )
                 
                 # Update quota
-                self._update_quota(organization, provider, 'fabric_analysis', 0.01)
+                self._update_quota(organization, provider, 'fabric_analysis', cost)
             
             # Add request ID to response
             analysis_result['request_id'] = str(request_record.id)
-            analysis_result['cost'] = 0.01
+            analysis_result['cost'] = cost
             
             return Response(analysis_result, status=status.HTTP_200_OK)
             
@@ -117,6 +137,154 @@ class FabricAnalysisViewSet(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=False, methods=['post'])
+    def analyze_batch(self, request):
+        """
+        Batch fabric analysis endpoint
+        POST /api/ai-services/fabric/analyze-batch/
+
+        Analyzes a catalog of fabric images on a pool of worker processes and
+        streams one JSON line per image (application/x-ndjson) as each
+        finishes, followed by a summary line. Request records are written and
+        the quota is charged once for the whole batch; a batch larger than the
+        remaining monthly quota is rejected up front.
+
+        Body:
+        {
+            "fabric_image_urls": ["https://example.com/fabric-1.jpg", ...],
+            "analysis_type": "comprehensive"  // "comprehensive", "colors_only", "texture_only"
+        }
+        """
+        # The organization context is request-scoped; capture it before streaming
+        organization = get_current_organization()
+        if not organization:
+            return Response(
+                {"error": "Organization context required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fabric_image_urls = request.data.get('fabric_image_urls')
+        analysis_type = request.data.get('analysis_type', 'comprehensive')
+        max_images = getattr(settings, 'FABRIC_BATCH_MAX_IMAGES', 500)
+
+        if not isinstance(fabric_image_urls, list) or not fabric_image_urls:
+            return Response(
+                {"error": "fabric_image_urls must be a non-empty list"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if len(fabric_image_urls) > max_images:
+            return Response(
+                {"error": f"At most {max_images} images can be analyzed per batch"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Validate analysis type
+        valid_types = ['comprehensive', 'colors_only', 'texture_only']
+        if analysis_type not in valid_types:
+            return Response(
+                {"error": f"analysis_type must be one of: {', '.join(valid_types)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # The quota is charged after streaming, so the whole batch must fit in what is left
+        remaining = self._remaining_quota(organization, 'fabric_analysis')
+        if remaining is not None and remaining < len(fabric_image_urls):
+            return Response(
+                {
+                    "error": f"Monthly quota for fabric analysis has {remaining} requests left; "
+                             f"this batch needs {len(fabric_image_urls)}",
+                    "remaining_requests": remaining
+                },
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+
+        user = request.user
+        batch_id = str(uuid.uuid4())
+        batch_analyzer = FabricBatchAnalyzer()
+
+        def events():
+            started = time.perf_counter()
+            completed = []
+            recorded = False
+            try:
+                for item in batch_analyzer.stream(organization, fabric_image_urls, analysis_type):
+                    item['cost'] = 0.0 if item['cache_hit'] or not item['success'] else 0.01
+                    completed.append(item)
+                    yield json.dumps(item) + '\n'
+
+                recorded = True
+                requests_recorded, total_cost = self._record_batch(
+                    organization, user, batch_id, analysis_type, completed
+                )
+                elapsed = time.perf_counter() - started
+                yield json.dumps({
+                    'event': 'summary',
+                    'batch_id': batch_id,
+                    'total': len(fabric_image_urls),
+                    'succeeded': requests_recorded,
+                    'failed': len(completed) - requests_recorded,
+                    'cache_hits': sum(1 for item in completed if item['cache_hit']),
+                    'cost': total_cost,
+                    'elapsed_ms': round(elapsed * 1000, 2),
+                    'images_per_second': round(len(completed) / elapsed, 2) if elapsed else None,
+                    'workers': batch_worker_count()
+                }) + '\n'
+            finally:
+                if not recorded:
+                    # Client went away mid-stream: still account for the work already done
+                    self._record_batch(organization, user, batch_id, analysis_type, completed)
+
+        return StreamingHttpResponse(events(), content_type='application/x-ndjson')
+
+    def _record_batch(self, organization, user, batch_id: str, analysis_type: str, items: list) -> tuple:
+        """
+        Create request records for a batch's successful analyses and charge the quota once
+
+        Returns:
+            Tuple of (records created, total cost)
+        """
+        succeeded = [item for item in items if item['success']]
+        total_cost = round(sum(item['cost'] for item in succeeded), 4)
+        if not succeeded:
+            return 0, 0.0
+
+        try:
+            with transaction.atomic():
+                provider = self._get_or_create_provider('fabric_analysis')
+                completed_at = timezone.now()
+
+                AIGenerationRequest.objects.bulk_create([
+                    AIGenerationRequest(
+                        organization=organization,
+                        user=user,
+                        provider=provider,
+                        generation_type='fabric_analysis',
+                        prompt=f"Fabric analysis for {item['image_url']}",
+                        parameters={
+                            'fabric_image_url': item['image_url'],
+                            'analysis_type': analysis_type,
+                            'batch_id': batch_id
+                        },
+                        result_data={
+                            'fabric_analysis_id': item['result'].get('fabric_analysis_id'),
+                            'content_hash': item['result'].get('content_hash'),
+                            'cache_hit': item['cache_hit'],
+                            'summary': self._get_result_summary(item['result'])
+                        },
+                        status='completed',
+                        completed_at=completed_at,
+                        cost=item['cost']
+                    )
+                    for item in succeeded
+                ])
+
+                self._update_quota(organization, provider, 'fabric_analysis', total_cost, requests=len(succeeded))
+        except Exception as e:
+            logger.error(f"Failed to record fabric analysis batch {batch_id}: {str(e)}")
+
+        return len(succeeded), total_cost
+    
     @action(detail=False, methods=['post'])
     def extract_colors(self, request):
         """
@@ -466,6 +634,64 @@ class FabricAnalysisViewSet(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=False, methods=['post'])
+    def search_by_palette(self, request):
+        """
+        Find the organization's analyzed fabrics that best match a palette
+        POST /api/ai-services/fabric/search-by-palette/
+        
+        Body:
+        {
+            "colors": ["#1E5AA0", "#F2C14E"],  // hex strings, or color dicts with rgb/lab and percentage
+            "limit": 10
+        }
+        """
+        organization = get_current_organization()
+        if not organization:
+            return Response(
+                {"error": "Organization context required"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        colors = request.data.get('colors')
+        if not isinstance(colors, list) or not colors:
+            return Response(
+                {"error": "colors must be a non-empty list"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            limit = min(max(int(request.data.get('limit', 10)), 1), 100)
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "limit must be an integer"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            palette_index = get_palette_index(organization)
+            try:
+                matches = palette_index.search(colors, limit=limit)
+            except (KeyError, TypeError, ValueError) as e:
+                return Response(
+                    {"error": f"Invalid palette: {str(e)}"}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            return Response({
+                'success': True,
+                'indexed_palettes': len(palette_index),
+                'total_matches': len(matches),
+                'matches': matches
+            }, status=status.HTTP_200_OK)
+            
+        except Exception as e:
+            logger.error(f"Palette search failed: {str(e)}")
+            return Response(
+                {"error": str(e)}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
     @action(detail=False, methods=['get'])
     def analysis_history(self, request):
         """
@@ -531,7 +757,27 @@ class FabricAnalysisViewSet(viewsets.ViewSet):
             logger.error(f"Failed to check quota: {str(e)}")
             return True  # Allow request if quota check fails
     
-    def _update_quota(self, organization, provider, generation_type: str, cost: float):
+    def _remaining_quota(self, organization, generation_type: str) -> Optional[int]:
+        """Requests left in the monthly quota, or None if no quota is set"""
+        try:
+            quota = AIUsageQuota.objects.filter(
+                organization=organization,
+                generation_type=generation_type,
+                quota_type='monthly'
+            ).first()
+            
+            if not quota:
+                return None
+            
+            if quota.current_cost >= quota.max_cost:
+                return 0
+            return max(0, quota.max_requests - quota.current_requests)
+            
+        except Exception as e:
+            logger.error(f"Failed to check quota: {str(e)}")
+            return None  # Allow request if quota check fails
+    
+    def _update_quota(self, organization, provider, generation_type: str, cost: float, requests: int = 1):
         """Update usage quota"""
         try:
             quota, created = AIUsageQuota.objects.get_or_create(
@@ -546,7 +792,7 @@ class FabricAnalysisViewSet(viewsets.ViewSet):
                 }
             )
             
-            quota.increment_usage(cost=cost)
+            quota.increment_usage(cost=cost, requests=requests)
             
         except Exception as e:
             logger.error(f"Failed to update quota: {str(e)}")
@@ -573,6 +819,10 @@ class FabricAnalysisViewSet(viewsets.ViewSet):
         if not result_data:
             return {}
         
+        # Fabric analyses store their summary next to a reference to the stored result
+        if 'summary' in result_data:
+            return result_data['summary']
+        
         summary = {}
         
         if 'color_palette' in result_data:
@@ -0,0 +1,43 @@
+"""
+Worker-process side of batch fabric analysis
+Runs inside ProcessPoolExecutor workers started with the 'spawn' method, so
+nothing Django-dependent is imported at module level: the pool initializer
+sets Django up before the first task is unpickled.
+"""
+import os
+from typing import Any, Dict
+
+# One analyzer per worker process, reused across tasks
+_analyzer = None
+
+
+def init_worker() -> None:
+    """Pool initializer: configure Django and build the analyzer in a freshly spawned worker"""
+    global _analyzer
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'frameio_backend.settings')
+    import django
+    django.setup()
+
+    from .fabric_analysis import FabricAnalyzer
+    _analyzer = FabricAnalyzer()
+
+
+def analyze_image_bytes(content: bytes, image_url: str, analysis_type: str) -> Dict[str, Any]:
+    """
+    Decode and analyze one fabric image
+
+    Args:
+        content: Encoded image bytes, already fetched by the parent process
+        image_url: URL the bytes came from, echoed in the result
+        analysis_type: 'comprehensive', 'colors_only' or 'texture_only'
+
+    Returns:
+        Result of FabricAnalyzer.analyze_bytes (picklable, JSON-compatible)
+    """
+    global _analyzer
+    from .fabric_analysis import FabricAnalyzer
+
+    if _analyzer is None:
+        _analyzer = FabricAnalyzer()
+
+    return _analyzer.analyze_bytes(content, image_url, analysis_type)
@@ -0,0 +1,397 @@
+"""
+Shared Gemini provider layer.
+
+Every Gemini call made by the poster and caption services goes through
+GeminiGateway.call, which adds:
+
+- a process-wide token bucket (GEMINI_REQUESTS_PER_MINUTE, GEMINI_BURST) so a
+  burst of requests waits for capacity instead of hammering the API
+- a circuit breaker per model: after GEMINI_BREAKER_FAILURE_THRESHOLD
+  consecutive transient failures the model fails fast for
+  GEMINI_BREAKER_RESET_TIMEOUT seconds, then a single trial call decides
+  whether it closes again
+- retries with capped exponential backoff, only for errors the SDK reports as
+  transient (5xx, 408, 429) and network failures
+- an attempt budget shared by every call made while serving one user request
+  (attempt_budget), so prompt variants and aspect-ratio re-generations cannot
+  fan a single outage out into dozens of calls
+
+Clients are created by get_gemini_client, which honours GEMINI_BASE_URL (a
+proxy, or the local fake server used in tests).
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+
+try:
+    from google import genai
+    from google.genai import errors as genai_errors
+except ImportError:
+    genai = None
+    genai_errors = None
+
+try:
+    import requests
+except ImportError:
+    requests = None
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: timeouts and rate limiting; every 5xx is retried too
+RETRYABLE_CLIENT_CODES = (408, 429)
+
+
+class GeminiUnavailableError(Exception):
+    """A Gemini call was refused before reaching the API"""
+
+
+class CircuitOpenError(GeminiUnavailableError):
+    """The model's circuit breaker is open"""
+
+    def __init__(self, model: str, retry_after: float):
+        self.model = model
+        self.retry_after = retry_after
+        super().__init__(f"Gemini model {model} is unavailable; retry in {retry_after:.0f}s")
+
+
+class AttemptBudgetExhausted(GeminiUnavailableError):
+    """The current user request has used all of its Gemini attempts"""
+
+    def __init__(self, max_attempts: int):
+        self.max_attempts = max_attempts
+        super().__init__(f"Gemini attempt budget of {max_attempts} calls exhausted for this request")
+
+
+class RequestBudgetExceeded(GeminiUnavailableError):
+    """No request capacity became available in time"""
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """
+    Whether a failed Gemini call is worth retrying.
+
+    Args:
+        error: Exception raised by the SDK call
+
+    Returns:
+        True for server errors, timeouts, rate limiting and network failures
+    """
+    if isinstance(error, GeminiUnavailableError):
+        return False
+    if genai_errors is not None:
+        if isinstance(error, genai_errors.ServerError):
+            return True
+        if isinstance(error, genai_errors.APIError):
+            return getattr(error, 'code', None) in RETRYABLE_CLIENT_CODES
+    if requests is not None and isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+def is_temporary_failure(error: BaseException) -> bool:
+    """Whether a failed call may succeed later: a transient API error, or a call refused by this layer"""
+    return isinstance(error, GeminiUnavailableError) or is_retryable_error(error)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, at most `capacity` banked"""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """
+        Take a token if one is available.
+
+        Returns:
+            0 if a token was taken, otherwise seconds until one is available
+        """
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout: float, sleep: Callable[[float], None] = time.sleep) -> bool:
+        """Wait up to `timeout` seconds for a token"""
+        deadline = self._clock() + timeout
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return True
+            if self._clock() + wait > deadline:
+                return False
+            sleep(wait)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one model"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = 0.0
+        self._state = self.CLOSED
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def retry_after(self) -> float:
+        with self._lock:
+            return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def allow(self) -> bool:
+        """Whether a call may go out; in the half-open state only one trial call at a time"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def release(self) -> None:
+        """Give back a half-open trial slot that was not used"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._state = self.CLOSED
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"Gemini circuit opened after {self._failures} consecutive failures")
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+
+class AttemptBudget:
+    """Gemini calls left for one user request"""
+
+    def __init__(self, max_attempts: int):
+        self.max_attempts = max_attempts
+        self.attempts = 0
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.max_attempts - self.attempts)
+
+    def consume(self) -> None:
+        """Use one attempt; raises AttemptBudgetExhausted when none are left"""
+        with self._lock:
+            if self.attempts >= self.max_attempts:
+                raise AttemptBudgetExhausted(self.max_attempts)
+            self.attempts += 1
+
+
+_current_budget: contextvars.ContextVar = contextvars.ContextVar('gemini_attempt_budget', default=None)
+
+
+def current_attempt_budget() -> Optional[AttemptBudget]:
+    return _current_budget.get()
+
+
+@contextmanager
+def attempt_budget(max_attempts: Optional[int] = None):
+    """
+    Share one attempt budget between every Gemini call in the block.
+
+    Nested blocks reuse the outer budget, so a view and the service it calls
+    count against the same limit. Worker threads see the budget when they run
+    in a copy of the caller's context (contextvars.copy_context().run).
+
+    Args:
+        max_attempts: Calls allowed (defaults to GEMINI_MAX_ATTEMPTS_PER_REQUEST)
+    """
+    existing = _current_budget.get()
+    if existing is not None:
+        yield existing
+        return
+
+    budget = AttemptBudget(max_attempts or getattr(settings, 'GEMINI_MAX_ATTEMPTS_PER_REQUEST', 12))
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
+
+
+class GeminiGateway:
+    """Rate-limited, circuit-broken, retrying entry point for Gemini calls"""
+
+    def __init__(self, bucket: Optional[TokenBucket] = None, max_retries: Optional[int] = None,
+                 retry_delay_base: Optional[float] = None, retry_delay_max: Optional[float] = None,
+                 failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None,
+                 acquire_timeout: Optional[float] = None, sleep: Callable[[float], None] = time.sleep):
+        if bucket is None:
+            per_minute = getattr(settings, 'GEMINI_REQUESTS_PER_MINUTE', 60)
+            bucket = TokenBucket(per_minute / 60.0, getattr(settings, 'GEMINI_BURST', 10))
+        self.bucket = bucket
+        self.max_retries = max_retries or getattr(settings, 'GEMINI_MAX_RETRIES', 3)
+        self.retry_delay_base = (
+            retry_delay_base if retry_delay_base is not None
+            else getattr(settings, 'GEMINI_RETRY_BASE_DELAY', 1.0)
+        )
+        self.retry_delay_max = retry_delay_max or getattr(settings, 'GEMINI_RETRY_MAX_DELAY', 20.0)
+        self.failure_threshold = failure_threshold or getattr(settings, 'GEMINI_BREAKER_FAILURE_THRESHOLD', 5)
+        self.reset_timeout = (
+            reset_timeout if reset_timeout is not None
+            else getattr(settings, 'GEMINI_BREAKER_RESET_TIMEOUT', 30)
+        )
+        self.acquire_timeout = (
+            acquire_timeout if acquire_timeout is not None
+            else getattr(settings, 'GEMINI_RATE_LIMIT_WAIT', 30)
+        )
+        self._sleep = sleep
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._breakers_lock = threading.Lock()
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        """The circuit breaker for a model"""
+        with self._breakers_lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._breakers[model]
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        delay = self.retry_delay_base * (2 ** attempt)
+        if getattr(error, 'code', None) == 429:
+            # Rate limited: back off harder than for a server error
+            delay *= 2
+        return min(self.retry_delay_max, delay + random.uniform(0, self.retry_delay_base))
+
+    def call(self, api_func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Call a Gemini SDK method with rate limiting, circuit breaking and retries.
+
+        Args:
+            api_func: SDK method, e.g. client.models.generate_content
+            *args: Positional arguments for the method
+            **kwargs: Keyword arguments for the method (`model` selects the breaker)
+
+        Returns:
+            The SDK method's result
+
+        Raises:
+            CircuitOpenError: The model is failing; no call was made
+            AttemptBudgetExhausted: The user request has no attempts left
+            RequestBudgetExceeded: No request capacity within GEMINI_RATE_LIMIT_WAIT
+            Exception: The SDK error, if it is not retryable or retries ran out
+        """
+        model = kwargs.get('model') or 'default'
+        breaker = self.breaker(model)
+        budget = _current_budget.get()
+
+        for attempt in range(self.max_retries):
+            if not breaker.allow():
+                raise CircuitOpenError(model, breaker.retry_after())
+            try:
+                if budget is not None:
+                    budget.consume()
+                if not self.bucket.acquire(self.acquire_timeout, sleep=self._sleep):
+                    raise RequestBudgetExceeded(f"No Gemini request capacity within {self.acquire_timeout}s")
+            except GeminiUnavailableError:
+                breaker.release()
+                raise
+
+            try:
+                result = api_func(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable_error(e):
+                    # The API answered; a bad request says nothing about its health
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                if attempt == self.max_retries - 1:
+                    raise
+                delay = self._backoff(attempt, e)
+                logger.warning(
+                    f"Gemini {model} call failed (attempt {attempt + 1}/{self.max_retries}): {str(e)}; "
+                    f"retrying in {delay:.2f}s"
+                )
+                self._sleep(delay)
+            else:
+                breaker.record_success()
+                return result
+
+
+_gemini_gateway = None
+_gemini_gateway_lock = threading.Lock()
+
+
+def get_gemini_gateway() -> GeminiGateway:
+    """Return the process-wide Gemini gateway"""
+    global _gemini_gateway
+    if _gemini_gateway is not None:
+        return _gemini_gateway
+
+    with _gemini_gateway_lock:
+        if _gemini_gateway is None:
+            _gemini_gateway = GeminiGateway()
+    return _gemini_gateway
+
+
+_gemini_clients: Dict[Any, Any] = {}
+_gemini_clients_lock = threading.Lock()
+
+
+def get_gemini_client(api_key: str):
+    """
+    Return the shared Gemini SDK client for an API key.
+
+    Args:
+        api_key: Gemini API key
+
+    Returns:
+        genai.Client (pointed at GEMINI_BASE_URL when set)
+    """
+    if genai is None:
+        raise ImportError("google-genai is not installed")
+
+    base_url = getattr(settings, 'GEMINI_BASE_URL', '')
+    key = (api_key, base_url)
+    with _gemini_clients_lock:
+        if key not in _gemini_clients:
+            http_options = {'base_url': base_url} if base_url else None
+            _gemini_clients[key] = genai.Client(api_key=api_key, http_options=http_options)
+        return _gemini_clients[key]
@@ -6,9 +6,10 @@ from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
 from django.conf import settings
 import time
-from collections import defaultdict, deque
 from datetime import datetime, timedelta
 from organizations.middleware import get_current_organization
+from organizations.tenant_context import get_tenant_context
+from .rate_limiter import get_rate_limiter, get_rules_for, retry_after_header
 
 logger = logging.getLogger(__name__)
 
@@ -20,8 +21,8 @@ class RateLimitMiddleware(MiddlewareMixin):
     
     def __init__(self, get_response):
         self.get_response = get_response
-        # Store rate limit data in memory (in production, use Redis)
-        self.rate_limits = defaultdict(lambda: defaultdict(deque))
+        # Shared GCRA limiter (Redis when available, in-process otherwise)
+        self.limiter = get_rate_limiter()
         super().__init__(get_response)
     
     def process_request(self, request):
@@ -31,113 +32,38 @@ class RateLimitMiddleware(MiddlewareMixin):
         if not request.path.startswith('/api/ai/'):
             return None
         
-        # Get organization and user identifiers
-        organization = get_current_organization()
+        # Get organization and user identifiers; the tenant context resolves
+        # the organization once and TenantMiddleware reuses it later
+        organization = get_tenant_context(request).get_organization()
+        
+        # If no organization (anonymous or no membership), skip rate limiting
+        # and let the authentication/tenant middleware handle the request
         if not organization:
-            # For testing, try to get organization from authenticated user
-            if hasattr(request, 'user') and request.user.is_authenticated:
-                organization = request.user.current_organization
-                if not organization:
-                    # Get first organization the user belongs to
-                    memberships = request.user.organization_memberships.filter(is_active=True)
-                    if memberships.exists():
-                        organization = memberships.first().organization
-            
-            # If still no organization and user is not authenticated, skip rate limiting
-            # This allows the authentication middleware to run first
-            if not organization and (not hasattr(request, 'user') or not request.user.is_authenticated):
-                return None
-            
-            # If user is authenticated but no organization found, skip rate limiting
-            # Let the tenant middleware handle organization validation
-            if not organization:
-                return None
+            return None
         
         user_id = str(request.user.id) if request.user.is_authenticated else 'anonymous'
         org_id = str(organization.id)
         
-        # Define rate limits based on endpoint
-        rate_limits = self._get_rate_limits(request.path, request.method)
-        
-        # Check rate limits
-        for limit_type, (limit, window_seconds) in rate_limits.items():
-            key = f"{org_id}:{user_id}:{limit_type}"
-            
-            if self._is_rate_limited(key, limit, window_seconds):
-                return JsonResponse(
-                    {
-                        'error': f'Rate limit exceeded for {limit_type}',
-                        'limit': limit,
-                        'window_seconds': window_seconds,
-                        'retry_after': self._get_retry_after(key, window_seconds)
-                    },
-                    status=429
-                )
-        
-        # Record the request
-        self._record_request(org_id, user_id, request.path)
+        # Check and record the request against this endpoint's limits in one step
+        rules = get_rules_for(request.path, request.method)
+        keys = [f"{org_id}:{user_id}:{rule.name}" for rule in rules]
+        result = self.limiter.hit(keys, rules)
+        
+        if not result.allowed:
+            retry_after = retry_after_header(result)
+            response = JsonResponse(
+                {
+                    'error': f'Rate limit exceeded for {result.rule.name}',
+                    'limit': result.rule.limit,
+                    'window_seconds': result.rule.window_seconds,
+                    'retry_after': int(retry_after)
+                },
+                status=429
+            )
+            response['Retry-After'] = retry_after
+            return response
         
         return None
-    
-    def _get_rate_limits(self, path, method):
-        """Get rate limits for specific endpoint"""
-        limits = {}
-        
-        if '/ai/generation-requests/' in path and method == 'POST':
-            # AI generation requests - more restrictive
-            limits['ai_generation'] = (10, 60)  # 10 requests per minute
-            limits['ai_generation_hourly'] = (100, 3600)  # 100 requests per hour
-        
-        elif '/ai/generation-requests/' in path and method == 'GET':
-            # Viewing requests - less restrictive
-            limits['api_read'] = (100, 60)  # 100 requests per minute
-        
-        elif '/ai/templates/' in path and method == 'POST':
-            # Template usage
-            limits['template_usage'] = (20, 60)  # 20 requests per minute
-        
-        else:
-            # Default limits for other AI endpoints
-            limits['api_general'] = (60, 60)  # 60 requests per minute
-        
-        return limits
-    
-    def _is_rate_limited(self, key, limit, window_seconds):
-        """Check if request should be rate limited"""
-        now = time.time()
-        window_start = now - window_seconds
-        
-        # Clean old entries
-        request_times = self.rate_limits[key]['requests']
-        while request_times and request_times[0] < window_start:
-            request_times.popleft()
-        
-        # Check if limit exceeded
-        return len(request_times) >= limit
-    
-    def _record_request(self, org_id, user_id, path):
-        """Record a request for rate limiting"""
-        now = time.time()
-        
-        # Record for different rate limit types
-        rate_limit_keys = [
-            f"{org_id}:{user_id}:ai_generation",
-            f"{org_id}:{user_id}:ai_generation_hourly",
-            f"{org_id}:{user_id}:api_read",
-            f"{org_id}:{user_id}:template_usage",
-            f"{org_id}:{user_id}:api_general"
-        ]
-        
-        for key in rate_limit_keys:
-            self.rate_limits[key]['requests'].append(now)
-    
-    def _get_retry_after(self, key, window_seconds):
-        """Get retry after time in seconds"""
-        request_times = self.rate_limits[key]['requests']
-        if request_times:
-            oldest_request = request_times[0]
-            return max(0, int(oldest_request + window_seconds - time.time()))
-        return 0
 
 
 class AISecurityMiddleware(MiddlewareMixin):
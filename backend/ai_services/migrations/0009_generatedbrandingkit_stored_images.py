@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-16 19:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_services', '0008_postergenerationjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatedbrandingkit',
+            name='color_palette_path',
+            field=models.CharField(blank=True, help_text='Storage path of the color palette', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='generatedbrandingkit',
+            name='color_palette_thumbnail_url',
+            field=models.URLField(blank=True, help_text='URL of the color palette thumbnail', max_length=500, null=True),
+        ),
+        migrations.AddField(
+            model_name='generatedbrandingkit',
+            name='logo_path',
+            field=models.CharField(blank=True, help_text='Storage path of the logo', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='generatedbrandingkit',
+            name='logo_thumbnail_url',
+            field=models.URLField(blank=True, help_text='URL of the logo thumbnail', max_length=500, null=True),
+        ),
+        migrations.AlterField(
+            model_name='generatedbrandingkit',
+            name='color_palette_data',
+            field=models.TextField(blank=True, help_text='Base64 encoded color palette image (legacy)'),
+        ),
+        migrations.AlterField(
+            model_name='generatedbrandingkit',
+            name='color_palette_url',
+            field=models.URLField(blank=True, help_text='URL of the stored color palette', max_length=500, null=True),
+        ),
+        migrations.AlterField(
+            model_name='generatedbrandingkit',
+            name='logo_data',
+            field=models.TextField(blank=True, help_text='Base64 encoded logo image (legacy)'),
+        ),
+        migrations.AlterField(
+            model_name='generatedbrandingkit',
+            name='logo_url',
+            field=models.URLField(blank=True, help_text='URL of the stored logo', max_length=500, null=True),
+        ),
+    ]
@@ -0,0 +1,144 @@
+import base64
+import binascii
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+IMAGE_KINDS = ('logo', 'color_palette')
+THUMBNAIL_SIZE = 256
+
+# The helpers below are frozen copies of ai_services.branding_kit_storage and
+# utils.storage_handler as of this migration; later edits to those modules must
+# not change what this migration does.
+
+
+def media_url(saved_path):
+    url = default_storage.url(saved_path)
+    if url.startswith('http'):
+        return url
+    domain = getattr(settings, 'DOMAIN_URL', '') or os.getenv('DOMAIN_URL', '') or 'http://localhost:8000'
+    return f"{domain.rstrip('/')}{url}"
+
+
+def make_thumbnail(image_bytes):
+    from PIL import Image
+
+    with Image.open(BytesIO(image_bytes)) as image:
+        image.draft('RGB', (THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        thumbnail = image.convert('RGBA') if image.mode not in ('RGB', 'RGBA') else image.copy()
+    thumbnail.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.LANCZOS)
+
+    buffer = BytesIO()
+    thumbnail.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def store_image(image_bytes, kit_id, kind, image_format):
+    folder = f"branding_kits/{kit_id}"
+    path = default_storage.save(f"{folder}/{kind}.{image_format.lower()}", ContentFile(image_bytes))
+    thumbnail_path = default_storage.save(f"{folder}/{kind}_thumb.png", ContentFile(make_thumbnail(image_bytes)))
+    return {'path': path, 'url': media_url(path), 'thumbnail_url': media_url(thumbnail_path)}
+
+
+def decode_image_data(data):
+    if data.startswith('data:') and ',' in data:
+        data = data.split(',', 1)[1]
+    return base64.b64decode(data)
+
+
+def offload_kit(kit):
+    """Move a kit's inline base64 images to media storage; returns True if it changed"""
+    changed = False
+    for kind in IMAGE_KINDS:
+        data = getattr(kit, f'{kind}_data')
+        if not data:
+            continue
+        try:
+            stored = store_image(decode_image_data(data), kit.id, kind, getattr(kit, f'{kind}_format') or 'png')
+        except (binascii.Error, ValueError, OSError) as e:
+            logger.error(f"Could not offload {kind} of branding kit {kit.id}: {str(e)}")
+            continue
+
+        setattr(kit, f'{kind}_url', stored['url'])
+        setattr(kit, f'{kind}_thumbnail_url', stored['thumbnail_url'])
+        setattr(kit, f'{kind}_path', stored['path'])
+        setattr(kit, f'{kind}_data', '')
+        changed = True
+    return changed
+
+
+def inline_kit(kit):
+    """Read a kit's stored images back into its base64 fields; returns True if it changed"""
+    changed = False
+    for kind in IMAGE_KINDS:
+        path = getattr(kit, f'{kind}_path')
+        if not path or getattr(kit, f'{kind}_data'):
+            continue
+        try:
+            with default_storage.open(path, 'rb') as stored_file:
+                setattr(kit, f'{kind}_data', base64.b64encode(stored_file.read()).decode('ascii'))
+        except OSError as e:
+            logger.error(f"Could not inline {kind} of branding kit {kit.id}: {str(e)}")
+            continue
+        changed = True
+    return changed
+
+
+def iterate_batches(queryset, fields):
+    """Yield batches of rows in primary-key order (keyset pagination)"""
+    last_id = None
+    while True:
+        batch_queryset = queryset.order_by('id').only('id', *fields)
+        if last_id is not None:
+            batch_queryset = batch_queryset.filter(id__gt=last_id)
+        batch = list(batch_queryset[:BATCH_SIZE])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
+
+
+def offload_images(apps, schema_editor):
+    GeneratedBrandingKit = apps.get_model('ai_services', 'GeneratedBrandingKit')
+    queryset = GeneratedBrandingKit.objects.exclude(logo_data='', color_palette_data='')
+    updated_fields = [
+        'logo_url', 'logo_thumbnail_url', 'logo_path', 'logo_data',
+        'color_palette_url', 'color_palette_thumbnail_url', 'color_palette_path', 'color_palette_data',
+    ]
+    # Every field written back is loaded up front so bulk_update never hits a deferred field
+    fields = ('logo_format', 'color_palette_format', *updated_fields)
+
+    for batch in iterate_batches(queryset, fields):
+        updated = [kit for kit in batch if offload_kit(kit)]
+        GeneratedBrandingKit.objects.bulk_update(updated, updated_fields)
+
+
+def inline_images(apps, schema_editor):
+    GeneratedBrandingKit = apps.get_model('ai_services', 'GeneratedBrandingKit')
+    queryset = GeneratedBrandingKit.objects.exclude(logo_path='', color_palette_path='')
+    fields = ('logo_data', 'logo_path', 'color_palette_data', 'color_palette_path')
+
+    for batch in iterate_batches(queryset, fields):
+        updated = [kit for kit in batch if inline_kit(kit)]
+        GeneratedBrandingKit.objects.bulk_update(updated, ['logo_data', 'color_palette_data'])
+
+
+class Migration(migrations.Migration):
+    # Commit each batch on its own instead of holding every row in one transaction
+    atomic = False
+
+    dependencies = [
+        ('ai_services', '0009_generatedbrandingkit_stored_images'),
+    ]
+
+    operations = [
+        migrations.RunPython(offload_images, inline_images),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-16 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_services', '0010_offload_branding_kit_images'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatedposter',
+            name='delivery_url',
+            field=models.URLField(blank=True, help_text='WebP/AVIF copy of the image for faster delivery', max_length=500),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-16 20:10
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_services', '0011_generatedposter_delivery_url'),
+        ('organizations', '0004_organization_poster_cache_enabled'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FabricAnalysisResult',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('content_hash', models.CharField(help_text='SHA-256 of the image bytes', max_length=64)),
+                ('analyzer_version', models.CharField(max_length=20)),
+                ('analysis_type', models.CharField(choices=[('comprehensive', 'Comprehensive'), ('colors_only', 'Colors Only'), ('texture_only', 'Texture Only')], max_length=20)),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('processing_time', models.FloatField(blank=True, null=True)),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now_add=True)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fabric_analyses', to='organizations.organization')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'unique_together': {('organization', 'content_hash', 'analyzer_version', 'analysis_type')},
+            },
+        ),
+    ]
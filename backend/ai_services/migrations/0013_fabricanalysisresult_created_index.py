@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-16 20:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_services', '0012_fabricanalysisresult'),
+        ('organizations', '0004_organization_poster_cache_enabled'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fabricanalysisresult',
+            index=models.Index(fields=['organization', 'created_at'], name='ai_services_organiz_b03d7c_idx'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from organizations.models import Organization
 import uuid
+from decimal import Decimal
 from django.utils import timezone
 
 User = get_user_model()
@@ -144,11 +145,13 @@ class AIUsageQuota(models.Model):
         return (self.current_requests >= self.max_requests or 
                 self.current_cost >= self.max_cost)
     
-    def increment_usage(self, cost=0):
-        """Increment usage counters"""
-        self.current_requests += 1
-        self.current_cost += cost
-        self.save(update_fields=['current_requests', 'current_cost'])
+    def increment_usage(self, cost=0, requests=1):
+        """Increment usage counters atomically in the database"""
+        AIUsageQuota.objects.filter(pk=self.pk).update(
+            current_requests=models.F('current_requests') + requests,
+            current_cost=models.F('current_cost') + Decimal(str(cost))
+        )
+        self.refresh_from_db(fields=['current_requests', 'current_cost'])
     
     def reset_usage(self):
         """Reset usage counters"""
@@ -238,6 +241,7 @@ class GeneratedPoster(models.Model):
     image_url = models.URLField(help_text="URL of the generated poster image")
     image_path = models.CharField(max_length=500, blank=True, help_text="Storage path of the image")
     public_url = models.URLField(blank=True, null=True, help_text="Public Cloudinary URL for sharing")
+    delivery_url = models.URLField(max_length=500, blank=True, help_text="WebP/AVIF copy of the image for faster delivery")
     caption = models.TextField(help_text="Short caption for the poster")
     full_caption = models.TextField(blank=True, help_text="Full caption with hashtags")
     prompt = models.TextField(help_text="Original prompt used to generate the poster")
@@ -272,6 +276,95 @@ class GeneratedPoster(models.Model):
         return f"Poster - {self.prompt[:50]}... ({self.created_at.strftime('%Y-%m-%d')})"
 
 
+class PosterGenerationJob(models.Model):
+    """Model to track background poster generation jobs and their progress"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    TERMINAL_STATUSES = ('completed', 'failed')
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='poster_jobs', null=True, blank=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='poster_jobs', null=True, blank=True)
+    poster = models.ForeignKey(GeneratedPoster, on_delete=models.SET_NULL, related_name='jobs', null=True, blank=True)
+    
+    # Anonymous jobs have no owner; they are polled with a per-job token (only its hash is stored)
+    access_token_hash = models.CharField(max_length=64, blank=True)
+    # User whose company profile brands the poster; may differ from the owner
+    branding_user = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='+', null=True, blank=True)
+    
+    # Request parameters
+    prompt = models.TextField()
+    aspect_ratio = models.CharField(max_length=20, default='1:1')
+    
+    # Progress tracking
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    stage = models.CharField(max_length=50, default='queued')
+    progress = models.PositiveSmallIntegerField(default=0)
+    stage_history = models.JSONField(default=list, blank=True, help_text="Ordered list of stages with timestamps")
+    celery_task_id = models.CharField(max_length=255, blank=True)
+    
+    # Response data
+    result_data = models.JSONField(default=dict, blank=True)
+    error_message = models.TextField(blank=True, null=True)
+    
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['organization', 'created_at']),
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['status']),
+        ]
+    
+    def __str__(self):
+        return f"Poster job {self.id} - {self.status} ({self.stage})"
+    
+    @property
+    def is_finished(self):
+        return self.status in self.TERMINAL_STATUSES
+    
+    def update_stage(self, stage, progress):
+        """Record a pipeline stage transition"""
+        now = timezone.now()
+        self.stage = stage
+        self.progress = max(self.progress, min(100, int(progress)))
+        self.stage_history = list(self.stage_history) + [
+            {'stage': stage, 'progress': self.progress, 'at': now.isoformat()}
+        ]
+        update_fields = ['stage', 'progress', 'stage_history', 'updated_at']
+        if self.status == 'queued':
+            self.status = 'running'
+            self.started_at = now
+            update_fields += ['status', 'started_at']
+        self.save(update_fields=update_fields)
+    
+    def mark_completed(self, result_data=None, poster=None):
+        """Mark the job as completed"""
+        self.status = 'completed'
+        self.poster = poster
+        self.result_data = result_data or {}
+        self.completed_at = timezone.now()
+        self.save(update_fields=['status', 'poster', 'result_data', 'completed_at', 'updated_at'])
+        self.update_stage('completed', 100)
+    
+    def mark_failed(self, error_message):
+        """Mark the job as failed"""
+        self.status = 'failed'
+        self.error_message = error_message
+        self.completed_at = timezone.now()
+        self.save(update_fields=['status', 'error_message', 'completed_at', 'updated_at'])
+        self.update_stage('failed', self.progress)
+
+
 class GeneratedBrandingKit(models.Model):
     """Model to store generated branding kits with logo and color palette"""
     
@@ -283,15 +376,19 @@ class GeneratedBrandingKit(models.Model):
     prompt = models.TextField(help_text="Original prompt used to generate the branding kit")
     style = models.CharField(max_length=50, default='modern', help_text="Style used for generation")
     
-    # Logo data (stored as base64 or URL)
-    logo_data = models.TextField(blank=True, help_text="Base64 encoded logo image")
+    # Logo (stored in media storage; logo_data only holds legacy rows not yet offloaded)
+    logo_data = models.TextField(blank=True, help_text="Base64 encoded logo image (legacy)")
     logo_format = models.CharField(max_length=10, default='png', help_text="Logo image format")
-    logo_url = models.URLField(blank=True, null=True, help_text="URL of the logo if stored externally")
+    logo_url = models.URLField(max_length=500, blank=True, null=True, help_text="URL of the stored logo")
+    logo_thumbnail_url = models.URLField(max_length=500, blank=True, null=True, help_text="URL of the logo thumbnail")
+    logo_path = models.CharField(max_length=255, blank=True, help_text="Storage path of the logo")
     
     # Color palette data
-    color_palette_data = models.TextField(blank=True, help_text="Base64 encoded color palette image")
+    color_palette_data = models.TextField(blank=True, help_text="Base64 encoded color palette image (legacy)")
     color_palette_format = models.CharField(max_length=10, default='png', help_text="Color palette image format")
-    color_palette_url = models.URLField(blank=True, null=True, help_text="URL of the color palette if stored externally")
+    color_palette_url = models.URLField(max_length=500, blank=True, null=True, help_text="URL of the stored color palette")
+    color_palette_thumbnail_url = models.URLField(max_length=500, blank=True, null=True, help_text="URL of the color palette thumbnail")
+    color_palette_path = models.CharField(max_length=255, blank=True, help_text="Storage path of the color palette")
     colors = models.JSONField(default=list, blank=True, help_text="List of hex color codes")
     
     # Metadata
@@ -307,4 +404,40 @@ class GeneratedBrandingKit(models.Model):
         ]
     
     def __str__(self):
-        return f"Branding Kit - {self.prompt[:50]}... ({self.created_at.strftime('%Y-%m-%d')})"
\ No newline at end of file
+        return f"Branding Kit - {self.prompt[:50]}... ({self.created_at.strftime('%Y-%m-%d')})"
+
+
+class FabricAnalysisResult(models.Model):
+    """Stored fabric analysis, shared by every request for the same image content in a tenant"""
+    ANALYSIS_TYPES = [
+        ('comprehensive', 'Comprehensive'),
+        ('colors_only', 'Colors Only'),
+        ('texture_only', 'Texture Only'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='fabric_analyses')
+    
+    # Store key
+    content_hash = models.CharField(max_length=64, help_text="SHA-256 of the image bytes")
+    analyzer_version = models.CharField(max_length=20)
+    analysis_type = models.CharField(max_length=20, choices=ANALYSIS_TYPES)
+    
+    # Analysis output
+    result = models.JSONField(default=dict, blank=True)
+    processing_time = models.FloatField(null=True, blank=True)  # Time in seconds
+    
+    # Reuse tracking
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        unique_together = ['organization', 'content_hash', 'analyzer_version', 'analysis_type']
+        indexes = [
+            models.Index(fields=['organization', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Fabric analysis {self.content_hash[:12]} - {self.analysis_type} (v{self.analyzer_version})"
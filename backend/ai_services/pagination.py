@@ -0,0 +1,36 @@
+"""
+Keyset pagination helpers shared by the history endpoints.
+
+Lists are ordered newest first by (created_at, id); a cursor is the opaque,
+URL-safe encoding of the last row of a page, and the next page is every row
+strictly before it in that order.
+"""
+import base64
+import binascii
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+from django.db.models import Q
+
+ORDERING = ('-created_at', '-id')
+
+
+def encode_cursor(created_at: datetime, pk) -> str:
+    """Opaque keyset cursor for the page after the row (created_at, pk)"""
+    raw = f"{created_at.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """Decode a cursor into (created_at, id); raises ValueError when malformed"""
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|', 1)
+        return datetime.fromisoformat(created_at), uuid.UUID(pk)
+    except (binascii.Error, UnicodeError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def rows_before(created_at: datetime, pk) -> Q:
+    """Filter for the rows that follow (created_at, pk) in newest-first order"""
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
@@ -0,0 +1,386 @@
+"""
+LAB palette similarity index
+Answers "which stored fabrics match this palette?" for a tenant. Every color of
+every indexed palette is a point in a KD-tree; a query gathers the palettes
+owning the colors nearest to each query color, scores them with an optimal
+one-to-one color assignment (Hungarian algorithm) over a vectorized distance
+matrix, and widens the search until no unseen palette can beat the results.
+
+Palettes added after the last tree build sit in a small delta that is
+scanned directly, and the tree is rebuilt once the delta grows past a
+fraction of the indexed colors, so new analyses are searchable immediately.
+"""
+import heapq
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+from scipy.optimize import linear_sum_assignment
+from scipy.spatial import cKDTree
+
+from . import color_quantizer
+from .fabric_analysis import ANALYZER_VERSION
+from .models import FabricAnalysisResult
+
+logger = logging.getLogger(__name__)
+
+# Stored analysis types whose result carries a color palette
+PALETTE_SOURCES = ('comprehensive', 'colors_only')
+
+# Colors kept per palette (most dominant first)
+MAX_PALETTE_COLORS = 8
+
+# Nearest colors fetched per query color on the first search pass
+INITIAL_NEIGHBOURS = 32
+
+# Factor the neighbour lists grow by until no unseen palette can make the results
+NEIGHBOUR_GROWTH = 2
+
+# LAB value of unused palette slots: never within max_distance of a real color
+PADDING_LAB = 1e4
+
+# Delta colors always tolerated before a rebuild, however small the tree
+MIN_DELTA_COLORS = 1024
+
+
+def palette_to_lab(colors: Sequence[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert a palette to LAB points and coverage weights
+
+    Args:
+        colors: Hex strings, or color dicts with 'lab', 'rgb' or 'hex' and an
+            optional 'percentage' (as produced by SmartColorMatcher)
+
+    Returns:
+        Tuple of (K, 3) OpenCV 8-bit LAB colors and (K,) weights summing to 1
+    """
+    labs, rgbs, weights = [], [], []
+    for color in list(colors)[:MAX_PALETTE_COLORS]:
+        if isinstance(color, str):
+            color = {'hex': color}
+        if 'lab' in color:
+            labs.append(color['lab'])
+        else:
+            rgbs.append(color['rgb'] if 'rgb' in color else _hex_to_rgb(color['hex']))
+        weights.append(float(color.get('percentage', 1.0)))
+
+    if not labs and not rgbs:
+        return np.empty((0, 3), dtype=np.float32), np.empty(0, dtype=np.float32)
+    if labs and rgbs:
+        raise ValueError("Palette colors must all carry 'lab' values or none of them")
+    lab = np.asarray(labs, dtype=np.float32) if labs else color_quantizer.rgb_to_lab(rgbs).astype(np.float32)
+    weights = np.asarray(weights, dtype=np.float32)
+    total = weights.sum()
+    weights = weights / total if total > 0 else np.full(len(weights), 1.0 / max(len(weights), 1), dtype=np.float32)
+    return lab.reshape(-1, 3), weights
+
+
+def _hex_to_rgb(value: str) -> List[int]:
+    value = value.lstrip('#')
+    if len(value) != 6:
+        raise ValueError(f"Invalid hex color: #{value}")
+    return [int(value[i:i + 2], 16) for i in (0, 2, 4)]
+
+
+class PaletteIndex:
+    """Incrementally built nearest-palette index for one tenant"""
+
+    def __init__(self, organization_id=None, max_distance: Optional[float] = None,
+                 rebuild_ratio: Optional[float] = None):
+        """
+        Args:
+            organization_id: Tenant whose stored fabric analyses are indexed by refresh()
+            max_distance: LAB distance at which a query color counts as unmatched
+            rebuild_ratio: Rebuild the tree once the delta holds this fraction of its colors
+        """
+        self.organization_id = organization_id
+        self.max_distance = max_distance or getattr(settings, 'PALETTE_INDEX_MAX_DISTANCE', 50.0)
+        self.rebuild_ratio = rebuild_ratio or getattr(settings, 'PALETTE_INDEX_REBUILD_RATIO', 0.02)
+        self._lock = threading.RLock()
+
+        # Palette rows, padded to MAX_PALETTE_COLORS; padding has weight 0 and lies far outside LAB space
+        self._labs = np.full((0, MAX_PALETTE_COLORS, 3), PADDING_LAB)
+        self._squared_norms = np.zeros((0, MAX_PALETTE_COLORS))
+        self._weights = np.zeros((0, MAX_PALETTE_COLORS), dtype=np.float32)
+        self._size = 0
+        self._entries: List[Dict[str, Any]] = []
+        self._keys = set()
+        self._content_hashes = set()
+
+        # KD-tree over the colors of palettes [0, _indexed); later palettes form the delta
+        self._tree: Optional[cKDTree] = None
+        self._tree_owner = np.empty(0, dtype=np.int64)
+        self._indexed = 0
+        self._delta_colors = 0
+
+        # Stored analyses created at or after this time have not been loaded yet
+        self._watermark = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, key: str, colors: Sequence[Any], **metadata) -> bool:
+        """
+        Add a palette
+
+        Args:
+            key: Unique palette key (fabric analysis id); repeated keys are ignored
+            colors: Palette colors, see palette_to_lab
+            **metadata: Returned with search results
+
+        Returns:
+            True if the palette was added
+        """
+        with self._lock:
+            added = self._append(key, colors, metadata)
+            self._maybe_rebuild()
+        return added
+
+    def extend(self, palettes: Iterable[Tuple[str, Sequence[Any], Dict[str, Any]]]) -> int:
+        """
+        Add many palettes, rebuilding the tree at most once
+
+        Args:
+            palettes: (key, colors, metadata) tuples
+
+        Returns:
+            Number of palettes added
+        """
+        with self._lock:
+            added = sum(self._append(key, colors, metadata) for key, colors, metadata in palettes)
+            self._maybe_rebuild()
+        return added
+
+    def _append(self, key: str, colors: Sequence[Any], metadata: Dict[str, Any]) -> bool:
+        lab, weights = palette_to_lab(colors)
+        with self._lock:
+            if key in self._keys or not len(lab):
+                return False
+            if self._size == len(self._labs):
+                self._grow()
+            row = self._size
+            self._labs[row, :len(lab)] = lab
+            self._squared_norms[row] = (self._labs[row] ** 2).sum(axis=1)
+            self._weights[row, :len(lab)] = weights
+            self._entries.append({'key': key, **metadata})
+            self._keys.add(key)
+            self._size += 1
+            self._delta_colors += len(lab)
+        return True
+
+    def _maybe_rebuild(self) -> None:
+        if self._delta_colors > max(self.rebuild_ratio * len(self._tree_owner), MIN_DELTA_COLORS):
+            self.rebuild()
+
+    def _grow(self) -> None:
+        capacity = max(64, 2 * len(self._labs))
+        labs = np.full((capacity, MAX_PALETTE_COLORS, 3), PADDING_LAB)
+        weights = np.zeros((capacity, MAX_PALETTE_COLORS), dtype=np.float32)
+        labs[:self._size] = self._labs[:self._size]
+        weights[:self._size] = self._weights[:self._size]
+        self._labs, self._weights = labs, weights
+        self._squared_norms = (labs ** 2).sum(axis=2)
+
+    def rebuild(self) -> None:
+        """Index every palette's colors in a fresh KD-tree"""
+        with self._lock:
+            present = self._weights[:self._size] > 0
+            owners, slots = np.nonzero(present)
+            if len(owners):
+                self._tree = cKDTree(self._labs[owners, slots], balanced_tree=False, compact_nodes=False)
+            self._tree_owner = owners
+            self._indexed = self._size
+            self._delta_colors = 0
+
+    def refresh(self) -> int:
+        """
+        Load palettes of the tenant's fabric analyses stored since the last refresh
+
+        Returns:
+            Number of palettes added
+        """
+        rows = FabricAnalysisResult.objects.filter(
+            organization_id=self.organization_id,
+            analyzer_version=ANALYZER_VERSION,
+            analysis_type__in=PALETTE_SOURCES
+        )
+        if self._watermark is not None:
+            rows = rows.filter(created_at__gte=self._watermark)
+        rows = rows.order_by('created_at').values_list(
+            'id', 'content_hash', 'created_at', 'result__color_analysis__palette', 'result__image_url'
+        )
+
+        added = 0
+        with self._lock:
+            for record_id, content_hash, created_at, palette, image_url in rows:
+                self._watermark = created_at
+                # The same content can be stored as both a comprehensive and a colors-only analysis
+                if content_hash in self._content_hashes or not isinstance(palette, list):
+                    continue
+                if self._append(str(record_id), palette, {'content_hash': content_hash, 'image_url': image_url}):
+                    self._content_hashes.add(content_hash)
+                    added += 1
+            self._maybe_rebuild()
+        if added:
+            logger.info(f"Palette index for organization {self.organization_id}: +{added} palettes ({self._size} total)")
+        return added
+
+    def search(self, colors: Sequence[Any], limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Find the indexed palettes closest to a query palette
+
+        Palettes are ranked by the coverage-weighted LAB distance of an optimal
+        one-to-one assignment of query colors to palette colors; query colors
+        without a partner within max_distance count as max_distance.
+
+        Args:
+            colors: Query palette, see palette_to_lab
+            limit: Number of results
+
+        Returns:
+            Result dicts (best first) with the palette's metadata, 'distance',
+            'similarity_score' and the color 'matches'
+        """
+        query_lab, query_weights = palette_to_lab(colors)
+        if not len(query_lab) or limit <= 0:
+            return []
+
+        with self._lock:
+            tree, owners, indexed, size = self._tree, self._tree_owner, self._indexed, self._size
+            search = _Search(self, query_lab, query_weights, limit)
+            search.score(np.arange(indexed, size))
+
+            neighbours = INITIAL_NEIGHBOURS
+            while tree is not None and tree.n:
+                neighbours = min(neighbours, tree.n)
+                distances, points = tree.query(query_lab, k=neighbours)
+                distances, points = distances.reshape(len(query_lab), -1), points.reshape(len(query_lab), -1)
+                search.score_neighbours(distances, owners[points])
+
+                # A palette with no color among any query color's neighbours is at least this far away
+                unseen_bound = float(np.dot(query_weights, np.minimum(distances[:, -1], self.max_distance)))
+                if neighbours >= tree.n or search.threshold() <= unseen_bound:
+                    break
+                neighbours *= NEIGHBOUR_GROWTH
+
+            return [self._result(query_lab, row, cost, columns) for row, cost, columns in search.ranked()]
+
+    def _result(self, query_lab: np.ndarray, row: int, cost: float, columns: np.ndarray) -> Dict[str, Any]:
+        entry = self._entries[row]
+        distances = np.linalg.norm(query_lab - self._labs[row][columns], axis=1)
+        return {
+            **{key: value for key, value in entry.items() if key != 'key'},
+            'fabric_analysis_id': entry['key'],
+            'distance': round(cost, 2),
+            'similarity_score': round((1 - cost / self.max_distance) * 100, 1),
+            'matches': [
+                {'query_color': i, 'palette_color': int(j), 'distance': round(float(distance), 2)}
+                for i, (j, distance) in enumerate(zip(columns, distances))
+                if distance < self.max_distance
+            ]
+        }
+
+
+class _Search:
+    """Best palettes found so far by one PaletteIndex.search call"""
+
+    def __init__(self, index: PaletteIndex, query_lab: np.ndarray, query_weights: np.ndarray, limit: int):
+        self.index = index
+        self.query_lab = query_lab.astype(np.float64)
+        self.query_sq = (self.query_lab ** 2).sum(axis=1)
+        self.query_weights = query_weights.astype(np.float64)
+        self.limit = limit
+        self.seen = np.zeros(index._size, dtype=bool)
+        # Max-heap (negated costs) of the best `limit` results: (-cost, row, assigned palette colors)
+        self.best: List[Tuple[float, int, np.ndarray]] = []
+
+    def threshold(self) -> float:
+        """Cost a palette must beat to enter the results"""
+        return -self.best[0][0] if len(self.best) >= self.limit else float('inf')
+
+    def score_neighbours(self, distances: np.ndarray, owners: np.ndarray) -> None:
+        """
+        Score the palettes owning each query color's nearest colors
+
+        A palette's distance to query color i is at least its nearest color in
+        neighbour list i, or the list's last distance if none of its colors made
+        the list; palettes whose bound cannot make the results are never scored.
+        """
+        max_distance = self.index.max_distance
+        candidates, inverse = np.unique(owners, return_inverse=True)
+        nearest = np.repeat(np.minimum(distances[:, -1], max_distance)[None, :], len(candidates), axis=0)
+        for color, (color_distances, color_owners) in enumerate(zip(distances, inverse.reshape(owners.shape))):
+            # Lists are sorted by distance, so a palette's first entry is its nearest color
+            seen, first = np.unique(color_owners, return_index=True)
+            nearest[seen, color] = np.minimum(color_distances[first], max_distance)
+        lower_bounds = nearest @ self.query_weights
+
+        order = np.argsort(lower_bounds, kind='stable')
+        candidates, lower_bounds = candidates[order], lower_bounds[order]
+        self.score(candidates[:4 * self.limit])
+        rest = candidates[4 * self.limit:]
+        self.score(rest[lower_bounds[4 * self.limit:] < self.threshold()])
+
+    def score(self, rows: np.ndarray) -> None:
+        """Score unseen candidate palettes exactly, skipping those whose lower bound cannot make the results"""
+        rows = rows[~self.seen[rows]]
+        if not len(rows):
+            return
+        self.seen[rows] = True
+
+        # (candidates, query colors, palette colors) squared distances via |q|^2 + |p|^2 - 2 q.p
+        palettes = self.index._labs[rows]
+        products = (palettes.reshape(-1, 3) @ self.query_lab.T).reshape(len(rows), MAX_PALETTE_COLORS, -1)
+        squared = (
+            self.index._squared_norms[rows][:, None, :]
+            + self.query_sq[None, :, None]
+            - 2 * products.transpose(0, 2, 1)
+        )
+        max_distance = self.index.max_distance
+
+        # Each query color's nearest palette color bounds the assignment cost from below
+        nearest = np.sqrt(np.maximum(squared.min(axis=2), 0))
+        lower_bounds = np.minimum(nearest, max_distance) @ self.query_weights
+        for position in np.argsort(lower_bounds, kind='stable'):
+            if lower_bounds[position] >= self.threshold():
+                break
+            costs = np.minimum(np.sqrt(np.maximum(squared[position], 0)), max_distance) * self.query_weights[:, None]
+            assigned_rows, assigned_cols = linear_sum_assignment(costs)
+            cost = float(costs[assigned_rows, assigned_cols].sum())
+            if cost < self.threshold():
+                entry = (-cost, int(rows[position]), assigned_cols)
+                if len(self.best) >= self.limit:
+                    heapq.heapreplace(self.best, entry)
+                else:
+                    heapq.heappush(self.best, entry)
+
+    def ranked(self) -> List[Tuple[int, float, np.ndarray]]:
+        return [(row, -cost, columns) for cost, row, columns in sorted(self.best, key=lambda entry: (-entry[0], entry[1]))]
+
+
+# Most recently used tenant indexes kept per process (least recently used evicted)
+_palette_indexes: 'OrderedDict[Any, PaletteIndex]' = OrderedDict()
+_palette_indexes_lock = threading.Lock()
+
+
+def get_palette_index(organization) -> PaletteIndex:
+    """Return the process-wide palette index of a tenant, loaded with its latest stored analyses"""
+    max_tenants = getattr(settings, 'PALETTE_INDEX_MAX_TENANTS', 32)
+    with _palette_indexes_lock:
+        index = _palette_indexes.get(organization.pk)
+        if index is None:
+            index = _palette_indexes[organization.pk] = PaletteIndex(organization.pk)
+        _palette_indexes.move_to_end(organization.pk)
+        while len(_palette_indexes) > max_tenants:
+            _palette_indexes.popitem(last=False)
+    index.refresh()
+    return index
+
+
+def invalidate_palette_index(organization_id) -> None:
+    """Drop a tenant's index so the next lookup rebuilds it without deleted analyses"""
+    with _palette_indexes_lock:
+        _palette_indexes.pop(organization_id, None)
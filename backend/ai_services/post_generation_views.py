@@ -275,7 +275,8 @@ class AIPostGenerationViewSet(viewsets.ViewSet):
             result = self.poster_service.generate_composite(
                 prompt=prompt,
                 image_paths=image_paths,
-                aspect_ratio="16:9"
+                aspect_ratio="16:9",
+                user=request.user
             )
             
             # Clean up temporary files
@@ -0,0 +1,328 @@
+"""
+Poster history listing
+
+Reads GeneratedPoster pages for the history API. Each owner scope
+(organization, user, ...) is read newest first along its own
+(owner, created_at) index and the scopes are merged in Python, so a page
+never sorts the tenant's whole history. Only the requested columns are
+loaded, counts are optional (exact or approximate), and the first page of
+each tenant is cached until one of its posters changes.
+"""
+import hashlib
+import heapq
+import json
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Q
+
+from .models import GeneratedPoster
+from .pagination import ORDERING, encode_cursor, rows_before
+
+logger = logging.getLogger(__name__)
+
+# Public fields of a poster in the history API, in response order
+POSTER_FIELDS = (
+    'id', 'image_url', 'public_url', 'delivery_url', 'caption', 'full_caption', 'prompt',
+    'aspect_ratio', 'width', 'height', 'hashtags', 'emoji', 'call_to_action',
+    'branding_applied', 'logo_added', 'contact_info_added', 'created_at', 'updated_at',
+)
+# Columns every page reads: the keyset needs them for the next cursor
+KEY_FIELDS = ('id', 'created_at')
+TEXT_FIELDS = ('image_url', 'public_url', 'delivery_url', 'caption', 'full_caption', 'prompt', 'emoji', 'call_to_action')
+FLAG_FIELDS = ('branding_applied', 'logo_added', 'contact_info_added')
+
+COUNT_MODES = ('exact', 'approximate', 'none')
+# Planner estimates below this are too coarse to show; count exactly instead
+APPROXIMATE_COUNT_MIN = 1000
+
+CACHE_PREFIX = 'poster_history'
+
+
+def parse_fields(value: Optional[str]) -> Tuple[str, ...]:
+    """
+    Parse a sparse fieldset such as "id,image_url,created_at".
+
+    Args:
+        value: Comma separated field names; empty for every field
+
+    Returns:
+        Requested fields in POSTER_FIELDS order
+
+    Raises:
+        ValueError: If a field is unknown
+    """
+    if not value:
+        return POSTER_FIELDS
+    requested = {field.strip() for field in value.split(',') if field.strip()}
+    unknown = requested.difference(POSTER_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(field for field in POSTER_FIELDS if field in requested)
+
+
+def owner_scopes(user=None, organization=None, include_unowned: bool = False) -> Optional[List[Q]]:
+    """
+    Filters whose union is the set of posters a user/organization may list.
+
+    Args:
+        user: Requesting user, if authenticated
+        organization: The user's organization, if any
+        include_unowned: Also list posters without an owner (development)
+
+    Returns:
+        List of filters (empty when nothing is visible), or None for every poster
+    """
+    scopes = []
+    if organization is not None:
+        scopes.append(Q(organization=organization))
+    if user is not None:
+        scopes.append(Q(user=user))
+
+    if include_unowned:
+        if organization is not None and user is not None:
+            scopes.append(Q(organization__isnull=True, user__isnull=True))
+        elif organization is not None:
+            scopes.append(Q(organization__isnull=True))
+        elif user is not None:
+            scopes.append(Q(user__isnull=True))
+        else:
+            return None
+    return scopes
+
+
+def _scope_tenants(user=None, organization=None, include_unowned: bool = False) -> List[str]:
+    """Cache tenants whose version covers every poster in the owner scopes"""
+    tenants = []
+    if organization is not None:
+        tenants.append(f"org:{organization.pk}")
+    if user is not None:
+        tenants.append(f"user:{user.pk}")
+    if include_unowned:
+        tenants.append('unowned')
+    return tenants
+
+
+def _poster_tenants(organization_id, user_id) -> List[str]:
+    """Cache tenants whose lists can contain a poster with these owners"""
+    tenants = []
+    if organization_id is not None:
+        tenants.append(f"org:{organization_id}")
+    if user_id is not None:
+        tenants.append(f"user:{user_id}")
+    if organization_id is None or user_id is None:
+        tenants.append('unowned')
+    return tenants
+
+
+def _version_key(tenant: str) -> str:
+    return f"{CACHE_PREFIX}:version:{tenant}"
+
+
+def _tenant_versions(tenants: Sequence[str]) -> List[str]:
+    """Current cache version of each tenant, creating missing ones"""
+    keys = [_version_key(tenant) for tenant in tenants]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def invalidate_poster_history(organization_id=None, user_id=None) -> None:
+    """
+    Drop the cached first pages that can contain a poster with these owners.
+
+    Versions are random tokens rather than counters, so a version lost to
+    cache eviction can never bring an old page back.
+    """
+    try:
+        cache.set_many({
+            _version_key(tenant): uuid.uuid4().hex
+            for tenant in _poster_tenants(organization_id, user_id)
+        }, None)
+    except Exception as e:
+        logger.error(f"Error invalidating poster history cache: {str(e)}")
+
+
+def _cache_key(kind: str, parts: Dict[str, Any]) -> str:
+    digest = hashlib.md5(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+    return f"{CACHE_PREFIX}:{kind}:{digest}"
+
+
+def _scoped_queryset(scopes: Optional[List[Q]]):
+    queryset = GeneratedPoster.objects.all()
+    if scopes is None:
+        return queryset
+    combined = Q()
+    for scope in scopes:
+        combined |= scope
+    return queryset.filter(combined)
+
+
+def fetch_rows(scopes: Optional[List[Q]], fields: Sequence[str], limit: int,
+               after: Optional[Tuple[datetime, uuid.UUID]] = None) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Read one keyset page of poster rows, newest first.
+
+    Each scope is read on its own so the database can walk its
+    (owner, created_at) index; the per-scope pages are merged and posters that
+    match several scopes are listed once.
+
+    Args:
+        scopes: Owner filters from owner_scopes
+        fields: Columns to load (the key columns are always added)
+        limit: Page size
+        after: (created_at, id) of the previous page's last row
+
+    Returns:
+        Tuple of (rows, has_more)
+    """
+    columns = list(dict.fromkeys((*KEY_FIELDS, *fields)))
+    base = GeneratedPoster.objects.values(*columns).order_by(*ORDERING)
+    if after is not None:
+        base = base.filter(rows_before(*after))
+
+    if scopes is None or len(scopes) == 1:
+        queryset = base.filter(scopes[0]) if scopes else base
+        rows = list(queryset[:limit + 1])
+    else:
+        pages = [list(base.filter(scope)[:limit + 1]) for scope in scopes]
+        rows = []
+        seen = set()
+        for row in heapq.merge(*pages, key=lambda row: (row['created_at'], row['id']), reverse=True):
+            if row['id'] in seen:
+                continue
+            seen.add(row['id'])
+            rows.append(row)
+            if len(rows) > limit:
+                break
+
+    return rows[:limit], len(rows) > limit
+
+
+def approximate_count(queryset, cache_key: str) -> int:
+    """
+    Count a queryset cheaply.
+
+    PostgreSQL's planner estimate is used for large results; otherwise the
+    exact count is cached for POSTER_HISTORY_COUNT_TIMEOUT seconds.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        try:
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = int(plan[0]['Plan']['Plan Rows'])
+            if estimate >= APPROXIMATE_COUNT_MIN:
+                return estimate
+        except Exception as e:
+            logger.warning(f"Could not estimate poster count: {str(e)}")
+
+    count = cache.get(cache_key)
+    if count is None:
+        count = queryset.count()
+        cache.set(cache_key, count, getattr(settings, 'POSTER_HISTORY_COUNT_TIMEOUT', 60))
+    return count
+
+
+def serialize_poster_row(row: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    """API representation of a poster row, limited to `fields`"""
+    data = {}
+    for field in fields:
+        value = row[field]
+        if field == 'id':
+            value = str(value)
+        elif field in ('created_at', 'updated_at'):
+            value = value.isoformat() if value else ''
+        elif field == 'hashtags' and not isinstance(value, list):
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value) if value else []
+                except ValueError:
+                    value = [value]
+            else:
+                value = list(value) if value else []
+        elif field in TEXT_FIELDS:
+            value = value or ''
+        elif field in FLAG_FIELDS:
+            value = bool(value)
+        elif field == 'aspect_ratio':
+            value = value or '1:1'
+        data[field] = value
+    return data
+
+
+def list_poster_history(user=None, organization=None, fields: Sequence[str] = POSTER_FIELDS, limit: int = 50,
+                        after: Optional[Tuple[datetime, uuid.UUID]] = None, offset: int = 0,
+                        count_mode: str = 'exact') -> Dict[str, Any]:
+    """
+    One page of a user's/organization's poster history.
+
+    Args:
+        user: Requesting user, if authenticated
+        organization: The user's organization, if any
+        fields: Fields to return (see parse_fields)
+        limit: Page size
+        after: Decoded cursor of the previous page
+        offset: Legacy offset pagination, used only without a cursor
+        count_mode: 'exact', 'approximate' or 'none'
+
+    Returns:
+        Dict with results, count (None when not requested) and next_cursor
+    """
+    include_unowned = settings.DEBUG
+    scopes = owner_scopes(user, organization, include_unowned)
+    if scopes == []:
+        return {'results': [], 'count': 0 if count_mode != 'none' else None, 'next_cursor': None}
+
+    # First pages are cached per tenant; anonymous development listings span every tenant
+    page_key = None
+    if after is None and not offset and scopes is not None:
+        tenants = _scope_tenants(user, organization, include_unowned)
+        page_key = _cache_key('page', {
+            'tenants': tenants,
+            'versions': _tenant_versions(tenants),
+            'fields': list(fields),
+            'limit': limit,
+            'count': count_mode,
+        })
+        page = cache.get(page_key)
+        if page is not None:
+            return page
+
+    if offset and after is None:
+        columns = list(dict.fromkeys((*KEY_FIELDS, *fields)))
+        rows = list(_scoped_queryset(scopes).values(*columns).order_by(*ORDERING)[offset:offset + limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+    else:
+        rows, has_more = fetch_rows(scopes, fields, limit, after)
+
+    count = None
+    if count_mode == 'exact':
+        count = _scoped_queryset(scopes).count()
+    elif count_mode == 'approximate':
+        count = approximate_count(
+            _scoped_queryset(scopes),
+            _cache_key('count', {'tenants': _scope_tenants(user, organization, include_unowned)})
+        )
+
+    page = {
+        'results': [serialize_poster_row(row, fields) for row in rows],
+        'count': count,
+        'next_cursor': encode_cursor(rows[-1]['created_at'], rows[-1]['id']) if has_more else None,
+    }
+    if page_key:
+        cache.set(page_key, page, getattr(settings, 'POSTER_HISTORY_CACHE_TIMEOUT', 300))
+    return page
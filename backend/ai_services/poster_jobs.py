@@ -0,0 +1,254 @@
+"""
+Background poster generation jobs.
+Helpers shared by the poster API views and the Celery task that runs the
+generation pipeline outside the request/response cycle.
+"""
+import hashlib
+import hmac
+import logging
+import secrets
+from typing import Any, Dict, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from .models import GeneratedPoster, PosterGenerationJob
+from .utils.poster_publisher import get_published_urls
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_user_organization(user):
+    """Get the organization for a poster owner, if any"""
+    if not user:
+        return None
+    if hasattr(user, 'organization'):
+        return user.organization
+    try:
+        company_profile = getattr(user, 'company_profile', None)
+        if company_profile and hasattr(company_profile, 'organization'):
+            return company_profile.organization
+    except Exception as e:
+        logger.warning(f"Could not get organization: {e}")
+    return None
+
+
+def save_generated_poster(result: Dict[str, Any], prompt: str, aspect_ratio: str, user=None,
+                          organization=None) -> GeneratedPoster:
+    """
+    Persist a successful AIPosterService result as a GeneratedPoster
+
+    Args:
+        result: Result dict returned by AIPosterService.generate_from_prompt
+        prompt: Original prompt
+        aspect_ratio: Requested aspect ratio
+        user: Poster owner
+        organization: Poster organization
+
+    Returns:
+        The created GeneratedPoster
+    """
+    public_url = result.get('public_url') or result.get('image_url', '')
+
+    poster = GeneratedPoster.objects.create(
+        organization=organization,
+        user=user,
+        image_url=result.get('image_url', ''),
+        image_path=result.get('image_path', ''),
+        public_url=public_url,
+        caption=result.get('caption', ''),
+        full_caption=result.get('full_caption', ''),
+        prompt=prompt,
+        aspect_ratio=result.get('aspect_ratio_final', aspect_ratio),
+        width=result.get('width'),
+        height=result.get('height'),
+        hashtags=result.get('hashtags', []),
+        emoji=result.get('emoji', ''),
+        call_to_action=result.get('call_to_action', ''),
+        branding_applied=result.get('branding_applied', False),
+        logo_added=result.get('logo_added', False),
+        contact_info_added=result.get('contact_info_added', False),
+        branding_metadata=result.get('branding_metadata', {})
+    )
+    apply_published_urls(poster)
+    return poster
+
+
+def apply_published_urls(poster: GeneratedPoster) -> None:
+    """
+    Point a just-created poster at its CDN copy if publishing already finished
+
+    The publisher only updates rows that exist when it records the URLs, so
+    every code path that creates a GeneratedPoster re-reads the record after
+    the create.
+    """
+    published = get_published_urls(poster.image_path)
+    if not published:
+        return
+    poster.public_url = published['public_url']
+    poster.delivery_url = published.get('delivery_url') or ''
+    update_fields = ['public_url', 'delivery_url']
+    if published.get('cdn_url'):
+        poster.image_url = published['cdn_url']
+        update_fields.append('image_url')
+    poster.save(update_fields=update_fields)
+
+
+def _hash_access_token(access_token: str) -> str:
+    """SHA-256 hex digest stored in place of an anonymous job's access token"""
+    return hashlib.sha256(access_token.encode()).hexdigest()
+
+
+def enqueue_poster_job(prompt: str, aspect_ratio: str, user=None,
+                       branding_user=None) -> Tuple[PosterGenerationJob, Optional[str]]:
+    """
+    Create a PosterGenerationJob and dispatch it to the Celery worker pool
+
+    Args:
+        prompt: Poster prompt
+        aspect_ratio: Requested aspect ratio
+        user: Requesting user; owns the job when authenticated
+        branding_user: User whose company profile brands the poster (defaults to the owner)
+
+    Returns:
+        Tuple of (job, access_token). Jobs without an authenticated owner get a
+        random access token that must be presented to poll them; it is None otherwise.
+
+    Raises:
+        Exception: If the broker rejects the task; the job is marked failed first
+    """
+    from .tasks import generate_poster_job
+
+    owner = user if user and getattr(user, 'is_authenticated', False) else None
+    access_token = None if owner else secrets.token_urlsafe(32)
+
+    job = PosterGenerationJob.objects.create(
+        organization=resolve_user_organization(owner),
+        user=owner,
+        branding_user=branding_user or owner,
+        access_token_hash=_hash_access_token(access_token) if access_token else '',
+        prompt=prompt,
+        aspect_ratio=aspect_ratio,
+    )
+
+    try:
+        async_result = generate_poster_job.delay(str(job.id))
+    except Exception as e:
+        logger.error(f"Failed to enqueue poster job {job.id}: {str(e)}")
+        job.mark_failed(f"Could not queue job: {str(e)}")
+        raise
+
+    if async_result is not None and async_result.id:
+        PosterGenerationJob.objects.filter(id=job.id).update(celery_task_id=async_result.id)
+        job.celery_task_id = async_result.id
+
+    logger.info(f"Queued poster job {job.id} (task {job.celery_task_id})")
+    return job, access_token
+
+
+def run_poster_job(job: PosterGenerationJob, poster_service=None) -> PosterGenerationJob:
+    """
+    Run the poster pipeline for a job, persisting progress at every stage
+
+    Args:
+        job: Job to run
+        poster_service: AIPosterService instance (created if not provided)
+
+    Returns:
+        The updated job
+    """
+    if poster_service is None:
+        from .ai_poster_service import AIPosterService
+        poster_service = AIPosterService()
+
+    job.update_stage('starting', 5)
+
+    if not poster_service.is_available():
+        job.mark_failed("AI poster service is not available. Please check configuration.")
+        return job
+
+    try:
+        # The branding user of an anonymous job belongs to someone else, so its
+        # tenant's render cache must not be shared with the requester
+        result = poster_service.generate_from_prompt(
+            job.prompt,
+            job.aspect_ratio,
+            job.branding_user or job.user,
+            progress_callback=job.update_stage,
+            use_cache=job.user_id is not None,
+        )
+    except Exception as e:
+        logger.error(f"Poster job {job.id} crashed: {str(e)}")
+        job.mark_failed(str(e))
+        return job
+
+    if result.get('status') != 'success':
+        job.mark_failed(result.get('message', 'Failed to generate poster'))
+        return job
+
+    job.update_stage('saving', 95)
+    poster = None
+    try:
+        poster = save_generated_poster(
+            result, job.prompt, job.aspect_ratio, job.user, job.organization
+        )
+    except Exception as e:
+        logger.error(f"Failed to save poster for job {job.id}: {str(e)}")
+
+    job.mark_completed(result_data=result, poster=poster)
+    return job
+
+
+def serialize_poster_job(job: PosterGenerationJob) -> Dict[str, Any]:
+    """Build the JSON payload returned by the job status endpoints"""
+    data: Dict[str, Any] = {
+        'job_id': str(job.id),
+        'status': job.status,
+        'stage': job.stage,
+        'progress': job.progress,
+        'stages': job.stage_history,
+        'prompt': job.prompt,
+        'aspect_ratio': job.aspect_ratio,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'completed_at': job.completed_at.isoformat() if job.completed_at else None,
+    }
+
+    if job.status == 'completed':
+        data['poster_id'] = str(job.poster_id) if job.poster_id else None
+        data['result'] = job.result_data
+    elif job.status == 'failed':
+        data['error'] = job.error_message
+
+    return data
+
+
+def get_poster_job(job_id: str, user=None, access_token: Optional[str] = None) -> Optional[PosterGenerationJob]:
+    """
+    Fetch a job visible to the requesting user
+    
+    Args:
+        job_id: Job id
+        user: Requesting user; sees jobs they own or that belong to one of their
+            organizations
+        access_token: Token returned when an anonymous job was queued; the only
+            way to see a job without an owner
+    
+    Returns:
+        The job, or None for unknown, malformed or foreign ids
+    """
+    try:
+        job = PosterGenerationJob.objects.get(id=job_id)
+    except (PosterGenerationJob.DoesNotExist, ValueError, ValidationError):
+        return None
+
+    if access_token and job.access_token_hash and hmac.compare_digest(
+        job.access_token_hash, _hash_access_token(access_token)
+    ):
+        return job
+
+    if user is not None and getattr(user, 'is_authenticated', False):
+        visible = Q(user=user) | Q(organization__members__user=user, organization__members__is_active=True)
+        if PosterGenerationJob.objects.filter(visible, id=job.id).exists():
+            return job
+    return None
@@ -0,0 +1,237 @@
+"""
+Shared rate limiter for AI service endpoints.
+
+Implements GCRA (generic cell rate algorithm), a sliding-window limiter that
+stores a single timestamp (the "theoretical arrival time") per key. The Redis
+backend evaluates every rule for a request in one atomic Lua script, so limits
+are shared by all gunicorn workers; the in-process backend is used when Redis
+is not configured or unreachable.
+"""
+import logging
+import math
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitRule(NamedTuple):
+    """A named limit: at most `limit` requests per `window_seconds`"""
+    name: str
+    limit: int
+    window_seconds: int
+
+
+class RateLimitResult(NamedTuple):
+    """Outcome of a rate limit check"""
+    allowed: bool
+    retry_after: float  # Seconds until the request would be allowed
+    remaining: int  # Requests left in the tightest window
+    rule: Optional[RateLimitRule]  # Rule that rejected the request, if any
+
+
+# Per-endpoint limit table: (path fragment, HTTP method or None for any, rules).
+# The first matching entry wins; override with settings.AI_RATE_LIMITS.
+DEFAULT_RATE_LIMITS: List[Tuple[str, Optional[str], List[Tuple[str, int, int]]]] = [
+    ('/ai/generation-requests/', 'POST', [
+        ('ai_generation', 10, 60),  # 10 requests per minute
+        ('ai_generation_hourly', 100, 3600),  # 100 requests per hour
+    ]),
+    ('/ai/generation-requests/', 'GET', [
+        ('api_read', 100, 60),  # 100 requests per minute
+    ]),
+    ('/ai/templates/', 'POST', [
+        ('template_usage', 20, 60),  # 20 requests per minute
+    ]),
+]
+DEFAULT_RULES: List[Tuple[str, int, int]] = [
+    ('api_general', 60, 60),  # 60 requests per minute
+]
+
+
+def get_rules_for(path: str, method: str) -> List[RateLimitRule]:
+    """Look up the rate limit rules for an endpoint"""
+    table = getattr(settings, 'AI_RATE_LIMITS', None) or DEFAULT_RATE_LIMITS
+    for fragment, rule_method, rules in table:
+        if fragment in path and (rule_method is None or rule_method == method):
+            return [RateLimitRule(*rule) for rule in rules]
+    default_rules = getattr(settings, 'AI_RATE_LIMIT_DEFAULT', None) or DEFAULT_RULES
+    return [RateLimitRule(*rule) for rule in default_rules]
+
+
+def _emission_interval_ms(rule: RateLimitRule) -> int:
+    return max(1, (rule.window_seconds * 1000) // max(1, rule.limit))
+
+
+class LocalRateLimiter:
+    """In-process GCRA limiter; one float per key, expired keys pruned lazily"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._tats: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def hit(self, keys: Sequence[str], rules: Sequence[RateLimitRule]) -> RateLimitResult:
+        """Count one request against every key if all rules allow it"""
+        now = time.time() * 1000
+        retry_after = 0.0
+        remaining = None
+        denied_rule = None
+        new_tats = []
+
+        with self._lock:
+            for key, rule in zip(keys, rules):
+                interval = _emission_interval_ms(rule)
+                tat = max(self._tats.get(key, now), now)
+                new_tat = tat + interval
+                allow_at = new_tat - interval * rule.limit
+
+                if now < allow_at:
+                    if allow_at - now > retry_after:
+                        retry_after = allow_at - now
+                        denied_rule = rule
+                else:
+                    new_tats.append((key, new_tat))
+                    left = int((now - allow_at) // interval)
+                    remaining = left if remaining is None else min(remaining, left)
+
+            if denied_rule is not None:
+                return RateLimitResult(False, retry_after / 1000, 0, denied_rule)
+
+            if len(self._tats) >= self.max_keys:
+                self._prune(now)
+            for key, new_tat in new_tats:
+                self._tats[key] = new_tat
+
+        return RateLimitResult(True, 0.0, remaining or 0, None)
+
+    def _prune(self, now: float) -> None:
+        """Drop keys whose theoretical arrival time has passed (they are at full capacity)"""
+        expired = [key for key, tat in self._tats.items() if tat <= now]
+        for key in expired:
+            del self._tats[key]
+
+
+# KEYS: one per rule. ARGV: (limit, emission interval ms) per key.
+# Returns {allowed, retry_after_ms, remaining, denied_rule_index (1-based, 0 if allowed)}.
+GCRA_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local retry_after = 0
+local denied = 0
+local remaining = -1
+local new_tats = {}
+
+for i = 1, #KEYS do
+    local limit = tonumber(ARGV[2 * i - 1])
+    local interval = tonumber(ARGV[2 * i])
+    local tat = tonumber(redis.call('GET', KEYS[i]) or now)
+    if tat < now then
+        tat = now
+    end
+    local new_tat = tat + interval
+    local allow_at = new_tat - interval * limit
+    if now < allow_at then
+        if allow_at - now > retry_after then
+            retry_after = allow_at - now
+            denied = i
+        end
+    else
+        new_tats[i] = new_tat
+        local left = math.floor((now - allow_at) / interval)
+        if remaining < 0 or left < remaining then
+            remaining = left
+        end
+    end
+end
+
+if denied > 0 then
+    return {0, retry_after, 0, denied}
+end
+
+for i = 1, #KEYS do
+    redis.call('SET', KEYS[i], string.format('%d', new_tats[i]), 'PX', new_tats[i] - now)
+end
+return {1, 0, remaining, 0}
+"""
+
+
+class RedisRateLimiter:
+    """
+    GCRA limiter shared across processes through Redis.
+
+    Falls back to a LocalRateLimiter while Redis is unreachable and retries
+    Redis after `retry_interval` seconds.
+    """
+
+    def __init__(self, client, key_prefix: str = 'ratelimit', fallback: Optional[LocalRateLimiter] = None,
+                 retry_interval: float = 30.0):
+        self.client = client
+        self.key_prefix = key_prefix
+        self.fallback = fallback or LocalRateLimiter()
+        self.retry_interval = retry_interval
+        self._script = client.register_script(GCRA_LUA)
+        self._redis_down_until = 0.0
+
+    def hit(self, keys: Sequence[str], rules: Sequence[RateLimitRule]) -> RateLimitResult:
+        """Count one request against every key if all rules allow it"""
+        if time.monotonic() < self._redis_down_until:
+            return self.fallback.hit(keys, rules)
+
+        args = []
+        for rule in rules:
+            args.extend([rule.limit, _emission_interval_ms(rule)])
+
+        try:
+            allowed, retry_after_ms, remaining, denied = self._script(
+                keys=[f"{self.key_prefix}:{key}" for key in keys], args=args
+            )
+        except Exception as e:
+            logger.warning(f"Redis rate limiter unavailable, using in-process fallback: {str(e)}")
+            self._redis_down_until = time.monotonic() + self.retry_interval
+            return self.fallback.hit(keys, rules)
+
+        if allowed:
+            return RateLimitResult(True, 0.0, int(remaining), None)
+        return RateLimitResult(False, int(retry_after_ms) / 1000, 0, rules[int(denied) - 1])
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Return the process-wide limiter configured by RATE_LIMIT_BACKEND"""
+    global _rate_limiter
+    if _rate_limiter is not None:
+        return _rate_limiter
+
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            backend = getattr(settings, 'RATE_LIMIT_BACKEND', 'redis')
+            redis_url = getattr(settings, 'RATE_LIMIT_REDIS_URL', None) or getattr(settings, 'REDIS_URL', None)
+            limiter = None
+
+            if backend == 'redis' and redis_url:
+                try:
+                    import redis
+                    client = redis.Redis.from_url(
+                        redis_url,
+                        socket_connect_timeout=0.1,
+                        socket_timeout=0.1,
+                    )
+                    limiter = RedisRateLimiter(client)
+                except Exception as e:
+                    logger.warning(f"Could not initialize Redis rate limiter: {str(e)}")
+
+            _rate_limiter = limiter or LocalRateLimiter()
+
+    return _rate_limiter
+
+
+def retry_after_header(result: RateLimitResult) -> str:
+    """Format a Retry-After header value (whole seconds, at least 1)"""
+    return str(max(1, int(math.ceil(result.retry_after))))
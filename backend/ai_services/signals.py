@@ -0,0 +1,31 @@
+"""
+Signal handlers for ai_services.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import invalidate_provider_cache
+from .models import AIProvider, FabricAnalysisResult, GeneratedPoster
+from .poster_history import invalidate_poster_history
+
+
+@receiver(post_save, sender=GeneratedPoster)
+@receiver(post_delete, sender=GeneratedPoster)
+def invalidate_cached_poster_history(sender, instance, **kwargs):
+    """Drop the cached first history pages that can list this poster"""
+    invalidate_poster_history(instance.organization_id, instance.user_id)
+
+
+@receiver(post_save, sender=AIProvider)
+@receiver(post_delete, sender=AIProvider)
+def invalidate_cached_provider(sender, instance, **kwargs):
+    """Make admin edits to a provider visible to every process sharing the cache"""
+    invalidate_provider_cache(instance.name)
+
+
+@receiver(post_delete, sender=FabricAnalysisResult)
+def invalidate_palette_index_on_delete(sender, instance, **kwargs):
+    """Stop serving a deleted analysis from its tenant's in-process palette index"""
+    # Imported lazily: the index pulls in scipy and the fabric analyzer
+    from .palette_index import invalidate_palette_index
+    invalidate_palette_index(instance.organization_id)
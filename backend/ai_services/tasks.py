@@ -0,0 +1,38 @@
+"""
+Celery tasks for AI services
+"""
+import logging
+
+from celery import shared_task
+
+from .models import PosterGenerationJob
+from .poster_jobs import run_poster_job
+
+logger = logging.getLogger(__name__)
+
+# One AIPosterService per worker process; the Gemini client is reused across tasks
+_poster_service = None
+
+
+def _get_poster_service():
+    global _poster_service
+    if _poster_service is None:
+        from .ai_poster_service import AIPosterService
+        _poster_service = AIPosterService()
+    return _poster_service
+
+
+@shared_task(bind=True, ignore_result=True, acks_late=True)
+def generate_poster_job(self, job_id: str):
+    """Run a queued PosterGenerationJob"""
+    try:
+        job = PosterGenerationJob.objects.select_related('user', 'branding_user', 'organization').get(id=job_id)
+    except PosterGenerationJob.DoesNotExist:
+        logger.error(f"Poster job {job_id} not found")
+        return
+
+    if job.is_finished:
+        logger.info(f"Poster job {job_id} already {job.status}; skipping")
+        return
+
+    run_poster_job(job, _get_poster_service())
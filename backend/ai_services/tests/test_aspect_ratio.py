@@ -0,0 +1,105 @@
+"""
+Unit tests for the local aspect-ratio engine
+"""
+import shutil
+import tempfile
+from unittest import mock
+
+import numpy as np
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from google import genai
+from PIL import Image, ImageDraw
+
+from ai_services.ai_poster_service import AIPosterService
+from ai_services.aspect_ratio import best_crop, correct_aspect_ratio, pad_to_ratio
+from ai_services.gemini_client import GeminiGateway, TokenBucket
+from frameio_backend.testing import FakeGeminiServer
+
+
+def poster(box, size=(1024, 1024), noise=0):
+    """A flat background with one subject inside `box`"""
+    image = Image.new('RGB', size, (240, 230, 220))
+    ImageDraw.Draw(image).ellipse(box, fill=(150, 20, 60))
+    if noise:
+        pixels = np.asarray(image).astype(int) + np.random.default_rng(0).integers(-noise, noise, (size[1], size[0], 3))
+        image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    return image
+
+
+class AspectRatioEngineTestCase(SimpleTestCase):
+    """Test cases for energy-guided cropping and edge padding"""
+
+    def test_crop_follows_the_subject(self):
+        correction = best_crop(poster((650, 300, 1000, 700)), 0.8)
+
+        self.assertEqual(correction.image.size, (819, 1024))
+        self.assertGreater(correction.quality, 0.99)
+        # The subject's right edge is still inside the crop
+        right = np.asarray(correction.image)[500, -40]
+        self.assertEqual(tuple(right), (150, 20, 60))
+
+    def test_wide_subject_is_padded(self):
+        image = poster((20, 400, 1004, 600))
+        correction = correct_aspect_ratio(image, 0.8)
+
+        self.assertEqual(correction.method, 'pad')
+        self.assertEqual(correction.image.size, (1024, 1280))
+        self.assertGreater(correction.quality, 0.9)
+        self.assertEqual(np.asarray(correction.image)[128:1152].tobytes(), np.asarray(image).tobytes())
+
+    def test_busy_edges_score_low(self):
+        image = poster((100, 100, 900, 900), noise=60)
+        self.assertLess(pad_to_ratio(image, 16 / 9).quality, 0.85)
+        self.assertLess(correct_aspect_ratio(image, 16 / 9).quality, 0.85)
+
+    def test_matching_ratio_is_unchanged(self):
+        image = poster((300, 300, 700, 700))
+        correction = correct_aspect_ratio(image, 1.0)
+        self.assertEqual((correction.method, correction.quality), ('none', 1.0))
+        self.assertIs(correction.image, image)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class LocalCorrectionBeforeRegenerationTestCase(TestCase):
+    """Test cases for skipping Gemini re-generations when the local correction is good enough"""
+
+    def setUp(self):
+        cache.clear()
+        # Generated posters are stored under MEDIA_ROOT; keep them out of the repository
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.server = FakeGeminiServer(image_size=(1024, 1024)).start()
+        self.addCleanup(self.server.stop)
+        client = genai.Client(api_key='test', http_options={'base_url': self.server.base_url})
+        gateway = GeminiGateway(bucket=TokenBucket(rate=1000, capacity=1000), retry_delay_base=0)
+
+        self.service = AIPosterService()
+        self.service.client = client
+        self.service.gemini = gateway
+        self.service.caption_service.client = None
+
+        patcher = mock.patch('ai_services.ai_poster_service.get_poster_publisher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def image_requests(self):
+        return [path for path in self.server.requests if 'flash-image' in path]
+
+    def test_square_image_is_cropped_locally(self):
+        result = self.service.generate_from_prompt('Silk saree', '4:5', use_cache=False)
+
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['aspect_ratio_final'], '1080:1350')
+        self.assertEqual(len(self.image_requests()), 1)
+
+    @override_settings(POSTER_LOCAL_AR_MIN_QUALITY=1.1)
+    def test_low_quality_falls_back_to_regeneration(self):
+        result = self.service.generate_from_prompt('Silk saree', '4:5', use_cache=False)
+
+        self.assertEqual(result['status'], 'success')
+        self.assertGreater(len(self.image_requests()), 1)
@@ -0,0 +1,98 @@
+"""
+Unit tests for BrandOverlayService._trim_uniform_borders
+"""
+import numpy as np
+from django.test import SimpleTestCase
+from PIL import Image
+
+from ai_services.brand_overlay_service import BrandOverlayService
+
+
+def reference_trim_box(image, threshold=245, max_border_ratio=0.2):
+    """Per-pixel scan the service used before vectorization; None means no crop"""
+    img = image if image.mode == 'RGBA' else image.convert('RGBA')
+    width, height = img.size
+    pixels = img.load()
+
+    def is_bg(px):
+        r, g, b, a = px
+        return a < 5 or (r >= threshold and g >= threshold and b >= threshold)
+
+    top = 0
+    while top < height and all(is_bg(pixels[x, top]) for x in range(width)):
+        top += 1
+    bottom = height - 1
+    while bottom >= 0 and all(is_bg(pixels[x, bottom]) for x in range(width)):
+        bottom -= 1
+    left = 0
+    while left < width and all(is_bg(pixels[left, y]) for y in range(height)):
+        left += 1
+    right = width - 1
+    while right >= 0 and all(is_bg(pixels[right, y]) for y in range(height)):
+        right -= 1
+
+    if left == 0 and top == 0 and right == width - 1 and bottom == height - 1:
+        return None
+    if (
+        left / width > max_border_ratio or
+        top / height > max_border_ratio or
+        (width - 1 - right) / width > max_border_ratio or
+        (height - 1 - bottom) / height > max_border_ratio or
+        right <= left or bottom <= top
+    ):
+        return None
+    return (left, top, right + 1, bottom + 1)
+
+
+class TrimUniformBordersTestCase(SimpleTestCase):
+    """The vectorized trim must pick the same crop box as the per-pixel scan"""
+
+    def setUp(self):
+        self.service = BrandOverlayService()
+        self.rng = np.random.default_rng(1)
+
+    def poster(self, box, size=(120, 150), background=250, mode='RGBA'):
+        width, height = size
+        pixels = np.full((height, width, 4), background, dtype=np.uint8)
+        left, top, right, bottom = box
+        pixels[top:bottom, left:right, :3] = self.rng.integers(0, 240, size=(bottom - top, right - left, 3))
+        pixels[top:bottom, left:right, 3] = 255
+        return Image.fromarray(pixels).convert(mode)
+
+    def assert_same_crop(self, image):
+        expected_box = reference_trim_box(image)
+        trimmed = self.service._trim_uniform_borders(image)
+
+        if expected_box is None:
+            self.assertIs(trimmed, image)
+        else:
+            expected = image.convert('RGBA').crop(expected_box)
+            self.assertEqual(trimmed.size, expected.size)
+            np.testing.assert_array_equal(np.asarray(trimmed), np.asarray(expected))
+
+    def test_matches_reference(self):
+        cases = [
+            (10, 12, 110, 140),  # framed on every side
+            (0, 0, 120, 150),    # no border
+            (0, 5, 120, 150),    # top border only
+            (30, 5, 100, 140),   # left border above max_border_ratio
+            (3, 3, 5, 148),      # content narrower than two columns after trim
+        ]
+        for box in cases:
+            for mode in ('RGBA', 'RGB'):
+                with self.subTest(box=box, mode=mode):
+                    self.assert_same_crop(self.poster(box, mode=mode))
+
+    def test_transparent_border_is_background(self):
+        image = self.poster((8, 8, 112, 142), background=0)
+        self.assert_same_crop(image)
+        self.assertEqual(self.service._trim_uniform_borders(image).size, (104, 134))
+
+    def test_threshold_boundary(self):
+        for background in (244, 245):
+            with self.subTest(background=background):
+                self.assert_same_crop(self.poster((6, 6, 114, 144), background=background))
+
+    def test_blank_image_is_unchanged(self):
+        image = Image.new('RGB', (64, 64), (255, 255, 255))
+        self.assertIs(self.service._trim_uniform_borders(image), image)
@@ -0,0 +1,152 @@
+"""
+Unit tests for the pipelined BrandingKitService and its vectorized palette extraction
+"""
+import base64
+import threading
+import time
+from io import BytesIO
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase, TestCase
+from PIL import Image, ImageDraw
+from rest_framework.test import APIClient
+
+from ai_services.branding_kit_service import BrandingKitService
+
+
+def make_logo(colors, size=(240, 240), fmt='PNG'):
+    """Vertical stripes of the given colors on a white background"""
+    image = Image.new('RGB', size, 'white')
+    draw = ImageDraw.Draw(image)
+    stripe = (size[0] - 80) // len(colors)
+    for i, color in enumerate(colors):
+        draw.rectangle([40 + i * stripe, 60, 40 + (i + 1) * stripe - 1, size[1] - 60], fill=color)
+    buffer = BytesIO()
+    image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def legacy_palette(image, num_colors):
+    """The per-color loop _extract_palette_image used before vectorization (RGB distance dedup)"""
+    import colorsys
+
+    scale = min(1.0, 256 / max(image.size))
+    small = image.resize((int(image.width * scale), int(image.height * scale)), Image.LANCZOS) if scale < 1 else image
+    small = small.convert('RGBA')
+    opaque = Image.alpha_composite(Image.new('RGBA', small.size, (255, 255, 255, 255)), small)
+    quantized = opaque.convert('RGB').convert('P', palette=Image.ADAPTIVE, colors=128)
+    palette = quantized.getpalette()
+    index_to_rgb = [tuple(palette[i:i + 3]) for i in range(0, len(palette), 3)]
+    freq_by_rgb = {}
+    for count, idx in quantized.getcolors() or []:
+        freq_by_rgb[index_to_rgb[idx]] = freq_by_rgb.get(index_to_rgb[idx], 0) + count
+    sorted_rgbs = sorted(freq_by_rgb.items(), key=lambda x: x[1], reverse=True)
+
+    filtered = []
+    for (r, g, b), count in sorted_rgbs:
+        if (r >= 240 and g >= 240 and b >= 240) or (r <= 20 and g <= 20 and b <= 20):
+            continue
+        near_gray = abs(r - g) < 15 and abs(r - b) < 15 and abs(g - b) < 15
+        if near_gray and colorsys.rgb_to_hsv(r / 255, g / 255, b / 255)[1] < 0.08:
+            continue
+        filtered.append(((r, g, b), count))
+    deduped = []
+    for rgb, count in filtered:
+        if not any(sum((a - b) ** 2 for a, b in zip(rgb, kept)) ** 0.5 < 35 for kept, _ in deduped):
+            deduped.append((rgb, count))
+    return [f"#{r:02x}{g:02x}{b:02x}" for (r, g, b), _ in deduped[:num_colors]]
+
+
+class FakeModels:
+    """Stands in for client.models; records how many calls overlap"""
+
+    def __init__(self, image_bytes, delay=0.0):
+        self.image_bytes = image_bytes
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def generate_content(self, model, contents):
+        with self.lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        part = SimpleNamespace(inline_data=SimpleNamespace(data=self.image_bytes))
+        return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+
+class BrandingKitServiceTestCase(SimpleTestCase):
+    """Test cases for palette extraction and the logo/palette pipeline"""
+
+    def setUp(self):
+        self.service = BrandingKitService()
+
+    def use_fake_client(self, image_bytes, delay=0.0):
+        models = FakeModels(image_bytes, delay)
+        self.service.client = SimpleNamespace(models=models)
+        return models
+
+    def test_distinct_colors_match_legacy_extraction(self):
+        logo = Image.open(BytesIO(make_logo(['#c0392b', '#2471a3', '#27ae60', '#f1c40f'])))
+        hex_colors, swatch = self.service._extract_palette_image(logo, 5)
+
+        self.assertEqual(hex_colors, legacy_palette(logo, 5))
+        self.assertEqual(len(hex_colors), 4)
+        self.assertTrue(all(color.startswith('#') and len(color) == 7 for color in hex_colors))
+        self.assertEqual(swatch.size, (120 * 4, 120))
+
+    def test_perceptually_similar_shades_are_merged(self):
+        # Far apart in RGB (distance 65) but only ~7 CIEDE2000 apart
+        logo = Image.open(BytesIO(make_logo(['#ffff00', '#ffe63c', '#2471a3'])))
+        hex_colors, _ = self.service._extract_palette_image(logo, 5)
+
+        self.assertEqual(len(legacy_palette(logo, 5)), 3)
+        self.assertEqual(len(hex_colors), 2)
+        self.assertIn('#2471a3', hex_colors)
+
+    def test_generate_branding_kit_pipeline(self):
+        logo_bytes = make_logo(['#c0392b', '#2471a3'])
+        self.use_fake_client(logo_bytes)
+
+        result = self.service.generate_branding_kit('Handloom brand', 'modern')
+
+        self.assertTrue(result['success'])
+        kit = result['branding_kit']
+        # PNG output from the model is passed through without re-encoding
+        self.assertEqual(base64.b64decode(kit['logo']['data']), logo_bytes)
+        self.assertEqual(kit['color_palette']['width'], 1024)
+        self.assertEqual(result['used_colors'], kit['color_palette']['colors'])
+        self.assertEqual(result['used_colors'], ['#c0392b', '#2471a3'])
+
+    def test_jpeg_logo_is_returned_as_png(self):
+        self.use_fake_client(make_logo(['#c0392b'], fmt='JPEG'))
+        result = self.service.generate_logo('Handloom brand')
+        self.assertEqual(base64.b64decode(result['logo']['data'])[:4], b'\x89PNG')
+
+    def test_variants_run_concurrently_with_bound(self):
+        models = self.use_fake_client(make_logo(['#c0392b', '#2471a3']), delay=0.05)
+
+        styles = ['modern', 'vintage', 'minimalist', 'bold', 'playful']
+        results = self.service.generate_branding_kit_variants('Handloom brand', styles, max_concurrency=2)
+
+        self.assertEqual([result['style'] for result in results], styles)
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertEqual(models.calls, 5)
+        self.assertEqual(models.max_active, 2)
+
+
+class GenerateBrandingKitViewTestCase(TestCase):
+    """Test cases for validating the styles of a variant request"""
+
+    def test_styles_must_be_style_names(self):
+        client = APIClient()
+        for styles in ([], ['modern'] * 7, 'modern', ['modern', 3], ['modern', {'name': 'bold'}], ['  ']):
+            with self.subTest(styles=styles):
+                response = client.post('/api/ai/branding-kit/generate/',
+                                       {'prompt': 'Handloom brand', 'styles': styles}, format='json')
+                self.assertEqual(response.status_code, 400)
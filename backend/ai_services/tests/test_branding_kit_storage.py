@@ -0,0 +1,178 @@
+"""
+Unit tests for branding kit image storage and the slimmed-down list endpoint
+"""
+import base64
+import importlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from ai_services.branding_kit_storage import offload_branding_kit_images
+from ai_services.models import GeneratedBrandingKit
+
+User = get_user_model()
+
+offload_migration = importlib.import_module('ai_services.migrations.0010_offload_branding_kit_images')
+
+
+def kit_queries(queries):
+    return [
+        query['sql'] for query in queries.captured_queries
+        if 'FROM "ai_services_generatedbrandingkit"' in query['sql']
+    ]
+
+
+def make_png_base64(size=(600, 600), color=(30, 90, 160, 255)):
+    buffer = BytesIO()
+    Image.new('RGBA', size, color).save(buffer, format='PNG')
+    return base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+class BrandingKitStorageTestCase(TestCase):
+    """Test cases for offloading, the data migration and list/detail payloads"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, DOMAIN_URL='https://frameio.test', DEBUG=False
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='brand', email='brand@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def make_kit(self, offload=True, minutes_ago=0, **fields):
+        kit = GeneratedBrandingKit(
+            user=self.user,
+            prompt='Handloom saree brand',
+            logo_data=make_png_base64(),
+            color_palette_data=make_png_base64((400, 100)),
+            colors=['#1E5AA0'],
+            **fields
+        )
+        if offload:
+            offload_branding_kit_images(kit)
+        kit.save()
+        if minutes_ago:
+            GeneratedBrandingKit.objects.filter(pk=kit.pk).update(
+                created_at=timezone.now() - timedelta(minutes=minutes_ago)
+            )
+        return kit
+
+    def test_offload_stores_image_and_thumbnail(self):
+        kit = self.make_kit()
+        kit.refresh_from_db()
+
+        self.assertEqual(kit.logo_data, '')
+        self.assertEqual(kit.color_palette_data, '')
+        self.assertTrue(kit.logo_url.startswith('https://frameio.test/media/branding_kits/'))
+        self.assertTrue(default_storage.exists(kit.logo_path))
+
+        thumbnail_path = kit.logo_thumbnail_url.split('/media/', 1)[1]
+        with default_storage.open(thumbnail_path) as thumbnail_file:
+            self.assertEqual(Image.open(thumbnail_file).size, (256, 256))
+
+    def test_generate_saves_urls_not_blobs(self):
+        result = {
+            'success': True,
+            'branding_kit': {
+                'logo': {'data': make_png_base64(), 'format': 'png'},
+                'color_palette': {'data': make_png_base64((400, 100)), 'format': 'png'},
+            },
+            'used_colors': ['#1E5AA0'],
+        }
+        with mock.patch('ai_services.branding_kit_views.branding_kit_service') as service:
+            service.is_available.return_value = True
+            service.generate_branding_kit.return_value = result
+            response = self.client.post('/api/ai/branding-kit/generate/', {'prompt': 'Batik studio'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        kit = GeneratedBrandingKit.objects.get()
+        self.assertEqual((kit.logo_data, kit.color_palette_data), ('', ''))
+        self.assertTrue(kit.logo_url and kit.color_palette_thumbnail_url)
+
+    def test_list_uses_keyset_pages_without_blobs(self):
+        kits = [self.make_kit(minutes_ago=minutes) for minutes in range(5, 0, -1)]
+
+        seen = []
+        cursor = None
+        for page in range(3):
+            params = {'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/api/ai/branding-kit/history/', params)
+            # The total count on the first page, then one query per page
+            self.assertEqual(len(kit_queries(queries)), 1 if cursor else 2)
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            seen += [item['id'] for item in body['results']]
+            for item in body['results']:
+                self.assertNotIn('data', item['logo'])
+                self.assertTrue(item['logo']['thumbnail_url'].endswith('logo_thumb.png'))
+            cursor = body['next_cursor']
+
+        self.assertIsNone(cursor)
+        self.assertEqual(seen, [str(kit.id) for kit in reversed(kits)])
+
+    def test_list_query_skips_legacy_columns(self):
+        self.make_kit()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/ai/branding-kit/history/')
+        self.assertNotIn('logo_data', kit_queries(queries)[-1])
+
+    def test_legacy_rows_keep_inline_data(self):
+        legacy = self.make_kit(offload=False)
+        self.make_kit()
+
+        response = self.client.get('/api/ai/branding-kit/history/')
+        results = {item['id']: item for item in response.json()['results']}
+        self.assertEqual(results[str(legacy.id)]['logo']['data'], legacy.logo_data)
+
+        detail = self.client.get(f'/api/ai/branding-kit/{legacy.id}/').json()['branding_kit']
+        self.assertEqual(detail['color_palette']['data'], legacy.color_palette_data)
+
+    def test_data_migration_offloads_in_batches(self):
+        legacy = [self.make_kit(offload=False) for _ in range(3)]
+
+        with mock.patch.object(offload_migration, 'BATCH_SIZE', 2), CaptureQueriesContext(connection) as queries:
+            offload_migration.offload_images(apps, None)
+
+        # Two batches plus the empty one that ends the scan; no per-row deferred field loads
+        selects = [sql for sql in kit_queries(queries) if sql.startswith('SELECT')]
+        self.assertEqual(len(selects), 3)
+
+        for kit in legacy:
+            kit.refresh_from_db()
+            self.assertEqual(kit.logo_data, '')
+            self.assertTrue(default_storage.exists(kit.color_palette_path))
+
+        with mock.patch.object(offload_migration, 'BATCH_SIZE', 2):
+            offload_migration.inline_images(apps, None)
+        legacy[0].refresh_from_db()
+        self.assertEqual(base64.b64decode(legacy[0].logo_data)[:4], b'\x89PNG')
+
+    def test_delete_removes_stored_images(self):
+        kit = self.make_kit()
+        folder = os.path.join(self.media_root, 'branding_kits', str(kit.id))
+        self.assertTrue(os.path.isdir(folder))
+
+        response = self.client.delete(f'/api/ai/branding-kit/{kit.id}/delete/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(os.listdir(folder), [])
@@ -0,0 +1,72 @@
+"""
+Unit tests for batched color math
+"""
+import colorsys
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from ai_services import color_math, color_quantizer
+from ai_services.color_matching import SmartColorMatcher
+
+
+class ColorMathTestCase(SimpleTestCase):
+    """Test cases for vectorized conversions, color names and harmony sets"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.colors = rng.integers(0, 256, size=(500, 3))
+        self.colors[:3] = [[0, 0, 0], [255, 255, 255], [128, 128, 128]]
+        self.matcher = SmartColorMatcher()
+
+    def test_describe_colors_reference_values(self):
+        described = color_math.describe_colors([[255, 0, 0], [0, 128, 128], [75, 0, 130], [128, 128, 128]])
+
+        self.assertEqual(described['hex'], ['#ff0000', '#008080', '#4b0082', '#808080'])
+        self.assertEqual(described['name'], ['Red', 'Teal', 'Indigo', 'Gray'])
+        np.testing.assert_array_equal(described['lab'], [[136, 208, 195], [123, 99, 119], [53, 179, 75], [137, 128, 128]])
+        np.testing.assert_allclose(described['hsv'], [[0, 100, 100], [180, 100, 50.1961], [274.6154, 100, 50.9804],
+                                                      [0, 0, 50.1961]], atol=1e-3)
+        np.testing.assert_allclose(described['hsl'], [[0, 100, 50], [180, 100, 25.0980], [274.6154, 100, 25.4902],
+                                                      [0, 0, 50.1961]], atol=1e-3)
+
+        # Hex strings stay aligned with their colors across a larger batch
+        self.assertEqual(color_math.describe_colors(self.colors)['hex'], [f"#{r:02x}{g:02x}{b:02x}" for r, g, b in self.colors])
+
+    def test_names_are_nearest_table_entry(self):
+        names = color_math.describe_colors(self.colors)['name']
+
+        table_lab = color_quantizer.rgb_to_cielab([rgb for _, rgb in color_math.COLOR_NAME_TABLE])
+        distances = np.linalg.norm(color_quantizer.rgb_to_cielab(self.colors)[:, None] - table_lab[None], axis=2)
+        expected = [color_math.COLOR_NAME_TABLE[index][0] for index in distances.argmin(axis=1)]
+        self.assertEqual(names, expected)
+
+        # Table colors name themselves, and the per-color helper uses the same index
+        for name, rgb in color_math.COLOR_NAME_TABLE:
+            self.assertEqual(self.matcher._get_color_name(np.array(rgb)), name)
+        self.assertEqual(self.matcher._get_color_name(np.array([20, 30, 110])), 'Indigo')
+
+    def test_hsv_to_rgb_matches_colorsys(self):
+        hsv = color_quantizer.rgb_to_hsv(self.colors)
+        hsv[:, 0] = (hsv[:, 0] + 137.5) % 360
+
+        expected = [[int(c * 255) for c in colorsys.hsv_to_rgb(h / 360, s / 100, v / 100)] for h, s, v in hsv]
+        np.testing.assert_array_equal(color_math.hsv_to_rgb(hsv), expected)
+
+    def test_harmony_sets(self):
+        color = {'hsv': [200.0, 90.0, 80.0], 'name': 'Sky Blue', 'rgb': [20, 150, 204], 'percentage': 40}
+        described = color_math.describe_colors([color['rgb']] * 2, harmonies=color_math.HARMONIES)
+
+        for harmony, spec in color_math.HARMONIES.items():
+            self.assertEqual(described['harmonies'][harmony]['rgb'].shape, (2, len(spec['hue_offsets']), 3))
+            self.assertEqual(len(described['harmonies'][harmony]['hex'][1]), len(spec['hue_offsets']))
+
+        complementary = self.matcher._get_complementary_colors(color)
+        self.assertEqual([c['hsv'] for c in complementary], [[20.0, 72.0, 56.0], [20.0, 72.0, 72.0], [20.0, 72.0, 88.0]])
+        self.assertEqual(complementary[0]['rgb'], [int(c * 255) for c in colorsys.hsv_to_rgb(20 / 360, 0.72, 0.56)])
+        self.assertEqual(complementary[0]['name'], 'Complementary Sky Blue')
+
+        suggestions = self.matcher.suggest_color_adjustments([color, {**color, 'hsv': [350.0, 50.0, 50.0]}], 'analogous')
+        self.assertEqual([c['hsv'][0] for c in suggestions[1]['suggested_colors']], [320.0, 335.0, 5.0, 20.0])
+        self.assertEqual({c['relationship'] for c in suggestions[0]['suggested_colors']}, {'analogous'})
+        self.assertEqual(suggestions[0]['suggested_colors'], self.matcher._get_analogous_colors(color))
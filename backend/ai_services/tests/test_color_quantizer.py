@@ -0,0 +1,96 @@
+"""
+Unit tests for the color quantizer backends and batched color conversions
+"""
+import colorsys
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from ai_services import color_quantizer
+from ai_services.color_matching import SmartColorMatcher
+
+# sRGB colors with their CIELAB (D65), HSV and HSL values (H in degrees, the rest in percent)
+REFERENCE_COLORS = [
+    ((255, 0, 0), (53.2408, 80.0925, 67.2032), (0.0, 100.0, 100.0), (0.0, 100.0, 50.0)),
+    ((0, 255, 0), (87.7347, -86.1827, 83.1793), (120.0, 100.0, 100.0), (120.0, 100.0, 50.0)),
+    ((0, 0, 255), (32.2970, 79.1875, -107.8602), (240.0, 100.0, 100.0), (240.0, 100.0, 50.0)),
+    ((255, 255, 255), (100.0, 0.0, 0.0), (0.0, 0.0, 100.0), (0.0, 0.0, 100.0)),
+    ((0, 0, 0), (0.0, 0.0, 0.0), (0.0, 0.0, 0.0), (0.0, 0.0, 0.0)),
+    ((128, 128, 128), (53.5850, 0.0, 0.0), (0.0, 0.0, 50.1961), (0.0, 0.0, 50.1961)),
+    ((255, 165, 0), (74.9357, 23.9332, 78.9498), (38.8235, 100.0, 100.0), (38.8235, 100.0, 50.0)),
+    ((0, 128, 128), (48.2541, -28.8463, -8.4769), (180.0, 100.0, 50.1961), (180.0, 100.0, 25.0980)),
+]
+
+
+class ColorQuantizerTestCase(SimpleTestCase):
+    """Test cases for quantizer backends and vectorized conversions"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.colors = rng.integers(0, 256, size=(200, 3))
+        self.colors[:3] = [[0, 0, 0], [255, 255, 255], [128, 128, 128]]
+
+    def test_conversions_match_reference_values(self):
+        rgb, cielab, hsv, hsl = (np.array(values, dtype=np.float64) for values in zip(*REFERENCE_COLORS))
+
+        np.testing.assert_allclose(color_quantizer.rgb_to_cielab(rgb), cielab, atol=1e-3)
+        np.testing.assert_allclose(color_quantizer.rgb_to_hsv(rgb), hsv, atol=1e-3)
+        np.testing.assert_allclose(color_quantizer.rgb_to_hsl(rgb), hsl, atol=1e-3)
+
+        # OpenCV 8-bit LAB: L scaled to 0-255, a and b offset by 128
+        opencv_lab = cielab * [255 / 100, 1, 1] + [0, 128, 128]
+        np.testing.assert_allclose(color_quantizer.rgb_to_lab(rgb), opencv_lab, atol=1)
+        np.testing.assert_array_equal(color_quantizer.rgb_to_lab([[255, 255, 255], [0, 0, 0]]),
+                                      [[255, 128, 128], [0, 128, 128]])
+
+    def test_hsv_matches_colorsys(self):
+        hsv = color_quantizer.rgb_to_hsv(self.colors)
+        for color, converted in zip(self.colors, hsv):
+            expected = colorsys.rgb_to_hsv(*(color / 255.0))
+            np.testing.assert_allclose(converted, [expected[0] * 360, expected[1] * 100, expected[2] * 100])
+
+    def test_backends_recover_solid_blocks(self):
+        blocks = np.array([[200, 30, 30], [30, 30, 200], [240, 240, 240]])
+        shares = [5000, 3000, 2000]
+        pixels = np.repeat(blocks, shares, axis=0).astype(np.uint8)
+
+        for backend in color_quantizer.QUANTIZER_BACKENDS:
+            with self.subTest(backend=backend):
+                centers, percentages = color_quantizer.quantize_colors(pixels, 3, backend)
+                self.assertAlmostEqual(float(percentages.sum()), 100.0, places=6)
+
+                order = np.argsort(-percentages)
+                np.testing.assert_allclose(centers[order], blocks, atol=4)
+                np.testing.assert_allclose(percentages[order], [50, 30, 20], atol=0.01)
+
+    def test_palettes_default_to_kmeans(self):
+        pixels = self.colors.astype(np.uint8)
+        with mock.patch.object(color_quantizer, 'quantize_colors', wraps=color_quantizer.quantize_colors) as quantize:
+            palette = SmartColorMatcher().palette_from_pixels(pixels, 4)
+
+        self.assertEqual(quantize.call_args[0][2], 'kmeans')
+        centers, _ = color_quantizer.kmeans_quantize(pixels, 4)
+        self.assertCountEqual([color['rgb'] for color in palette],
+                              np.clip(centers, 0, 255).astype(int).tolist())
+
+    def test_unknown_backend(self):
+        pixels = np.zeros((10, 3), dtype=np.uint8)
+        with self.assertRaises(ValueError):
+            color_quantizer.quantize_colors(pixels, 2, 'octree')
+
+    def test_ciede2000_matches_reference_pairs(self):
+        # Sharma, Wu & Dalal (2005) CIEDE2000 test data
+        pairs = [
+            ((50.0, 2.6772, -79.7751), (50.0, 0.0, -82.7485), 2.0425),
+            ((50.0, 2.5, 0.0), (50.0, 0.0, -2.5), 4.3065),
+            ((60.2574, -34.0099, 36.2677), (60.4626, -34.1751, 39.4387), 1.2644),
+            ((22.7233, 20.0904, -46.6940), (23.0331, 14.9730, -42.5619), 2.0373),
+            ((90.9257, -0.5406, -0.9208), (88.6381, -0.8985, -0.7239), 1.5381),
+        ]
+        lab1, lab2, expected = zip(*pairs)
+        np.testing.assert_allclose(color_quantizer.ciede2000(np.array(lab1), np.array(lab2)), expected, atol=1e-4)
+
+    def test_dedupe_keeps_first_of_similar_colors(self):
+        colors = np.array([[255, 255, 0], [36, 113, 163], [255, 230, 60], [40, 40, 110]])
+        np.testing.assert_array_equal(color_quantizer.dedupe_colors(colors, 10.0), [0, 1, 3])
@@ -0,0 +1,107 @@
+"""
+Unit tests for the single-decode fabric analysis feature graph
+"""
+import os
+import shutil
+import tempfile
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import cv2
+import numpy as np
+from django.test import SimpleTestCase
+from PIL import Image
+
+from ai_services import texture_engine
+from ai_services.fabric_analysis import FabricAnalyzer
+from ai_services.fabric_features import FabricFeatureGraph
+
+
+def make_fabric(path, size=(240, 180)):
+    """Striped fabric with a little noise"""
+    width, height = size
+    stripes = ((np.arange(width) // 12) % 2).astype(np.uint8)
+    pixels = np.zeros((height, width, 3), dtype=np.uint8)
+    pixels[:] = np.where(stripes[None, :, None], [180, 30, 60], [235, 215, 160])
+    noise = np.random.default_rng(7).integers(-12, 12, pixels.shape)
+    Image.fromarray(np.clip(pixels + noise, 0, 255).astype(np.uint8)).save(path, format='PNG')
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FabricFeatureGraphTestCase(SimpleTestCase):
+    """Test cases for analyze_fabric over one shared feature graph"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.path = os.path.join(self.directory, 'fabric.png')
+        make_fabric(self.path)
+        server = ThreadingHTTPServer(('127.0.0.1', 0), partial(QuietHandler, directory=self.directory))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.url = f'http://127.0.0.1:{server.server_address[1]}/fabric.png'
+        self.analyzer = FabricAnalyzer()
+
+    def test_intermediates_are_computed_once(self):
+        with mock.patch.object(texture_engine, 'lbp_features', wraps=texture_engine.lbp_features) as lbp, \
+                mock.patch.object(texture_engine, 'compute_glcm', wraps=texture_engine.compute_glcm) as glcm, \
+                mock.patch.object(cv2, 'Canny', wraps=cv2.Canny) as canny, \
+                mock.patch.object(cv2, 'getGaborKernel', wraps=cv2.getGaborKernel) as gabor:
+            result = self.analyzer.analyze_fabric(self.url)
+
+        self.assertTrue(result['success'], result)
+        # Stages report failure through an 'error' key; every stage must have produced its output
+        for stage in ('color_analysis', 'texture_analysis', 'pattern_analysis', 'quality_assessment'):
+            self.assertNotIn('error', result[stage], stage)
+        color_analysis = result['color_analysis']
+        self.assertEqual(color_analysis['total_colors'], len(color_analysis['palette']))
+        self.assertGreater(color_analysis['total_colors'], 0)
+        self.assertIn('temperature', color_analysis['color_temperature'])
+        self.assertIn('intensity', color_analysis['color_intensity'])
+        self.assertIn('mood', color_analysis['fabric_mood'])
+        self.assertEqual(lbp.call_count, 1)
+        self.assertEqual(glcm.call_count, 1)
+        self.assertEqual(canny.call_count, 1)
+        self.assertEqual(gabor.call_count, 4)
+        for stage in ('decode', 'color_analysis', 'texture_analysis', 'pattern_analysis',
+                      'quality_assessment', 'recommendations', 'total'):
+            self.assertIn(stage, result['stage_timings_ms'])
+        self.assertLessEqual({'gray', 'edges', 'gabor', 'lbp', 'glcm', 'palette_pixels'},
+                             set(result['feature_timings_ms']))
+
+    def test_colors_are_extracted_in_memory(self):
+        matcher = self.analyzer.color_matcher
+        with mock.patch.object(cv2, 'imwrite') as imwrite, \
+                mock.patch.object(matcher, 'extract_dominant_colors') as extract, \
+                mock.patch.object(matcher, 'palette_from_pixels', wraps=matcher.palette_from_pixels) as palette:
+            result = self.analyzer.analyze_fabric(self.url, 'colors_only')
+
+        imwrite.assert_not_called()
+        extract.assert_not_called()
+        pixels = palette.call_args[0][0]
+        self.assertEqual(pixels.shape, (240 * 180, 3))
+        self.assertEqual(len(matcher.palette_from_pixels(pixels)), 8)
+        self.assertNotIn('texture_analysis', result)
+
+    def test_color_temperature_has_the_same_keys_for_any_palette(self):
+        palette = [{'hsv': (20, 80, 70), 'percentage': 100.0}]
+        self.assertEqual(self.analyzer._analyze_color_temperature([]), {'temperature': 'neutral'})
+        self.assertEqual(self.analyzer._analyze_color_temperature(palette), {'temperature': 'warm'})
+
+    def test_features_match_per_stage_computation(self):
+        image = cv2.imread(self.path)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        graph = FabricFeatureGraph(image)
+
+        self.assertEqual(self.analyzer._extract_texture_features(graph),
+                         self.analyzer._extract_texture_features(gray))
+        self.assertEqual(self.analyzer._detect_patterns(graph), self.analyzer._detect_patterns(gray))
+        self.assertEqual(graph.lbp_features, texture_engine.lbp_features(gray))
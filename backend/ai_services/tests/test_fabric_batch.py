@@ -0,0 +1,205 @@
+"""
+Unit tests for streaming batch fabric analysis
+"""
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from ai_services.fabric_batch import FabricBatchAnalyzer, batch_worker_count
+from ai_services.fabric_store import FabricAnalysisStore
+from ai_services.fabric_worker import analyze_image_bytes, init_worker
+from ai_services.models import AIGenerationRequest, AIProvider, AIUsageQuota, FabricAnalysisResult
+from organizations.middleware import set_current_organization
+from organizations.models import Organization, OrganizationMember
+
+User = get_user_model()
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BatchTestMixin:
+    """Serves fabric images written to a temp directory over local HTTP"""
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        server = ThreadingHTTPServer(('127.0.0.1', 0), partial(QuietHandler, directory=self.directory))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.base_url = f'http://127.0.0.1:{server.server_address[1]}'
+        self.organization = Organization.objects.create(name='Weavers', slug='weavers')
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(self.executor.shutdown)
+        self.addCleanup(mock.patch.stopall)
+        self.store = FabricAnalysisStore()
+
+    def write_fabric(self, name, seed=3):
+        pixels = np.random.default_rng(seed).integers(0, 256, (48, 64, 3), dtype=np.uint8)
+        Image.fromarray(pixels).save(os.path.join(self.directory, name), format='PNG')
+        return f'{self.base_url}/{name}'
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FabricBatchAnalyzerTestCase(BatchTestMixin, TestCase):
+    """Test cases for batch fan-out, reuse and failures"""
+
+    def setUp(self):
+        super().setUp()
+        self.analyze = mock.patch('ai_services.fabric_batch.analyze_image_bytes', wraps=analyze_image_bytes).start()
+        self.batch = FabricBatchAnalyzer(store=self.store, executor=self.executor)
+
+    def test_duplicates_and_stored_results_are_not_reanalyzed(self):
+        stored = self.write_fabric('stored.png', seed=1)
+        self.store.analyze(self.organization, stored)
+        first = self.write_fabric('first.png', seed=2)
+        shutil.copy(os.path.join(self.directory, 'first.png'), os.path.join(self.directory, 'copy.png'))
+        copy = f'{self.base_url}/copy.png'
+        urls = [first, stored, copy, f'{self.base_url}/missing.png']
+
+        items = sorted(self.batch.stream(self.organization, urls), key=lambda item: item['index'])
+
+        self.assertEqual([item['index'] for item in items], [0, 1, 2, 3])
+        self.assertEqual([item['image_url'] for item in items], urls)
+        self.assertEqual([item['success'] for item in items], [True, True, True, False])
+        self.assertEqual([items[1]['cache_hit'], items[3]['cache_hit']], [True, False])
+        # Whichever copy of the same content arrives first is analyzed, the other reuses it
+        self.assertEqual(sorted([items[0]['cache_hit'], items[2]['cache_hit']]), [False, True])
+        self.assertIn('error', items[3])
+
+        # Only the new content ran on a worker, and it is now stored
+        self.assertEqual(self.analyze.call_count, 1)
+        self.assertEqual(items[0]['result']['fabric_analysis_id'], items[2]['result']['fabric_analysis_id'])
+        self.assertEqual(FabricAnalysisResult.objects.count(), 2)
+
+    def test_worker_failure_is_reported_per_image(self):
+        with open(os.path.join(self.directory, 'broken.png'), 'wb') as handle:
+            handle.write(b'not an image')
+        broken = f'{self.base_url}/broken.png'
+        good = self.write_fabric('good.png')
+
+        items = {item['index']: item for item in self.batch.stream(self.organization, [broken, good], 'texture_only')}
+
+        self.assertFalse(items[0]['success'])
+        self.assertTrue(items[1]['success'])
+        self.assertIn('texture_analysis', items[1]['result'])
+        self.assertEqual(FabricAnalysisResult.objects.get().analysis_type, 'texture_only')
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FabricBatchProcessPoolTestCase(BatchTestMixin, TestCase):
+    """Tasks and results cross into spawned worker processes"""
+
+    def test_spawned_worker_pool(self):
+        pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=init_worker)
+        self.addCleanup(pool.shutdown)
+        urls = [self.write_fabric(f'fabric-{seed}.png', seed=seed) for seed in range(2)]
+
+        items = list(FabricBatchAnalyzer(store=self.store, executor=pool).stream(self.organization, urls))
+
+        self.assertEqual(sorted(item['index'] for item in items), [0, 1])
+        self.assertTrue(all(item['success'] and not item['cache_hit'] for item in items))
+        self.assertEqual(FabricAnalysisResult.objects.count(), 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FabricBatchViewTestCase(BatchTestMixin, TestCase):
+    """Test cases for the streaming batch endpoint"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='buyer', email='buyer@example.com', password='testpass123')
+        OrganizationMember.objects.create(organization=self.organization, user=self.user, role='designer')
+        self.addCleanup(set_current_organization, None)
+        mock.patch('ai_services.fabric_batch.get_fabric_process_pool', return_value=self.executor).start()
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post_batch(self, urls, **data):
+        return self.client.post('/api/ai/fabric/analyze_batch/', {'fabric_image_urls': urls, **data},
+                                format='json', HTTP_X_ORGANIZATION='weavers')
+
+    def test_streams_results_and_records_batch_once(self):
+        first = self.write_fabric('first.png', seed=1)
+        urls = [first, self.write_fabric('second.png', seed=2), first]
+
+        response = self.post_batch(urls)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        items, summary = lines[:-1], lines[-1]
+        self.assertEqual(sorted(item['index'] for item in items), [0, 1, 2])
+        self.assertEqual(summary['event'], 'summary')
+        self.assertEqual((summary['succeeded'], summary['failed'], summary['cache_hits']), (3, 0, 1))
+        self.assertEqual(summary['cost'], 0.02)
+
+        records = AIGenerationRequest.objects.filter(parameters__batch_id=summary['batch_id'])
+        self.assertEqual(records.count(), 3)
+        quota = AIUsageQuota.objects.get(organization=self.organization, generation_type='fabric_analysis')
+        self.assertEqual(quota.current_requests, 3)
+        self.assertEqual(float(quota.current_cost), 0.02)
+
+    def test_rejects_oversized_batch(self):
+        with self.settings(FABRIC_BATCH_MAX_IMAGES=2):
+            response = self.post_batch(['a.png', 'b.png', 'c.png'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.post_batch([]).status_code, 400)
+
+    def test_rejects_batch_larger_than_remaining_quota(self):
+        AIUsageQuota.objects.create(
+            organization=self.organization, provider=AIProvider.objects.create(name='fabric_analysis'),
+            generation_type='fabric_analysis', quota_type='monthly', max_requests=10, current_requests=8,
+            reset_at=timezone.now() + timedelta(days=30)
+        )
+        urls = [self.write_fabric(f'fabric-{seed}.png', seed=seed) for seed in range(3)]
+
+        response = self.post_batch(urls)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.data['remaining_requests'], 2)
+        self.assertFalse(AIGenerationRequest.objects.exists())
+
+        # A batch that fits is analyzed and charged
+        response = self.post_batch(urls[:2])
+        self.assertEqual(response.status_code, 200)
+        b''.join(response.streaming_content)
+        self.assertEqual(AIUsageQuota.objects.get().current_requests, 10)
+
+
+class BatchWorkerCountTestCase(TestCase):
+    """The per-web-worker analysis pool stays bounded"""
+
+    def test_worker_count_is_capped_at_cpu_cores(self):
+        with mock.patch('ai_services.fabric_batch.os.cpu_count', return_value=4):
+            with self.settings(FABRIC_BATCH_WORKERS=2):
+                self.assertEqual(batch_worker_count(), 2)
+            with self.settings(FABRIC_BATCH_WORKERS=64):
+                self.assertEqual(batch_worker_count(), 4)
+            with self.settings(FABRIC_BATCH_WORKERS=0):
+                self.assertEqual(batch_worker_count(), 1)
@@ -0,0 +1,185 @@
+"""
+Unit tests for the content-addressed fabric analysis store
+"""
+import os
+import shutil
+import tempfile
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from unittest import mock
+
+import numpy as np
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from PIL import Image
+
+from ai_services.fabric_analysis import FabricAnalyzer
+from ai_services.fabric_store import FabricAnalysisStore
+from ai_services.models import FabricAnalysisResult
+from organizations.models import Organization
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LockRecordingCache:
+    """Cache front for the store that signals once `waiters` requests were refused the single-flight lock"""
+
+    def __init__(self, waiters):
+        self.waiters = waiters
+        self.refused = set()
+        self.all_waiting = threading.Event()
+        self._lock = threading.Lock()
+
+    def add(self, *args, **kwargs):
+        added = cache.add(*args, **kwargs)
+        if not added:
+            with self._lock:
+                self.refused.add(threading.get_ident())
+                if len(self.refused) >= self.waiters:
+                    self.all_waiting.set()
+        return added
+
+    def get(self, *args, **kwargs):
+        return cache.get(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return cache.delete(*args, **kwargs)
+
+
+class StoreTestMixin:
+    """Serves fabric images written to a temp directory over local HTTP"""
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        server = ThreadingHTTPServer(('127.0.0.1', 0), partial(QuietHandler, directory=self.directory))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.base_url = f'http://127.0.0.1:{server.server_address[1]}'
+        self.organization = Organization.objects.create(name='Weavers', slug='weavers')
+        self.analyzer = FabricAnalyzer()
+        self.analyze = mock.patch.object(self.analyzer, 'analyze_bytes', wraps=self.analyzer.analyze_bytes).start()
+        self.addCleanup(mock.patch.stopall)
+        self.store = FabricAnalysisStore(analyzer=self.analyzer, wait_timeout=10, poll_interval=0.01)
+
+    def write_fabric(self, name, seed=3):
+        pixels = np.random.default_rng(seed).integers(0, 256, (48, 64, 3), dtype=np.uint8)
+        Image.fromarray(pixels).save(os.path.join(self.directory, name), format='PNG')
+        return f'{self.base_url}/{name}'
+
+    def copy_fabric(self, name, copy_name):
+        shutil.copy(os.path.join(self.directory, name), os.path.join(self.directory, copy_name))
+        return f'{self.base_url}/{copy_name}'
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FabricAnalysisStoreTestCase(StoreTestMixin, TestCase):
+    """Test cases for store keys and reuse"""
+
+    def test_same_content_under_another_url_is_reused(self):
+        first = self.write_fabric('first.png')
+        second = self.copy_fabric('first.png', 'second.png')
+
+        stored = self.store.analyze(self.organization, first)
+        reused = self.store.analyze(self.organization, second)
+
+        self.assertEqual(self.analyze.call_count, 1)
+        self.assertFalse(stored['cache_hit'])
+        self.assertTrue(reused['cache_hit'])
+        self.assertEqual(reused['image_url'], second)
+        self.assertEqual(reused['fabric_analysis_id'], stored['fabric_analysis_id'])
+        self.assertEqual(reused['texture_analysis'], stored['texture_analysis'])
+        self.assertEqual(FabricAnalysisResult.objects.get().hit_count, 1)
+
+        # Different content and other tenants are analyzed separately
+        self.store.analyze(self.organization, self.write_fabric('other.png', seed=4))
+        self.store.analyze(Organization.objects.create(name='Dyers', slug='dyers'), first)
+        self.assertEqual(self.analyze.call_count, 3)
+
+    def test_partial_request_reuses_comprehensive_result(self):
+        path = self.write_fabric('fabric.png')
+        comprehensive = self.store.analyze(self.organization, path, 'comprehensive')
+
+        colors = self.store.analyze(self.organization, path, 'colors_only')
+        texture = self.store.analyze(self.organization, path, 'texture_only')
+
+        self.assertEqual(self.analyze.call_count, 1)
+        self.assertEqual(colors['analysis_type'], 'colors_only')
+        self.assertEqual(colors['color_analysis'], comprehensive['color_analysis'])
+        self.assertNotIn('texture_analysis', colors)
+        self.assertEqual(set(texture) & {'color_analysis', 'pattern_analysis', 'texture_analysis'}, {'texture_analysis'})
+
+        # A stored partial result never answers a comprehensive request
+        other = self.write_fabric('other.png', seed=5)
+        self.store.analyze(self.organization, other, 'colors_only')
+        self.assertFalse(self.store.analyze(self.organization, other, 'comprehensive')['cache_hit'])
+
+    def test_stored_result_describes_the_hashed_bytes(self):
+        path = self.write_fabric('fabric.png')
+        original = Image.open(os.path.join(self.directory, 'fabric.png')).tobytes()
+
+        def replace_then_analyze(*args, **kwargs):
+            # The URL now serves a different image; the analysis must not refetch it
+            Image.new('RGB', (32, 32), (200, 30, 30)).save(os.path.join(self.directory, 'fabric.png'))
+            return FabricAnalyzer.analyze_bytes(self.analyzer, *args, **kwargs)
+        self.analyze.side_effect = replace_then_analyze
+
+        result = self.store.analyze(self.organization, path)
+
+        self.assertEqual(result['image_info']['dimensions'], {'width': 64, 'height': 48})
+        self.assertEqual(Image.open(BytesIO(self.analyze.call_args[0][0])).tobytes(), original)
+
+    def test_analyzer_version_change_misses(self):
+        path = self.write_fabric('fabric.png')
+        self.store.analyze(self.organization, path)
+        with mock.patch('ai_services.fabric_store.ANALYZER_VERSION', 'next'):
+            self.assertFalse(self.store.analyze(self.organization, path)['cache_hit'])
+        self.assertEqual(self.analyze.call_count, 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FabricAnalysisSingleFlightTestCase(StoreTestMixin, TransactionTestCase):
+    """Concurrent identical requests run the analyzer once"""
+
+    def test_concurrent_requests_share_one_run(self):
+        path = self.write_fabric('fabric.png')
+        recording_cache = LockRecordingCache(waiters=3)
+        mock.patch('ai_services.fabric_store.cache', recording_cache).start()
+        followers_waited = []
+
+        def leader_analyze(*args, **kwargs):
+            # Hold the lock until every other request is waiting on it
+            followers_waited.append(recording_cache.all_waiting.wait(timeout=10))
+            return FabricAnalyzer.analyze_bytes(self.analyzer, *args, **kwargs)
+        self.analyze.side_effect = leader_analyze
+
+        results = []
+
+        def request():
+            try:
+                results.append(self.store.analyze(self.organization, path))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=request) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(followers_waited, [True])
+        self.assertEqual(self.analyze.call_count, 1)
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertEqual(sorted(result['cache_hit'] for result in results), [False, True, True, True])
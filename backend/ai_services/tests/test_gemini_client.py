@@ -0,0 +1,161 @@
+"""
+Unit tests for the shared Gemini gateway, run against a local fake Gemini server
+"""
+from unittest import mock
+
+import requests
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from google import genai
+from google.genai import errors as genai_errors
+
+from ai_services.ai_poster_service import AIPosterService
+from ai_services.gemini_client import (
+    AttemptBudgetExhausted, CircuitBreaker, CircuitOpenError, GeminiGateway, TokenBucket, attempt_budget,
+    is_retryable_error
+)
+from frameio_backend.testing import FakeGeminiServer
+
+MODEL = 'gemini-2.5-flash-image'
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class GatewayPrimitivesTestCase(SimpleTestCase):
+    """Test cases for the token bucket and circuit breaker"""
+
+    def test_token_bucket_waits_for_refill(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+
+        self.assertTrue(bucket.acquire(0, sleep=clock.sleep))
+        self.assertTrue(bucket.acquire(0, sleep=clock.sleep))
+        self.assertFalse(bucket.acquire(0.1, sleep=clock.sleep))
+        self.assertTrue(bucket.acquire(1, sleep=clock.sleep))
+        self.assertAlmostEqual(clock.now, 0.5)
+
+    def test_circuit_breaker_half_open_trial(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        clock.now = 10
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())  # one trial at a time
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        clock.now = 20
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+
+class GeminiGatewayTestCase(SimpleTestCase):
+    """Test cases for retries, circuit breaking and budgets against the fake server"""
+
+    def setUp(self):
+        self.server = FakeGeminiServer(text='ok').start()
+        self.addCleanup(self.server.stop)
+        self.client = genai.Client(api_key='test', http_options={'base_url': self.server.base_url})
+        self.gateway = GeminiGateway(
+            bucket=TokenBucket(rate=1000, capacity=1000), max_retries=3, retry_delay_base=0,
+            failure_threshold=4, reset_timeout=60
+        )
+
+    def generate(self, gateway=None, client=None):
+        return (gateway or self.gateway).call(
+            (client or self.client).models.generate_content, model=MODEL, contents=['Silk saree']
+        )
+
+    def test_transient_errors_are_retried(self):
+        self.server.fail_next(2, status=503)
+        self.assertEqual(self.generate().text, 'ok')
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_client_errors_are_not_retried(self):
+        self.server.fail_next(1, status=400)
+        with self.assertRaises(genai_errors.ClientError):
+            self.generate()
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.gateway.breaker(MODEL).state, CircuitBreaker.CLOSED)
+
+    def test_rate_limited_calls_are_retried(self):
+        self.server.fail_next(1, status=429)
+        self.assertEqual(self.generate().text, 'ok')
+
+    def test_timeouts_are_retried(self):
+        self.server.latency = 0.3
+        client = genai.Client(api_key='test', http_options={'base_url': self.server.base_url, 'timeout': 50})
+        with self.assertRaises(requests.exceptions.Timeout) as raised:
+            self.generate(client=client)
+        self.assertTrue(is_retryable_error(raised.exception))
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_circuit_opens_and_fails_fast(self):
+        self.server.fail_always()
+        with self.assertRaises(genai_errors.ServerError):
+            self.generate()
+        with self.assertRaises(CircuitOpenError):
+            self.generate()
+        self.assertEqual(len(self.server.requests), 4)
+
+        # Other models keep their own breaker
+        self.assertEqual(self.gateway.breaker('gemini-2.5-flash').state, CircuitBreaker.CLOSED)
+
+    def test_attempt_budget_caps_calls(self):
+        self.server.fail_always()
+        with attempt_budget(5) as budget:
+            with self.assertRaises(genai_errors.ServerError):
+                self.generate()
+            with self.assertRaises(AttemptBudgetExhausted):
+                self.generate(gateway=GeminiGateway(
+                    bucket=TokenBucket(rate=1000, capacity=1000), max_retries=3, retry_delay_base=0
+                ))
+        self.assertEqual(budget.attempts, 5)
+        self.assertEqual(len(self.server.requests), 5)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                   GEMINI_MAX_ATTEMPTS_PER_REQUEST=6)
+class PosterOutageTestCase(TestCase):
+    """Test cases for one poster request during a Gemini outage"""
+
+    def setUp(self):
+        cache.clear()
+        self.server = FakeGeminiServer().start()
+        self.addCleanup(self.server.stop)
+        client = genai.Client(api_key='test', http_options={'base_url': self.server.base_url})
+        gateway = GeminiGateway(
+            bucket=TokenBucket(rate=1000, capacity=1000), max_retries=3, retry_delay_base=0,
+            failure_threshold=100, reset_timeout=60
+        )
+
+        self.service = AIPosterService()
+        self.service.client = client
+        self.service.gemini = gateway
+        self.service.caption_service.client = client
+        self.service.caption_service.gemini = gateway
+
+    def test_outage_is_bounded_by_the_attempt_budget(self):
+        self.server.fail_always()
+        with mock.patch('ai_services.ai_poster_service.get_poster_publisher'):
+            result = self.service.generate_from_prompt('Silk saree', '1:1', use_cache=False)
+
+        self.assertEqual(result['status'], 'error')
+        self.assertIn('temporary issues', result['message'])
+        # Without the budget: 4 prompt variations x 3 attempts, plus the caption's retries
+        self.assertLessEqual(len(self.server.requests), 6)
@@ -0,0 +1,183 @@
+"""
+Unit tests for the shared image fetcher, served by a local HTTP server
+"""
+import os
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+from django.test import SimpleTestCase
+from PIL import Image
+
+from ai_services.utils.image_fetcher import ImageFetcher, ImageFetchError
+
+
+def make_jpeg(width, height, color=(200, 40, 40)):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    """Serves `server.images` with an ETag and honours If-None-Match"""
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        content = self.server.images.get(self.path)
+        if content is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        etag = f'"{len(content)}-{content[-8:].hex()}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(content)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ImageFetcherTestCase(SimpleTestCase):
+    """Test cases for conditional GET, size caps, caches and draft decoding"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), ImageHandler)
+        cls.server.images = {}
+        cls.server.requests = []
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.images.clear()
+        self.server.requests.clear()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.server.images['/fabric.jpg'] = make_jpeg(1600, 1200)
+
+    def make_fetcher(self, **kwargs):
+        options = {'cache_dir': self.cache_dir, 'revalidate_seconds': 0}
+        options.update(kwargs)
+        fetcher = ImageFetcher(**options)
+        self.addCleanup(fetcher.session.close)
+        return fetcher
+
+    def test_conditional_get_reuses_cached_bytes(self):
+        fetcher = self.make_fetcher()
+        first, first_digest = fetcher.fetch_bytes(f'{self.base_url}/fabric.jpg')
+        second, second_digest = fetcher.fetch_bytes(f'{self.base_url}/fabric.jpg')
+
+        self.assertEqual(first, second)
+        self.assertEqual(first_digest, second_digest)
+        self.assertEqual(fetcher.stats['network'], 1)
+        self.assertEqual(fetcher.stats['not_modified'], 1)
+
+    def test_disk_cache_is_shared_between_fetchers(self):
+        self.make_fetcher().fetch_bytes(f'{self.base_url}/fabric.jpg')
+
+        other = self.make_fetcher()
+        other.fetch_bytes(f'{self.base_url}/fabric.jpg')
+
+        self.assertEqual(other.stats['network'], 0)
+        self.assertEqual(other.stats['not_modified'], 1)
+
+    def test_fresh_entries_skip_the_network(self):
+        fetcher = self.make_fetcher(revalidate_seconds=60)
+        fetcher.fetch_bytes(f'{self.base_url}/fabric.jpg')
+        fetcher.fetch_bytes(f'{self.base_url}/fabric.jpg')
+
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(fetcher.stats['fresh'], 1)
+
+    def test_changed_image_is_downloaded_again(self):
+        fetcher = self.make_fetcher()
+        first, _ = fetcher.fetch_bytes(f'{self.base_url}/fabric.jpg')
+        self.server.images['/fabric.jpg'] = make_jpeg(800, 600, color=(10, 120, 10))
+
+        second, _ = fetcher.fetch_bytes(f'{self.base_url}/fabric.jpg')
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(fetcher.stats['network'], 2)
+
+    def test_size_cap(self):
+        fetcher = self.make_fetcher(max_bytes=1024)
+        with self.assertRaises(ImageFetchError):
+            fetcher.fetch_bytes(f'{self.base_url}/fabric.jpg')
+
+    def test_missing_image_raises(self):
+        with self.assertRaises(ImageFetchError):
+            self.make_fetcher().fetch_bytes(f'{self.base_url}/missing.jpg')
+
+    def test_reduced_resolution_decode(self):
+        fetcher = self.make_fetcher()
+        full = fetcher.fetch_array(f'{self.base_url}/fabric.jpg')
+        small = fetcher.fetch_array(f'{self.base_url}/fabric.jpg', max_size=300)
+
+        self.assertEqual(full.shape, (1200, 1600, 3))
+        self.assertEqual(max(small.shape[:2]), 300)
+        self.assertFalse(small.flags.writeable)
+
+    def test_decoded_arrays_are_cached_by_content(self):
+        fetcher = self.make_fetcher()
+        first = fetcher.fetch_array(f'{self.base_url}/fabric.jpg', max_size=300)
+        second = fetcher.fetch_array(f'{self.base_url}/fabric.jpg', max_size=300)
+
+        self.assertIs(first, second)
+        self.assertEqual(fetcher.stats['decodes'], 1)
+        self.assertEqual(fetcher.stats['decoded_hits'], 1)
+
+    def test_only_http_urls_are_fetched(self):
+        path = f'{self.cache_dir}/local.jpg'
+        with open(path, 'wb') as image_file:
+            image_file.write(make_jpeg(64, 48))
+        fetcher = self.make_fetcher()
+
+        for url in (path, f'file://{path}', '/etc/hostname', '/dev/zero', 'ftp://example.com/a.jpg'):
+            with self.subTest(url=url), self.assertRaises(ImageFetchError):
+                fetcher.fetch_array(url)
+
+
+    def test_validators_are_bounded_in_memory_and_on_disk(self):
+        for index in range(4):
+            self.server.images[f'/fabric{index}.jpg'] = make_jpeg(64, 48, color=(index * 40, 10, 10))
+        fetcher = self.make_fetcher(max_validators=2)
+
+        for index in range(4):
+            fetcher.fetch_bytes(f'{self.base_url}/fabric{index}.jpg')
+
+        self.assertEqual(list(fetcher._validators), [f'{self.base_url}/fabric2.jpg', f'{self.base_url}/fabric3.jpg'])
+        self.assertEqual(len([name for name in os.listdir(self.cache_dir) if name.endswith('.json')]), 2)
+
+    def test_pruned_blobs_take_their_validator_files_along(self):
+        self.server.images['/other.jpg'] = make_jpeg(1600, 1200, color=(10, 120, 10))
+        budget = max(len(self.server.images['/fabric.jpg']), len(self.server.images['/other.jpg']))
+        fetcher = self.make_fetcher(disk_cache_bytes=budget)
+
+        fetcher.fetch_bytes(f'{self.base_url}/fabric.jpg')
+        for name in os.listdir(self.cache_dir):
+            os.utime(os.path.join(self.cache_dir, name), (0, 0))
+        fetcher.fetch_bytes(f'{self.base_url}/other.jpg')
+
+        names = os.listdir(self.cache_dir)
+        self.assertEqual(len([name for name in names if name.endswith('.img')]), 1)
+        self.assertEqual(len([name for name in names if name.endswith('.json')]), 1)
+        self.assertEqual(list(fetcher._validators), [f'{self.base_url}/other.jpg'])
@@ -0,0 +1,174 @@
+"""
+Unit tests for optimal color matching and the LAB palette index
+"""
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from scipy.optimize import linear_sum_assignment
+
+from ai_services import palette_index
+from ai_services.color_matching import SmartColorMatcher
+from ai_services.fabric_analysis import ANALYZER_VERSION
+from ai_services.models import FabricAnalysisResult
+from ai_services.palette_index import PaletteIndex, get_palette_index, palette_to_lab
+from organizations.middleware import set_current_organization
+from organizations.models import Organization, OrganizationMember
+
+User = get_user_model()
+
+
+def lab_color(lightness, percentage=50.0):
+    """Neutral gray color dict as produced by SmartColorMatcher.palette_from_pixels"""
+    value = int(lightness)
+    return {
+        'hex': f'#{value:02x}{value:02x}{value:02x}', 'rgb': [value] * 3, 'lab': [lightness, 128, 128],
+        'percentage': percentage, 'name': 'Gray', 'hsv': [0, 0, lightness / 2.55], 'hsl': [0, lightness / 2.55, 0]
+    }
+
+
+def random_palette(rng):
+    size = int(rng.integers(2, 9))
+    labs = rng.uniform([0, 60, 60], [255, 200, 200], (size, 3))
+    weights = rng.dirichlet(np.ones(size)) * 100
+    return [{'lab': lab.tolist(), 'percentage': float(weight)} for lab, weight in zip(labs, weights)]
+
+
+def brute_force(palettes, query, max_distance, limit):
+    query_lab, query_weights = palette_to_lab(query)
+    costs = []
+    for key, palette in palettes.items():
+        lab, _ = palette_to_lab(palette)
+        distances = np.linalg.norm(query_lab[:, None, :].astype(float) - lab[None, :, :], axis=2)
+        cost = np.minimum(distances, max_distance) * query_weights[:, None]
+        if len(lab) < len(query_lab):
+            cost = np.hstack([cost, np.repeat(max_distance * query_weights[:, None], len(query_lab) - len(lab), axis=1)])
+        rows, cols = linear_sum_assignment(cost)
+        costs.append((cost[rows, cols].sum(), key))
+    return sorted(costs)[:limit]
+
+
+class OptimalColorMatchTestCase(SimpleTestCase):
+    """Test cases for one-to-one fabric/design color assignment"""
+
+    def test_assignment_beats_greedy_pairing(self):
+        fabric = [lab_color(100, 60), lab_color(114, 40)]
+        design = [lab_color(107), lab_color(90)]
+
+        # Greedy pairing would give 100 -> 107 and leave 114 without a partner within tolerance
+        result = SmartColorMatcher().match_colors(fabric, design)
+
+        self.assertEqual(result['total_matches'], 2)
+        self.assertEqual(result['overall_matching_score'], 100.0)
+        pairs = {(m['fabric_color']['lab'][0], m['design_color']['lab'][0]) for m in result['matches']}
+        self.assertEqual(pairs, {(100, 90), (114, 107)})
+        self.assertEqual(result['unmatched_fabric'], [])
+        self.assertEqual(result['unmatched_design'], [])
+
+
+class PaletteIndexTestCase(SimpleTestCase):
+    """Test cases for exact nearest-palette search"""
+
+    def test_search_matches_brute_force(self):
+        rng = np.random.default_rng(7)
+        index = PaletteIndex(max_distance=50.0)
+        palettes = {}
+        for number in range(400):
+            palettes[str(number)] = random_palette(rng)
+            index.add(str(number), palettes[str(number)], label=number)
+
+        # Part of the catalog is in the KD-tree, the newest palettes are still in the delta
+        self.assertGreater(index._indexed, 0)
+        self.assertLess(index._indexed, len(index))
+
+        for _ in range(5):
+            query = random_palette(rng)
+            results = index.search(query, limit=5)
+            expected = brute_force(palettes, query, 50.0, 5)
+            self.assertEqual([result['fabric_analysis_id'] for result in results], [key for _, key in expected])
+            np.testing.assert_allclose([result['distance'] for result in results],
+                                       [round(cost, 2) for cost, _ in expected], atol=0.011)
+            self.assertEqual(results[0]['label'], int(results[0]['fabric_analysis_id']))
+
+    def test_hex_query_and_matches(self):
+        index = PaletteIndex()
+        index.add('navy-gold', ['#1E5AA0', '#F2C14E'])
+        index.add('red', ['#C0392B'])
+        index.add('red', ['#000000'])
+
+        results = index.search(['#F2C14E', '#1F5BA1'], limit=5)
+
+        self.assertEqual(len(index), 2)
+        self.assertEqual(results[0]['fabric_analysis_id'], 'navy-gold')
+        self.assertEqual({(m['query_color'], m['palette_color']) for m in results[0]['matches']}, {(0, 1), (1, 0)})
+        self.assertGreater(results[0]['similarity_score'], 95)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class StoredPaletteIndexTestCase(TestCase):
+    """Test cases for indexing stored fabric analyses"""
+
+    def setUp(self):
+        cache.clear()
+        palette_index._palette_indexes.clear()
+        self.addCleanup(palette_index._palette_indexes.clear)
+        self.organization = Organization.objects.create(name='Weavers', slug='weavers')
+
+    def store(self, organization, content_hash, colors, analysis_type='comprehensive'):
+        palette = [{'rgb': rgb, 'percentage': 100 / len(colors)} for rgb in colors]
+        return FabricAnalysisResult.objects.create(
+            organization=organization, content_hash=content_hash, analyzer_version=ANALYZER_VERSION,
+            analysis_type=analysis_type,
+            result={'image_url': f'https://example.com/{content_hash}.jpg', 'color_analysis': {'palette': palette}}
+        )
+
+    def test_refresh_is_incremental_and_per_tenant(self):
+        indigo = self.store(self.organization, 'indigo', [[30, 40, 120], [230, 230, 220]])
+        self.store(self.organization, 'indigo', [[30, 40, 120]], analysis_type='colors_only')
+        self.store(Organization.objects.create(name='Dyers', slug='dyers'), 'crimson', [[180, 20, 30]])
+
+        index = get_palette_index(self.organization)
+        self.assertEqual(len(index), 1)
+        self.assertEqual(index.search(['#B4141E'])[0]['content_hash'], 'indigo')
+
+        # Analyses stored later are picked up on the next lookup, without reloading the rest
+        crimson = self.store(self.organization, 'crimson', [[180, 20, 30]])
+        index = get_palette_index(self.organization)
+        self.assertEqual(len(index), 2)
+        best = index.search(['#B4141E'])[0]
+        self.assertEqual(best['fabric_analysis_id'], str(crimson.id))
+        self.assertEqual(best['image_url'], 'https://example.com/crimson.jpg')
+        self.assertEqual(index.search(['#1E2878', '#E6E6DC'])[0]['fabric_analysis_id'], str(indigo.id))
+
+    def test_indexes_are_bounded_and_dropped_on_delete(self):
+        indigo = self.store(self.organization, 'indigo', [[30, 40, 120]])
+        others = [Organization.objects.create(name=f'Mill {n}', slug=f'mill-{n}') for n in range(2)]
+
+        with override_settings(PALETTE_INDEX_MAX_TENANTS=2):
+            first = get_palette_index(self.organization)
+            for organization in others:
+                get_palette_index(organization)
+            self.assertEqual(list(palette_index._palette_indexes), [other.pk for other in others])
+            self.assertIsNot(get_palette_index(self.organization), first)
+
+        indigo.delete()
+        self.assertNotIn(self.organization.pk, palette_index._palette_indexes)
+        self.assertEqual(len(get_palette_index(self.organization)), 0)
+
+    def test_search_endpoint(self):
+        self.store(self.organization, 'indigo', [[30, 40, 120], [230, 230, 220]])
+        user = User.objects.create_user(username='buyer', email='buyer@example.com', password='testpass123')
+        OrganizationMember.objects.create(organization=self.organization, user=user, role='designer')
+        self.addCleanup(set_current_organization, None)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.post('/api/ai/fabric/search_by_palette/', {'colors': ['#1E2878'], 'limit': 3},
+                               format='json', HTTP_X_ORGANIZATION='weavers')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['matches'][0]['content_hash'], 'indigo')
+
+        response = client.post('/api/ai/fabric/search_by_palette/', {'colors': ['#12'], 'limit': 3},
+                               format='json', HTTP_X_ORGANIZATION='weavers')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,158 @@
+"""
+Unit tests for the keyset-paginated poster history API
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ai_services.models import GeneratedPoster
+from organizations.models import Organization
+
+User = get_user_model()
+
+URL = '/api/ai/ai-poster/posters/'
+
+
+def poster_queries(queries):
+    return [
+        query['sql'] for query in queries.captured_queries
+        if 'FROM "ai_services_generatedposter"' in query['sql']
+    ]
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}, DEBUG=False)
+class PosterHistoryTestCase(TestCase):
+    """Test cases for cursor pages, sparse fieldsets, counts and the first-page cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='weaver', email='weaver@example.com', password='testpass123')
+        self.other_user = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        self.organization = Organization.objects.create(name='Weavers', slug='weavers')
+
+        patcher = mock.patch(
+            'ai_services.ai_poster_views.resolve_user_organization', return_value=self.organization
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def make_poster(self, minutes_ago, **owners):
+        poster = GeneratedPoster.objects.create(
+            image_url='/media/generated_posters/poster.png',
+            caption='Handloom sale',
+            full_caption='Handloom sale #handloom',
+            prompt='Festive handloom saree poster',
+            hashtags=['#handloom'],
+            **owners
+        )
+        GeneratedPoster.objects.filter(pk=poster.pk).update(created_at=timezone.now() - timedelta(minutes=minutes_ago))
+        return poster
+
+    def make_history(self):
+        """Posters owned by the org, the user, both, and an outsider, oldest first"""
+        return [
+            self.make_poster(7, organization=self.organization, user=self.other_user),
+            self.make_poster(6, user=self.user),
+            self.make_poster(5, organization=self.organization, user=self.user),
+            self.make_poster(4, organization=self.organization),
+            self.make_poster(3, user=self.other_user),
+            self.make_poster(2, user=self.user),
+            self.make_poster(1, organization=self.organization, user=self.user),
+        ]
+
+    def test_cursor_pages_merge_owner_scopes(self):
+        posters = self.make_history()
+        visible = [str(poster.id) for poster in reversed(posters) if poster.user_id != self.other_user.id or poster.organization_id]
+
+        seen = []
+        params = {'limit': 2}
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(URL, params)
+            body = response.json()
+            self.assertEqual(response.status_code, 200)
+            seen += [poster['id'] for poster in body['results']]
+            if 'cursor' in params:
+                # One index-ordered read per owner scope, no count
+                self.assertEqual(len(poster_queries(queries)), 2)
+                self.assertIsNone(body['count'])
+            else:
+                self.assertEqual(body['count'], len(visible))
+            if not body['next_cursor']:
+                break
+            params['cursor'] = body['next_cursor']
+
+        self.assertEqual(seen, visible)
+
+    def test_sparse_fieldset_skips_text_columns(self):
+        self.make_history()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(URL, {'fields': 'id,image_url', 'count': 'none'})
+
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'image_url'})
+        self.assertTrue(response.json()['results'][0]['image_url'].startswith('http://testserver/media/'))
+        for sql in poster_queries(queries):
+            self.assertNotIn('full_caption', sql)
+            self.assertNotIn('prompt', sql)
+
+    def test_full_rows_keep_legacy_shape(self):
+        self.make_poster(1, user=self.user)
+        poster = self.client.get(URL).json()['results'][0]
+        self.assertEqual(poster['hashtags'], ['#handloom'])
+        self.assertEqual(poster['public_url'], '')
+        self.assertIs(poster['branding_applied'], False)
+        self.assertEqual(poster['aspect_ratio'], '1:1')
+
+    def test_invalid_parameters_are_rejected(self):
+        self.assertEqual(self.client.get(URL, {'fields': 'id,secret'}).status_code, 400)
+        self.assertEqual(self.client.get(URL, {'cursor': 'not-a-cursor'}).status_code, 400)
+        self.assertEqual(self.client.get(URL, {'count': 'sometimes'}).status_code, 400)
+
+    def test_first_page_is_cached_until_a_poster_changes(self):
+        self.make_history()
+        first = self.client.get(URL, {'limit': 3}).json()
+
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.client.get(URL, {'limit': 3}).json()
+        self.assertEqual(poster_queries(queries), [])
+        self.assertEqual(cached, first)
+
+        newest = self.make_poster(0, organization=self.organization)
+        refreshed = self.client.get(URL, {'limit': 3}).json()
+        self.assertEqual(refreshed['results'][0]['id'], str(newest.id))
+        self.assertEqual(refreshed['count'], first['count'] + 1)
+
+        newest.delete()
+        self.assertEqual(self.client.get(URL, {'limit': 3}).json(), first)
+
+    def test_other_tenants_do_not_invalidate_the_cache(self):
+        self.make_history()
+        self.client.get(URL)
+        self.make_poster(0, user=self.other_user, organization=Organization.objects.create(name='Other', slug='other'))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(URL)
+        self.assertEqual(poster_queries(queries), [])
+
+    def test_approximate_count_is_cached(self):
+        self.make_history()
+        params = {'limit': 1, 'fields': 'id', 'count': 'approximate'}
+        self.assertEqual(self.client.get(URL, params).json()['count'], 6)
+
+        # A new poster shows up on the first page but the count lags until it expires
+        self.make_poster(0, user=self.user)
+        body = self.client.get(URL, params).json()
+        self.assertEqual(body['count'], 6)
+
+        cache.clear()
+        self.assertEqual(self.client.get(URL, params).json()['count'], 7)
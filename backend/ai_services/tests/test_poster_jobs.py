@@ -0,0 +1,201 @@
+"""
+Unit tests for background poster generation jobs
+"""
+from unittest import mock
+
+from django.test import TestCase, Client
+from django.contrib.auth import get_user_model
+from rest_framework import status
+
+from ai_services.models import GeneratedPoster, PosterGenerationJob
+from ai_services.poster_jobs import run_poster_job, serialize_poster_job
+from organizations.models import Organization, OrganizationMember
+
+User = get_user_model()
+
+
+class FakePosterService:
+    """Stands in for AIPosterService and walks through the pipeline stages"""
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = []
+
+    def is_available(self):
+        return True
+
+    def generate_from_prompt(self, prompt, aspect_ratio, user=None, progress_callback=None, use_cache=True):
+        self.calls.append({'user': user, 'use_cache': use_cache})
+        for stage, progress in (('generating_image', 10), ('storing_image', 50), ('generating_caption', 65)):
+            progress_callback(stage, progress)
+        return self.result
+
+
+class PosterGenerationJobTestCase(TestCase):
+    """Test cases for the poster job pipeline and endpoints"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='jobuser',
+            email='jobs@example.com',
+            password='testpass123'
+        )
+
+    def test_run_poster_job_records_stages_and_saves_poster(self):
+        job = PosterGenerationJob.objects.create(user=self.user, prompt='Silk saree', aspect_ratio='4:5')
+        service = FakePosterService({
+            'status': 'success',
+            'image_url': 'http://example.com/poster.png',
+            'image_path': 'generated_posters/poster.png',
+            'caption': 'Caption',
+            'hashtags': ['#silk'],
+            'width': 1080,
+            'height': 1350,
+        })
+
+        run_poster_job(job, service)
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.progress, 100)
+        self.assertEqual(
+            [entry['stage'] for entry in job.stage_history],
+            ['starting', 'generating_image', 'storing_image', 'generating_caption', 'saving', 'completed']
+        )
+        self.assertIsNotNone(job.poster)
+        self.assertEqual(GeneratedPoster.objects.get(id=job.poster_id).prompt, 'Silk saree')
+
+    def test_run_poster_job_failure(self):
+        job = PosterGenerationJob.objects.create(prompt='Silk saree')
+        run_poster_job(job, FakePosterService({'status': 'error', 'message': 'quota exceeded'}))
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(serialize_poster_job(job)['error'], 'quota exceeded')
+
+    def test_job_status_endpoint(self):
+        job = PosterGenerationJob.objects.create(user=self.user, prompt='Silk saree')
+        job.update_stage('generating_image', 10)
+        self.client.force_login(self.user)
+
+        response = self.client.get(f'/api/ai/ai-poster/jobs/{job.id}/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['status'], 'running')
+        self.assertEqual(data['stage'], 'generating_image')
+        self.assertEqual(data['progress'], 10)
+
+    def test_job_status_not_found(self):
+        response = self.client.get('/api/ai/ai-poster/jobs/not-a-uuid/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_jobs_are_only_visible_to_owner_and_organization(self):
+        organization = Organization.objects.create(name='Weavers', slug='weavers')
+        colleague = User.objects.create_user(username='colleague', email='colleague@example.com', password='testpass123')
+        stranger = User.objects.create_user(username='stranger', email='stranger@example.com', password='testpass123')
+        OrganizationMember.objects.create(organization=organization, user=colleague, role='designer')
+        job = PosterGenerationJob.objects.create(user=self.user, organization=organization, prompt='Silk saree')
+
+        for viewer, expected in ((None, 404), (stranger, 404), (colleague, 200), (self.user, 200)):
+            client = Client()
+            if viewer:
+                client.force_login(viewer)
+            with self.subTest(viewer=viewer):
+                self.assertEqual(client.get(f'/api/ai/ai-poster/jobs/{job.id}/').status_code, expected)
+                self.assertEqual(client.get(f'/api/ai/ai-poster/jobs/{job.id}/events/').status_code, expected)
+
+    def test_job_events_stream_finished_job(self):
+        job = PosterGenerationJob.objects.create(user=self.user, prompt='Silk saree')
+        job.mark_failed('boom')
+        self.client.force_login(self.user)
+
+        response = self.client.get(f'/api/ai/ai-poster/jobs/{job.id}/events/')
+        body = b''.join(response.streaming_content).decode()
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertIn('event: progress', body)
+        self.assertIn('"status": "failed"', body)
+        self.assertTrue(body.rstrip().endswith('data: {}'))
+
+    @mock.patch('ai_services.ai_poster_views.ai_poster_service')
+    @mock.patch('ai_services.tasks.generate_poster_job.delay')
+    def test_create_job_returns_immediately(self, mock_delay, mock_service):
+        mock_service.is_available.return_value = True
+        mock_delay.return_value = mock.Mock(id='task-123')
+
+        response = self.client.post(
+            '/api/ai/ai-poster/jobs/',
+            {'prompt': 'Silk saree', 'aspect_ratio': '4:5'},
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = PosterGenerationJob.objects.get(id=response.json()['job_id'])
+        self.assertEqual(job.celery_task_id, 'task-123')
+        mock_delay.assert_called_once_with(str(job.id))
+        mock_service.generate_from_prompt.assert_not_called()
+
+    @mock.patch('ai_services.ai_poster_views.ai_poster_service')
+    @mock.patch('ai_services.tasks.generate_poster_job.delay')
+    def test_anonymous_job_needs_its_access_token(self, mock_delay, mock_service):
+        mock_service.is_available.return_value = True
+        mock_delay.return_value = mock.Mock(id='task-123')
+
+        # The development header only picks the branding profile, never the owner
+        response = self.client.post(
+            '/api/ai/ai-poster/jobs/',
+            {'prompt': 'Silk saree'},
+            content_type='application/json',
+            HTTP_X_DEV_USER_ID=str(self.user.id)
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        data = response.json()
+        job = PosterGenerationJob.objects.get(id=data['job_id'])
+        self.assertIsNone(job.user)
+        self.assertIsNone(job.organization)
+        self.assertEqual(job.branding_user, self.user)
+        self.assertNotEqual(job.access_token_hash, data['access_token'])
+
+        owner_client = Client()
+        owner_client.force_login(self.user)
+        self.assertEqual(owner_client.get(f'/api/ai/ai-poster/jobs/{job.id}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/ai/ai-poster/jobs/{job.id}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/ai/ai-poster/jobs/{job.id}/?token=wrong').status_code, 404)
+
+        self.assertEqual(self.client.get(data['status_url']).status_code, 200)
+        self.assertEqual(
+            self.client.get(f'/api/ai/ai-poster/jobs/{job.id}/', HTTP_X_POSTER_JOB_TOKEN=data['access_token']).status_code,
+            200
+        )
+        job.mark_failed('boom')
+        self.assertEqual(self.client.get(data['events_url']).status_code, 200)
+
+    @mock.patch('ai_services.tasks.generate_poster_job.delay')
+    def test_authenticated_job_is_owned_without_token(self, mock_delay):
+        mock_delay.return_value = mock.Mock(id='task-123')
+        self.client.force_login(self.user)
+
+        with mock.patch('ai_services.ai_poster_views.ai_poster_service') as mock_service:
+            mock_service.is_available.return_value = True
+            response = self.client.post(
+                '/api/ai/ai-poster/jobs/',
+                {'prompt': 'Silk saree'},
+                content_type='application/json'
+            )
+
+        data = response.json()
+        self.assertNotIn('access_token', data)
+        job = PosterGenerationJob.objects.get(id=data['job_id'])
+        self.assertEqual(job.user, self.user)
+        self.assertEqual(job.access_token_hash, '')
+
+    def test_anonymous_job_brands_without_sharing_the_render_cache(self):
+        job = PosterGenerationJob.objects.create(branding_user=self.user, prompt='Silk saree')
+        service = FakePosterService({'status': 'error', 'message': 'quota exceeded'})
+
+        run_poster_job(job, service)
+
+        self.assertEqual(service.calls, [{'user': self.user, 'use_cache': False}])
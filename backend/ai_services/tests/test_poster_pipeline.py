@@ -0,0 +1,99 @@
+"""
+Unit tests for the concurrent generate_from_prompt pipeline
+"""
+import shutil
+import tempfile
+import threading
+import time
+from io import BytesIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from ai_services.ai_poster_service import AIPosterService
+
+DELAY = 0.3
+
+
+def gemini_image_response(size=(1080, 1080)):
+    buffer = BytesIO()
+    Image.new('RGB', size, (120, 40, 90)).save(buffer, format='PNG')
+    part = SimpleNamespace(inline_data=SimpleNamespace(data=buffer.getvalue()))
+    return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                   DOMAIN_URL='http://testserver')
+class PosterPipelineTestCase(TestCase):
+    """Test cases for caption generation overlapping image generation"""
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.caption_threads = []
+        self.service = AIPosterService()
+        self.service.client = SimpleNamespace(models=SimpleNamespace(generate_content=self.fake_generate_content))
+
+        patchers = [
+            mock.patch.object(self.service, 'generate_caption_and_hashtags', side_effect=self.fake_caption),
+            mock.patch('ai_services.ai_poster_service.get_poster_publisher'),
+            mock.patch.dict('os.environ', {'USE_CLOUDINARY': 'False'}),
+        ]
+        mocks = [patcher.start() for patcher in patchers]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+        self.publisher = mocks[1].return_value
+
+    def fake_generate_content(self, **kwargs):
+        time.sleep(DELAY)
+        return gemini_image_response()
+
+    def fake_caption(self, prompt, image_url=None, user=None):
+        self.caption_threads.append(threading.current_thread().name)
+        time.sleep(DELAY)
+        return {'status': 'success', 'caption': f'{prompt} caption', 'full_caption': f'{prompt} caption #silk',
+                'hashtags': ['#silk']}
+
+    def test_caption_overlaps_image_generation(self):
+        started = time.perf_counter()
+        result = self.service._generate_from_prompt('Silk saree', '1:1')
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['caption'], 'Silk saree caption')
+        self.assertTrue(self.caption_threads[0].startswith('poster-pipeline'))
+        self.assertLess(elapsed, 2 * DELAY)
+
+        timings = result['stage_timings_ms']
+        for stage in ('caption', 'generate_image', 'store_image', 'schedule_publish', 'total'):
+            self.assertIn(stage, timings)
+        self.assertLess(timings['total'], timings['caption'] + timings['generate_image'])
+
+        self.publisher.publish.assert_called_once()
+        self.assertEqual(self.publisher.publish.call_args.args[:2], (result['image_path'], 'Silk saree caption'))
+        self.assertEqual(result['publish_status'], 'pending')
+
+    def test_brand_overlay_uses_in_memory_image(self):
+        profile = SimpleNamespace(has_complete_profile=True)
+        branded = {'status': 'success', 'image_path': 'branded_posters/poster.png',
+                   'image_url': '/media/branded_posters/poster.png', 'logo_added': True}
+        user = SimpleNamespace(company_profile=profile)
+
+        with mock.patch.object(self.service.brand_overlay_service, 'create_branded_poster',
+                               return_value=branded) as create_branded_poster:
+            result = self.service._generate_from_prompt('Silk saree', '1:1', user=user)
+
+        poster_image = create_branded_poster.call_args.args[3]
+        self.assertEqual(poster_image.size, (1080, 1080))
+        self.assertTrue(result['branding_applied'])
+        self.assertEqual(result['image_url'], 'http://testserver/media/branded_posters/poster.png')
+        self.assertIn('brand_overlay', result['stage_timings_ms'])
+        self.assertIsNone(self.publisher.publish.call_args.kwargs['image_bytes'])
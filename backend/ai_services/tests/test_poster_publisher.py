@@ -0,0 +1,154 @@
+"""
+Unit tests for background poster publishing
+"""
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from ai_services.models import GeneratedPoster
+from ai_services.poster_jobs import save_generated_poster
+from ai_services.utils import cloudinary_utils
+from ai_services.utils.poster_publisher import (
+    LocalFakeUploader, PosterPublisher, encode_delivery_derivative, get_published_urls
+)
+from ai_services.utils.storage_handler import store_poster_image
+
+
+def poster_png(size=(320, 240)):
+    gradient = Image.linear_gradient('L').resize(size)
+    image = Image.merge('RGB', (gradient, Image.effect_noise(size, 24), gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    buffer = BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    DOMAIN_URL='http://testserver',
+    POSTER_DELIVERY_FORMAT='webp',
+    POSTER_PUBLISH_RETRY_DELAY=0,
+)
+class PosterPublisherTestCase(TestCase):
+    """Test cases for CDN publishing after the poster is served locally"""
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.png = poster_png()
+        self.image_path, self.local_url, _ = store_poster_image(self.png, filename='poster.png')
+        self.uploader = LocalFakeUploader()
+
+    def result(self, **overrides):
+        result = {'image_url': self.local_url, 'image_path': self.image_path, 'public_url': self.local_url,
+                  'caption': 'Silk saree', 'full_caption': 'Silk saree #festive'}
+        result.update(overrides)
+        return result
+
+    def test_publish_updates_saved_poster(self):
+        poster = save_generated_poster(self.result(), 'Silk saree', '1:1')
+        self.assertEqual(poster.public_url, self.local_url)
+
+        urls = PosterPublisher(self.uploader, asynchronous=False).publish(
+            self.image_path, 'Silk saree', 'Silk saree #festive', image_bytes=self.png
+        ).result()
+
+        self.assertEqual(urls['status'], 'published')
+        self.assertEqual([upload['kind'] for upload in self.uploader.uploads], ['image', 'image', 'html'])
+        self.assertTrue(urls['public_url'].endswith('_share.html'))
+        poster.refresh_from_db()
+        self.assertEqual(poster.public_url, urls['public_url'])
+        self.assertEqual(poster.delivery_url, urls['delivery_url'])
+        self.assertTrue(poster.delivery_url.endswith('_delivery.webp'))
+        self.assertEqual(poster.image_url, urls['cdn_url'])
+
+    def test_background_publish_reads_stored_image(self):
+        publisher = PosterPublisher(self.uploader, max_workers=1, asynchronous=True)
+        urls = publisher.publish(self.image_path, 'Silk saree').result(timeout=10)
+
+        self.assertEqual(urls['status'], 'published')
+        self.assertEqual(self.uploader.uploads[0]['size'], len(self.png))
+        self.assertEqual(get_published_urls(self.image_path), urls)
+
+    def test_poster_saved_after_publishing_uses_published_urls(self):
+        urls = PosterPublisher(self.uploader, asynchronous=False).publish(self.image_path, 'Silk saree').result()
+
+        poster = save_generated_poster(self.result(), 'Silk saree', '1:1')
+        self.assertEqual(poster.public_url, urls['public_url'])
+        saved = GeneratedPoster.objects.get(pk=poster.pk)
+        self.assertEqual(saved.delivery_url, urls['delivery_url'])
+        self.assertEqual(saved.image_url, urls['cdn_url'])
+
+    @mock.patch('ai_services.ai_poster_views.ai_poster_service')
+    def test_edited_poster_saved_after_publishing_uses_published_urls(self, mock_service):
+        publisher = PosterPublisher(self.uploader, asynchronous=False)
+        published = {}
+
+        def generate_with_image(*args, **kwargs):
+            # Publishing finishes before the view creates the poster row
+            published.update(publisher.publish(self.image_path, 'Add logo').result())
+            return {**self.result(), 'status': 'success'}
+
+        mock_service.is_available.return_value = True
+        mock_service.generate_with_image.side_effect = generate_with_image
+
+        user = get_user_model().objects.create_user(username='editor', password='testpass123')
+        self.client.force_login(user)
+        self.client.post(
+            '/api/ai/ai-poster/edit_poster/',
+            {'prompt': 'Add logo', 'image': SimpleUploadedFile('input.png', self.png, content_type='image/png')},
+        )
+
+        poster = GeneratedPoster.objects.get(image_path=self.image_path)
+        self.assertEqual(poster.public_url, published['public_url'])
+        self.assertEqual(poster.image_url, published['cdn_url'])
+
+    @mock.patch.dict('os.environ', {'USE_CLOUDINARY': 'False'})
+    def test_local_storage_mode_keeps_share_page_local(self):
+        urls = PosterPublisher(asynchronous=False).publish(
+            self.image_path, 'Silk saree', image_bytes=self.png
+        ).result()
+
+        self.assertEqual(urls['status'], 'published')
+        self.assertIsNone(urls['cdn_url'])
+        self.assertTrue(urls['public_url'].startswith('http://testserver'))
+        self.assertEqual(urls['image_url'], self.local_url)
+
+    def test_delivery_derivative_is_smaller(self):
+        encoded, image_format = encode_delivery_derivative(self.png)
+        self.assertEqual(image_format, 'webp')
+        self.assertLess(len(encoded), len(self.png))
+        self.assertIsNone(encode_delivery_derivative(self.png, ''))
+
+
+class ConfigureCloudinaryTestCase(TestCase):
+    """Test cases for configuring the Cloudinary client once"""
+
+    def setUp(self):
+        patcher = mock.patch.object(cloudinary_utils, '_configured_credentials', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @mock.patch.dict('os.environ', {
+        'CLOUDINARY_CLOUD_NAME': 'demo', 'CLOUDINARY_API_KEY': 'key', 'CLOUDINARY_API_SECRET': 'secret'
+    })
+    def test_configures_once_until_credentials_change(self):
+        with mock.patch.object(cloudinary_utils.cloudinary, 'config') as config:
+            self.assertTrue(cloudinary_utils.configure_cloudinary())
+            self.assertTrue(cloudinary_utils.configure_cloudinary())
+            self.assertEqual(config.call_count, 1)
+
+            with mock.patch.dict('os.environ', {'CLOUDINARY_API_KEY': 'rotated'}):
+                self.assertTrue(cloudinary_utils.configure_cloudinary())
+            self.assertEqual(config.call_count, 2)
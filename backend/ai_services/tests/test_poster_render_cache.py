@@ -0,0 +1,200 @@
+"""
+Unit tests for the content-addressed poster render cache
+"""
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from ai_services.ai_poster_service import AIPosterService
+from ai_services.caching import PosterRenderCache
+from organizations.models import Organization, OrganizationMember
+
+User = get_user_model()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PosterRenderCacheTestCase(TestCase):
+    """Test cases for render cache keys, eviction and AIPosterService integration"""
+
+    def setUp(self):
+        cache.clear()
+        self.render_cache = PosterRenderCache()
+        self.user = User.objects.create_user(
+            username='renderuser',
+            email='render@example.com',
+            password='testpass123'
+        )
+        self.organization = Organization.objects.create(name='Weavers', slug='weavers')
+        OrganizationMember.objects.create(organization=self.organization, user=self.user, role='admin')
+
+        self.service = AIPosterService()
+        self.service.client = object()
+        self.render_count = 0
+
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+
+        patchers = [
+            mock.patch('ai_services.ai_poster_service.poster_render_cache', self.render_cache),
+            mock.patch('ai_services.caching.default_storage'),
+            mock.patch.object(self.service, '_generate_from_prompt', side_effect=self.fake_render),
+            mock.patch.object(self.service, '_generate_with_image', side_effect=self.fake_render),
+            mock.patch.object(self.service, '_generate_composite', side_effect=self.fake_render),
+        ]
+        mocks = [patcher.start() for patcher in patchers]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+        self.storage = mocks[1]
+        self.storage.exists.return_value = True
+
+    def fake_render(self, prompt, *args):
+        self.render_count += 1
+        return {
+            'status': 'success',
+            'image_path': f'generated_posters/poster_{self.render_count}.png',
+            'caption': prompt,
+        }
+
+    def write_image(self, name, content):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'wb') as image_file:
+            image_file.write(content)
+        return path
+
+    def test_identical_prompt_is_served_from_cache(self):
+        first = self.service.generate_from_prompt('Silk  saree', '4:5', user=self.user)
+        second = self.service.generate_from_prompt('silk saree', '4:5', user=self.user)
+
+        self.assertEqual(self.render_count, 1)
+        self.assertTrue(second['cached'])
+        self.assertEqual(second['image_path'], first['image_path'])
+
+        stats = self.render_cache.get_cache_stats()['renders']['prompt']
+        self.assertEqual((stats['hits'], stats['misses'], stats['stores']), (1, 1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_aspect_ratio_and_branding_change_the_key(self):
+        self.service.generate_from_prompt('Silk saree', '1:1', user=self.user)
+        self.service.generate_from_prompt('Silk saree', '16:9', user=self.user)
+        with mock.patch.object(PosterRenderCache, '_branding_version', return_value='7:2026-01-01'):
+            self.service.generate_from_prompt('Silk saree', '1:1', user=self.user)
+
+        self.assertEqual(self.render_count, 3)
+
+    def test_image_content_is_part_of_the_key(self):
+        image_path = self.write_image('input.png', b'first')
+        self.service.generate_with_image('Add logo', image_path, '1:1', user=self.user)
+        self.service.generate_with_image('Add logo', image_path, '1:1', user=self.user)
+        self.assertEqual(self.render_count, 1)
+
+        with open(image_path, 'wb') as image_file:
+            image_file.write(b'second image')
+        self.service.generate_with_image('Add logo', image_path, '1:1', user=self.user)
+        self.assertEqual(self.render_count, 2)
+
+    def test_composite_renders_are_scoped_per_tenant(self):
+        image_path = self.write_image('input.png', b'fabric')
+        other_user = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='testpass123'
+        )
+        other_organization = Organization.objects.create(name='Dyers', slug='dyers')
+        OrganizationMember.objects.create(organization=other_organization, user=other_user, role='admin')
+
+        self.service.generate_composite('Collage', [image_path], '16:9', user=self.user)
+        self.service.generate_composite('Collage', [image_path], '16:9', user=self.user)
+        self.assertEqual(self.render_count, 1)
+
+        result = self.service.generate_composite('Collage', [image_path], '16:9', user=other_user)
+        self.assertEqual(self.render_count, 2)
+        self.assertNotIn('cached', result)
+
+        Organization.objects.filter(id=self.organization.id).update(poster_cache_enabled=False)
+        self.service.generate_composite('Collage', [image_path], '16:9', user=self.user)
+        self.assertEqual(self.render_count, 3)
+
+    def test_renders_without_a_tenant_are_not_cached(self):
+        image_path = self.write_image('input.png', b'fabric')
+        self.service.generate_composite('Collage', [image_path], '16:9')
+        self.service.generate_composite('Collage', [image_path], '16:9')
+        self.service.generate_from_prompt('Silk saree', '1:1')
+        self.service.generate_from_prompt('Silk saree', '1:1')
+
+        self.assertEqual(self.render_count, 4)
+
+    def test_anonymous_generate_request_skips_the_fallback_users_cache(self):
+        self.service.api_key = 'test-key'
+        self.service.generate_from_prompt('Silk saree', '1:1', user=self.user)
+
+        # The development header resolves the branding user, not the cache tenant
+        with mock.patch('ai_services.ai_poster_views.ai_poster_service', self.service):
+            response = self.client.post(
+                '/api/ai/ai-poster/generate_poster/',
+                {'prompt': 'Silk saree', 'aspect_ratio': '1:1'},
+                content_type='application/json',
+                HTTP_X_DEV_USER_ID=str(self.user.id)
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.render_count, 2)
+        self.assertEqual(self.render_cache.get_cache_stats()['renders']['prompt']['hits'], 0)
+
+    @mock.patch('ai_services.ai_poster_views.ai_poster_service')
+    def test_anonymous_edit_request_skips_the_render_cache(self, mock_service):
+        mock_service.is_available.return_value = True
+        mock_service.generate_with_image.return_value = {'status': 'error', 'message': 'stop'}
+
+        with self.settings(MEDIA_ROOT=self.temp_dir), \
+                open(self.write_image('input.png', b'fabric'), 'rb') as image_file:
+            self.client.post(
+                '/api/ai/ai-poster/edit_poster/',
+                {'prompt': 'Add logo', 'image': image_file},
+                HTTP_X_DEV_USER_ID=str(self.user.id)
+            )
+
+        mock_service.generate_with_image.assert_called_once()
+        self.assertIs(mock_service.generate_with_image.call_args.kwargs['use_cache'], False)
+
+    def test_tenant_opt_out_and_use_cache_flag(self):
+        self.service.generate_from_prompt('Silk saree', '1:1', user=self.user, use_cache=False)
+        self.service.generate_from_prompt('Silk saree', '1:1', user=self.user, use_cache=False)
+        self.assertEqual(self.render_count, 2)
+
+        Organization.objects.filter(id=self.organization.id).update(poster_cache_enabled=False)
+        self.service.generate_from_prompt('Cotton kurta', '1:1', user=self.user)
+        self.service.generate_from_prompt('Cotton kurta', '1:1', user=self.user)
+        self.assertEqual(self.render_count, 4)
+
+    def test_tenant_lru_eviction(self):
+        self.render_cache.max_entries = 2
+        for prompt in ('one', 'two', 'one', 'three'):
+            self.service.generate_from_prompt(prompt, '1:1', user=self.user)
+        self.assertEqual(self.render_count, 3)
+
+        # 'two' was least recently used when 'three' was stored
+        self.service.generate_from_prompt('one', '1:1', user=self.user)
+        self.assertEqual(self.render_count, 3)
+        self.service.generate_from_prompt('two', '1:1', user=self.user)
+        self.assertEqual(self.render_count, 4)
+
+    def test_missing_stored_image_invalidates_entry(self):
+        self.service.generate_from_prompt('Silk saree', '1:1', user=self.user)
+        self.storage.exists.return_value = False
+
+        result = self.service.generate_from_prompt('Silk saree', '1:1', user=self.user)
+
+        self.assertEqual(self.render_count, 2)
+        self.assertNotIn('cached', result)
+
+    def test_failed_renders_are_not_cached(self):
+        with mock.patch.object(self.service, '_generate_from_prompt', return_value={'status': 'error'}) as render:
+            self.service.generate_from_prompt('Silk saree', '1:1', user=self.user)
+            self.service.generate_from_prompt('Silk saree', '1:1', user=self.user)
+
+        self.assertEqual(render.call_count, 2)
@@ -0,0 +1,167 @@
+"""
+Unit tests for the shared GCRA rate limiter
+"""
+import json
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from ai_services.rate_limiter import (
+    LocalRateLimiter, RateLimitRule, RedisRateLimiter, get_rules_for, retry_after_header
+)
+
+try:
+    import fakeredis
+except ImportError:  # Optional; only used to exercise the Lua script locally
+    fakeredis = None
+
+
+class LimiterBehaviourMixin:
+    """Behaviour shared by every limiter backend"""
+
+    def make_limiter(self):
+        raise NotImplementedError
+
+    def test_allows_up_to_limit_then_rejects(self):
+        limiter = self.make_limiter()
+        rule = RateLimitRule('api_general', 5, 60)
+
+        results = [limiter.hit(['org:user:api_general'], [rule]) for _ in range(6)]
+
+        self.assertTrue(all(result.allowed for result in results[:5]))
+        self.assertFalse(results[5].allowed)
+        self.assertEqual(results[5].rule, rule)
+        # One slot frees up every 60 / 5 = 12 seconds
+        self.assertGreater(results[5].retry_after, 11)
+        self.assertLessEqual(results[5].retry_after, 12)
+        self.assertEqual(retry_after_header(results[5]), '12')
+
+    def test_remaining_counts_down(self):
+        limiter = self.make_limiter()
+        rule = RateLimitRule('api_read', 3, 60)
+
+        remaining = [limiter.hit(['k'], [rule]).remaining for _ in range(3)]
+
+        self.assertEqual(remaining, [2, 1, 0])
+
+    def test_rejected_request_is_not_counted_against_other_rules(self):
+        limiter = self.make_limiter()
+        minute = RateLimitRule('ai_generation', 2, 60)
+        hour = RateLimitRule('ai_generation_hourly', 100, 3600)
+        keys = ['org:user:ai_generation', 'org:user:ai_generation_hourly']
+
+        for _ in range(5):
+            limiter.hit(keys, [minute, hour])
+
+        # Only the two allowed requests consumed hourly capacity
+        self.assertEqual(limiter.hit(['org:user:ai_generation_hourly'], [hour]).remaining, 97)
+
+    def test_keys_are_independent(self):
+        limiter = self.make_limiter()
+        rule = RateLimitRule('api_general', 1, 60)
+
+        self.assertTrue(limiter.hit(['org-a:user:api_general'], [rule]).allowed)
+        self.assertTrue(limiter.hit(['org-b:user:api_general'], [rule]).allowed)
+        self.assertFalse(limiter.hit(['org-a:user:api_general'], [rule]).allowed)
+
+
+class LocalRateLimiterTestCase(LimiterBehaviourMixin, SimpleTestCase):
+
+    def make_limiter(self):
+        return LocalRateLimiter()
+
+    def test_window_slides(self):
+        limiter = LocalRateLimiter()
+        rule = RateLimitRule('api_general', 2, 60)
+
+        with mock.patch('ai_services.rate_limiter.time.time', return_value=1000.0):
+            limiter.hit(['k'], [rule])
+            limiter.hit(['k'], [rule])
+            self.assertFalse(limiter.hit(['k'], [rule]).allowed)
+
+        with mock.patch('ai_services.rate_limiter.time.time', return_value=1030.0):
+            self.assertTrue(limiter.hit(['k'], [rule]).allowed)
+            self.assertFalse(limiter.hit(['k'], [rule]).allowed)
+
+    def test_expired_keys_are_pruned(self):
+        limiter = LocalRateLimiter(max_keys=2)
+        rule = RateLimitRule('api_general', 10, 1)
+
+        with mock.patch('ai_services.rate_limiter.time.time', return_value=1000.0):
+            limiter.hit(['a'], [rule])
+            limiter.hit(['b'], [rule])
+
+        with mock.patch('ai_services.rate_limiter.time.time', return_value=1010.0):
+            limiter.hit(['c'], [rule])
+
+        self.assertEqual(set(limiter._tats), {'c'})
+
+
+@mock.patch('ai_services.rate_limiter.logger')
+class RedisFallbackTestCase(SimpleTestCase):
+
+    def test_falls_back_when_redis_is_down(self, mock_logger):
+        client = mock.Mock()
+        client.register_script.return_value = mock.Mock(side_effect=ConnectionError('refused'))
+        limiter = RedisRateLimiter(client)
+        rule = RateLimitRule('api_general', 1, 60)
+
+        self.assertTrue(limiter.hit(['k'], [rule]).allowed)
+        self.assertFalse(limiter.hit(['k'], [rule]).allowed)
+        # Redis is not retried during the back-off period
+        self.assertEqual(client.register_script.return_value.call_count, 1)
+
+
+if fakeredis is not None:
+    class RedisRateLimiterTestCase(LimiterBehaviourMixin, SimpleTestCase):
+
+        def make_limiter(self):
+            return RedisRateLimiter(fakeredis.FakeRedis())
+
+
+class RuleTableTestCase(SimpleTestCase):
+
+    def test_default_table(self):
+        self.assertEqual(
+            [rule.name for rule in get_rules_for('/api/ai/generation-requests/', 'POST')],
+            ['ai_generation', 'ai_generation_hourly']
+        )
+        self.assertEqual(
+            [rule.name for rule in get_rules_for('/api/ai/generation-requests/', 'GET')],
+            ['api_read']
+        )
+        self.assertEqual(
+            get_rules_for('/api/ai/ai-poster/generate_poster/', 'POST'),
+            [RateLimitRule('api_general', 60, 60)]
+        )
+
+    @override_settings(AI_RATE_LIMITS=[('/ai/ai-poster/', 'POST', [('poster_generation', 5, 60)])])
+    def test_table_override(self):
+        self.assertEqual(
+            get_rules_for('/api/ai/ai-poster/generate_poster/', 'POST'),
+            [RateLimitRule('poster_generation', 5, 60)]
+        )
+
+
+class RateLimitMiddlewareTestCase(SimpleTestCase):
+
+    @override_settings(AI_RATE_LIMIT_DEFAULT=[('api_general', 1, 60)])
+    def test_rejects_with_retry_after_header(self):
+        from django.test import RequestFactory
+        from ai_services.middleware import RateLimitMiddleware
+        from organizations.tenant_context import get_tenant_context
+
+        middleware = RateLimitMiddleware(lambda request: None)
+        middleware.limiter = LocalRateLimiter()
+        request = RequestFactory().get('/api/ai/ai-poster/status/')
+        request.user = mock.Mock(is_authenticated=True, id=1)
+        get_tenant_context(request).set_organization(mock.Mock(id='org-1'))
+
+        self.assertIsNone(middleware.process_request(request))
+        response = middleware.process_request(request)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        data = json.loads(response.content)
+        self.assertEqual(data['retry_after'], 60)
+        self.assertEqual(data['limit'], 1)
@@ -0,0 +1,201 @@
+"""
+Unit tests for UsageTracker quota updates and usage analytics
+"""
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ai_services.models import AIGenerationRequest, AIProvider, AIUsageQuota
+from ai_services.usage_tracker import UsageTracker
+from organizations.models import Organization
+
+User = get_user_model()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class UsageTrackerQuotaTestCase(TestCase):
+    """Test cases for the single-statement quota engine"""
+
+    def setUp(self):
+        cache.clear()
+        self.tracker = UsageTracker()
+        self.organization = Organization.objects.create(name='Weavers', slug='weavers')
+        self.user = User.objects.create_user(
+            username='quotauser',
+            email='quota@example.com',
+            password='testpass123'
+        )
+
+    def track(self, cost=0.5):
+        return self.tracker.track_usage(self.organization, self.user, 'text_generation', cost=cost)
+
+    def test_first_use_creates_all_windows(self):
+        result = self.track()
+
+        self.assertTrue(result['success'])
+        for quota_type in ('monthly', 'daily', 'hourly'):
+            self.assertEqual(result[f'{quota_type}_quota']['current_requests'], 1)
+            self.assertEqual(result[f'{quota_type}_quota']['current_cost'], 0.5)
+        self.assertEqual(AIUsageQuota.objects.filter(organization=self.organization).count(), 3)
+
+    def test_repeated_usage_accumulates(self):
+        for _ in range(3):
+            result = self.track(cost=0.25)
+
+        self.assertEqual(result['monthly_quota']['current_requests'], 3)
+        self.assertEqual(result['hourly_quota']['current_cost'], 0.75)
+        quota = AIUsageQuota.objects.get(organization=self.organization, quota_type='daily')
+        self.assertEqual(quota.current_requests, 3)
+        self.assertEqual(quota.current_cost, Decimal('0.75'))
+
+    def test_expired_window_is_reset(self):
+        self.track()
+        self.track()
+        past = timezone.now() - timedelta(minutes=5)
+        AIUsageQuota.objects.filter(quota_type='hourly').update(reset_at=past)
+
+        result = self.track(cost=1.0)
+
+        self.assertEqual(result['hourly_quota']['current_requests'], 1)
+        self.assertEqual(result['hourly_quota']['current_cost'], 1.0)
+        self.assertGreater(result['hourly_quota']['reset_at'], timezone.now())
+        self.assertEqual(result['daily_quota']['current_requests'], 3)
+
+    def test_quota_exceeded(self):
+        self.track()
+        AIUsageQuota.objects.filter(quota_type='hourly').update(max_requests=3)
+
+        self.assertFalse(self.track()['quota_exceeded'])
+        self.assertTrue(self.track()['quota_exceeded'])
+
+    def test_concurrent_first_use_counts_both_requests(self):
+        increment_all = self.tracker._increment_all_quotas
+        calls = []
+
+        def interleaved(*args, **kwargs):
+            # Another request creates and counts the windows right after this one found them missing
+            complete = increment_all(*args, **kwargs)
+            calls.append(complete)
+            if len(calls) == 1:
+                UsageTracker().track_usage(self.organization, self.user, 'text_generation', cost=0.5)
+            return complete
+
+        with mock.patch.object(self.tracker, '_increment_all_quotas', side_effect=interleaved):
+            result = self.track()
+
+        self.assertEqual(calls, [False])
+        for quota_type in ('monthly', 'daily', 'hourly'):
+            self.assertEqual(result[f'{quota_type}_quota']['current_requests'], 2)
+            self.assertEqual(result[f'{quota_type}_quota']['current_cost'], 1.0)
+        self.assertEqual(AIUsageQuota.objects.filter(organization=self.organization).count(), 3)
+
+    def test_steady_state_query_count(self):
+        self.track()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.track()
+
+        statements = [
+            query['sql'] for query in queries.captured_queries
+            if not query['sql'].upper().startswith(('SAVEPOINT', 'RELEASE', 'ROLLBACK'))
+        ]
+        # One UPDATE for all windows plus one SELECT to read them back
+        self.assertEqual(len(statements), 2, statements)
+
+    def test_provider_edits_invalidate_the_cached_provider(self):
+        self.track()
+        AIProvider.objects.filter(name='gemini').update(rate_limit_per_minute=5)
+        self.assertEqual(self.tracker._get_or_create_provider('gemini').rate_limit_per_minute, 60)
+
+        # Saving through the ORM (as the admin does) is seen by every process sharing the cache
+        provider = AIProvider.objects.get(name='gemini')
+        provider.rate_limit_per_minute = 10
+        provider.save()
+        self.assertEqual(self.tracker._get_or_create_provider('gemini').rate_limit_per_minute, 10)
+
+        with override_settings(AI_PROVIDER_CACHE_TIMEOUT=0):
+            cache.clear()
+            self.tracker._get_or_create_provider('gemini')
+            AIProvider.objects.filter(name='gemini').update(rate_limit_per_minute=20)
+            self.assertEqual(self.tracker._get_or_create_provider('gemini').rate_limit_per_minute, 20)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class UsageAnalyticsTestCase(TestCase):
+    """Test cases for the grouped-query usage analytics"""
+
+    def setUp(self):
+        cache.clear()
+        self.tracker = UsageTracker()
+        self.organization = Organization.objects.create(name='Weavers', slug='weavers')
+        self.user = User.objects.create_user(
+            username='analyticsuser',
+            email='analytics@example.com',
+            password='testpass123'
+        )
+        gemini = AIProvider.objects.create(name='gemini')
+        openai = AIProvider.objects.create(name='openai')
+
+        now = timezone.now()
+        rows = [
+            # (provider, generation_type, status, cost, processing_time, days ago)
+            (gemini, 'text_generation', 'completed', '0.10', 2.0, 0),
+            (gemini, 'text_generation', 'failed', None, None, 1),
+            (gemini, 'content_analysis', 'completed', '0.30', 4.0, 1),
+            (openai, 'data_processing', 'pending', '0.20', None, 3),
+            (openai, 'text_generation', 'completed', '0.40', 6.0, 40),  # outside the period
+        ]
+        for provider, generation_type, request_status, cost, processing_time, days_ago in rows:
+            request = AIGenerationRequest.objects.create(
+                organization=self.organization,
+                user=self.user,
+                provider=provider,
+                generation_type=generation_type,
+                status=request_status,
+                prompt='prompt',
+                cost=Decimal(cost) if cost else None,
+                processing_time=processing_time
+            )
+            AIGenerationRequest.objects.filter(id=request.id).update(created_at=now - timedelta(days=days_ago))
+
+    def test_analytics_values(self):
+        analytics = self.tracker.get_usage_analytics(self.organization, days=30, use_cache=False)
+
+        self.assertTrue(analytics['success'])
+        self.assertEqual(analytics['summary'], {
+            'total_requests': 4,
+            'successful_requests': 2,
+            'failed_requests': 1,
+            'success_rate': 50.0,
+            'total_cost': 0.6,
+            'avg_cost_per_request': 0.2,
+            'avg_processing_time': 3.0,
+        })
+        self.assertEqual(analytics['usage_by_type']['text_generation'], {'count': 2, 'cost': 0.1, 'success_rate': 50.0})
+        self.assertEqual(analytics['usage_by_type']['data_processing']['success_rate'], 0)
+        self.assertEqual(analytics['usage_by_provider']['openai'], {'count': 1, 'cost': 0.2, 'success_rate': 0.0})
+        self.assertEqual(len(analytics['daily_trends']), 30)
+        self.assertEqual(sum(day['requests'] for day in analytics['daily_trends']), 3)
+        self.assertEqual(analytics['top_users'][0]['request_count'], 4)
+
+    def test_query_count_does_not_depend_on_period(self):
+        with CaptureQueriesContext(connection) as short_period:
+            self.tracker.get_usage_analytics(self.organization, days=7, use_cache=False)
+        with CaptureQueriesContext(connection) as long_period:
+            self.tracker.get_usage_analytics(self.organization, days=90, use_cache=False)
+
+        self.assertEqual(len(short_period), len(long_period))
+        self.assertLessEqual(len(long_period), 6)
+
+    def test_analytics_are_cached_per_organization(self):
+        first = self.tracker.get_usage_analytics(self.organization)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.tracker.get_usage_analytics(self.organization), first)
@@ -0,0 +1,237 @@
+"""
+Vectorized texture engine for fabric analysis.
+Computes Local Binary Patterns and Gray Level Co-occurrence Matrices with
+shifted NumPy views instead of per-pixel Python loops.
+"""
+import logging
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 8-neighbourhood in LBP bit order (most significant bit first):
+# top-left, top, top-right, right, bottom-right, bottom, bottom-left, left
+LBP_NEIGHBOR_OFFSETS: Tuple[Tuple[int, int], ...] = (
+    (-1, -1), (-1, 0), (-1, 1), (0, 1),
+    (1, 1), (1, 0), (1, -1), (0, -1),
+)
+
+# Offsets (row, col) used by the original FabricAnalyzer GLCM: right + down
+GLCM_DEFAULT_OFFSETS: Tuple[Tuple[int, int], ...] = ((0, 1), (1, 0))
+
+# Standard GLCM angles at distance 1, expressed as (row, col) offsets
+GLCM_ANGLE_OFFSETS: Dict[int, Tuple[int, int]] = {
+    0: (0, 1),
+    45: (-1, 1),
+    90: (-1, 0),
+    135: (-1, -1),
+}
+
+
+def compute_lbp_image(gray_image: np.ndarray) -> np.ndarray:
+    """
+    Compute the 8-neighbour Local Binary Pattern image.
+
+    Border pixels are left at 0, matching the original per-pixel implementation.
+
+    Args:
+        gray_image: 2-D grayscale image
+
+    Returns:
+        uint8 array of LBP codes with the same shape as the input
+    """
+    gray = np.asarray(gray_image)
+    height, width = gray.shape[:2]
+    lbp_image = np.zeros((height, width), dtype=np.uint8)
+
+    if height < 3 or width < 3:
+        return lbp_image
+
+    center = gray[1:-1, 1:-1]
+    codes = lbp_image[1:-1, 1:-1]
+
+    for bit, (dy, dx) in zip(range(7, -1, -1), LBP_NEIGHBOR_OFFSETS):
+        neighbor = gray[1 + dy:height - 1 + dy, 1 + dx:width - 1 + dx]
+        codes |= (neighbor >= center).view(np.uint8) << np.uint8(bit)
+
+    return lbp_image
+
+
+def lbp_histogram(gray_image: np.ndarray) -> np.ndarray:
+    """
+    Compute the normalized 256-bin LBP histogram.
+
+    Avoids materialising the full bordered LBP image: interior codes are
+    counted with ``bincount`` and the zero-valued border is added to bin 0.
+
+    Args:
+        gray_image: 2-D grayscale image
+
+    Returns:
+        float64 array of 256 bin frequencies summing to 1
+    """
+    gray = np.asarray(gray_image)
+    height, width = gray.shape[:2]
+    total = height * width
+
+    if total == 0:
+        return np.zeros(256, dtype=np.float64)
+
+    if height < 3 or width < 3:
+        hist = np.zeros(256, dtype=np.float64)
+        hist[0] = 1.0
+        return hist
+
+    codes = compute_lbp_image(gray)[1:-1, 1:-1]
+    counts = np.bincount(codes.ravel(), minlength=256).astype(np.float64)
+    counts[0] += total - codes.size
+
+    return counts / total
+
+
+def lbp_features(gray_image: np.ndarray) -> Dict[str, float]:
+    """
+    Compute roughness/smoothness from the LBP histogram.
+
+    Args:
+        gray_image: 2-D grayscale image
+
+    Returns:
+        Dictionary with 'roughness' and 'smoothness' in [0, 1]
+    """
+    hist = lbp_histogram(gray_image)
+    roughness = float(np.dot(hist, np.arange(256)) / 255)
+
+    return {
+        'roughness': roughness,
+        'smoothness': 1 - roughness,
+    }
+
+
+def quantize_gray(gray_image: np.ndarray, levels: int = 8) -> np.ndarray:
+    """Quantize a uint8 grayscale image to ``levels`` gray levels"""
+    return (np.asarray(gray_image) // (256 // levels)).astype(np.uint8)
+
+
+def compute_glcm(
+    gray_image: np.ndarray,
+    levels: int = 8,
+    offsets: Optional[Iterable[Tuple[int, int]]] = None,
+    normalize: bool = True,
+) -> np.ndarray:
+    """
+    Compute a Gray Level Co-occurrence Matrix summed over several offsets.
+
+    Every offset is evaluated over the same reference window (the pixels for
+    which all offsets stay inside the image), which reproduces the original
+    loop for the default right/down offsets.
+
+    Args:
+        gray_image: 2-D uint8 grayscale image
+        levels: Number of quantized gray levels
+        offsets: Iterable of (row, col) offsets, defaults to right + down
+        normalize: Divide by the total number of pairs
+
+    Returns:
+        levels x levels float64 co-occurrence matrix
+    """
+    offsets = tuple(offsets) if offsets is not None else GLCM_DEFAULT_OFFSETS
+    return _glcm_from_quantized(quantize_gray(gray_image, levels), levels, offsets, normalize)
+
+
+def _glcm_from_quantized(
+    quantized: np.ndarray,
+    levels: int,
+    offsets: Tuple[Tuple[int, int], ...],
+    normalize: bool = True,
+) -> np.ndarray:
+    """Accumulate co-occurrence counts of an already quantized image with bincount"""
+    height, width = quantized.shape[:2]
+
+    row_start = max(0, -min(dy for dy, _ in offsets))
+    row_end = height - max(0, max(dy for dy, _ in offsets))
+    col_start = max(0, -min(dx for _, dx in offsets))
+    col_end = width - max(0, max(dx for _, dx in offsets))
+
+    counts = np.zeros(levels * levels, dtype=np.int64)
+
+    if row_end > row_start and col_end > col_start:
+        reference = quantized[row_start:row_end, col_start:col_end].astype(np.int32) * levels
+        for dy, dx in offsets:
+            neighbor = quantized[row_start + dy:row_end + dy, col_start + dx:col_end + dx]
+            counts += np.bincount((reference + neighbor).ravel(), minlength=levels * levels)
+
+    glcm = counts.reshape(levels, levels).astype(np.float64)
+
+    if normalize:
+        total = glcm.sum()
+        if total > 0:
+            glcm /= total
+
+    return glcm
+
+
+def compute_glcm_by_angle(
+    gray_image: np.ndarray,
+    levels: int = 8,
+    angles: Iterable[int] = (0, 45, 90, 135),
+    distance: int = 1,
+) -> Dict[int, np.ndarray]:
+    """
+    Compute one normalized GLCM per angle.
+
+    The image is quantized once and shared by every angle.
+
+    Args:
+        gray_image: 2-D uint8 grayscale image
+        levels: Number of quantized gray levels
+        angles: Angles in degrees (0, 45, 90, 135)
+        distance: Pixel distance between pairs
+
+    Returns:
+        Dictionary mapping angle to its levels x levels GLCM
+    """
+    quantized = quantize_gray(gray_image, levels)
+    result = {}
+
+    for angle in angles:
+        dy, dx = GLCM_ANGLE_OFFSETS[angle]
+        result[angle] = _glcm_from_quantized(quantized, levels, ((dy * distance, dx * distance),))
+
+    return result
+
+
+def glcm_properties(glcm: np.ndarray) -> Dict[str, float]:
+    """
+    Compute Haralick-style properties of a normalized GLCM.
+
+    Args:
+        glcm: Normalized co-occurrence matrix
+
+    Returns:
+        Dictionary with contrast, homogeneity, energy and correlation
+    """
+    i, j = np.meshgrid(np.arange(glcm.shape[0]), np.arange(glcm.shape[1]), indexing='ij')
+    diff = i - j
+
+    contrast = np.sum(glcm * np.square(diff))
+    homogeneity = np.sum(glcm / (1 + np.abs(diff)))
+    energy = np.sum(glcm ** 2)
+
+    mu_i = np.sum(i * glcm)
+    mu_j = np.sum(j * glcm)
+    sigma_i = np.sqrt(np.sum(glcm * (i - mu_i) ** 2))
+    sigma_j = np.sqrt(np.sum(glcm * (j - mu_j) ** 2))
+
+    if sigma_i == 0 or sigma_j == 0:
+        correlation = 0.0
+    else:
+        correlation = np.sum(glcm * (i - mu_i) * (j - mu_j)) / (sigma_i * sigma_j)
+
+    return {
+        'contrast': float(contrast),
+        'homogeneity': float(homogeneity),
+        'energy': float(energy),
+        'correlation': float(correlation),
+    }
@@ -39,6 +39,9 @@ urlpatterns = [
     
     # AI Poster Generation URLs
     path('ai-poster/generate_poster/', ai_poster_views.generate_poster, name='generate-poster'),
+    path('ai-poster/jobs/', ai_poster_views.create_poster_job, name='create-poster-job'),
+    path('ai-poster/jobs/<str:job_id>/', ai_poster_views.poster_job_status, name='poster-job-status'),
+    path('ai-poster/jobs/<str:job_id>/events/', ai_poster_views.poster_job_events, name='poster-job-events'),
     path('ai-poster/edit_poster/', ai_poster_views.edit_poster, name='edit-poster'),
     path('ai-poster/composite_poster/', ai_poster_views.composite_poster, name='composite-poster'),
     path('ai-poster/add_text_overlay/', ai_poster_views.add_text_overlay, name='add-text-overlay'),
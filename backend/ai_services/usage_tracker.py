@@ -8,10 +8,13 @@ from typing import Dict, List, Any, Optional
 from decimal import Decimal
 from django.conf import settings
 from django.utils import timezone
+from django.core.cache import cache
 from django.db import transaction
-from django.db.models import Sum, Count, Avg
+from django.db.models import Sum, Count, Avg, Case, When, F, Q, Value, DecimalField
+from django.db.models.functions import TruncDate
 from datetime import timedelta, datetime
 
+from .caching import invalidate_provider_cache, provider_cache_key
 from .models import AIGenerationRequest, AIUsageQuota, AIProvider
 from organizations.models import Organization
 
@@ -24,6 +27,8 @@ stripe.api_key = settings.STRIPE_SECRET_KEY if hasattr(settings, 'STRIPE_SECRET_
 class UsageTracker:
     """Advanced usage tracking and quota management system"""
     
+    QUOTA_TYPES = ('monthly', 'daily', 'hourly')
+    
     def __init__(self):
         self.stripe_configured = bool(stripe.api_key)
         if not self.stripe_configured:
@@ -53,32 +58,16 @@ class UsageTracker:
                 # Get or create provider
                 provider = self._get_or_create_provider(provider_name)
                 
-                # Update monthly quota
-                monthly_result = self._update_quota(
-                    organization=organization,
-                    provider=provider,
-                    generation_type=generation_type,
-                    quota_type='monthly',
-                    cost=cost
-                )
-                
-                # Update daily quota
-                daily_result = self._update_quota(
+                # Update monthly, daily and hourly quotas in one statement
+                quota_results = self._update_quotas(
                     organization=organization,
                     provider=provider,
                     generation_type=generation_type,
-                    quota_type='daily',
-                    cost=cost
-                )
-                
-                # Update hourly quota
-                hourly_result = self._update_quota(
-                    organization=organization,
-                    provider=provider,
-                    generation_type=generation_type,
-                    quota_type='hourly',
                     cost=cost
                 )
+                monthly_result = quota_results['monthly']
+                daily_result = quota_results['daily']
+                hourly_result = quota_results['hourly']
                 
                 # Check if any quota is exceeded
                 quota_exceeded = (
@@ -110,6 +99,8 @@ class UsageTracker:
                 return result
                 
         except Exception as e:
+            # The cached provider may have been deleted; look it up again next time
+            invalidate_provider_cache(provider_name)
             logger.error(f"Failed to track usage: {str(e)}")
             return {
                 'success': False,
@@ -195,17 +186,31 @@ class UsageTracker:
     
     def get_usage_analytics(self,
                           organization: Organization,
-                          days: int = 30) -> Dict[str, Any]:
+                          days: int = 30,
+                          use_cache: bool = True) -> Dict[str, Any]:
         """
         Get comprehensive usage analytics
         
+        Every breakdown is computed with a grouped query, so the number of
+        queries does not depend on the number of days, types or providers.
+        
         Args:
             organization: Organization instance
             days: Number of days to analyze
+            use_cache: Serve and store the result in the per-organization cache
             
         Returns:
             Dictionary containing usage analytics
         """
+        cache_key = f"usage_analytics:{organization.id}:{days}"
+        if use_cache:
+            try:
+                cached_analytics = cache.get(cache_key)
+                if cached_analytics is not None:
+                    return cached_analytics
+            except Exception as e:
+                logger.warning(f"Usage analytics cache unavailable: {str(e)}")
+        
         try:
             start_date = timezone.now() - timedelta(days=days)
             
@@ -214,49 +219,51 @@ class UsageTracker:
                 organization=organization,
                 created_at__gte=start_date
             )
+            completed = Q(status='completed')
             
             # Basic metrics
-            total_requests = requests.count()
-            successful_requests = requests.filter(status='completed').count()
-            failed_requests = requests.filter(status='failed').count()
+            summary = requests.aggregate(
+                total_requests=Count('id'),
+                successful_requests=Count('id', filter=completed),
+                failed_requests=Count('id', filter=Q(status='failed')),
+                total_cost=Sum('cost'),
+                avg_cost_per_request=Avg('cost'),
+                avg_processing_time=Avg('processing_time', filter=completed)
+            )
+            total_requests = summary['total_requests']
+            successful_requests = summary['successful_requests']
             success_rate = (successful_requests / total_requests * 100) if total_requests > 0 else 0
-            
-            # Cost metrics
-            total_cost = requests.aggregate(total=Sum('cost'))['total'] or 0
-            avg_cost_per_request = requests.filter(cost__isnull=False).aggregate(avg=Avg('cost'))['avg'] or 0
+            avg_processing_time = summary['avg_processing_time'] or 0
             
             # Usage by generation type
-            usage_by_type = {}
-            for gen_type in AIGenerationRequest.GENERATION_TYPES:
-                type_requests = requests.filter(generation_type=gen_type[0])
-                usage_by_type[gen_type[0]] = {
-                    'count': type_requests.count(),
-                    'cost': float(type_requests.aggregate(total=Sum('cost'))['total'] or 0),
-                    'success_rate': (type_requests.filter(status='completed').count() / type_requests.count() * 100) if type_requests.count() > 0 else 0
-                }
+            usage_by_type = {
+                gen_type[0]: {'count': 0, 'cost': 0.0, 'success_rate': 0}
+                for gen_type in AIGenerationRequest.GENERATION_TYPES
+            }
+            for row in self._grouped_usage(requests, 'generation_type'):
+                if row['generation_type'] in usage_by_type:
+                    usage_by_type[row['generation_type']] = self._usage_entry(row)
             
             # Usage by provider
-            usage_by_provider = {}
-            providers = requests.values('provider__name').distinct()
-            for provider_data in providers:
-                provider_name = provider_data['provider__name']
-                provider_requests = requests.filter(provider__name=provider_name)
-                usage_by_provider[provider_name] = {
-                    'count': provider_requests.count(),
-                    'cost': float(provider_requests.aggregate(total=Sum('cost'))['total'] or 0),
-                    'success_rate': (provider_requests.filter(status='completed').count() / provider_requests.count() * 100) if provider_requests.count() > 0 else 0
-                }
+            usage_by_provider = {
+                row['provider__name']: self._usage_entry(row)
+                for row in self._grouped_usage(requests, 'provider__name')
+            }
             
             # Daily usage trends
+            daily_rows = {
+                row['day']: row
+                for row in self._grouped_usage(requests.annotate(day=TruncDate('created_at')), 'day')
+            }
             daily_usage = []
             for i in range(days):
-                date = start_date + timedelta(days=i)
-                day_requests = requests.filter(created_at__date=date.date())
+                date = (start_date + timedelta(days=i)).date()
+                row = daily_rows.get(date)
                 daily_usage.append({
-                    'date': date.date().isoformat(),
-                    'requests': day_requests.count(),
-                    'cost': float(day_requests.aggregate(total=Sum('cost'))['total'] or 0),
-                    'successful': day_requests.filter(status='completed').count()
+                    'date': date.isoformat(),
+                    'requests': row['count'] if row else 0,
+                    'cost': float(row['cost'] or 0) if row else 0.0,
+                    'successful': row['successful'] if row else 0
                 })
             
             # Top users
@@ -265,14 +272,6 @@ class UsageTracker:
                 total_cost=Sum('cost')
             ).order_by('-request_count')[:10]
             
-            # Processing time analytics
-            processing_times = requests.filter(
-                status='completed',
-                processing_time__isnull=False
-            ).values_list('processing_time', flat=True)
-            
-            avg_processing_time = sum(processing_times) / len(processing_times) if processing_times else 0
-            
             analytics = {
                 'success': True,
                 'period_days': days,
@@ -281,10 +280,10 @@ class UsageTracker:
                 'summary': {
                     'total_requests': total_requests,
                     'successful_requests': successful_requests,
-                    'failed_requests': failed_requests,
+                    'failed_requests': summary['failed_requests'],
                     'success_rate': round(success_rate, 2),
-                    'total_cost': float(total_cost),
-                    'avg_cost_per_request': float(avg_cost_per_request),
+                    'total_cost': float(summary['total_cost'] or 0),
+                    'avg_cost_per_request': float(summary['avg_cost_per_request'] or 0),
                     'avg_processing_time': round(avg_processing_time, 2)
                 },
                 'usage_by_type': usage_by_type,
@@ -294,6 +293,12 @@ class UsageTracker:
                 'quota_status': self._get_quota_status(organization)
             }
             
+            if use_cache:
+                try:
+                    cache.set(cache_key, analytics, getattr(settings, 'USAGE_ANALYTICS_CACHE_TIMEOUT', 300))
+                except Exception as e:
+                    logger.warning(f"Failed to cache usage analytics: {str(e)}")
+            
             return analytics
             
         except Exception as e:
@@ -303,6 +308,22 @@ class UsageTracker:
                 'error': str(e)
             }
     
+    def _grouped_usage(self, requests, field: str):
+        """Count, cost and successful requests grouped by a single field"""
+        return requests.order_by().values(field).annotate(
+            count=Count('id'),
+            cost=Sum('cost'),
+            successful=Count('id', filter=Q(status='completed'))
+        )
+    
+    def _usage_entry(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Format a grouped usage row"""
+        return {
+            'count': row['count'],
+            'cost': float(row['cost'] or 0),
+            'success_rate': (row['successful'] / row['count'] * 100) if row['count'] > 0 else 0
+        }
+    
     def create_billing_invoice(self,
                              organization: Organization,
                              amount: float,
@@ -374,67 +395,133 @@ class UsageTracker:
                 'error': str(e)
             }
     
-    def _update_quota(self,
-                     organization: Organization,
-                     provider: AIProvider,
-                     generation_type: str,
-                     quota_type: str,
-                     cost: float) -> Dict[str, Any]:
-        """Update specific quota"""
+    def _get_reset_at(self, quota_type: str, now: datetime) -> datetime:
+        """Calculate the next reset time for a quota type"""
+        if quota_type == 'monthly':
+            return now.replace(day=1, hour=0, minute=0, second=0, microsecond=0) + timedelta(days=32)
+        elif quota_type == 'daily':
+            return now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        else:  # hourly
+            return now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    
+    def _update_quotas(self,
+                      organization: Organization,
+                      provider: AIProvider,
+                      generation_type: str,
+                      cost: float) -> Dict[str, Dict[str, Any]]:
+        """
+        Increment every quota window for a generation
+        
+        All windows are updated by a single UPDATE whose increments (and
+        expired-window resets) are computed by the database, so concurrent
+        generations for the same organization never overwrite each other.
+        If any window row is missing the UPDATE is rolled back, the rows are
+        created (ignoring rows a concurrent request created first) and every
+        window is incremented again, so first-use races never drop a request.
+        
+        Args:
+            organization: Organization instance
+            provider: AIProvider instance
+            generation_type: Type of AI generation
+            cost: Cost of the generation
+            
+        Returns:
+            Dictionary mapping quota type to its quota result
+        """
         try:
-            # Calculate reset time based on quota type
             now = timezone.now()
-            if quota_type == 'monthly':
-                reset_at = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0) + timedelta(days=32)
-            elif quota_type == 'daily':
-                reset_at = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
-            else:  # hourly
-                reset_at = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
-            
-            # Get or create quota
-            quota, created = AIUsageQuota.objects.get_or_create(
+            cost = Decimal(str(cost))
+            quotas = AIUsageQuota.objects.filter(
                 organization=organization,
                 provider=provider,
                 generation_type=generation_type,
-                quota_type=quota_type,
-                defaults={
-                    'max_requests': self._get_default_max_requests(quota_type),
-                    'max_cost': self._get_default_max_cost(quota_type),
-                    'reset_at': reset_at
-                }
+                quota_type__in=self.QUOTA_TYPES
             )
             
-            # Check if quota needs reset
-            if now >= quota.reset_at:
-                quota.reset_usage()
-                quota.reset_at = reset_at
-                quota.save()
-            
-            # Increment usage
-            quota.increment_usage(cost=cost)
+            if not self._increment_all_quotas(quotas, cost, now):
+                # First use for this generation type: create the rows, then count the request once
+                AIUsageQuota.objects.bulk_create(
+                    [
+                        AIUsageQuota(
+                            organization=organization,
+                            provider=provider,
+                            generation_type=generation_type,
+                            quota_type=quota_type,
+                            max_requests=self._get_default_max_requests(quota_type),
+                            max_cost=self._get_default_max_cost(quota_type),
+                            reset_at=self._get_reset_at(quota_type, now)
+                        )
+                        for quota_type in self.QUOTA_TYPES
+                    ],
+                    ignore_conflicts=True
+                )
+                self._increment_quotas(quotas, self.QUOTA_TYPES, cost, now)
             
             return {
-                'quota_exceeded': quota.is_quota_exceeded(),
-                'current_requests': quota.current_requests,
-                'max_requests': quota.max_requests,
-                'current_cost': float(quota.current_cost),
-                'max_cost': float(quota.max_cost),
-                'reset_at': quota.reset_at,
-                'usage_percentage': {
-                    'requests': (quota.current_requests / quota.max_requests) * 100,
-                    'cost': (quota.current_cost / quota.max_cost) * 100
-                }
+                quota.quota_type: self._serialize_quota(quota)
+                for quota in quotas
             }
             
         except Exception as e:
             logger.error(f"Failed to update quota: {str(e)}")
             return {
-                'quota_exceeded': False,
-                'error': str(e)
+                quota_type: {'quota_exceeded': False, 'error': str(e)}
+                for quota_type in self.QUOTA_TYPES
             }
     
+    def _increment_all_quotas(self, quotas, cost: Decimal, now: datetime) -> bool:
+        """Count one request against every quota window, or against none if any row is missing"""
+        with transaction.atomic():
+            complete = self._increment_quotas(quotas, self.QUOTA_TYPES, cost, now) == len(self.QUOTA_TYPES)
+            if not complete:
+                transaction.set_rollback(True)
+        return complete
+    
+    def _increment_quotas(self, quotas, quota_types, cost: Decimal, now: datetime) -> int:
+        """Atomically count one request against the given quotas, resetting expired windows"""
+        expired = Q(reset_at__lte=now)
+        return quotas.update(
+            current_requests=Case(
+                When(expired, then=Value(1)),
+                default=F('current_requests') + 1
+            ),
+            current_cost=Case(
+                When(expired, then=Value(cost)),
+                default=F('current_cost') + cost,
+                output_field=DecimalField(max_digits=10, decimal_places=2)
+            ),
+            reset_at=Case(
+                *[
+                    When(expired & Q(quota_type=quota_type), then=Value(self._get_reset_at(quota_type, now)))
+                    for quota_type in quota_types
+                ],
+                default=F('reset_at')
+            ),
+            updated_at=now
+        )
+    
+    def _serialize_quota(self, quota: AIUsageQuota) -> Dict[str, Any]:
+        """Build the quota result returned by track_usage"""
+        return {
+            'quota_exceeded': quota.is_quota_exceeded(),
+            'current_requests': quota.current_requests,
+            'max_requests': quota.max_requests,
+            'current_cost': float(quota.current_cost),
+            'max_cost': float(quota.max_cost),
+            'reset_at': quota.reset_at,
+            'usage_percentage': {
+                'requests': (quota.current_requests / quota.max_requests) * 100,
+                'cost': (quota.current_cost / quota.max_cost) * 100
+            }
+        }
+    
     def _get_or_create_provider(self, provider_name: str) -> AIProvider:
         """Get or create AI provider"""
+        cache_key = provider_cache_key(provider_name)
+        provider = cache.get(cache_key)
+        if provider is not None:
+            return provider
+        
         provider, created = AIProvider.objects.get_or_create(
             name=provider_name,
             defaults={
@@ -445,6 +532,7 @@ class UsageTracker:
                 'rate_limit_per_hour': 1000
             }
         )
+        cache.set(cache_key, provider, getattr(settings, 'AI_PROVIDER_CACHE_TIMEOUT', 300))
         return provider
     
     def _get_default_max_requests(self, quota_type: str) -> int:
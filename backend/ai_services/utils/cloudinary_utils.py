@@ -3,7 +3,9 @@ Cloudinary utility functions for uploading images
 """
 import os
 import logging
+import threading
 import time
+from io import BytesIO
 from typing import Optional
 from django.conf import settings
 
@@ -18,6 +20,76 @@ except ImportError:
     logger.warning("Cloudinary not available. Please install: pip install cloudinary")
     CLOUDINARY_AVAILABLE = False
 
+# Credentials the client was last configured with; cloudinary.config is global
+_configured_credentials = None
+_config_lock = threading.Lock()
+
+
+def configure_cloudinary() -> bool:
+    """
+    Configure the Cloudinary client once per process.
+    
+    The client is reconfigured only when the credentials in the environment
+    change.
+    
+    Returns:
+        True if the client is ready to upload
+    """
+    global _configured_credentials
+    
+    if not CLOUDINARY_AVAILABLE:
+        logger.error("Cloudinary is not available. Please install cloudinary package.")
+        return False
+    
+    credentials = (
+        os.getenv('CLOUDINARY_CLOUD_NAME'),
+        os.getenv('CLOUDINARY_API_KEY'),
+        os.getenv('CLOUDINARY_API_SECRET'),
+    )
+    if not all(credentials):
+        logger.error("Cloudinary credentials not configured. Please set CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, and CLOUDINARY_API_SECRET environment variables.")
+        return False
+    
+    if credentials != _configured_credentials:
+        with _config_lock:
+            if credentials != _configured_credentials:
+                cloud_name, api_key, api_secret = credentials
+                cloudinary.config(cloud_name=cloud_name, api_key=api_key, api_secret=api_secret)
+                _configured_credentials = credentials
+    return True
+
+
+def upload_image_bytes(image_bytes: bytes, image_format: str = 'png', public_id: str = None) -> Optional[str]:
+    """
+    Upload encoded image bytes to Cloudinary without writing them to disk.
+    
+    Args:
+        image_bytes: Encoded image
+        image_format: Format Cloudinary stores the image in
+        public_id: Optional public ID (Cloudinary generates one otherwise)
+    
+    Returns:
+        Public URL of the uploaded image, or None if upload fails
+    """
+    if not configure_cloudinary():
+        return None
+    
+    options = {'folder': 'posters', 'resource_type': 'image', 'format': image_format}
+    if public_id:
+        options['public_id'] = public_id
+    
+    try:
+        result = cloudinary.uploader.upload(BytesIO(image_bytes), **options)
+        public_url = result.get('secure_url') or result.get('url')
+        if public_url:
+            logger.info(f"Uploaded image to Cloudinary: {public_url}")
+        else:
+            logger.error(f"Cloudinary upload returned no URL: {result}")
+        return public_url
+    except Exception as e:
+        logger.error(f"Failed to upload image to Cloudinary: {str(e)}")
+        return None
+
 
 def create_shareable_html_page(image_url: str, caption: str, full_caption: str) -> str:
     """
@@ -121,29 +193,10 @@ def upload_html_to_cloudinary(html_content: str, filename: str = None) -> Option
     Returns:
         Public URL of the uploaded HTML file, or None if upload fails
     """
-    if not CLOUDINARY_AVAILABLE:
-        logger.error("Cloudinary is not available. Please install cloudinary package.")
+    if not configure_cloudinary():
         return None
     
-    # Get Cloudinary credentials from environment
-    cloud_name = os.getenv('CLOUDINARY_CLOUD_NAME')
-    api_key = os.getenv('CLOUDINARY_API_KEY')
-    api_secret = os.getenv('CLOUDINARY_API_SECRET')
-    
-    if not all([cloud_name, api_key, api_secret]):
-        logger.error("Cloudinary credentials not configured.")
-        return None
-    
-    # Configure Cloudinary
-    cloudinary.config(
-        cloud_name=cloud_name,
-        api_key=api_key,
-        api_secret=api_secret
-    )
-    
     try:
-        from io import BytesIO
-        
         # Convert HTML string to bytes
         html_bytes = html_content.encode('utf-8')
         html_file = BytesIO(html_bytes)
@@ -253,100 +306,31 @@ def upload_to_cloudinary(image_path: str) -> Optional[str]:
     """
     Upload an image file to Cloudinary and return the public URL.
     
+    Prefer upload_image_bytes when the image is already in memory.
+    
     Args:
         image_path: Path to the image file (can be local file path or Django storage path)
     
     Returns:
         Public URL of the uploaded image, or None if upload fails
     """
-    logger.info(f"=== CLOUDINARY UPLOAD DEBUG ===")
-    logger.info(f"Attempting to upload: {image_path}")
-    
-    if not CLOUDINARY_AVAILABLE:
-        logger.error("ERROR: Cloudinary is not available. Please install cloudinary package.")
+    if not configure_cloudinary():
         return None
     
-    # Get Cloudinary credentials from environment
-    cloud_name = os.getenv('CLOUDINARY_CLOUD_NAME')
-    api_key = os.getenv('CLOUDINARY_API_KEY')
-    api_secret = os.getenv('CLOUDINARY_API_SECRET')
-    
-    logger.info(f"Cloudinary credentials check:")
-    logger.info(f"  cloud_name: {'SET' if cloud_name else 'NOT SET'}")
-    logger.info(f"  api_key: {'SET' if api_key else 'NOT SET'}")
-    logger.info(f"  api_secret: {'SET' if api_secret else 'NOT SET'}")
-    
-    if not all([cloud_name, api_key, api_secret]):
-        logger.error("ERROR: Cloudinary credentials not configured. Please set CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, and CLOUDINARY_API_SECRET environment variables.")
-        return None
-    
-    # Configure Cloudinary
     try:
-        cloudinary.config(
-            cloud_name=cloud_name,
-            api_key=api_key,
-            api_secret=api_secret
-        )
-        logger.info("Cloudinary configured successfully")
-    except Exception as config_error:
-        logger.error(f"ERROR: Failed to configure Cloudinary: {config_error}")
-        return None
-    
-    try:
-        # Check if image_path is a Django storage path or absolute file path
         from django.core.files.storage import default_storage
         
-        logger.info(f"Checking if file exists in storage: {image_path}")
-        
-        # Try to get the actual file path
         if default_storage.exists(image_path):
-            logger.info(f"File exists in Django storage")
-            # If it's a storage path, get the actual file
             with default_storage.open(image_path, 'rb') as f:
-                logger.info(f"Opening file for upload...")
-                # Upload to Cloudinary
-                result = cloudinary.uploader.upload(
-                    f,
-                    folder="posters",
-                    resource_type="image",
-                    format="png"
-                )
-                public_url = result.get('secure_url') or result.get('url')
-                if public_url:
-                    logger.info(f"SUCCESS: Successfully uploaded image to Cloudinary: {public_url}")
-                else:
-                    logger.error(f"ERROR: Upload succeeded but no URL returned. Result: {result}")
-                logger.info(f"=== END CLOUDINARY UPLOAD DEBUG ===")
-                return public_url
+                image_bytes = f.read()
         elif os.path.exists(image_path):
-            logger.info(f"File exists as absolute path")
-            # If it's an absolute file path
             with open(image_path, 'rb') as f:
-                logger.info(f"Opening file for upload...")
-                result = cloudinary.uploader.upload(
-                    f,
-                    folder="posters",
-                    resource_type="image",
-                    format="png"
-                )
-                public_url = result.get('secure_url') or result.get('url')
-                if public_url:
-                    logger.info(f"SUCCESS: Successfully uploaded image to Cloudinary: {public_url}")
-                else:
-                    logger.error(f"ERROR: Upload succeeded but no URL returned. Result: {result}")
-                logger.info(f"=== END CLOUDINARY UPLOAD DEBUG ===")
-                return public_url
+                image_bytes = f.read()
         else:
-            logger.error(f"ERROR: Image file not found: {image_path}")
-            logger.error(f"   Checked Django storage: {default_storage.exists(image_path) if hasattr(default_storage, 'exists') else 'N/A'}")
-            logger.error(f"   Checked absolute path: {os.path.exists(image_path)}")
-            logger.info(f"=== END CLOUDINARY UPLOAD DEBUG ===")
+            logger.error(f"Image file not found for Cloudinary upload: {image_path}")
             return None
-            
     except Exception as e:
-        logger.error(f"ERROR: Failed to upload image to Cloudinary: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        logger.info(f"=== END CLOUDINARY UPLOAD DEBUG ===")
+        logger.error(f"Failed to read {image_path} for Cloudinary upload: {str(e)}")
         return None
-
+    
+    return upload_image_bytes(image_bytes, image_format='png')
@@ -0,0 +1,369 @@
+"""
+Shared image fetching for the color and fabric analysis services
+
+Downloads go through one pooled requests.Session with streaming size caps.
+Raw bytes are kept in a bounded on-disk cache (revalidated with ETag /
+Last-Modified conditional GETs) and decoded images in a bounded in-memory
+cache keyed by content hash, so repeated analysis of the same image neither
+re-downloads nor re-decodes it. Analysis-only callers can ask for a reduced
+resolution, which JPEGs decode directly via draft mode.
+
+Only http(s) URLs are fetched: URLs reach this module straight from API
+requests, so file:// URLs and bare paths are rejected rather than read.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import numpy as np
+import requests
+from django.conf import settings
+from PIL import Image
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# URL schemes fetch_bytes / fetch_array accept
+ALLOWED_SCHEMES = ('http', 'https')
+
+
+class ImageFetchError(Exception):
+    """Raised when an image cannot be fetched or decoded"""
+    pass
+
+
+class ImageFetcher:
+    """Pooled, cached image downloader"""
+
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        timeout: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        cache_dir: Optional[str] = None,
+        disk_cache_bytes: Optional[int] = None,
+        memory_cache_bytes: Optional[int] = None,
+        revalidate_seconds: Optional[float] = None,
+        max_validators: Optional[int] = None,
+    ):
+        self.timeout = timeout if timeout is not None else getattr(settings, 'IMAGE_FETCH_TIMEOUT', 30)
+        self.max_bytes = max_bytes if max_bytes is not None else getattr(
+            settings, 'IMAGE_FETCH_MAX_BYTES', 20 * 1024 * 1024
+        )
+        self.cache_dir = cache_dir or getattr(settings, 'IMAGE_FETCH_CACHE_DIR', None) or os.path.join(
+            tempfile.gettempdir(), 'frameio_image_cache'
+        )
+        self.disk_cache_bytes = disk_cache_bytes if disk_cache_bytes is not None else getattr(
+            settings, 'IMAGE_FETCH_DISK_CACHE_BYTES', 256 * 1024 * 1024
+        )
+        self.memory_cache_bytes = memory_cache_bytes if memory_cache_bytes is not None else getattr(
+            settings, 'IMAGE_FETCH_MEMORY_CACHE_BYTES', 64 * 1024 * 1024
+        )
+        self.revalidate_seconds = revalidate_seconds if revalidate_seconds is not None else getattr(
+            settings, 'IMAGE_FETCH_REVALIDATE_SECONDS', 60
+        )
+        # Bounds both the in-memory validator LRU and the per-URL files on disk
+        self.max_validators = max_validators if max_validators is not None else getattr(
+            settings, 'IMAGE_FETCH_MAX_VALIDATORS', 4096
+        )
+        self.session = session or self._build_session()
+
+        self._lock = threading.Lock()
+        self._validators = OrderedDict()  # url -> etag/last_modified/sha256/validated_at
+        self._decoded = OrderedDict()  # (sha256, max_size) -> read-only RGB array
+        self._decoded_bytes = 0
+        self.stats = {'network': 0, 'not_modified': 0, 'fresh': 0, 'decoded_hits': 0, 'decodes': 0}
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def _build_session() -> requests.Session:
+        pool_size = getattr(settings, 'IMAGE_FETCH_POOL_SIZE', 10)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=1)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['User-Agent'] = 'Frameio-ImageFetcher/1.0'
+        return session
+
+    def fetch_bytes(self, url: str) -> Tuple[bytes, str]:
+        """
+        Fetch the raw bytes of an image
+
+        Args:
+            url: http(s) URL; any other scheme, file:// URLs and bare paths
+                included, is rejected
+
+        Returns:
+            Tuple of (content, sha256 hex digest)
+
+        Raises:
+            ImageFetchError: If the URL is not http(s) or cannot be downloaded
+        """
+        if urlparse(str(url)).scheme not in ALLOWED_SCHEMES:
+            raise ImageFetchError(f"Unsupported image URL (only http and https are allowed): {url}")
+        return self._fetch_remote(url)
+
+    def fetch_array(self, url: str, max_size: Optional[int] = None) -> np.ndarray:
+        """
+        Fetch and decode an image to an RGB uint8 array
+
+        Args:
+            url: Image location (see fetch_bytes)
+            max_size: Optional bound on the longest side; JPEGs are decoded at
+                reduced scale directly, other formats are downscaled after decode
+
+        Returns:
+            Read-only array of shape (height, width, 3); copy before modifying
+        """
+        content, digest = self.fetch_bytes(url)
+        return self._decode_cached(content, digest, max_size)
+
+    def _decode_cached(self, content: bytes, digest: str, max_size: Optional[int] = None) -> np.ndarray:
+        """Decode image bytes already in memory through the decoded-image cache"""
+        cache_key = (digest, max_size)
+
+        with self._lock:
+            cached = self._decoded.get(cache_key)
+            if cached is not None:
+                self._decoded.move_to_end(cache_key)
+                self.stats['decoded_hits'] += 1
+                return cached
+
+        array = self.decode(content, max_size)
+        array.setflags(write=False)
+
+        with self._lock:
+            self.stats['decodes'] += 1
+            if array.nbytes <= self.memory_cache_bytes and cache_key not in self._decoded:
+                self._decoded[cache_key] = array
+                self._decoded_bytes += array.nbytes
+                while self._decoded_bytes > self.memory_cache_bytes:
+                    _, evicted = self._decoded.popitem(last=False)
+                    self._decoded_bytes -= evicted.nbytes
+        return array
+
+    @staticmethod
+    def decode(content: bytes, max_size: Optional[int] = None) -> np.ndarray:
+        """Decode image bytes to an RGB array, optionally bounding the longest side"""
+        try:
+            image = Image.open(BytesIO(content))
+            if max_size:
+                # JPEG only: picks the smallest DCT scale that still covers max_size
+                image.draft('RGB', (max_size, max_size))
+            image = image.convert('RGB')
+            if max_size and max(image.size) > max_size:
+                image.thumbnail((max_size, max_size), Image.Resampling.BILINEAR)
+            return np.asarray(image)
+        except Exception as e:
+            raise ImageFetchError(f"Could not decode image: {str(e)}")
+
+    def clear_memory_cache(self) -> None:
+        with self._lock:
+            self._decoded.clear()
+            self._decoded_bytes = 0
+            self._validators.clear()
+
+    def _fetch_remote(self, url: str) -> Tuple[bytes, str]:
+        validators = self._remembered_validators(url) or self._load_validators(url)
+        cached_content = self._read_blob(validators['sha256']) if validators else None
+
+        if cached_content is not None and time.time() - validators['validated_at'] < self.revalidate_seconds:
+            self.stats['fresh'] += 1
+            return cached_content, validators['sha256']
+
+        headers = {}
+        if cached_content is not None:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+
+        try:
+            with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304 and cached_content is not None:
+                    self.stats['not_modified'] += 1
+                    self._save_validators(url, {**validators, 'validated_at': time.time()})
+                    return cached_content, validators['sha256']
+
+                response.raise_for_status()
+                content = self._read_capped(response, url)
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+        except requests.RequestException as e:
+            raise ImageFetchError(f"Could not download image {url}: {str(e)}")
+
+        self.stats['network'] += 1
+        digest = hashlib.sha256(content).hexdigest()
+        if (etag or last_modified) and self._write_blob(digest, content):
+            self._save_validators(url, {
+                'etag': etag,
+                'last_modified': last_modified,
+                'sha256': digest,
+                'validated_at': time.time(),
+            })
+            self._prune_disk_cache()
+        return content, digest
+
+    def _read_capped(self, response: requests.Response, url: str) -> bytes:
+        declared = response.headers.get('Content-Length')
+        if declared and declared.isdigit() and int(declared) > self.max_bytes:
+            raise ImageFetchError(f"Image exceeds {self.max_bytes} bytes: {url}")
+
+        buffer = bytearray()
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            buffer.extend(chunk)
+            if len(buffer) > self.max_bytes:
+                raise ImageFetchError(f"Image exceeds {self.max_bytes} bytes: {url}")
+        return bytes(buffer)
+
+    # Disk cache: content-addressed blobs plus one small validator file per URL
+
+    def _url_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode()).hexdigest() + '.json')
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, digest + '.img')
+
+    def _remembered_validators(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            validators = self._validators.get(url)
+            if validators is not None:
+                self._validators.move_to_end(url)
+            return validators
+
+    def _remember_validators(self, url: str, validators: Dict[str, Any]) -> None:
+        with self._lock:
+            self._validators[url] = validators
+            self._validators.move_to_end(url)
+            while len(self._validators) > self.max_validators:
+                self._validators.popitem(last=False)
+
+    def _load_validators(self, url: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._url_path(url)) as validator_file:
+                validators = json.load(validator_file)
+        except (OSError, ValueError):
+            return None
+        self._remember_validators(url, validators)
+        return validators
+
+    def _save_validators(self, url: str, validators: Dict[str, Any]) -> None:
+        self._remember_validators(url, validators)
+        try:
+            temp_path = f"{self._url_path(url)}.{os.getpid()}.tmp"
+            with open(temp_path, 'w') as validator_file:
+                json.dump(validators, validator_file)
+            os.replace(temp_path, self._url_path(url))
+        except OSError as e:
+            logger.warning(f"Could not write image cache entry: {str(e)}")
+
+    def _read_blob(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self._blob_path(digest), 'rb') as blob_file:
+                content = blob_file.read()
+            os.utime(self._blob_path(digest))
+            return content
+        except OSError:
+            return None
+
+    def _write_blob(self, digest: str, content: bytes) -> bool:
+        """Store a blob; returns False if it is not cached (too large or unwritable)"""
+        if len(content) > self.disk_cache_bytes:
+            return False
+        try:
+            blob_path = self._blob_path(digest)
+            if not os.path.exists(blob_path):
+                temp_path = f"{blob_path}.{os.getpid()}.tmp"
+                with open(temp_path, 'wb') as blob_file:
+                    blob_file.write(content)
+                os.replace(temp_path, blob_path)
+            return True
+        except OSError as e:
+            logger.warning(f"Could not write image cache blob: {str(e)}")
+            return False
+
+    def _prune_disk_cache(self) -> None:
+        """
+        Delete least recently used blobs until the cache fits its byte budget,
+        together with the validator files that point at them, then the least
+        recently validated files beyond max_validators
+        """
+        blobs = []
+        validator_files = []
+        total = 0
+        with os.scandir(self.cache_dir) as scan:
+            for entry in scan:
+                if entry.name.endswith('.img'):
+                    entry_stat = entry.stat()
+                    blobs.append((entry_stat.st_mtime, entry_stat.st_size, entry.path))
+                    total += entry_stat.st_size
+                elif entry.name.endswith('.json'):
+                    validator_files.append((entry.stat().st_mtime, entry.path))
+
+        removed_digests = set()
+        if total > self.disk_cache_bytes:
+            for _, size, path in sorted(blobs):
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                removed_digests.add(os.path.basename(path)[:-len('.img')])
+                total -= size
+                if total <= self.disk_cache_bytes:
+                    break
+
+        if removed_digests:
+            with self._lock:
+                for url in [url for url, validators in self._validators.items()
+                            if validators.get('sha256') in removed_digests]:
+                    del self._validators[url]
+
+            remaining = []
+            for mtime, path in validator_files:
+                try:
+                    with open(path) as validator_file:
+                        orphaned = json.load(validator_file).get('sha256') in removed_digests
+                except (OSError, ValueError):
+                    orphaned = True
+                if orphaned:
+                    self._remove_quietly(path)
+                else:
+                    remaining.append((mtime, path))
+            validator_files = remaining
+
+        excess = len(validator_files) - self.max_validators
+        if excess > 0:
+            for _, path in sorted(validator_files)[:excess]:
+                self._remove_quietly(path)
+
+    @staticmethod
+    def _remove_quietly(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+_image_fetcher = None
+_image_fetcher_lock = threading.Lock()
+
+
+def get_image_fetcher() -> ImageFetcher:
+    """Return the process-wide image fetcher"""
+    global _image_fetcher
+    if _image_fetcher is not None:
+        return _image_fetcher
+
+    with _image_fetcher_lock:
+        if _image_fetcher is None:
+            _image_fetcher = ImageFetcher()
+    return _image_fetcher
@@ -0,0 +1,293 @@
+"""
+Background publishing of generated posters.
+
+A stored poster is served from its local media URL straight away. Its CDN
+copy, optional WebP/AVIF delivery derivative and Open Graph share page are
+produced here on a small thread pool from the in-memory bytes; when they are
+ready the GeneratedPoster rows for the image are updated and the URLs are
+recorded in the cache for rows that are saved later.
+
+Uploads go through an uploader: CloudinaryUploader in production, or
+LocalFakeUploader, which writes "CDN" files to media storage so the whole
+pipeline runs offline.
+"""
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connections
+
+from .cloudinary_utils import create_shareable_html_page, upload_html_to_cloudinary, upload_image_bytes
+from .storage_handler import create_and_store_shareable_page, get_domain_url, get_storage_mode, save_media_file
+
+logger = logging.getLogger(__name__)
+
+RECORD_PREFIX = 'poster_publish'
+
+
+class CloudinaryUploader:
+    """Uploads posters and share pages to Cloudinary"""
+
+    name = 'cloudinary'
+
+    def upload_image(self, image_bytes: bytes, image_format: str = 'png', public_id: str = None) -> Optional[str]:
+        return upload_image_bytes(image_bytes, image_format=image_format, public_id=public_id)
+
+    def upload_html(self, html_content: str, filename: str = None) -> Optional[str]:
+        return upload_html_to_cloudinary(html_content, filename=filename)
+
+
+class LocalFakeUploader:
+    """
+    Offline stand-in for the CDN.
+
+    "Uploads" are written to media storage under `folder` and every call is
+    recorded in `uploads`, so tests and local setups need no credentials.
+    """
+
+    name = 'fake'
+
+    def __init__(self, folder: str = 'fake_cdn', delay: float = 0.0):
+        self.folder = folder
+        self.delay = delay
+        self.uploads = []
+        self._lock = threading.Lock()
+
+    def _store(self, content: bytes, name: str, kind: str) -> str:
+        if self.delay:
+            time.sleep(self.delay)
+        _, url = save_media_file(content, f"{self.folder}/{name}")
+        with self._lock:
+            self.uploads.append({'kind': kind, 'name': name, 'url': url, 'size': len(content)})
+        return url
+
+    def upload_image(self, image_bytes: bytes, image_format: str = 'png', public_id: str = None) -> Optional[str]:
+        return self._store(image_bytes, f"{public_id or uuid.uuid4().hex}.{image_format}", 'image')
+
+    def upload_html(self, html_content: str, filename: str = None) -> Optional[str]:
+        return self._store(html_content.encode('utf-8'), f"{filename or uuid.uuid4().hex}.html", 'html')
+
+
+def get_default_uploader():
+    """Uploader for the configured storage mode, or None when posters stay local"""
+    if get_storage_mode() != 'cloudinary':
+        return None
+    if getattr(settings, 'POSTER_CDN_UPLOADER', 'cloudinary') == 'fake':
+        return LocalFakeUploader()
+    return CloudinaryUploader()
+
+
+def encode_delivery_derivative(image_bytes: bytes, image_format: Optional[str] = None) -> Optional[Tuple[bytes, str]]:
+    """
+    Encode a smaller copy of a poster for delivery.
+
+    Args:
+        image_bytes: Encoded poster (PNG)
+        image_format: 'webp' or 'avif'; defaults to POSTER_DELIVERY_FORMAT (empty disables)
+
+    Returns:
+        Tuple of (encoded bytes, format), or None if disabled or unsupported
+    """
+    from PIL import Image, features
+
+    image_format = (image_format if image_format is not None else getattr(settings, 'POSTER_DELIVERY_FORMAT', '')).lower()
+    if not image_format:
+        return None
+    if image_format not in ('webp', 'avif'):
+        logger.warning(f"Unsupported poster delivery format: {image_format}")
+        return None
+
+    try:
+        supported = features.check(image_format)
+    except ValueError:
+        supported = False
+    if not supported and image_format == 'avif':
+        logger.warning("Pillow has no AVIF support; using WebP for poster delivery")
+        image_format = 'webp'
+        supported = features.check('webp')
+    if not supported:
+        logger.warning(f"Pillow has no {image_format} support; skipping poster delivery copy")
+        return None
+
+    quality = getattr(settings, 'POSTER_DELIVERY_QUALITY', 80)
+    with Image.open(BytesIO(image_bytes)) as image:
+        image.load()
+        buffer = BytesIO()
+        if image_format == 'webp':
+            image.save(buffer, format='WEBP', quality=quality, method=4)
+        else:
+            image.save(buffer, format='AVIF', quality=quality)
+    return buffer.getvalue(), image_format
+
+
+def record_key(image_path: str) -> str:
+    return f"{RECORD_PREFIX}:{image_path}"
+
+
+def get_published_urls(image_path: str) -> Optional[Dict[str, Any]]:
+    """URLs published for a stored poster image, or None while publishing is pending"""
+    if not image_path:
+        return None
+    try:
+        return cache.get(record_key(image_path))
+    except Exception as e:
+        logger.warning(f"Could not read poster publish record: {str(e)}")
+        return None
+
+
+class PosterPublisher:
+    """Publishes stored posters to the CDN on a bounded thread pool"""
+
+    def __init__(self, uploader=None, max_workers: Optional[int] = None, asynchronous: Optional[bool] = None):
+        self.uploader = uploader if uploader is not None else get_default_uploader()
+        self.asynchronous = (
+            asynchronous if asynchronous is not None
+            else getattr(settings, 'POSTER_ASYNC_PUBLISH', True)
+        )
+        self.max_attempts = getattr(settings, 'POSTER_PUBLISH_MAX_ATTEMPTS', 3)
+        self.retry_delay = getattr(settings, 'POSTER_PUBLISH_RETRY_DELAY', 1.0)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or getattr(settings, 'POSTER_PUBLISH_WORKERS', 2),
+            thread_name_prefix='poster-publish'
+        )
+
+    def publish(self, image_path: str, caption: str = '', full_caption: str = '',
+                image_bytes: Optional[bytes] = None) -> Future:
+        """
+        Publish a stored poster: CDN copy, delivery derivative and share page.
+
+        Args:
+            image_path: Storage path of the poster image
+            caption: Short caption for the share page
+            full_caption: Full caption for the share page
+            image_bytes: The image if still in memory (read from storage otherwise)
+
+        Returns:
+            Future resolving to the published URLs (see _publish)
+        """
+        if not self.asynchronous:
+            future = Future()
+            future.set_result(self._publish(image_path, caption, full_caption, image_bytes))
+            return future
+        return self._executor.submit(self._run_in_background, image_path, caption, full_caption, image_bytes)
+
+    def _run_in_background(self, *args) -> Dict[str, Any]:
+        try:
+            return self._publish(*args)
+        finally:
+            # Worker threads hold their own database connections
+            connections.close_all()
+
+    def _with_retries(self, upload, description: str) -> Optional[str]:
+        for attempt in range(self.max_attempts):
+            try:
+                url = upload()
+                if url:
+                    return url
+                logger.warning(f"{description} attempt {attempt + 1} returned no URL")
+            except Exception as e:
+                logger.error(f"{description} attempt {attempt + 1} failed: {str(e)}")
+            if attempt < self.max_attempts - 1:
+                time.sleep(self.retry_delay * (2 ** attempt))
+        return None
+
+    def _publish(self, image_path: str, caption: str, full_caption: str,
+                 image_bytes: Optional[bytes]) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict with image_url (local), cdn_url, delivery_url, public_url and status
+        """
+        local_url = default_storage.url(image_path)
+        if not local_url.startswith('http'):
+            local_url = f"{get_domain_url()}{local_url}"
+        urls = {'image_url': local_url, 'cdn_url': None, 'delivery_url': None, 'public_url': local_url}
+
+        try:
+            if image_bytes is None:
+                with default_storage.open(image_path, 'rb') as image_file:
+                    image_bytes = image_file.read()
+
+            stem = image_path.rsplit('/', 1)[-1].rsplit('.', 1)[0]
+            derivative = encode_delivery_derivative(image_bytes)
+            if derivative:
+                derivative_bytes, derivative_format = derivative
+                _, urls['delivery_url'] = save_media_file(
+                    derivative_bytes, f"{image_path.rsplit('.', 1)[0]}.{derivative_format}"
+                )
+
+            if self.uploader is not None:
+                urls['cdn_url'] = self._with_retries(
+                    lambda: self.uploader.upload_image(image_bytes, 'png', stem), 'Poster CDN upload'
+                )
+                if derivative and urls['cdn_url']:
+                    urls['delivery_url'] = self._with_retries(
+                        lambda: self.uploader.upload_image(derivative_bytes, derivative_format, f"{stem}_delivery"),
+                        'Poster delivery upload'
+                    ) or urls['delivery_url']
+
+            image_url = urls['cdn_url'] or local_url
+            share_url = None
+            if caption or full_caption:
+                if self.uploader is not None:
+                    html_content = create_shareable_html_page(image_url, caption, full_caption or caption)
+                    share_url = self._with_retries(
+                        lambda: self.uploader.upload_html(html_content, filename=f"{stem}_share"),
+                        'Share page upload'
+                    )
+                else:
+                    share_url = create_and_store_shareable_page(image_url, caption, full_caption or caption)
+            urls['public_url'] = share_url or image_url
+            urls['status'] = 'published' if (urls['cdn_url'] or self.uploader is None) else 'local_only'
+        except Exception as e:
+            logger.error(f"Failed to publish poster {image_path}: {str(e)}")
+            urls['status'] = 'failed'
+
+        self._record(image_path, urls)
+        return urls
+
+    def _record(self, image_path: str, urls: Dict[str, Any]) -> None:
+        """Cache the URLs, then point already saved posters at them"""
+        try:
+            cache.set(record_key(image_path), urls, getattr(settings, 'POSTER_PUBLISH_RECORD_TIMEOUT', 86400))
+        except Exception as e:
+            logger.warning(f"Could not cache poster publish record: {str(e)}")
+
+        from ..models import GeneratedPoster
+        from ..poster_history import invalidate_poster_history
+
+        try:
+            posters = GeneratedPoster.objects.filter(image_path=image_path)
+            owners = set(posters.values_list('organization_id', 'user_id'))
+            fields = {'public_url': urls['public_url'], 'delivery_url': urls['delivery_url'] or ''}
+            if urls.get('cdn_url'):
+                # Local media may live on ephemeral or per-node storage; the CDN copy is durable
+                fields['image_url'] = urls['cdn_url']
+            updated = posters.update(**fields)
+            for organization_id, user_id in owners:
+                invalidate_poster_history(organization_id, user_id)
+            logger.info(f"Published poster {image_path} ({urls.get('status')}); updated {updated} saved poster(s)")
+        except Exception as e:
+            logger.error(f"Failed to update published poster URLs for {image_path}: {str(e)}")
+
+
+_poster_publisher = None
+_poster_publisher_lock = threading.Lock()
+
+
+def get_poster_publisher() -> PosterPublisher:
+    """Return the process-wide poster publisher"""
+    global _poster_publisher
+    if _poster_publisher is not None:
+        return _poster_publisher
+
+    with _poster_publisher_lock:
+        if _poster_publisher is None:
+            _poster_publisher = PosterPublisher()
+    return _poster_publisher
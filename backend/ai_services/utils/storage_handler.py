@@ -15,7 +15,7 @@ from io import BytesIO
 logger = logging.getLogger(__name__)
 
 # Import Cloudinary utilities
-from .cloudinary_utils import upload_to_cloudinary, upload_html_to_cloudinary, create_shareable_html_page
+from .cloudinary_utils import upload_html_to_cloudinary, create_shareable_html_page
 
 
 def get_storage_mode() -> str:
@@ -83,40 +83,15 @@ def save_poster_image(image_bytes: bytes, filename: str = None) -> tuple[str, st
     return saved_path, image_url
 
 
-def upload_poster_image(image_path: str) -> Optional[str]:
-    """
-    Upload poster image using the configured storage mode.
-    
-    Args:
-        image_path: Path to the image file (Django storage path)
-    
-    Returns:
-        Public URL of the uploaded image, or None if upload fails
-    """
-    storage_mode = get_storage_mode()
-    
-    if storage_mode == 'cloudinary':
-        logger.info(f"Using Cloudinary storage mode for: {image_path}")
-        return upload_to_cloudinary(image_path)
-    else:
-        logger.info(f"Using local storage mode for: {image_path}")
-        # For local storage, return the media URL
-        if default_storage.exists(image_path):
-            image_url = default_storage.url(image_path)
-            if not image_url.startswith('http'):
-                domain = get_domain_url()
-                image_url = f"{domain}{image_url}"
-            return image_url
-        else:
-            logger.error(f"Image file not found: {image_path}")
-            return None
-
-
 def store_poster_image(image_bytes: bytes, filename: str = None) -> tuple[str, str, Optional[str]]:
     """
-    Store poster image using the configured storage mode.
+    Store poster image in media storage.
     This is the main entry point for storing poster images.
     
+    The bytes are written once; the CDN copy and the shareable page are
+    published from memory afterwards by utils.poster_publisher, so the
+    public URL is the local media URL until that finishes.
+    
     Args:
         image_bytes: Image data as bytes
         filename: Optional filename (will generate if not provided)
@@ -125,31 +100,11 @@ def store_poster_image(image_bytes: bytes, filename: str = None) -> tuple[str, s
         Tuple of (saved_path, image_url, public_url)
         - saved_path: Django storage path
         - image_url: Local media URL
-        - public_url: Public URL for sharing (Cloudinary URL or local media URL)
+        - public_url: Public URL for sharing (the local media URL for now)
     """
-    storage_mode = get_storage_mode()
-    
-    # Always save locally first (for backup and local access)
     saved_path, image_url = save_poster_image(image_bytes, filename)
     logger.info(f"Image saved locally to: {saved_path}")
-    
-    # Get public URL based on storage mode
-    public_url = None
-    if storage_mode == 'cloudinary':
-        # Upload to Cloudinary for public sharing
-        logger.info("Uploading to Cloudinary...")
-        public_url = upload_to_cloudinary(saved_path)
-        if public_url:
-            logger.info(f"Successfully uploaded to Cloudinary: {public_url}")
-        else:
-            logger.warning("Cloudinary upload failed, falling back to local URL")
-            public_url = image_url
-    else:
-        # Use local URL as public URL
-        public_url = image_url
-        logger.info(f"Using local storage URL: {public_url}")
-    
-    return saved_path, image_url, public_url
+    return saved_path, image_url, image_url
 
 
 def create_and_store_shareable_page(image_url: str, caption: str, full_caption: str) -> Optional[str]:
@@ -199,3 +154,82 @@ def create_and_store_shareable_page(image_url: str, caption: str, full_caption:
             logger.error(f"Failed to save HTML page locally: {str(e)}")
             return None
 
+
+
+def save_media_file(content: bytes, path: str) -> tuple[str, str]:
+    """
+    Save bytes to media storage and return the stored path and absolute URL.
+    
+    Args:
+        content: File content as bytes
+        path: Storage path (storage may alter it to keep names unique)
+    
+    Returns:
+        Tuple of (saved_path, url)
+    """
+    saved_path = default_storage.save(path, ContentFile(content))
+    url = default_storage.url(saved_path)
+    if not url.startswith('http'):
+        url = f"{get_domain_url()}{url}"
+    return saved_path, url
+
+
+def make_thumbnail(image_bytes: bytes, max_size: Optional[int] = None) -> bytes:
+    """
+    Downscale an image to fit in a max_size square, preserving transparency.
+    
+    Args:
+        image_bytes: Encoded image
+        max_size: Longest side in pixels (defaults to BRANDING_KIT_THUMBNAIL_SIZE)
+    
+    Returns:
+        PNG-encoded thumbnail
+    """
+    from PIL import Image
+    
+    max_size = max_size or getattr(settings, 'BRANDING_KIT_THUMBNAIL_SIZE', 256)
+    with Image.open(BytesIO(image_bytes)) as image:
+        image.draft('RGB', (max_size, max_size))
+        thumbnail = image.convert('RGBA') if image.mode not in ('RGB', 'RGBA') else image.copy()
+    thumbnail.thumbnail((max_size, max_size), Image.LANCZOS)
+    
+    buffer = BytesIO()
+    thumbnail.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def store_branding_kit_image(image_bytes: bytes, kit_id, kind: str, image_format: str = 'png') -> dict:
+    """
+    Store a branding kit image and its thumbnail in media storage.
+    
+    Args:
+        image_bytes: Encoded image
+        kit_id: Branding kit ID, used as the storage folder
+        kind: 'logo' or 'color_palette'
+        image_format: File extension of the image
+    
+    Returns:
+        Dict with path, url and thumbnail_url
+    """
+    folder = f"branding_kits/{kit_id}"
+    path, url = save_media_file(image_bytes, f"{folder}/{kind}.{image_format.lower()}")
+    _, thumbnail_url = save_media_file(make_thumbnail(image_bytes), f"{folder}/{kind}_thumb.png")
+    return {'path': path, 'url': url, 'thumbnail_url': thumbnail_url}
+
+
+def delete_branding_kit_images(kit_id) -> None:
+    """
+    Delete every stored image of a branding kit.
+    
+    Args:
+        kit_id: Branding kit ID
+    """
+    folder = f"branding_kits/{kit_id}"
+    try:
+        if not default_storage.exists(folder):
+            return
+        _, files = default_storage.listdir(folder)
+        for name in files:
+            default_storage.delete(f"{folder}/{name}")
+    except Exception as e:
+        logger.error(f"Failed to delete branding kit images in {folder}: {str(e)}")
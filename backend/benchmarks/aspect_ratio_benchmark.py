@@ -0,0 +1,129 @@
+"""
+Benchmark: local aspect-ratio correction vs Gemini re-generation.
+
+Usage (from backend/):
+    python -m benchmarks.aspect_ratio_benchmark [--latency 2.0] [--repeat 3]
+
+Part 1 times the local engine on synthetic square posters (flat or textured
+backgrounds, subjects in different places) for each requested ratio and
+reports how many would be accepted at POSTER_LOCAL_AR_MIN_QUALITY.
+
+Part 2 runs AIPosterService.generate_from_prompt against the local fake Gemini
+server, which always answers with a square image (the model ignoring the
+requested ratio), once with the local engine and once with it disabled
+(re-generation first, as before). It reports image API calls per poster and
+wall time, with `--latency` seconds of simulated generation time per call.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from unittest import mock
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'frameio_backend.settings')
+django.setup()
+
+import numpy as np  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+from google import genai  # noqa: E402
+from PIL import Image, ImageDraw  # noqa: E402
+
+from ai_services.ai_poster_service import AIPosterService  # noqa: E402
+from ai_services.aspect_ratio import correct_aspect_ratio  # noqa: E402
+from ai_services.gemini_client import GeminiGateway, TokenBucket  # noqa: E402
+from frameio_backend.testing import FakeGeminiServer  # noqa: E402
+
+RATIOS = {'4:5': 0.8, '16:9': 16 / 9, '9:16': 9 / 16}
+SUBJECTS = {
+    'centred': (312, 312, 712, 712),
+    'off-centre': (600, 250, 1000, 650),
+    'wide band': (24, 380, 1000, 640),
+}
+
+
+def make_poster(box, textured, seed=0):
+    image = Image.new('RGB', (1024, 1024), (236, 226, 214))
+    draw = ImageDraw.Draw(image)
+    draw.ellipse(box, fill=(150, 20, 60))
+    draw.rectangle((box[0] + 40, box[1] + 40, box[0] + 120, box[1] + 120), fill=(20, 40, 180))
+    if textured:
+        noise = np.random.default_rng(seed).integers(-50, 50, (1024, 1024, 3))
+        image = Image.fromarray(np.clip(np.asarray(image).astype(int) + noise, 0, 255).astype(np.uint8))
+    return image
+
+
+def engine_benchmark(repeat, threshold):
+    print(f"Local engine on 1024x1024 posters (accept at quality >= {threshold})")
+    print(f"{'ratio':>6} {'subject':>11} {'background':>10} {'method':>6} {'quality':>8} {'ms':>7} {'accepted':>9}")
+    accepted = total = 0
+    timings = []
+    for ratio_name, ratio in RATIOS.items():
+        for subject_name, box in SUBJECTS.items():
+            for textured in (False, True):
+                image = make_poster(box, textured)
+                best = None
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    correction = correct_aspect_ratio(image, ratio)
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                timings.append(best * 1000)
+                ok = correction.quality >= threshold
+                accepted += ok
+                total += 1
+                print(
+                    f"{ratio_name:>6} {subject_name:>11} {'textured' if textured else 'flat':>10} "
+                    f"{correction.method:>6} {correction.quality:>8.3f} {best * 1000:>7.1f} {'yes' if ok else 'no':>9}"
+                )
+    print(f"accepted {accepted}/{total}; median {statistics.median(timings):.1f} ms, max {max(timings):.1f} ms\n")
+
+
+def pipeline_benchmark(latency, posters):
+    print(f"generate_from_prompt against the fake Gemini server ({latency:.1f}s per image call, square answers)")
+    print(f"{'ratio':>6} {'mode':>16} {'image calls/poster':>19} {'seconds/poster':>15}")
+    media_root = tempfile.mkdtemp()
+    try:
+        with FakeGeminiServer(image_size=(1024, 1024), latency=latency) as server, \
+                override_settings(MEDIA_ROOT=media_root), \
+                mock.patch('ai_services.ai_poster_service.get_poster_publisher'), \
+                mock.patch.dict('os.environ', {'USE_CLOUDINARY': 'False'}):
+            service = AIPosterService()
+            service.client = genai.Client(api_key='benchmark', http_options={'base_url': server.base_url})
+            service.gemini = GeminiGateway(bucket=TokenBucket(rate=1000, capacity=1000), retry_delay_base=0)
+            service.caption_service.client = None
+
+            for ratio_name in RATIOS:
+                calls = {}
+                for mode, threshold in (('re-generate', 1.1), ('local engine', settings.POSTER_LOCAL_AR_MIN_QUALITY)):
+                    with override_settings(POSTER_LOCAL_AR_MIN_QUALITY=threshold):
+                        server.requests.clear()
+                        started = time.perf_counter()
+                        for _ in range(posters):
+                            result = service.generate_from_prompt('Festive silk saree', ratio_name, use_cache=False)
+                            assert result['status'] == 'success', result
+                        elapsed = (time.perf_counter() - started) / posters
+                    calls[mode] = len([path for path in server.requests if 'flash-image' in path]) / posters
+                    print(f"{ratio_name:>6} {mode:>16} {calls[mode]:>19.1f} {elapsed:>15.2f}")
+                print(f"{'':>6} {'calls saved':>16} {calls['re-generate'] - calls['local engine']:>19.1f}")
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--latency', type=float, default=2.0, help='simulated seconds per Gemini image call')
+    parser.add_argument('--posters', type=int, default=1, help='posters generated per ratio and mode')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    engine_benchmark(args.repeat, settings.POSTER_LOCAL_AR_MIN_QUALITY)
+    pipeline_benchmark(args.latency, args.posters)
+
+
+if __name__ == '__main__':
+    main()
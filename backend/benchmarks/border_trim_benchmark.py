@@ -0,0 +1,112 @@
+"""
+Benchmark: vectorized BrandOverlayService._trim_uniform_borders vs the
+original per-pixel scan.
+
+Usage (from backend/):
+    python -m benchmarks.border_trim_benchmark [--repeat 5]
+
+Posters are synthetic: a noisy content area inside a thin or wide near-white
+frame, with a transparent strip on one side. The legacy scan stops at the
+first content pixel of each row/column, so its cost grows with the frame. Both implementations must return the same
+crop box.
+"""
+import argparse
+import time
+
+import numpy as np
+from PIL import Image
+
+from ai_services.brand_overlay_service import BrandOverlayService
+
+SIZES = {
+    '1080x1350': (1080, 1350),
+    '2048x2048': (2048, 2048),
+}
+
+# Fraction of each side covered by the near-white frame
+FRAMES = {
+    'thin': 0.04,
+    'wide': 0.15,
+}
+
+
+def legacy_trim_box(image, threshold=245, max_border_ratio=0.2):
+    """Original pixel-access implementation; returns the crop box or None"""
+    img = image if image.mode == 'RGBA' else image.convert('RGBA')
+    width, height = img.size
+    pixels = img.load()
+
+    def is_bg(px):
+        r, g, b, a = px
+        if a < 5:
+            return True
+        return r >= threshold and g >= threshold and b >= threshold
+
+    top = 0
+    while top < height and all(is_bg(pixels[x, top]) for x in range(width)):
+        top += 1
+    bottom = height - 1
+    while bottom >= 0 and all(is_bg(pixels[x, bottom]) for x in range(width)):
+        bottom -= 1
+    left = 0
+    while left < width and all(is_bg(pixels[left, y]) for y in range(height)):
+        left += 1
+    right = width - 1
+    while right >= 0 and all(is_bg(pixels[right, y]) for y in range(height)):
+        right -= 1
+
+    if left == 0 and top == 0 and right == width - 1 and bottom == height - 1:
+        return None
+    if (
+        left / width > max_border_ratio or
+        top / height > max_border_ratio or
+        (width - 1 - right) / width > max_border_ratio or
+        (height - 1 - bottom) / height > max_border_ratio or
+        right <= left or bottom <= top
+    ):
+        return None
+    return (left, top, right + 1, bottom + 1)
+
+
+def make_poster(width, height, frame=0.04, seed=0):
+    """Noisy content inside a near-white frame, with a transparent strip on the left"""
+    rng = np.random.default_rng(seed)
+    poster = np.full((height, width, 4), 250, dtype=np.uint8)
+    top, left = int(height * frame), int(width * frame)
+    bottom, right = height - int(height * frame * 0.7), width - int(width * frame * 0.6)
+    poster[top:bottom, left:right, :3] = rng.integers(0, 240, size=(bottom - top, right - left, 3))
+    poster[:, :max(1, left // 2), 3] = 0
+    return Image.fromarray(poster)
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    service = BrandOverlayService()
+    print(f"{'poster':>10} {'frame':>6} {'legacy (ms)':>12} {'vectorized (ms)':>16} {'speedup':>9} {'box':>22}")
+    for name, (width, height) in SIZES.items():
+        for frame_name, frame in FRAMES.items():
+            poster = make_poster(width, height, frame)
+            legacy_seconds, legacy_box = best_of(lambda: legacy_trim_box(poster), 1)
+            vectorized_seconds, trimmed = best_of(lambda: service._trim_uniform_borders(poster), args.repeat)
+
+            expected = poster.crop(legacy_box) if legacy_box else poster
+            assert np.array_equal(np.asarray(trimmed), np.asarray(expected)), 'crop boxes differ'
+            print(
+                f"{name:>10} {frame_name:>6} {legacy_seconds * 1000:>12.1f} {vectorized_seconds * 1000:>16.1f} "
+                f"{legacy_seconds / vectorized_seconds:>8.0f}x {str(legacy_box):>22}"
+            )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark: /api/ai/branding-kit/history/ response size and latency with
+inline base64 images vs images offloaded to media storage.
+
+Usage (from backend/, against a throwaway test database):
+    DJANGO_SETTINGS_MODULE=frameio_backend.settings python -m benchmarks.branding_kit_list_benchmark [--kits 50]
+
+"inline" rows are never offloaded, so the endpoint returns their base64
+data exactly as the list did before images moved to storage; "stored" rows
+carry only URLs and thumbnails.
+"""
+import argparse
+import base64
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from io import BytesIO
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'frameio_backend.settings')
+django.setup()
+
+import numpy as np  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.runner import DiscoverRunner  # noqa: E402
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment  # noqa: E402
+from PIL import Image  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+
+def make_image_base64(width, height, seed):
+    """Smooth gradient with mild noise; compresses like a generated logo"""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    pixels = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    pixels += rng.normal(0, 6, size=pixels.shape)
+    buffer = BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buffer, format='PNG')
+    return base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def measure(client, repeat):
+    timings = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = client.get('/api/ai/branding-kit/history/', {'limit': 50})
+            content = response.content
+            timings.append(time.perf_counter() - start)
+    assert response.status_code == 200, response.status_code
+    return len(content), statistics.median(timings), len(queries)
+
+
+def main(kits, repeat):
+    from ai_services.branding_kit_storage import offload_branding_kit_images
+    from ai_services.models import GeneratedBrandingKit
+
+    user = get_user_model().objects.create_user(
+        username='benchuser', email='bench@example.com', password='benchpass123'
+    )
+    client = APIClient()
+    client.force_authenticate(user)
+
+    logo = make_image_base64(1024, 1024, seed=1)
+    palette = make_image_base64(1000, 250, seed=2)
+    print(f"logo {len(logo) / 1024:.0f} KiB base64, palette {len(palette) / 1024:.0f} KiB base64, {kits} kits")
+
+    for _ in range(kits):
+        GeneratedBrandingKit.objects.create(
+            user=user, prompt='Handloom saree brand', logo_data=logo, color_palette_data=palette,
+            colors=['#1E5AA0', '#F2C14E']
+        )
+
+    print(f"{'rows':<8} {'response (KiB)':>15} {'median (ms)':>12} {'queries':>8}")
+    size, seconds, queries = measure(client, repeat)
+    print(f"{'inline':<8} {size / 1024:>15.1f} {seconds * 1000:>12.1f} {queries:>8}")
+
+    for kit in GeneratedBrandingKit.objects.all():
+        offload_branding_kit_images(kit)
+        kit.save()
+
+    size, seconds, queries = measure(client, repeat)
+    print(f"{'stored':<8} {size / 1024:>15.1f} {seconds * 1000:>12.1f} {queries:>8}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--kits', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0, interactive=False)
+    old_config = runner.setup_databases()
+    media_root = tempfile.mkdtemp()
+    try:
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver'], MEDIA_ROOT=media_root):
+            main(args.kits, args.repeat)
+    finally:
+        runner.teardown_databases(old_config)
+        shutil.rmtree(media_root)
@@ -0,0 +1,139 @@
+"""
+Benchmark: color conversions, color names and harmony sets for a batch of
+colors, one color at a time vs the vectorized color_math pass.
+
+Usage (from backend/):
+    DJANGO_SETTINGS_MODULE=frameio_backend.settings python -m benchmarks.color_math_benchmark [--colors 10000]
+
+The per-color baselines are the previous SmartColorMatcher code paths: a 1x1
+OpenCV conversion for LAB, colorsys for HSV/HSL and for every harmony color,
+and a scan of the name table for each color. Both sides produce the same
+values (checked before timing); the best of --repeat runs is reported.
+"""
+import argparse
+import colorsys
+import os
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'frameio_backend.settings')
+django.setup()
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+
+
+def per_color_conversions(colors):
+    converted = []
+    for rgb in colors:
+        r, g, b = rgb / 255.0
+        h, s, v = colorsys.rgb_to_hsv(r, g, b)
+        hh, ll, ss = colorsys.rgb_to_hls(r, g, b)
+        converted.append((
+            f"#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}",
+            cv2.cvtColor(np.uint8([[rgb]]), cv2.COLOR_RGB2LAB)[0][0].tolist(),
+            [h * 360, s * 100, v * 100],
+            [hh * 360, ss * 100, ll * 100],
+        ))
+    return converted
+
+
+def per_color_names(colors, table_names, table_lab):
+    from ai_services import color_quantizer
+
+    names = []
+    for rgb in colors:
+        lab = color_quantizer.rgb_to_cielab(rgb)[0]
+        names.append(table_names[int(np.argmin(((table_lab - lab) ** 2).sum(axis=1)))])
+    return names
+
+
+def per_color_harmonies(hsv_colors):
+    from ai_services.color_math import HARMONIES
+
+    harmonies = {}
+    for harmony, spec in HARMONIES.items():
+        offsets = spec['hue_offsets']
+        saturation_scale = spec.get('saturation_scale', (1.0,) * len(offsets))
+        value_scale = spec.get('value_scale', (1.0,) * len(offsets))
+        sets = []
+        for hue, saturation, value in hsv_colors:
+            suggested = []
+            for offset, sat_adj, val_adj in zip(offsets, saturation_scale, value_scale):
+                rgb = colorsys.hsv_to_rgb((hue + offset) % 360 / 360, min(100, saturation * sat_adj) / 100,
+                                          min(100, value * val_adj) / 100)
+                suggested.append([int(c * 255) for c in rgb])
+            sets.append(suggested)
+        harmonies[harmony] = sets
+    return harmonies
+
+
+def best_of(repeat, function, *args):
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        seconds.append(time.perf_counter() - start)
+    return min(seconds), result
+
+
+def main(count, repeat):
+    from ai_services import color_math, color_quantizer
+    from ai_services.color_matching import SmartColorMatcher
+
+    rng = np.random.default_rng(0)
+    colors = rng.integers(0, 256, size=(count, 3))
+    index = color_math.get_color_name_index()
+    table_names = [name for name, _ in color_math.COLOR_NAME_TABLE]
+    table_lab = color_quantizer.rgb_to_cielab(index.colors)
+    hsv = color_quantizer.rgb_to_hsv(colors)
+    hsv_list = hsv.tolist()
+
+    stages = [
+        ('conversions', lambda: per_color_conversions(colors),
+         lambda: (color_math.rgb_to_hex(colors), color_quantizer.rgb_to_lab(colors),
+                  color_quantizer.rgb_to_hsv(colors), color_quantizer.rgb_to_hsl(colors))),
+        ('names', lambda: per_color_names(colors, table_names, table_lab), lambda: index.names_of(colors)),
+        ('harmonies (4 sets)', lambda: per_color_harmonies(hsv_list),
+         lambda: {harmony: color_math.harmony_colors(hsv, harmony) for harmony in color_math.HARMONIES}),
+        ('all (one pass)', None, lambda: color_math.describe_colors(colors, harmonies=color_math.HARMONIES)),
+    ]
+
+    # Both implementations agree before anything is timed
+    described = color_math.describe_colors(colors, harmonies=color_math.HARMONIES)
+    assert [converted[0] for converted in per_color_conversions(colors[:500])] == described['hex'][:500]
+    assert per_color_names(colors[:500], table_names, table_lab) == described['name'][:500]
+    reference = per_color_harmonies(hsv_list[:500])
+    for harmony in color_math.HARMONIES:
+        assert described['harmonies'][harmony]['rgb'][:500].tolist() == reference[harmony]
+
+    print(f"{count} colors, best of {repeat}")
+    print(f"{'stage':<28} {'per color (ms)':>15} {'batched (ms)':>13} {'speedup':>8}")
+    per_color_total = 0.0
+    for name, per_color, batched in stages:
+        if per_color is not None:
+            per_color_seconds, _ = best_of(repeat, per_color)
+            per_color_total += per_color_seconds
+        else:
+            per_color_seconds = per_color_total
+        batched_seconds, _ = best_of(repeat, batched)
+        print(f"{name:<28} {per_color_seconds * 1000:>15.1f} {batched_seconds * 1000:>13.1f} "
+              f"{per_color_seconds / batched_seconds:>7.1f}x")
+
+    # End to end through the matcher, including building the suggestion dicts
+    matcher = SmartColorMatcher()
+    fabric_colors = [{'hsv': color_hsv, 'name': name, 'percentage': 10.0}
+                     for color_hsv, name in zip(hsv_list, described['name'])]
+    for harmony in color_math.HARMONIES:
+        seconds, suggestions = best_of(repeat, matcher.suggest_color_adjustments, fabric_colors, harmony)
+        assert len(suggestions) == count
+        print(f"{'suggest ' + harmony:<28} {'-':>15} {seconds * 1000:>13.1f} {'':>8}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--colors', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    main(args.colors, args.repeat)
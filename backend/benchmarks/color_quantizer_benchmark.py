@@ -0,0 +1,92 @@
+"""
+Benchmark: color quantizer backends for SmartColorMatcher.extract_dominant_colors.
+
+Usage (from backend/):
+    python -m benchmarks.color_quantizer_benchmark [--colors 8] [--repeat 3]
+
+Each backend runs on synthetic 300px fabric images (the size
+extract_dominant_colors clusters at). Palette quality is the mean CIE76
+delta E from every color of the full K-Means palette to its nearest color in
+the backend's palette, weighted by the K-Means cluster share.
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from ai_services import color_quantizer
+
+SIZE = (300, 225)
+
+
+def make_fabric_image(kind, height, width, seed=0):
+    """Synthetic fabrics: woven stripes, a floral print and a noisy solid"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    if kind == 'stripes':
+        palette = np.array([[180, 30, 40], [240, 210, 120], [30, 60, 120], [250, 250, 245]])
+        image = palette[(x // 12 + y // 30) % len(palette)]
+    elif kind == 'floral':
+        base = np.array([20, 90, 60]) + np.zeros((height, width, 3))
+        for _ in range(40):
+            cy, cx = rng.integers(0, height), rng.integers(0, width)
+            radius = rng.integers(6, 20)
+            color = rng.integers(60, 255, size=3)
+            mask = (y - cy) ** 2 + (x - cx) ** 2 < radius ** 2
+            base[mask] = color
+        image = base
+    else:
+        image = np.array([200, 120, 80]) + np.zeros((height, width, 3))
+    noise = rng.normal(0, 8, size=(height, width, 3))
+    return np.clip(image + noise, 0, 255).astype(np.uint8)
+
+
+def to_cie_lab(colors):
+    rgb = np.asarray(colors, dtype=np.float32).reshape(1, -1, 3) / 255.0
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2LAB)[0].astype(np.float64)
+
+
+def mean_delta_e(reference, reference_weights, candidate):
+    distances = np.linalg.norm(to_cie_lab(reference)[:, None, :] - to_cie_lab(candidate)[None, :, :], axis=2)
+    nearest = distances.min(axis=1)
+    return float(np.average(nearest, weights=reference_weights))
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--colors', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'image':>8} {'backend':>11} {'latency (ms)':>13} {'speedup':>8} {'mean dE':>8}")
+    for kind in ('stripes', 'floral', 'solid'):
+        pixels = make_fabric_image(kind, *SIZE).reshape(-1, 3)
+        baseline_seconds, (reference, weights) = best_of(
+            lambda: color_quantizer.quantize_colors(pixels, args.colors, 'kmeans'), args.repeat
+        )
+
+        for backend in color_quantizer.QUANTIZER_BACKENDS:
+            if backend == 'kmeans':
+                seconds, centers = baseline_seconds, reference
+            else:
+                seconds, (centers, _) = best_of(
+                    lambda: color_quantizer.quantize_colors(pixels, args.colors, backend), args.repeat
+                )
+            print(
+                f"{kind:>8} {backend:>11} {seconds * 1000:>13.1f} {baseline_seconds / seconds:>7.1f}x "
+                f"{mean_delta_e(reference, weights, centers):>8.2f}"
+            )
+
+
+if __name__ == '__main__':
+    main()
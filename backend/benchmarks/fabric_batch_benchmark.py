@@ -0,0 +1,130 @@
+"""
+Benchmark: fabric catalog throughput, one request per image vs the streaming
+batch analyzer on process pools of 1..N workers.
+
+Usage (from backend/, against a throwaway test database):
+    DJANGO_SETTINGS_MODULE=frameio_backend.settings python -m benchmarks.fabric_batch_benchmark [--images 24]
+
+Every run analyzes the same synthetic woven-fabric images, served by a local
+HTTP server, for a fresh organization, so nothing is served from the fabric analysis store; the best
+of --repeat runs is reported. Pools are started and warmed before timing and
+the spawn cost is reported separately.
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'frameio_backend.settings')
+django.setup()
+
+import numpy as np  # noqa: E402
+from django.test.runner import DiscoverRunner  # noqa: E402
+from django.test.utils import override_settings, setup_test_environment  # noqa: E402
+from PIL import Image  # noqa: E402
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_fabric(directory, index, width, height):
+    """Twill-like weave: two crossing thread frequencies, dyed, with yarn noise"""
+    rng = np.random.default_rng(index)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    period = 6 + index % 5
+    weave = 0.5 + 0.25 * np.sin(2 * np.pi * (x + y) / period) + 0.25 * np.sin(2 * np.pi * x / (period * 2))
+    dye = rng.integers(40, 220, size=3).astype(np.float32)
+    pixels = weave[..., None] * dye + rng.normal(0, 10, size=(height, width, 3))
+    name = f'fabric-{index}.png'
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(os.path.join(directory, name), format='PNG')
+    return name
+
+
+def run_sequential(urls, slug):
+    from ai_services.fabric_store import FabricAnalysisStore
+    from organizations.models import Organization
+
+    organization = Organization.objects.create(name=slug, slug=slug)
+    store = FabricAnalysisStore()
+    start = time.perf_counter()
+    for url in urls:
+        assert store.analyze(organization, url)['success']
+    return time.perf_counter() - start
+
+
+def run_batch(urls, slug, pool):
+    from ai_services.fabric_batch import FabricBatchAnalyzer
+    from organizations.models import Organization
+
+    organization = Organization.objects.create(name=slug, slug=slug)
+    start = time.perf_counter()
+    first = None
+    for item in FabricBatchAnalyzer(executor=pool).stream(organization, urls):
+        assert item['success'] and not item['cache_hit'], item
+        first = first or time.perf_counter() - start
+    return time.perf_counter() - start, first
+
+
+def main(images, width, height, max_workers, repeat):
+    from ai_services.fabric_worker import init_worker
+
+    directory = tempfile.mkdtemp()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        urls = [f'{base_url}/{write_fabric(directory, index, width, height)}' for index in range(images)]
+        print(f"{images} images of {width}x{height}, {os.cpu_count()} CPU core(s)")
+        print(f"{'mode':<16} {'workers':>8} {'startup (s)':>12} {'first (ms)':>11} "
+              f"{'total (s)':>10} {'images/s':>9} {'images/s/core':>14}")
+
+        seconds = min(run_sequential(urls, f'sequential-{run}') for run in range(repeat))
+        print(f"{'per request':<16} {1:>8} {'-':>12} {seconds / images * 1000:>11.0f} "
+              f"{seconds:>10.2f} {images / seconds:>9.2f} {images / seconds:>14.2f}")
+
+        for workers in range(1, max_workers + 1):
+            started = time.perf_counter()
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=init_worker)
+            list(pool.map(time.sleep, [0.2] * workers))
+            startup = time.perf_counter() - started
+            try:
+                seconds, first = min(run_batch(urls, f'batch-{workers}-{run}', pool) for run in range(repeat))
+            finally:
+                pool.shutdown()
+            print(f"{'batch':<16} {workers:>8} {startup:>12.2f} {first * 1000:>11.0f} "
+                  f"{seconds:>10.2f} {images / seconds:>9.2f} {images / seconds / workers:>14.2f}")
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--images', type=int, default=24)
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0, interactive=False)
+    old_config = runner.setup_databases()
+    try:
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            main(args.images, args.width, args.height, args.max_workers, args.repeat)
+    finally:
+        runner.teardown_databases(old_config)
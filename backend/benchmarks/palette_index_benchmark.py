@@ -0,0 +1,110 @@
+"""
+Benchmark: palette search latency against catalog size, LAB palette index vs
+scoring every stored palette.
+
+Usage (from backend/):
+    DJANGO_SETTINGS_MODULE=frameio_backend.settings python -m benchmarks.palette_index_benchmark [--sizes 1000 10000 100000]
+
+Catalogs are random 2-8 color palettes. "near" queries are catalog palettes
+with LAB noise (a design that has a matching fabric); "random" queries are
+fresh random palettes, whose 10th best match is poor and forces the index to
+search widest. The scan baseline runs the same Hungarian assignment on every
+palette and is skipped above --scan-max palettes.
+"""
+import argparse
+import os
+import statistics
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'frameio_backend.settings')
+django.setup()
+
+import numpy as np  # noqa: E402
+from scipy.optimize import linear_sum_assignment  # noqa: E402
+
+
+def random_palette(rng):
+    size = int(rng.integers(2, 9))
+    labs = rng.uniform([0, 60, 60], [255, 200, 200], (size, 3))
+    weights = rng.dirichlet(np.ones(size)) * 100
+    return [{'lab': lab.tolist(), 'percentage': float(weight)} for lab, weight in zip(labs, weights)]
+
+
+def near_palette(rng, palette):
+    return [{'lab': (np.array(c['lab']) + rng.normal(0, 4, 3)).tolist(), 'percentage': c['percentage']} for c in palette]
+
+
+def scan(catalog, query, max_distance, limit):
+    """Score every palette with the Hungarian assignment, no index"""
+    from ai_services.palette_index import palette_to_lab
+
+    query_lab, query_weights = palette_to_lab(query)
+    costs = []
+    for lab, _ in catalog:
+        cost = np.minimum(np.linalg.norm(query_lab[:, None, :] - lab[None, :, :], axis=2), max_distance)
+        cost = cost * query_weights[:, None]
+        if len(lab) < len(query_lab):
+            cost = np.hstack([cost, np.repeat(max_distance * query_weights[:, None], len(query_lab) - len(lab), axis=1)])
+        rows, cols = linear_sum_assignment(cost)
+        costs.append(cost[rows, cols].sum())
+    return np.argsort(costs)[:limit]
+
+
+def percentiles(seconds):
+    ordered = sorted(seconds)
+    return statistics.median(ordered) * 1000, ordered[int(0.95 * (len(ordered) - 1))] * 1000
+
+
+def main(sizes, queries, limit, scan_max):
+    from ai_services.palette_index import PaletteIndex, palette_to_lab
+
+    rng = np.random.default_rng(0)
+    print(f"{'palettes':>9} {'build (s)':>10} {'add (ms)':>9} {'near p50':>9} {'near p95':>9} "
+          f"{'rand p50':>9} {'rand p95':>9} {'scan (ms)':>10}")
+    for size in sizes:
+        palettes = [random_palette(rng) for _ in range(size)]
+        index = PaletteIndex()
+
+        start = time.perf_counter()
+        index.extend((str(number), palette, {}) for number, palette in enumerate(palettes))
+        build = time.perf_counter() - start
+
+        # Incremental adds, including the amortized KD-tree rebuilds they trigger
+        extra = [random_palette(rng) for _ in range(max(size // 20, 20))]
+        start = time.perf_counter()
+        for number, palette in enumerate(extra):
+            index.add(f'new-{number}', palette)
+        add = (time.perf_counter() - start) / len(extra)
+
+        timings = {}
+        for kind in ('near', 'random'):
+            seconds = []
+            for _ in range(queries):
+                query = near_palette(rng, palettes[rng.integers(size)]) if kind == 'near' else random_palette(rng)
+                start = time.perf_counter()
+                index.search(query, limit=limit)
+                seconds.append(time.perf_counter() - start)
+            timings[kind] = percentiles(seconds)
+
+        scan_ms = '-'
+        if size <= scan_max:
+            catalog = [palette_to_lab(palette) for palette in palettes]
+            query = near_palette(rng, palettes[0])
+            start = time.perf_counter()
+            scan(catalog, query, index.max_distance, limit)
+            scan_ms = f"{(time.perf_counter() - start) * 1000:.0f}"
+
+        print(f"{size:>9} {build:>10.2f} {add * 1000:>9.2f} {timings['near'][0]:>9.2f} {timings['near'][1]:>9.2f} "
+              f"{timings['random'][0]:>9.2f} {timings['random'][1]:>9.2f} {scan_ms:>10}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--scan-max', type=int, default=10000)
+    args = parser.parse_args()
+    main(args.sizes, args.queries, args.limit, args.scan_max)
@@ -0,0 +1,162 @@
+"""
+Benchmark: poster history pages for an organization with 100k+ posters,
+legacy COUNT + OFFSET listing vs keyset pages with sparse fieldsets.
+
+Usage (from backend/, against a throwaway test database):
+    DJANGO_SETTINGS_MODULE=frameio_backend.settings python -m benchmarks.poster_history_benchmark [--posters 100000]
+
+"legacy" replays the queries list_posters ran before keyset pagination:
+an exact count, then every column of the page via OFFSET, serialized per
+model instance. The keyset rows go through the endpoint itself.
+"""
+import argparse
+import statistics
+import time
+from datetime import timedelta
+
+import django
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'frameio_backend.settings')
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Q  # noqa: E402
+from django.test.runner import DiscoverRunner  # noqa: E402
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+PAGE = 50
+PROMPT = 'Festive handloom saree poster with gold zari border, deep maroon silk and soft studio lighting. ' * 4
+CAPTION = 'Celebrate the season in handwoven silk. ' * 8
+
+
+def legacy_page(user, organization, offset):
+    """The pre-keyset list_posters queries and per-row serialization"""
+    from ai_services.models import GeneratedPoster
+
+    queryset = GeneratedPoster.objects.filter(Q(organization=organization) | Q(user=user)).order_by('-created_at')
+    total = queryset.count()
+    rows = []
+    for poster in queryset[offset:offset + PAGE]:
+        rows.append({
+            'id': str(poster.id), 'image_url': poster.image_url, 'public_url': poster.public_url or '',
+            'caption': poster.caption, 'full_caption': poster.full_caption, 'prompt': poster.prompt,
+            'aspect_ratio': poster.aspect_ratio, 'width': poster.width, 'height': poster.height,
+            'hashtags': list(poster.hashtags or []), 'emoji': poster.emoji,
+            'call_to_action': poster.call_to_action, 'branding_applied': poster.branding_applied,
+            'logo_added': poster.logo_added, 'contact_info_added': poster.contact_info_added,
+            'created_at': poster.created_at.isoformat(), 'updated_at': poster.updated_at.isoformat(),
+        })
+    return total, rows
+
+
+def timed(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000, len(queries)
+
+
+def main(posters, repeat):
+    from ai_services.models import GeneratedPoster
+    from ai_services.pagination import encode_cursor
+    from organizations.models import Organization
+
+    user = get_user_model().objects.create_user(
+        username='benchuser', email='bench@example.com', password='benchpass123'
+    )
+    organization = Organization.objects.create(name='Bench Weavers', slug='bench-weavers')
+    client = APIClient()
+    client.force_authenticate(user)
+
+    now = timezone.now()
+    start = time.perf_counter()
+    for batch_start in range(0, posters, 5000):
+        GeneratedPoster.objects.bulk_create([
+            GeneratedPoster(
+                organization=organization,
+                user=user if i % 4 == 0 else None,
+                image_url=f'https://cdn.example.com/posters/{i}.png',
+                caption='Handloom sale', full_caption=CAPTION, prompt=PROMPT,
+                hashtags=['#handloom', '#saree', '#festive'],
+                created_at=now - timedelta(seconds=i),
+            )
+            for i in range(batch_start, min(batch_start + 5000, posters))
+        ], batch_size=1000)
+    # auto_now_add ignores the given timestamps on insert; set them afterwards
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE ai_services_generatedposter SET created_at = datetime('now', '-' || rowid || ' seconds')"
+            if connection.vendor == 'sqlite' else
+            "UPDATE ai_services_generatedposter SET created_at = now() - (random() * interval '365 days')"
+        )
+    print(f"{posters} posters for one organization seeded in {time.perf_counter() - start:.1f}s ({connection.vendor})")
+
+    deep = GeneratedPoster.objects.filter(organization=organization).order_by('-created_at', '-id').values_list(
+        'created_at', 'id'
+    )[posters // 2]
+    deep_cursor = encode_cursor(*deep)
+
+    from ai_services import ai_poster_views
+    ai_poster_views.resolve_user_organization = lambda _user: organization
+
+    def endpoint(**params):
+        def call():
+            response = client.get('/api/ai/ai-poster/posters/', {'limit': PAGE, **params})
+            assert response.status_code == 200, response.content[:200]
+            return response
+        return call
+
+    def cold(**params):
+        call = endpoint(**params)
+
+        def run():
+            cache.clear()
+            call()
+        return run
+
+    cases = [
+        ('legacy, offset 0', lambda: legacy_page(user, organization, 0)),
+        (f'legacy, offset {posters // 2}', lambda: legacy_page(user, organization, posters // 2)),
+        ('keyset, first page, exact count', cold()),
+        ('keyset, first page, approx count', cold(count='approximate')),
+        ('keyset, first page, no count', cold(count='none')),
+        ('keyset, first page, cached', endpoint()),
+        ('keyset, cursor mid-history', endpoint(cursor=deep_cursor)),
+        ('keyset, cursor, fields=id,image_url', endpoint(cursor=deep_cursor, fields='id,image_url')),
+    ]
+    endpoint()()  # warm the first-page cache
+    size_full = len(endpoint(cursor=deep_cursor)().content)
+    size_sparse = len(endpoint(cursor=deep_cursor, fields='id,image_url')().content)
+
+    print(f"{'case':<40} {'median (ms)':>12} {'queries':>8}")
+    for name, func in cases:
+        millis, queries = timed(func, repeat)
+        print(f"{name:<40} {millis:>12.1f} {queries:>8}")
+    print(f"page size: all fields {size_full / 1024:.1f} KiB, fields=id,image_url {size_sparse / 1024:.1f} KiB")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--posters', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0, interactive=False)
+    old_config = runner.setup_databases()
+    try:
+        with override_settings(
+            DEBUG=False, ALLOWED_HOSTS=['testserver'],
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        ):
+            main(args.posters, args.repeat)
+    finally:
+        runner.teardown_databases(old_config)
@@ -0,0 +1,81 @@
+"""
+Benchmark: per-request overhead of the AI endpoint rate limiter.
+
+Usage (from backend/):
+    python -m benchmarks.rate_limiter_benchmark [--redis-url redis://localhost:6379/0]
+
+Times one limiter check for the two-rule generation endpoint (the most
+expensive case) against the legacy per-process deque limiter. The target is
+well under 1ms per request; with --redis-url the shared Redis backend is timed
+too, which is dominated by one network round trip.
+"""
+import argparse
+import time
+from collections import defaultdict, deque
+
+import django
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure()
+    django.setup()
+
+from ai_services.rate_limiter import LocalRateLimiter, RedisRateLimiter, get_rules_for  # noqa: E402
+
+
+class LegacyDequeLimiter:
+    """The original RateLimitMiddleware storage: one timestamp per request per key"""
+
+    def __init__(self):
+        self.rate_limits = defaultdict(lambda: defaultdict(deque))
+
+    def hit(self, keys, rules):
+        now = time.time()
+        for key, rule in zip(keys, rules):
+            request_times = self.rate_limits[key]['requests']
+            while request_times and request_times[0] < now - rule.window_seconds:
+                request_times.popleft()
+            if len(request_times) >= rule.limit:
+                return False
+        for key in keys:
+            self.rate_limits[key]['requests'].append(now)
+        return True
+
+
+def time_limiter(limiter, iterations, tenants):
+    rules = get_rules_for('/api/ai/generation-requests/', 'POST')
+    # Spread requests over many tenants so most checks are allowed
+    keys = [[f"org-{i}:user:{rule.name}" for rule in rules] for i in range(tenants)]
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        limiter.hit(keys[i % tenants], rules)
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=50000)
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--redis-url', help='also benchmark the Redis backend')
+    args = parser.parse_args()
+
+    limiters = {
+        'legacy deque': LegacyDequeLimiter(),
+        'local GCRA': LocalRateLimiter(),
+    }
+    if args.redis_url:
+        import redis
+        client = redis.Redis.from_url(args.redis_url)
+        limiters['redis GCRA'] = RedisRateLimiter(client, key_prefix='ratelimit-benchmark')
+
+    print(f"{'backend':>14} {'per check (us)':>15} {'target':>8}")
+    for name, limiter in limiters.items():
+        iterations = args.iterations if name != 'redis GCRA' else min(args.iterations, 5000)
+        per_check = time_limiter(limiter, iterations, args.tenants)
+        verdict = 'ok' if per_check < 0.001 else 'SLOW'
+        print(f"{name:>14} {per_check * 1e6:>15.1f} {verdict:>8}")
+
+
+if __name__ == '__main__':
+    main()
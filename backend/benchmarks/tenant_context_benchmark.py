@@ -0,0 +1,88 @@
+"""
+Benchmark: database queries per API request spent resolving tenant membership.
+
+Usage (from backend/, against a throwaway test database):
+    DJANGO_SETTINGS_MODULE=frameio_backend.settings python -m benchmarks.tenant_context_benchmark
+
+For each endpoint a logged-in member requests it with an X-Organization
+header, and the total query count plus the (user, organization) membership
+lookups are recorded in three modes:
+  no cache   - DummyCache: only the per-request TenantContext memoization
+  cold cache - shared cache enabled but empty
+  warm cache - second request with the membership already cached
+"""
+import os
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'frameio_backend.settings')
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.runner import DiscoverRunner  # noqa: E402
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment  # noqa: E402
+
+ENDPOINTS = [
+    '/api/members/',
+    '/api/organizations/',
+    '/api/profiles/',
+    '/api/ai/providers/',
+]
+
+CACHES = {
+    'no cache': {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+    'shared cache': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+}
+
+
+def membership_lookups(queries):
+    return sum(
+        1 for query in queries.captured_queries
+        if 'FROM "organization_members"' in query['sql'] and '"organization_members"."user_id" =' in query['sql']
+    )
+
+
+def measure(client, path):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(path, HTTP_X_ORGANIZATION='bench-weavers')
+    return response.status_code, len(queries), membership_lookups(queries)
+
+
+def main():
+    from organizations.models import Organization, OrganizationMember
+
+    user = get_user_model().objects.create_user(
+        username='benchuser', email='bench@example.com', password='benchpass123'
+    )
+    organization = Organization.objects.create(name='Bench Weavers', slug='bench-weavers')
+    OrganizationMember.objects.create(organization=organization, user=user, role='admin')
+
+    client = Client()
+    client.force_login(user)
+
+    print(f"{'endpoint':<22} {'mode':<11} {'status':>6} {'queries':>8} {'membership lookups':>19}")
+    for path in ENDPOINTS:
+        rows = []
+        with override_settings(CACHES=CACHES['no cache']):
+            rows.append(('no cache',) + measure(client, path))
+        with override_settings(CACHES=CACHES['shared cache']):
+            cache.clear()
+            rows.append(('cold cache',) + measure(client, path))
+            rows.append(('warm cache',) + measure(client, path))
+
+        for mode, status_code, total, lookups in rows:
+            print(f"{path:<22} {mode:<11} {status_code:>6} {total:>8} {lookups:>19}")
+
+
+if __name__ == '__main__':
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0, interactive=False)
+    old_config = runner.setup_databases()
+    try:
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver']):
+            main()
+    finally:
+        runner.teardown_databases(old_config)
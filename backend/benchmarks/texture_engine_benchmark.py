@@ -0,0 +1,111 @@
+"""
+Benchmark: vectorized texture engine vs the original per-pixel loops.
+
+Usage (from backend/):
+    python -m benchmarks.texture_engine_benchmark [--full-legacy]
+
+The legacy loops take minutes on 4K images, so by default they are timed on a
+512px tile and extrapolated per pixel. Pass --full-legacy to time them on every
+size.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from ai_services import texture_engine
+
+SIZES = {
+    '512px': (512, 512),
+    '1080px': (1080, 1080),
+    '4K': (2160, 3840),
+}
+
+
+def legacy_lbp_features(gray_image):
+    height, width = gray_image.shape
+    lbp_image = np.zeros_like(gray_image)
+    for i in range(1, height - 1):
+        for j in range(1, width - 1):
+            center = gray_image[i, j]
+            binary_string = ""
+            neighbors = [
+                gray_image[i-1, j-1], gray_image[i-1, j], gray_image[i-1, j+1],
+                gray_image[i, j+1], gray_image[i+1, j+1], gray_image[i+1, j],
+                gray_image[i+1, j-1], gray_image[i, j-1]
+            ]
+            for neighbor in neighbors:
+                binary_string += "1" if neighbor >= center else "0"
+            lbp_image[i, j] = int(binary_string, 2)
+    hist = np.bincount(lbp_image.ravel(), minlength=256) / lbp_image.size
+    roughness = np.sum(hist * np.arange(256)) / 255
+    return {'roughness': float(roughness), 'smoothness': float(1 - roughness)}
+
+
+def legacy_glcm(gray_image, levels=8):
+    quantized = (gray_image // (256 // levels)).astype(np.uint8)
+    glcm = np.zeros((levels, levels), dtype=np.float32)
+    for i in range(quantized.shape[0] - 1):
+        for j in range(quantized.shape[1] - 1):
+            glcm[quantized[i, j], quantized[i, j + 1]] += 1
+            glcm[quantized[i, j], quantized[i + 1, j]] += 1
+    return glcm / np.sum(glcm)
+
+
+def vectorized(gray_image):
+    texture_engine.lbp_features(gray_image)
+    texture_engine.compute_glcm(gray_image)
+
+
+def legacy(gray_image):
+    legacy_lbp_features(gray_image)
+    legacy_glcm(gray_image)
+
+
+def best_of(func, image, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(image)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def make_fabric_image(height, width, seed=0):
+    """Synthetic woven texture: sinusoidal warp/weft plus noise"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    weave = 64 * np.sin(x / 3.0) + 64 * np.sin(y / 5.0)
+    noise = rng.normal(0, 20, size=(height, width))
+    return np.clip(128 + weave + noise, 0, 255).astype(np.uint8)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--full-legacy', action='store_true', help='time legacy loops on every size')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    tile = make_fabric_image(*SIZES['512px'])
+    legacy_per_pixel = best_of(legacy, tile, 1) / tile.size
+
+    print(f"{'size':>8} {'pixels':>10} {'legacy (s)':>12} {'vectorized (ms)':>16} {'speedup':>9}")
+    for name, (height, width) in SIZES.items():
+        image = make_fabric_image(height, width)
+
+        if args.full_legacy or name == '512px':
+            legacy_seconds = best_of(legacy, image, 1)
+            marker = ''
+        else:
+            legacy_seconds = legacy_per_pixel * image.size
+            marker = '~'
+
+        vectorized_seconds = best_of(vectorized, image, args.repeat)
+        print(
+            f"{name:>8} {image.size:>10} {marker + format(legacy_seconds, '.2f'):>12} "
+            f"{vectorized_seconds * 1000:>16.1f} {legacy_seconds / vectorized_seconds:>8.0f}x"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -83,7 +83,9 @@ class DesignCommentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'author', 'created_at', 'updated_at']
     
     def get_replies_count(self, obj):
-        """Get count of replies to this comment"""
+        """Get count of replies to this comment (annotated by DesignCommentViewSet)"""
+        if hasattr(obj, 'replies_total'):
+            return obj.replies_total
         return obj.replies.count()
     
     def get_can_edit(self, obj):
@@ -0,0 +1,62 @@
+"""
+Unit tests for the annotated design comment listing
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from collaboration.models import DesignComment
+from designs.models import Design
+from frameio_backend.testing import QueryCountAssertionsMixin
+from organizations.middleware import set_current_organization
+from organizations.models import Organization, OrganizationMember
+
+User = get_user_model()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class DesignCommentListingTestCase(QueryCountAssertionsMixin, TestCase):
+    """Test cases for reply counts without per-comment queries"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reviewer', email='reviewer@example.com', password='testpass123')
+        self.organization = Organization.objects.create(name='Weavers', slug='weavers')
+        OrganizationMember.objects.create(organization=self.organization, user=self.user, role='designer')
+        self.design = Design(organization=self.organization, title='Festive poster', created_by=self.user)
+        self.design.save()
+        self.comments = []
+        self.addCleanup(set_current_organization, None)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_comments(self, total):
+        """Grow the design's top-level comments to `total`, comment i having i % 3 replies"""
+        while len(self.comments) < total:
+            comment = DesignComment(
+                organization=self.organization, design=self.design, author=self.user,
+                content=f'Comment {len(self.comments)}'
+            )
+            comment.save()
+            for reply in range(len(self.comments) % 3):
+                DesignComment(
+                    organization=self.organization, design=self.design, author=self.user,
+                    parent_comment=comment, content=f'Reply {reply}'
+                ).save()
+            self.comments.append(comment)
+
+    def list_comments(self):
+        response = self.client.get('/api/collaboration/comments/', HTTP_X_ORGANIZATION='weavers')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        return body['results'] if isinstance(body, dict) else body
+
+    def test_list_uses_constant_queries(self):
+        self.assertConstantQueries(self.add_comments, self.list_comments)
+
+    def test_reply_counts(self):
+        self.add_comments(4)
+        counts = {item['content']: item['replies_count'] for item in self.list_comments()}
+        self.assertEqual(counts, {'Comment 0': 0, 'Comment 1': 1, 'Comment 2': 2, 'Comment 3': 0})
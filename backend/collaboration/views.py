@@ -1,7 +1,7 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q
+from django.db.models import Count, Q
 from django.core.cache import cache
 import logging
 
@@ -162,7 +162,9 @@ class DesignCommentViewSet(viewsets.ModelViewSet):
             # Only show top-level comments by default
             queryset = queryset.filter(parent_comment__isnull=True)
         
-        return queryset.select_related('design', 'author', 'parent_comment', 'organization').order_by('created_at')
+        return queryset.select_related(
+            'design', 'author', 'parent_comment', 'organization'
+        ).annotate(replies_total=Count('replies')).order_by('created_at')
     
     def perform_create(self, serializer):
         """Create a new design comment"""
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-16 18:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('design_export', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='celery_task_id',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='processed_designs',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='progress',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='total_designs',
+            field=models.IntegerField(default=0),
+        ),
+    ]
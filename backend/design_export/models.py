@@ -31,6 +31,12 @@ class ExportJob(TenantScopedModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_jobs')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     
+    # Progress (updated by the export worker after each design)
+    progress = models.PositiveSmallIntegerField(default=0)  # 0-100
+    processed_designs = models.IntegerField(default=0)
+    total_designs = models.IntegerField(default=0)
+    celery_task_id = models.CharField(max_length=255, blank=True, null=True)
+    
     # Export parameters
     design_ids = models.JSONField(default=list)  # List of design IDs to export
     export_format = models.CharField(max_length=10, choices=EXPORT_FORMAT_CHOICES)
@@ -67,14 +73,36 @@ class ExportJob(TenantScopedModel):
     def __str__(self):
         return f"Export Job {self.id} - {self.export_format} - {self.status}"
     
-    def mark_processing(self):
+    def mark_processing(self, total_designs=0):
         """Mark job as processing"""
         self.status = 'processing'
-        self.save(update_fields=['status'])
+        self.progress = 0
+        self.processed_designs = 0
+        self.total_designs = total_designs
+        self.save(update_fields=['status', 'progress', 'processed_designs', 'total_designs'])
+    
+    def update_progress(self, processed_designs):
+        """
+        Record how many designs have been written to the export file
+        
+        Returns:
+            False if the job is no longer processing (e.g. it was cancelled)
+        """
+        total = max(self.total_designs, 1)
+        # Leave headroom for finalizing the file; 100 is reserved for completion
+        self.progress = min(95, int(processed_designs * 95 / total))
+        self.processed_designs = processed_designs
+        updated = ExportJob.objects.all_organizations().filter(id=self.id, status='processing').update(
+            progress=self.progress,
+            processed_designs=processed_designs,
+            updated_at=timezone.now()
+        )
+        return updated > 0
     
     def mark_completed(self, export_file_path=None, download_url=None, file_size=None, processing_time=None):
         """Mark job as completed"""
         self.status = 'completed'
+        self.progress = 100
         self.completed_at = timezone.now()
         self.expires_at = timezone.now() + timezone.timedelta(hours=24)  # Expire in 24 hours
         
@@ -88,7 +116,7 @@ class ExportJob(TenantScopedModel):
             self.processing_time = processing_time
             
         self.save(update_fields=[
-            'status', 'completed_at', 'expires_at', 'export_file_path',
+            'status', 'progress', 'completed_at', 'expires_at', 'export_file_path',
             'download_url', 'file_size', 'processing_time'
         ])
     
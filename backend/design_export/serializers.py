@@ -17,13 +17,14 @@ class ExportJobSerializer(serializers.ModelSerializer):
         model = ExportJob
         fields = [
             'id', 'user', 'user_name', 'user_email', 'organization_name',
-            'status', 'design_ids', 'export_format', 'export_options',
+            'status', 'progress', 'processed_designs', 'total_designs', 'design_ids', 'export_format', 'export_options',
             'export_file_path', 'download_url', 'file_size', 'processing_time',
             'error_message', 'created_at', 'updated_at', 'completed_at',
             'expires_at', 'is_expired'
         ]
         read_only_fields = [
-            'id', 'user', 'organization', 'status', 'export_file_path',
+            'id', 'user', 'organization', 'status', 'progress', 'processed_designs',
+            'total_designs', 'export_file_path',
             'download_url', 'file_size', 'processing_time', 'error_message',
             'created_at', 'updated_at', 'completed_at', 'expires_at'
         ]
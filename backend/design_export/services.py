@@ -6,8 +6,10 @@ from django.conf import settings
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from django.utils import timezone
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, Iterator, List, Optional, Any
 import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 import io
 
@@ -17,12 +19,48 @@ from organizations.middleware import get_current_organization
 
 logger = logging.getLogger(__name__)
 
+# Extensions of already-compressed image formats, stored in ZIPs without deflate
+STORED_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp', '.gif'}
+
+IMAGE_FORMAT_EXTENSIONS = {
+    'png': {'.png'},
+    'jpg': {'.jpg', '.jpeg'},
+}
+
+PIL_FORMATS = {
+    'png': 'PNG',
+    'jpg': 'JPEG',
+}
+
+
+def _ordered_parallel_map(func: Callable, items: List[Any], max_workers: int) -> Iterator[Any]:
+    """
+    Apply func to items in a thread pool, yielding results in input order
+    
+    At most 2 * max_workers results are in flight at a time, so large exports
+    never hold every decoded image in memory at once.
+    """
+    if max_workers <= 1 or len(items) <= 1:
+        for item in items:
+            yield func(item)
+        return
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= 2 * max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
 
 class DesignExportService:
     """Service for exporting designs in various formats"""
     
     def __init__(self):
         self.export_dir = os.path.join(settings.MEDIA_ROOT, 'exports')
+        self.max_workers = getattr(settings, 'EXPORT_WORKER_THREADS', 4)
         os.makedirs(self.export_dir, exist_ok=True)
     
     def create_export_job(
@@ -80,6 +118,34 @@ class DesignExportService:
         logger.info(f"Created export job {job.id} for user {user.id}")
         return job
     
+    def dispatch_export_job(self, job: ExportJob) -> ExportJob:
+        """
+        Queue an export job for the background worker pool
+        
+        Falls back to processing the job inline when the broker is unavailable.
+        
+        Args:
+            job: ExportJob instance to queue
+            
+        Returns:
+            The queued (or processed) job
+        """
+        from .tasks import process_export_job as process_export_job_task
+        
+        try:
+            async_result = process_export_job_task.delay(str(job.id))
+        except Exception as e:
+            logger.warning(f"Could not queue export job {job.id}, processing inline: {str(e)}")
+            self.process_export_job(job)
+            return job
+        
+        if async_result is not None and async_result.id:
+            ExportJob.objects.all_organizations().filter(id=job.id).update(celery_task_id=async_result.id)
+            job.celery_task_id = async_result.id
+        
+        logger.info(f"Queued export job {job.id} (task {job.celery_task_id})")
+        return job
+    
     def process_export_job(self, job: ExportJob) -> bool:
         """
         Process an export job
@@ -91,19 +157,23 @@ class DesignExportService:
             True if successful, False otherwise
         """
         try:
-            # Mark job as processing
-            job.mark_processing()
-            
-            # Get designs
-            designs = Design.objects.filter(
-                id__in=job.design_ids,
-                organization=job.organization
-            )
+            # Get designs (in the requested order)
+            designs_by_id = {
+                str(design.id): design
+                for design in Design.objects.filter(
+                    id__in=job.design_ids,
+                    organization=job.organization
+                )
+            }
+            designs = [designs_by_id[str(design_id)] for design_id in job.design_ids if str(design_id) in designs_by_id]
             
-            if not designs.exists():
+            if not designs:
                 job.mark_failed("No valid designs found")
                 return False
             
+            # Mark job as processing
+            job.mark_processing(total_designs=len(designs))
+            
             # Process based on export format
             if job.export_format == 'zip':
                 result = self._export_as_zip(job, designs)
@@ -135,6 +205,9 @@ class DesignExportService:
                 
                 logger.info(f"Successfully processed export job {job.id}")
                 return True
+            elif result.get('cancelled'):
+                logger.info(f"Export job {job.id} was cancelled")
+                return False
             else:
                 # Mark job as failed
                 job.mark_failed(result['error'])
@@ -157,17 +230,41 @@ class DesignExportService:
             zip_filename = f"export_{job.id}.zip"
             zip_path = os.path.join(self.export_dir, zip_filename)
             
+            # Entries are prepared (and converted if needed) in worker threads and
+            # written to the archive in order as they become ready
+            cancelled = False
             with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                for design in designs:
-                    if design.image:
-                        # Get image file
-                        image_path = design.image.path
-                        if os.path.exists(image_path):
-                            # Add to ZIP with design title as filename
-                            arcname = f"{design.title}_{design.id}.{job.export_format}"
-                            zip_file.write(image_path, arcname)
+                entries = _ordered_parallel_map(
+                    lambda design: self._prepare_zip_entry(job, design),
+                    designs,
+                    self.max_workers
+                )
+                for index, entry in enumerate(entries, start=1):
+                    if entry:
+                        arcname, source = entry
+                        # PNG/JPEG data is already compressed; deflating it again only costs CPU
+                        compress_type = (
+                            zipfile.ZIP_STORED
+                            if os.path.splitext(arcname)[1].lower() in STORED_EXTENSIONS
+                            else zipfile.ZIP_DEFLATED
+                        )
+                        if isinstance(source, bytes):
+                            zip_file.writestr(arcname, source, compress_type=compress_type)
                         else:
-                            logger.warning(f"Image file not found for design {design.id}")
+                            zip_file.write(source, arcname, compress_type=compress_type)
+                    
+                    if not job.update_progress(index):
+                        cancelled = True
+                        break
+            
+            if cancelled:
+                os.remove(zip_path)
+                return {
+                    'success': False,
+                    'cancelled': True,
+                    'error': 'Export was cancelled',
+                    'processing_time': time.time() - start_time
+                }
             
             # Get file size
             file_size = os.path.getsize(zip_path)
@@ -192,6 +289,38 @@ class DesignExportService:
                 'processing_time': time.time() - start_time
             }
     
+    def _prepare_zip_entry(self, job: ExportJob, design) -> Optional[tuple]:
+        """
+        Get the archive name and content for a design
+        
+        Returns:
+            (arcname, source) where source is a file path to copy as-is or the
+            converted image bytes, or None if the design has no image file
+        """
+        if not design.image:
+            return None
+        
+        image_path = design.image.path
+        if not os.path.exists(image_path):
+            logger.warning(f"Image file not found for design {design.id}")
+            return None
+        
+        source_extension = os.path.splitext(image_path)[1].lower()
+        if job.export_format not in ['png', 'jpg']:
+            return f"{design.title}_{design.id}{source_extension}", image_path
+        
+        arcname = f"{design.title}_{design.id}.{job.export_format}"
+        if source_extension in IMAGE_FORMAT_EXTENSIONS[job.export_format]:
+            # Already in the requested format; copy the file without decoding it
+            return arcname, image_path
+        
+        with Image.open(image_path) as img:
+            if job.export_format == 'jpg' and img.mode in ('RGBA', 'LA', 'P'):
+                img = img.convert('RGB')
+            buffer = io.BytesIO()
+            img.save(buffer, format=PIL_FORMATS[job.export_format])
+        return arcname, buffer.getvalue()
+    
     def _export_as_images(self, job: ExportJob, designs) -> Dict[str, Any]:
         """Export designs as individual images"""
         import time
@@ -200,7 +329,7 @@ class DesignExportService:
         try:
             # For single image export, return the first design
             if len(designs) == 1:
-                design = designs.first()
+                design = designs[0]
                 if design.image:
                     # Copy image to export directory
                     export_filename = f"export_{job.id}.{job.export_format}"
@@ -212,8 +341,9 @@ class DesignExportService:
                             # Convert to RGB for JPEG
                             if img.mode in ('RGBA', 'LA', 'P'):
                                 img = img.convert('RGB')
-                        img.save(export_path, format=job.export_format.upper())
+                        img.save(export_path, format=PIL_FORMATS[job.export_format])
                     
+                    job.update_progress(1)
                     file_size = os.path.getsize(export_path)
                     download_url = f"{settings.MEDIA_URL}exports/{export_filename}"
                     
@@ -264,17 +394,30 @@ class DesignExportService:
             else:
                 pagesize = letter
             
+            def load_image(design):
+                """Open each image once; non-JPEG images are decoded here, in parallel"""
+                if not (design.image and os.path.exists(design.image.path)):
+                    return None
+                reader = ImageReader(design.image.path)
+                if os.path.splitext(design.image.path)[1].lower() not in IMAGE_FORMAT_EXTENSIONS['jpg']:
+                    # JPEGs are embedded as-is; everything else needs raw pixels
+                    reader.getRGBData()
+                return reader
+            
             c = canvas.Canvas(pdf_path, pagesize=pagesize)
+            pages = 0
+            cancelled = False
             
-            for i, design in enumerate(designs):
-                if design.image and os.path.exists(design.image.path):
+            images = _ordered_parallel_map(load_image, designs, self.max_workers)
+            for index, (design, reader) in enumerate(zip(designs, images), start=1):
+                if reader is not None:
                     # Add new page for each design (except first)
-                    if i > 0:
+                    if pages > 0:
                         c.showPage()
+                    pages += 1
                     
                     # Get image dimensions
-                    with Image.open(design.image.path) as img:
-                        img_width, img_height = img.size
+                    img_width, img_height = reader.getSize()
                     
                     # Calculate scaling to fit page
                     page_width, page_height = pagesize
@@ -295,7 +438,7 @@ class DesignExportService:
                     
                     # Add image to PDF
                     c.drawImage(
-                        design.image.path,
+                        reader,
                         x, y,
                         width=new_width,
                         height=new_height
@@ -304,6 +447,18 @@ class DesignExportService:
                     # Add design title
                     c.setFont("Helvetica", 12)
                     c.drawString(margin, page_height - 30, f"Design: {design.title}")
+                
+                if not job.update_progress(index):
+                    cancelled = True
+                    break
+            
+            if cancelled:
+                return {
+                    'success': False,
+                    'cancelled': True,
+                    'error': 'Export was cancelled',
+                    'processing_time': time.time() - start_time
+                }
             
             c.save()
             
@@ -341,7 +496,7 @@ class DesignExportService:
         try:
             # For now, convert images to SVG (basic implementation)
             if len(designs) == 1:
-                design = designs.first()
+                design = designs[0]
                 if design.image:
                     # Create basic SVG with embedded image
                     export_filename = f"export_{job.id}.svg"
@@ -360,6 +515,7 @@ class DesignExportService:
                     with open(export_path, 'w') as f:
                         f.write(svg_content)
                     
+                    job.update_progress(1)
                     file_size = os.path.getsize(export_path)
                     download_url = f"{settings.MEDIA_URL}exports/{export_filename}"
                     
@@ -432,10 +588,8 @@ class DesignExportService:
     
     def _calculate_progress(self, job: ExportJob) -> int:
         """Calculate progress percentage for a job"""
-        if job.status == 'pending':
-            return 10
-        elif job.status == 'processing':
-            return 50
+        if job.status in ['pending', 'processing']:
+            return job.progress
         elif job.status == 'completed':
             return 100
         elif job.status == 'failed':
@@ -449,6 +603,8 @@ class DesignExportService:
         if job.status == 'pending':
             return 'Export job is queued for processing'
         elif job.status == 'processing':
+            if job.total_designs:
+                return f'Processing export... ({job.processed_designs}/{job.total_designs} designs)'
             return 'Processing export...'
         elif job.status == 'completed':
             return 'Export completed successfully'
@@ -0,0 +1,33 @@
+"""
+Celery tasks for design export
+"""
+import logging
+
+from celery import shared_task
+
+from organizations.middleware import set_current_organization
+from .models import ExportJob
+from .services import DesignExportService
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, ignore_result=True, acks_late=True)
+def process_export_job(self, job_id: str):
+    """Run a queued ExportJob"""
+    try:
+        job = ExportJob.objects.all_organizations().select_related('user', 'organization').get(id=job_id)
+    except ExportJob.DoesNotExist:
+        logger.error(f"Export job {job_id} not found")
+        return
+
+    if job.status != 'pending':
+        logger.info(f"Export job {job_id} already {job.status}; skipping")
+        return
+
+    # Tenant-scoped managers need the job's organization outside of a request
+    set_current_organization(job.organization)
+    try:
+        DesignExportService().process_export_job(job)
+    finally:
+        set_current_organization(None)
@@ -0,0 +1,150 @@
+"""
+Unit tests for the design export worker
+"""
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from design_export.models import ExportJob
+from design_export.services import DesignExportService
+from designs.models import Design
+from organizations.middleware import set_current_organization
+from organizations.models import Organization
+
+User = get_user_model()
+
+
+class DesignExportServiceTestCase(TestCase):
+    """Test cases for export processing, progress and dispatch"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+        self.organization = Organization.objects.create(name='Weavers', slug='weavers')
+        set_current_organization(self.organization)
+        self.user = User.objects.create_user(
+            username='exportuser',
+            email='export@example.com',
+            password='testpass123'
+        )
+        self.designs = [
+            self.create_design('Silk', 'silk.png', 'PNG', (120, 80)),
+            self.create_design('Cotton', 'cotton.jpg', 'JPEG', (60, 90)),
+        ]
+        self.service = DesignExportService()
+
+    def tearDown(self):
+        set_current_organization(None)
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def create_design(self, title, filename, image_format, size):
+        relative_path = os.path.join('designs', 'images', filename)
+        os.makedirs(os.path.join(self.media_root, 'designs', 'images'), exist_ok=True)
+        Image.new('RGB', size, (180, 40, 90)).save(os.path.join(self.media_root, relative_path), image_format)
+        return Design.objects.create(
+            organization=self.organization,
+            title=title,
+            image=relative_path,
+            created_by=self.user
+        )
+
+    def create_job(self, export_format):
+        return ExportJob.objects.create(
+            organization=self.organization,
+            user=self.user,
+            design_ids=[str(design.id) for design in self.designs],
+            export_format=export_format
+        )
+
+    def test_zip_export_stores_images_without_recompressing(self):
+        job = self.create_job('zip')
+
+        self.assertTrue(self.service.process_export_job(job))
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.progress, job.processed_designs, job.total_designs), (100, 2, 2))
+        with zipfile.ZipFile(job.export_file_path) as archive:
+            infos = archive.infolist()
+            self.assertEqual(
+                [info.filename for info in infos],
+                [f'Silk_{self.designs[0].id}.png', f'Cotton_{self.designs[1].id}.jpg']
+            )
+            self.assertTrue(all(info.compress_type == zipfile.ZIP_STORED for info in infos))
+
+    def test_multi_image_export_converts_to_requested_format(self):
+        job = self.create_job('jpg')
+
+        self.assertTrue(self.service.process_export_job(job))
+        job.refresh_from_db()
+
+        with zipfile.ZipFile(job.export_file_path) as archive:
+            for name in archive.namelist():
+                self.assertTrue(name.endswith('.jpg'))
+                with Image.open(io.BytesIO(archive.read(name))) as img:
+                    self.assertEqual(img.format, 'JPEG')
+
+    def test_pdf_export(self):
+        job = self.create_job('pdf')
+
+        self.assertTrue(self.service.process_export_job(job))
+        job.refresh_from_db()
+
+        with open(job.export_file_path, 'rb') as pdf_file:
+            self.assertEqual(pdf_file.read(4), b'%PDF')
+        self.assertEqual(job.processed_designs, 2)
+
+    def test_cancelled_job_stops_and_removes_partial_file(self):
+        job = self.create_job('zip')
+
+        def cancel_during_export(processed_designs):
+            ExportJob.objects.filter(id=job.id).update(status='cancelled')
+            return False
+
+        with mock.patch.object(job, 'update_progress', side_effect=cancel_during_export):
+            self.assertFalse(self.service.process_export_job(job))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'cancelled')
+        self.assertFalse(os.path.exists(os.path.join(self.service.export_dir, f'export_{job.id}.zip')))
+
+    def test_status_reports_real_progress(self):
+        job = self.create_job('zip')
+        job.mark_processing(total_designs=4)
+        job.update_progress(1)
+
+        status_info = self.service.get_job_status(str(job.id))
+
+        self.assertEqual(status_info['progress'], 23)
+        self.assertIn('1/4 designs', status_info['message'])
+
+    @mock.patch('design_export.tasks.process_export_job.delay')
+    def test_dispatch_queues_job(self, mock_delay):
+        mock_delay.return_value = mock.Mock(id='task-123')
+        job = self.create_job('zip')
+
+        self.service.dispatch_export_job(job)
+
+        mock_delay.assert_called_once_with(str(job.id))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'pending')
+        self.assertEqual(job.celery_task_id, 'task-123')
+
+    @mock.patch('design_export.tasks.process_export_job.delay', side_effect=ConnectionError('broker down'))
+    def test_dispatch_falls_back_to_inline_processing(self, mock_delay):
+        job = self.create_job('zip')
+
+        self.service.dispatch_export_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
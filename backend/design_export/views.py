@@ -3,7 +3,8 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db.models import Q, Avg, Sum
 from django.core.cache import cache
-from django.http import HttpResponse, Http404
+from django.conf import settings
+from django.http import HttpResponse, Http404, FileResponse
 import logging
 import os
 
@@ -62,10 +63,10 @@ class ExportJobViewSet(viewsets.ModelViewSet):
             user=self.request.user
         )
         
-        # Process the job
+        # Queue the job for the export worker
         try:
             service = DesignExportService()
-            service.process_export_job(job)
+            service.dispatch_export_job(job)
         except Exception as e:
             logger.error(f"Failed to process export job {job.id}: {str(e)}")
             job.mark_failed(str(e))
@@ -94,6 +95,35 @@ class ExportJobViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=True, methods=['get'])
+    def file(self, request, pk=None):
+        """Stream the exported file in chunks"""
+        job = self.get_object()
+        
+        if job.status != 'completed' or not job.export_file_path:
+            return Response(
+                {'error': 'Export job not completed'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if job.is_expired():
+            return Response(
+                {'error': 'Download link has expired'},
+                status=status.HTTP_410_GONE
+            )
+        if not os.path.exists(job.export_file_path):
+            raise Http404("Export file not found")
+        
+        if hasattr(job, 'history'):
+            job.history.increment_download_count()
+        
+        response = FileResponse(
+            open(job.export_file_path, 'rb'),
+            as_attachment=True,
+            filename=os.path.basename(job.export_file_path)
+        )
+        response.block_size = getattr(settings, 'EXPORT_DOWNLOAD_CHUNK_SIZE', 1024 * 1024)
+        return response
+    
     @action(detail=True, methods=['get'])
     def status(self, request, pk=None):
         """Get status of an export job"""
@@ -178,8 +208,8 @@ class ExportTemplateViewSet(viewsets.ModelViewSet):
                     template_id=str(template.id)
                 )
                 
-                # Process the job
-                service.process_export_job(job)
+                # Queue the job for the export worker
+                service.dispatch_export_job(job)
                 
                 return Response(
                     {
@@ -265,8 +295,8 @@ class ExportAPIView(viewsets.ViewSet):
                 template_id=serializer.validated_data.get('template_id')
             )
             
-            # Process the job
-            self.service.process_export_job(job)
+            # Queue the job for the export worker
+            self.service.dispatch_export_job(job)
             
             return Response(
                 {
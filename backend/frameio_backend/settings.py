@@ -293,6 +293,16 @@ CLERK_PUBLISHABLE_KEY = os.getenv('CLERK_PUBLISHABLE_KEY')
 CLERK_SECRET_KEY = os.getenv('CLERK_SECRET_KEY')
 NEXT_PUBLIC_CLERK_FRONTEND_API = os.getenv('NEXT_PUBLIC_CLERK_FRONTEND_API')
 
+# Session token verification (users.clerk_jwt). The JWKS URL and issuer default
+# to the frontend API: https://<frontend api>/.well-known/jwks.json
+CLERK_JWKS_URL = os.getenv('CLERK_JWKS_URL')
+CLERK_ISSUER = os.getenv('CLERK_ISSUER')
+CLERK_AUTHORIZED_PARTIES = [party for party in os.getenv('CLERK_AUTHORIZED_PARTIES', '').split(',') if party]
+CLERK_JWKS_REFRESH_SECONDS = int(os.getenv('CLERK_JWKS_REFRESH_SECONDS', '3600'))
+CLERK_JWKS_MIN_REFRESH_INTERVAL = int(os.getenv('CLERK_JWKS_MIN_REFRESH_INTERVAL', '30'))
+CLERK_TOKEN_LEEWAY = int(os.getenv('CLERK_TOKEN_LEEWAY', '5'))
+CLERK_TOKEN_CACHE_SIZE = int(os.getenv('CLERK_TOKEN_CACHE_SIZE', '10000'))
+
 # Validate Clerk configuration
 CLERK_CONFIGURED = bool(CLERK_PUBLISHABLE_KEY and CLERK_SECRET_KEY and NEXT_PUBLIC_CLERK_FRONTEND_API)
 
@@ -320,6 +330,18 @@ ARCJET_KEY = os.getenv('ARCJET_KEY', '')
 # Google Gemini configuration
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 GEMINI_MODEL_NAME = os.getenv('GEMINI_MODEL_NAME', 'gemini-2.5-flash-image')
+GEMINI_BASE_URL = os.getenv('GEMINI_BASE_URL', '')  # API endpoint override (proxy or local fake server)
+
+# Gemini call protection (ai_services.gemini_client); limits are per process
+GEMINI_REQUESTS_PER_MINUTE = int(os.getenv('GEMINI_REQUESTS_PER_MINUTE', '60'))
+GEMINI_BURST = int(os.getenv('GEMINI_BURST', '10'))
+GEMINI_RATE_LIMIT_WAIT = float(os.getenv('GEMINI_RATE_LIMIT_WAIT', '30'))  # seconds a call may wait for capacity
+GEMINI_MAX_RETRIES = int(os.getenv('GEMINI_MAX_RETRIES', '3'))  # attempts per call, transient errors only
+GEMINI_RETRY_BASE_DELAY = float(os.getenv('GEMINI_RETRY_BASE_DELAY', '1.0'))  # seconds, doubled per retry
+GEMINI_RETRY_MAX_DELAY = float(os.getenv('GEMINI_RETRY_MAX_DELAY', '20'))  # seconds
+GEMINI_BREAKER_FAILURE_THRESHOLD = int(os.getenv('GEMINI_BREAKER_FAILURE_THRESHOLD', '5'))
+GEMINI_BREAKER_RESET_TIMEOUT = float(os.getenv('GEMINI_BREAKER_RESET_TIMEOUT', '30'))  # seconds
+GEMINI_MAX_ATTEMPTS_PER_REQUEST = int(os.getenv('GEMINI_MAX_ATTEMPTS_PER_REQUEST', '12'))
 
 # Validate Gemini configuration
 if not GEMINI_API_KEY:
@@ -359,9 +381,82 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Run tasks inline (no worker) - useful for local development and tests
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', 'False').lower() == 'true'
+
+# Background poster generation jobs
+POSTER_JOB_SSE_POLL_INTERVAL = float(os.getenv('POSTER_JOB_SSE_POLL_INTERVAL', '1.0'))  # seconds
+POSTER_JOB_SSE_MAX_DURATION = int(os.getenv('POSTER_JOB_SSE_MAX_DURATION', '20'))  # seconds per SSE connection (capped at 30; clients reconnect or poll status)
+
+# AI endpoint rate limiting ('redis' shares limits across workers, 'local' is per process)
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'redis')
+RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL', REDIS_URL)
+
+# Design export worker
+EXPORT_WORKER_THREADS = int(os.getenv('EXPORT_WORKER_THREADS', '4'))  # parallel image decode/convert per job
+EXPORT_DOWNLOAD_CHUNK_SIZE = int(os.getenv('EXPORT_DOWNLOAD_CHUNK_SIZE', str(1024 * 1024)))  # bytes
+
+# Per-organization cache lifetime for usage analytics responses
+USAGE_ANALYTICS_CACHE_TIMEOUT = int(os.getenv('USAGE_ANALYTICS_CACHE_TIMEOUT', '300'))  # seconds
+
+# AIProvider lookups are cached and dropped whenever a provider is saved or deleted
+AI_PROVIDER_CACHE_TIMEOUT = int(os.getenv('AI_PROVIDER_CACHE_TIMEOUT', '300'))  # seconds
+
+# Content-addressed poster render cache (per tenant; organizations can opt out)
+POSTER_RENDER_CACHE_ENABLED = os.getenv('POSTER_RENDER_CACHE_ENABLED', 'True').lower() == 'true'
+POSTER_RENDER_CACHE_TIMEOUT = int(os.getenv('POSTER_RENDER_CACHE_TIMEOUT', '86400'))  # seconds
+POSTER_RENDER_CACHE_MAX_ENTRIES = int(os.getenv('POSTER_RENDER_CACHE_MAX_ENTRIES', '200'))  # per tenant
+POSTER_HISTORY_CACHE_TIMEOUT = int(os.getenv('POSTER_HISTORY_CACHE_TIMEOUT', '300'))  # seconds, first page per tenant
+POSTER_HISTORY_COUNT_TIMEOUT = int(os.getenv('POSTER_HISTORY_COUNT_TIMEOUT', '60'))  # seconds, approximate counts
+
+# Poster publishing: CDN upload, delivery copy and share page run after the response
+POSTER_ASYNC_PUBLISH = os.getenv('POSTER_ASYNC_PUBLISH', 'True').lower() == 'true'
+POSTER_PUBLISH_WORKERS = int(os.getenv('POSTER_PUBLISH_WORKERS', '2'))
+POSTER_PUBLISH_MAX_ATTEMPTS = int(os.getenv('POSTER_PUBLISH_MAX_ATTEMPTS', '3'))
+POSTER_PUBLISH_RETRY_DELAY = float(os.getenv('POSTER_PUBLISH_RETRY_DELAY', '1.0'))  # seconds, doubled per retry
+POSTER_PUBLISH_RECORD_TIMEOUT = int(os.getenv('POSTER_PUBLISH_RECORD_TIMEOUT', '86400'))  # seconds
+POSTER_CDN_UPLOADER = os.getenv('POSTER_CDN_UPLOADER', 'cloudinary')  # 'cloudinary' or 'fake' (offline, media storage)
+POSTER_DELIVERY_FORMAT = os.getenv('POSTER_DELIVERY_FORMAT', '')  # '', 'webp' or 'avif'
+POSTER_DELIVERY_QUALITY = int(os.getenv('POSTER_DELIVERY_QUALITY', '80'))
+
+# Local aspect-ratio correction (crop/pad) is used instead of re-generating when it scores at least this
+POSTER_LOCAL_AR_MIN_QUALITY = float(os.getenv('POSTER_LOCAL_AR_MIN_QUALITY', '0.85'))  # 0-1; above 1 always re-generates
+
+# Shared image fetcher for color/fabric analysis (pooled session, conditional GET, bounded caches)
+IMAGE_FETCH_TIMEOUT = int(os.getenv('IMAGE_FETCH_TIMEOUT', '30'))  # seconds
+IMAGE_FETCH_MAX_BYTES = int(os.getenv('IMAGE_FETCH_MAX_BYTES', str(20 * 1024 * 1024)))
+IMAGE_FETCH_POOL_SIZE = int(os.getenv('IMAGE_FETCH_POOL_SIZE', '10'))
+IMAGE_FETCH_CACHE_DIR = os.getenv('IMAGE_FETCH_CACHE_DIR', '')  # defaults to <tmp>/frameio_image_cache
+IMAGE_FETCH_DISK_CACHE_BYTES = int(os.getenv('IMAGE_FETCH_DISK_CACHE_BYTES', str(256 * 1024 * 1024)))
+IMAGE_FETCH_MEMORY_CACHE_BYTES = int(os.getenv('IMAGE_FETCH_MEMORY_CACHE_BYTES', str(64 * 1024 * 1024)))
+IMAGE_FETCH_REVALIDATE_SECONDS = int(os.getenv('IMAGE_FETCH_REVALIDATE_SECONDS', '60'))
+IMAGE_FETCH_MAX_VALIDATORS = int(os.getenv('IMAGE_FETCH_MAX_VALIDATORS', '4096'))  # URLs whose ETag/Last-Modified are kept, in memory and on disk
+
+# Dominant color extraction backend: kmeans, minibatch, median_cut or histogram
+# (the faster backends return slightly different palettes than kmeans)
+COLOR_QUANTIZER_BACKEND = os.getenv('COLOR_QUANTIZER_BACKEND', 'kmeans')
+
+# Fabric analysis store: identical concurrent requests wait for one analyzer run
+FABRIC_ANALYSIS_LOCK_TIMEOUT = int(os.getenv('FABRIC_ANALYSIS_LOCK_TIMEOUT', '120'))  # seconds a run may hold the lock
+FABRIC_ANALYSIS_WAIT_TIMEOUT = float(os.getenv('FABRIC_ANALYSIS_WAIT_TIMEOUT', '60'))  # seconds a waiter polls before running itself
+
+# Batch fabric analysis runs on a process pool; results stream back as they finish
+FABRIC_BATCH_WORKERS = int(os.getenv('FABRIC_BATCH_WORKERS', '2'))  # analysis processes per web worker process (capped at CPU cores); multiply by web workers for the host total
+FABRIC_BATCH_FETCH_WORKERS = int(os.getenv('FABRIC_BATCH_FETCH_WORKERS', '8'))  # threads fetching batch images
+FABRIC_BATCH_MAX_IMAGES = int(os.getenv('FABRIC_BATCH_MAX_IMAGES', '500'))  # images accepted per batch request
+
+# Palette search over stored fabric analyses (distances in OpenCV 8-bit LAB units)
+PALETTE_INDEX_MAX_DISTANCE = float(os.getenv('PALETTE_INDEX_MAX_DISTANCE', '50'))  # a query color farther than this is unmatched
+PALETTE_INDEX_REBUILD_RATIO = float(os.getenv('PALETTE_INDEX_REBUILD_RATIO', '0.02'))  # rebuild the KD-tree once new colors exceed this share
+PALETTE_INDEX_MAX_TENANTS = int(os.getenv('PALETTE_INDEX_MAX_TENANTS', '32'))  # tenant indexes kept per process (least recently used evicted)
+
+# Branding kit images are kept in media storage with a thumbnail for list views
+BRANDING_KIT_THUMBNAIL_SIZE = int(os.getenv('BRANDING_KIT_THUMBNAIL_SIZE', '256'))  # px, longest side
+BRANDING_KIT_MAX_CONCURRENCY = int(os.getenv('BRANDING_KIT_MAX_CONCURRENCY', '3'))  # style variants generated at once
 
 # Multi-tenancy settings
 TENANT_MODEL = 'organizations.Organization'
+MEMBERSHIP_CACHE_TIMEOUT = int(os.getenv('MEMBERSHIP_CACHE_TIMEOUT', '60'))  # seconds; (user, org) membership/role cache
 
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
@@ -0,0 +1,146 @@
+"""
+Shared helpers for the apps' test suites.
+"""
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+
+class QueryCountAssertionsMixin:
+    """TestCase mixin for checking that list endpoints do not query per row"""
+
+    def assertConstantQueries(self, grow: Callable[[int], None], run: Callable[[], object],
+                              sizes: Sequence[int] = (1, 5, 20)) -> int:
+        """
+        Assert that run() issues the same number of queries as the data grows.
+
+        run() is called once before measuring so per-request caches (tenant,
+        membership) are warm; rows added later are not warmed.
+
+        Args:
+            grow: Called with each size in turn; creates rows until there are that many
+            run: The code under test, e.g. a GET of a list endpoint
+            sizes: Increasing row counts to compare
+
+        Returns:
+            The (constant) number of queries
+        """
+        counts = []
+        for index, size in enumerate(sizes):
+            grow(size)
+            if index == 0:
+                run()
+            with CaptureQueriesContext(connection) as queries:
+                run()
+            counts.append(len(queries))
+            if counts[-1] != counts[0]:
+                statements = '\n'.join(query['sql'] for query in queries.captured_queries)
+                self.fail(
+                    f"Query count grows with the number of rows: {dict(zip(sizes, counts))}\n"
+                    f"Queries for {size} rows:\n{statements}"
+                )
+        return counts[0]
+
+
+class FakeGeminiServer:
+    """
+    Local stand-in for the Gemini REST API (generateContent only).
+
+    Answers every model with an image part (or `text` when set), after
+    `latency` seconds. Queued failures from fail_next() are returned first, so
+    tests can drive retries, circuit breakers and budgets against the real SDK:
+
+        with FakeGeminiServer() as server:
+            client = genai.Client(api_key='test', http_options={'base_url': server.base_url})
+    """
+
+    def __init__(self, text: Optional[str] = None, image_size: Tuple[int, int] = (64, 64), latency: float = 0.0):
+        self.text = text
+        self.image_size = image_size
+        self.latency = latency
+        self.requests: List[str] = []
+        self._failures: List[int] = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def fail_next(self, count: int, status: int = 503) -> None:
+        """Answer the next `count` requests with HTTP `status`"""
+        with self._lock:
+            self._failures.extend([status] * count)
+
+    def fail_always(self, status: int = 503) -> None:
+        self.fail_next(10 ** 6, status)
+
+    def _next_failure(self) -> Optional[int]:
+        with self._lock:
+            return self._failures.pop(0) if self._failures else None
+
+    def _success_body(self) -> Dict[str, Any]:
+        if self.text is not None:
+            part = {'text': self.text}
+        else:
+            buffer = BytesIO()
+            Image.new('RGB', self.image_size, (200, 30, 90)).save(buffer, format='PNG')
+            part = {'inlineData': {'mimeType': 'image/png', 'data': base64.b64encode(buffer.getvalue()).decode()}}
+        return {'candidates': [{'content': {'role': 'model', 'parts': [part]}, 'finishReason': 'STOP'}]}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                with fake._lock:
+                    fake.requests.append(self.path)
+                if fake.latency:
+                    time.sleep(fake.latency)
+                status = fake._next_failure()
+                if status:
+                    body = {'error': {'code': status, 'message': 'Injected failure', 'status': 'UNAVAILABLE'}}
+                else:
+                    status, body = 200, fake._success_body()
+                payload = json.dumps(body).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client timed out
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'FakeGeminiServer':
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'FakeGeminiServer':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
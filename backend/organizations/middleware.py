@@ -1,7 +1,13 @@
 from django.utils.deprecation import MiddlewareMixin
 from django.http import JsonResponse
 from django.core.exceptions import PermissionDenied
-from .models import Organization, OrganizationMember
+from .tenant_context import (
+    get_membership,
+    get_tenant_context,
+    organization_from_dev_header,
+    organization_from_header,
+    organization_from_subdomain,
+)
 import logging
 from threading import local
 
@@ -55,9 +61,7 @@ class TenantMiddleware(MiddlewareMixin):
             if not organization:
                 organization = self.get_organization_from_request(request)
             if organization:
-                request.organization = organization
-                request.tenant = organization
-                set_current_organization(organization)
+                self.set_request_organization(request, organization)
             # Don't block - let the view handle organization resolution
             return None
         
@@ -79,19 +83,15 @@ class TenantMiddleware(MiddlewareMixin):
             organization = self.get_organization_from_request(request)
         
         if organization:
-            request.organization = organization
-            request.tenant = organization
-            set_current_organization(organization)
+            self.set_request_organization(request, organization)
         else:
             # Attempt to auto-select an organization for authenticated users
             if hasattr(request, 'user') and request.user.is_authenticated:
                 try:
-                    membership = OrganizationMember.objects.filter(user=request.user, is_active=True).select_related('organization').first()
-                    if membership and membership.organization:
-                        request.organization = membership.organization
-                        request.tenant = membership.organization
-                        set_current_organization(membership.organization)
-                        logger.info(f"Auto-selected organization '{membership.organization.slug}' for user {request.user.id}")
+                    default_organization = get_tenant_context(request).get_default_organization(request.user)
+                    if default_organization:
+                        self.set_request_organization(request, default_organization)
+                        logger.info(f"Auto-selected organization '{default_organization.slug}' for user {request.user.id}")
                     else:
                         # If still no organization: for unsafe methods, block; for safe (GET/HEAD/OPTIONS), allow without org
                         # BUT skip this check for company-profiles endpoints
@@ -121,70 +121,43 @@ class TenantMiddleware(MiddlewareMixin):
         
         return None
     
+    def set_request_organization(self, request, organization):
+        """
+        Attach the resolved organization to the request and its tenant context.
+        """
+        request.organization = organization
+        request.tenant = organization
+        get_tenant_context(request).set_organization(organization)
+        set_current_organization(organization)
+    
     def get_organization_from_request(self, request):
         """
-        Get the organization from the request.
+        Get the organization from the request (subdomain, header, then user),
+        resolved once per request by the tenant context.
         """
-        # Method 1: From subdomain
-        organization = self.get_organization_from_subdomain(request)
-        if organization:
-            return organization
-        
-        # Method 2: From header
-        organization = self.get_organization_from_header(request)
-        if organization:
-            return organization
-        
-        # Method 3: From user's current organization
-        organization = self.get_organization_from_user(request)
-        if organization:
-            return organization
-        
-        return None
+        return get_tenant_context(request).get_organization()
     
     def get_organization_from_subdomain(self, request):
         """
         Get organization from subdomain.
         """
-        host = request.get_host()
-        if '.' in host:
-            subdomain = host.split('.')[0]
-            if subdomain not in ['www', 'api', 'admin']:
-                try:
-                    return Organization.objects.get(slug=subdomain)
-                except Organization.DoesNotExist:
-                    pass
-        return None
+        return organization_from_subdomain(request)
     
     def get_organization_from_header(self, request):
         """
         Get organization from X-Organization header.
         """
-        org_slug = request.META.get('HTTP_X_ORGANIZATION')
-        if org_slug:
-            try:
-                return Organization.objects.get(slug=org_slug)
-            except Organization.DoesNotExist:
-                pass
-        return None
+        return organization_from_header(request)
     
     def get_organization_from_user(self, request):
         """
         Get organization from authenticated user's current organization.
         """
         if hasattr(request, 'user') and request.user.is_authenticated:
-            return request.user.current_organization
+            return get_tenant_context(request).get_default_organization(request.user)
         
         # Check for development headers
-        dev_org_id = request.META.get('HTTP_X_DEV_ORG_ID')
-        if dev_org_id:
-            try:
-                from .models import Organization
-                return Organization.objects.get(id=dev_org_id)
-            except Organization.DoesNotExist:
-                pass
-        
-        return None
+        return organization_from_dev_header(request)
     
     def process_view(self, request, view_func, view_args, view_kwargs):
         """
@@ -210,7 +183,7 @@ class TenantMiddleware(MiddlewareMixin):
             if hasattr(request, '_django_test_client'):
                 return None
                 
-            if not self.user_has_organization_access(request.user, request.organization):
+            if not get_tenant_context(request).is_member(request.user, request.organization):
                 logger.warning(
                     f"User {request.user.id} attempted to access organization "
                     f"{request.organization.id} without permission"
@@ -225,15 +198,7 @@ class TenantMiddleware(MiddlewareMixin):
         """
         Check if user has access to the organization.
         """
-        try:
-            membership = OrganizationMember.objects.get(
-                user=user,
-                organization=organization,
-                is_active=True
-            )
-            return True
-        except OrganizationMember.DoesNotExist:
-            return False
+        return get_membership(user, organization) is not None
     
     def process_response(self, request, response):
         """
@@ -262,17 +227,8 @@ class OrganizationPermissionMiddleware(MiddlewareMixin):
             return None
         
         # Get user's role in the organization
-        try:
-            membership = OrganizationMember.objects.get(
-                user=request.user,
-                organization=request.organization,
-                is_active=True
-            )
-            request.organization_membership = membership
-            request.organization_role = membership.role
-            
-        except OrganizationMember.DoesNotExist:
-            request.organization_membership = None
-            request.organization_role = None
+        membership = get_tenant_context(request).get_membership(request.user, request.organization)
+        request.organization_membership = membership
+        request.organization_role = membership.role if membership else None
         
         return None
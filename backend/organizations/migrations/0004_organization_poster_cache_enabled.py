@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-16 18:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0003_alter_organizationinvitation_role_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='poster_cache_enabled',
+            field=models.BooleanField(default=True),
+        ),
+    ]
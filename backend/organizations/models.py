@@ -41,6 +41,7 @@ class Organization(models.Model):
     # Usage tracking
     ai_generations_used = models.PositiveIntegerField(default=0)
     ai_generations_limit = models.PositiveIntegerField(default=10)  # Free plan limit
+    poster_cache_enabled = models.BooleanField(default=True)  # Reuse identical poster renders
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -1,11 +1,88 @@
+from django.db.models import Count, Exists, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
 from .models import Organization, OrganizationMember, OrganizationInvitation
 from users.models import User
 
 
+def active_memberships(user=None):
+    """Active memberships of the outer Organization, optionally of one user"""
+    memberships = OrganizationMember.objects.filter(organization=OuterRef('pk'), is_active=True)
+    if user is not None:
+        memberships = memberships.filter(user=user)
+    return memberships
+
+
+def annotate_organizations(queryset, user=None):
+    """
+    Annotate organizations with what OrganizationSerializer reads per row.
+    
+    Args:
+        queryset: Organization queryset
+        user: Requesting user; adds current_user_role when authenticated
+        
+    Returns:
+        Queryset annotated with active_members_count (and current_user_role)
+    """
+    members_count = active_memberships().order_by().values('organization').annotate(
+        count=Count('pk')
+    ).values('count')
+    queryset = queryset.annotate(
+        active_members_count=Coalesce(Subquery(members_count, output_field=IntegerField()), Value(0))
+    )
+    if user is not None and user.is_authenticated:
+        queryset = queryset.annotate(
+            current_user_role=Subquery(active_memberships(user).values('role')[:1])
+        )
+    return queryset
+
+
+def member_organizations(user):
+    """Organizations the user is an active member of, annotated for OrganizationSerializer"""
+    return annotate_organizations(
+        Organization.objects.filter(Exists(active_memberships(user))), user
+    )
+
+
+class OrganizationListSerializer(serializers.ListSerializer):
+    """
+    Lists organizations with a constant number of queries.
+    
+    Rows that were not annotated by annotate_organizations get their member
+    counts and the current user's role from one prefetch of the active
+    memberships of every organization in the list.
+    """
+    
+    def to_representation(self, data):
+        organizations = list(data.all() if hasattr(data, 'all') else data)
+        missing = [org for org in organizations if not hasattr(org, 'active_members_count')]
+        if missing:
+            request = self.context.get('request')
+            user = getattr(request, 'user', None)
+            user_id = user.pk if user is not None and user.is_authenticated else None
+            
+            counts = {org.pk: 0 for org in missing}
+            roles = {}
+            for organization_id, member_id, role in OrganizationMember.objects.filter(
+                organization__in=missing, is_active=True
+            ).values_list('organization_id', 'user_id', 'role'):
+                counts[organization_id] += 1
+                if member_id == user_id:
+                    roles[organization_id] = role
+            
+            for org in missing:
+                org.active_members_count = counts[org.pk]
+                if user_id is not None:
+                    org.current_user_role = roles.get(org.pk)
+        return super().to_representation(organizations)
+
+
 class OrganizationSerializer(serializers.ModelSerializer):
     """
     Serializer for Organization model.
+    
+    Reads the active_members_count / current_user_role annotations of
+    annotate_organizations when present and queries per object otherwise.
     """
     members_count = serializers.SerializerMethodField()
     is_owner = serializers.SerializerMethodField()
@@ -16,30 +93,28 @@ class OrganizationSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'name', 'slug', 'description', 'logo', 'website', 'industry',
             'subscription_plan', 'subscription_status', 'ai_generations_used',
-            'ai_generations_limit', 'created_at', 'updated_at', 'members_count',
-            'is_owner', 'user_role'
+            'ai_generations_limit', 'poster_cache_enabled', 'created_at', 'updated_at',
+            'members_count', 'is_owner', 'user_role'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'ai_generations_used']
+        list_serializer_class = OrganizationListSerializer
     
     def get_members_count(self, obj):
         """Get the number of active members."""
+        if hasattr(obj, 'active_members_count'):
+            return obj.active_members_count
         return obj.members.filter(is_active=True).count()
     
     def get_is_owner(self, obj):
         """Check if current user is the owner."""
-        request = self.context.get('request')
-        if request and hasattr(request, 'user') and request.user.is_authenticated:
-            return obj.members.filter(
-                user=request.user,
-                role='owner',
-                is_active=True
-            ).exists()
-        return False
+        return self.get_user_role(obj) == 'owner'
     
     def get_user_role(self, obj):
         """Get current user's role in the organization."""
         request = self.context.get('request')
         if request and hasattr(request, 'user') and request.user.is_authenticated:
+            if hasattr(obj, 'current_user_role'):
+                return obj.current_user_role
             membership = obj.members.filter(
                 user=request.user,
                 is_active=True
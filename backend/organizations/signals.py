@@ -0,0 +1,15 @@
+"""
+Signal handlers for organizations.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import OrganizationMember
+from .tenant_context import invalidate_membership
+
+
+@receiver(post_save, sender=OrganizationMember)
+@receiver(post_delete, sender=OrganizationMember)
+def invalidate_cached_membership(sender, instance, **kwargs):
+    """Drop the cached (user, organization) membership when it changes"""
+    invalidate_membership(instance.user_id, instance.organization_id)
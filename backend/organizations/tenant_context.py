@@ -0,0 +1,229 @@
+"""
+Request-scoped tenant context.
+
+A single API call used to resolve its organization and membership several
+times over: TenantMiddleware, RateLimitMiddleware and every permission class
+ran their own OrganizationMember queries. The TenantContext attached to each
+request resolves the organization once and memoizes (user, organization)
+membership lookups; memberships are also kept in the shared cache for
+MEMBERSHIP_CACHE_TIMEOUT seconds and dropped by organizations.signals
+whenever a membership is saved or deleted.
+"""
+import logging
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Organization, OrganizationMember
+
+logger = logging.getLogger(__name__)
+
+# Cached marker for "looked up, not an active member" so misses are cached too
+NOT_A_MEMBER = 'not-a-member'
+
+
+def membership_cache_key(user_id, organization_id) -> str:
+    return f"tenant:membership:{user_id}:{organization_id}"
+
+
+def _is_authenticated(user) -> bool:
+    return bool(user) and getattr(user, 'is_authenticated', False)
+
+
+def _attach_relations(membership: OrganizationMember, user, organization) -> OrganizationMember:
+    # Avoid follow-up queries when callers read membership.user / .organization
+    membership.user = user
+    membership.organization = organization
+    return membership
+
+
+def cache_membership(user_id, organization_id, membership: Optional[OrganizationMember]) -> None:
+    """Store a membership (or the not-a-member marker) in the shared cache"""
+    try:
+        cache.set(
+            membership_cache_key(user_id, organization_id),
+            membership if membership is not None else NOT_A_MEMBER,
+            getattr(settings, 'MEMBERSHIP_CACHE_TIMEOUT', 60)
+        )
+    except Exception as e:
+        logger.warning(f"Could not cache membership: {str(e)}")
+
+
+def invalidate_membership(user_id, organization_id) -> None:
+    """Drop the cached membership for a (user, organization) pair"""
+    try:
+        cache.delete(membership_cache_key(user_id, organization_id))
+    except Exception as e:
+        logger.warning(f"Could not invalidate cached membership: {str(e)}")
+
+
+def get_membership(user, organization) -> Optional[OrganizationMember]:
+    """
+    Get a user's active membership in an organization through the shared cache.
+
+    Args:
+        user: User instance
+        organization: Organization instance
+
+    Returns:
+        OrganizationMember, or None if the user is not an active member
+    """
+    if not _is_authenticated(user) or organization is None:
+        return None
+
+    cache_key = membership_cache_key(user.pk, organization.pk)
+    try:
+        cached = cache.get(cache_key)
+    except Exception as e:
+        logger.warning(f"Could not read cached membership: {str(e)}")
+        cached = None
+
+    if isinstance(cached, OrganizationMember):
+        return _attach_relations(cached, user, organization)
+    if cached == NOT_A_MEMBER:
+        return None
+
+    membership = OrganizationMember.objects.filter(
+        user=user,
+        organization=organization,
+        is_active=True
+    ).first()
+    cache_membership(user.pk, organization.pk, membership)
+    return _attach_relations(membership, user, organization) if membership else None
+
+
+def organization_from_subdomain(request) -> Optional[Organization]:
+    """Get organization from the request subdomain"""
+    host = request.get_host()
+    if '.' in host:
+        subdomain = host.split('.')[0]
+        if subdomain not in ['www', 'api', 'admin']:
+            try:
+                return Organization.objects.get(slug=subdomain)
+            except Organization.DoesNotExist:
+                pass
+    return None
+
+
+def organization_from_header(request) -> Optional[Organization]:
+    """Get organization from the X-Organization header"""
+    org_slug = request.META.get('HTTP_X_ORGANIZATION')
+    if org_slug:
+        try:
+            return Organization.objects.get(slug=org_slug)
+        except Organization.DoesNotExist:
+            pass
+    return None
+
+
+def organization_from_dev_header(request) -> Optional[Organization]:
+    """Get organization from the X-Dev-Org-Id development header"""
+    dev_org_id = request.META.get('HTTP_X_DEV_ORG_ID')
+    if dev_org_id:
+        try:
+            return Organization.objects.get(id=dev_org_id)
+        except (Organization.DoesNotExist, ValueError):
+            pass
+    return None
+
+
+class TenantContext:
+    """
+    Organization and membership lookups for one request.
+
+    Obtain it with get_tenant_context(request); the same object is shared by
+    the middleware and the DRF permission classes of that request.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self._organization: Optional[Organization] = None
+        self._organization_resolved = False
+        self._default_organizations: Dict[object, Optional[Organization]] = {}
+        self._memberships: Dict[Tuple[object, object], Optional[OrganizationMember]] = {}
+
+    @property
+    def user(self):
+        return getattr(self.request, 'user', None)
+
+    def get_organization(self) -> Optional[Organization]:
+        """
+        Resolve the request organization once: subdomain, X-Organization header,
+        then the user's current organization (development header when anonymous)
+        """
+        if not self._organization_resolved:
+            self._organization = (
+                organization_from_subdomain(self.request)
+                or organization_from_header(self.request)
+                or (self.get_default_organization(self.user) if _is_authenticated(self.user)
+                    else organization_from_dev_header(self.request))
+            )
+            self._organization_resolved = True
+        return self._organization
+
+    def set_organization(self, organization: Optional[Organization]) -> None:
+        self._organization = organization
+        self._organization_resolved = True
+
+    def get_default_organization(self, user=None) -> Optional[Organization]:
+        """The user's current organization (first active membership, like User.current_organization)"""
+        user = user or self.user
+        if not _is_authenticated(user):
+            return None
+
+        if user.pk not in self._default_organizations:
+            membership = user.organization_memberships.filter(
+                is_active=True
+            ).select_related('organization').first()
+            organization = membership.organization if membership else None
+            self._default_organizations[user.pk] = organization
+
+            if membership:
+                # The same row answers the membership question for this pair
+                cache_membership(user.pk, organization.pk, membership)
+                self._memberships[(user.pk, organization.pk)] = _attach_relations(membership, user, organization)
+
+        return self._default_organizations[user.pk]
+
+    def get_membership(self, user=None, organization=None) -> Optional[OrganizationMember]:
+        """Active membership of user (default: request user) in organization (default: request organization)"""
+        user = user or self.user
+        organization = organization or getattr(self.request, 'organization', None) or self.get_organization()
+        if not _is_authenticated(user) or organization is None:
+            return None
+
+        key = (user.pk, organization.pk)
+        if key not in self._memberships:
+            self._memberships[key] = get_membership(user, organization)
+        return self._memberships[key]
+
+    def get_role(self, user=None, organization=None) -> Optional[str]:
+        membership = self.get_membership(user, organization)
+        return membership.role if membership else None
+
+    def is_member(self, user=None, organization=None) -> bool:
+        return self.get_membership(user, organization) is not None
+
+
+def get_tenant_context(request) -> TenantContext:
+    """
+    Get (or create) the tenant context of a request.
+
+    Accepts a Django HttpRequest or a DRF Request; both share the context
+    stored on the underlying HttpRequest.
+    """
+    http_request = getattr(request, '_request', request)
+    context = getattr(http_request, 'tenant_context', None)
+    if context is None:
+        context = TenantContext(http_request)
+        http_request.tenant_context = context
+    return context
+
+
+def get_request_organization(request) -> Optional[Organization]:
+    """Organization set by TenantMiddleware, falling back to the requesting user's current organization"""
+    organization = getattr(request, 'organization', None)
+    if organization:
+        return organization
+    return get_tenant_context(request).get_default_organization(getattr(request, 'user', None))
@@ -0,0 +1,86 @@
+"""
+Unit tests for the annotated organization listing
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from frameio_backend.testing import QueryCountAssertionsMixin
+from organizations.models import Organization, OrganizationMember
+from organizations.serializers import OrganizationSerializer, member_organizations
+
+User = get_user_model()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class OrganizationListingTestCase(QueryCountAssertionsMixin, TestCase):
+    """Test cases for member counts and roles without per-organization queries"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='testpass123')
+        self.colleague = User.objects.create_user(username='colleague', email='colleague@example.com', password='testpass123')
+        self.organizations = []
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_organizations(self, total):
+        """Grow the user's organizations to `total`, alternating owner and designer roles"""
+        while len(self.organizations) < total:
+            index = len(self.organizations)
+            organization = Organization.objects.create(name=f'Weavers {index}', slug=f'weavers-{index}')
+            OrganizationMember.objects.create(
+                organization=organization, user=self.user, role='owner' if index % 2 == 0 else 'designer'
+            )
+            OrganizationMember.objects.create(organization=organization, user=self.colleague, role='designer')
+            if index % 3 == 0:
+                inactive = User.objects.create_user(
+                    username=f'former{index}', email=f'former{index}@example.com', password='testpass123'
+                )
+                OrganizationMember.objects.create(organization=organization, user=inactive, is_active=False)
+            self.organizations.append(organization)
+
+    def list_organizations(self):
+        response = self.client.get('/api/organizations/', HTTP_X_ORGANIZATION='weavers-0')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_list_endpoint_uses_constant_queries(self):
+        self.assertConstantQueries(self.add_organizations, self.list_organizations)
+
+    def test_list_endpoint_values(self):
+        self.add_organizations(4)
+        OrganizationMember.objects.create(
+            organization=Organization.objects.create(name='Elsewhere', slug='elsewhere'),
+            user=self.colleague, role='owner'
+        )
+
+        body = self.list_organizations()
+        results = body['results'] if isinstance(body, dict) else body
+        by_slug = {item['slug']: item for item in results}
+
+        self.assertEqual(sorted(by_slug), [f'weavers-{index}' for index in range(4)])
+        self.assertEqual(by_slug['weavers-0']['members_count'], 2)
+        self.assertEqual((by_slug['weavers-0']['user_role'], by_slug['weavers-0']['is_owner']), ('owner', True))
+        self.assertEqual((by_slug['weavers-1']['user_role'], by_slug['weavers-1']['is_owner']), ('designer', False))
+
+    def test_list_serializer_prefetches_unannotated_rows(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+
+        def serialize():
+            return OrganizationSerializer(Organization.objects.all(), many=True, context={'request': request}).data
+
+        self.assertConstantQueries(self.add_organizations, serialize)
+
+        expected = [
+            OrganizationSerializer(organization, context={'request': request}).data
+            for organization in Organization.objects.all()
+        ]
+        self.assertEqual(serialize(), expected)
+        self.assertEqual(
+            OrganizationSerializer(member_organizations(self.user), many=True, context={'request': request}).data,
+            expected
+        )
@@ -0,0 +1,111 @@
+"""
+Unit tests for the request-scoped tenant context and membership cache
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from organizations.models import Organization, OrganizationMember
+from organizations.tenant_context import get_membership, get_tenant_context
+from users.permissions import IsOrganizationAdmin, IsOrganizationMember
+from users.roles import IsDesigner
+
+User = get_user_model()
+
+
+def membership_queries(queries):
+    """Queries that look up a specific user's membership"""
+    return [
+        query['sql'] for query in queries.captured_queries
+        if 'FROM "organization_members"' in query['sql'] and '"organization_members"."user_id" =' in query['sql']
+    ]
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TenantContextTestCase(TestCase):
+    """Test cases for membership caching, invalidation and request memoization"""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.organization = Organization.objects.create(name='Weavers', slug='weavers')
+        self.user = User.objects.create_user(
+            username='tenantuser',
+            email='tenant@example.com',
+            password='testpass123'
+        )
+        self.membership = OrganizationMember.objects.create(
+            organization=self.organization, user=self.user, role='designer'
+        )
+
+    def make_request(self, **headers):
+        request = self.factory.get('/api/members/', **headers)
+        request.user = self.user
+        return request
+
+    def test_membership_is_cached_across_requests(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(get_membership(self.user, self.organization).role, 'designer')
+        with self.assertNumQueries(0):
+            membership = get_membership(self.user, self.organization)
+            self.assertEqual(membership.pk, self.membership.pk)
+            self.assertEqual(membership.organization, self.organization)
+
+    def test_non_members_are_cached_too(self):
+        other = Organization.objects.create(name='Dyers', slug='dyers')
+        self.assertIsNone(get_membership(self.user, other))
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_membership(self.user, other))
+
+    def test_membership_changes_invalidate_cache(self):
+        get_membership(self.user, self.organization)
+
+        self.membership.role = 'admin'
+        self.membership.save()
+        self.assertEqual(get_membership(self.user, self.organization).role, 'admin')
+
+        self.membership.delete()
+        self.assertIsNone(get_membership(self.user, self.organization))
+
+    def test_context_is_shared_by_permission_classes(self):
+        request = self.make_request(HTTP_X_ORGANIZATION='weavers')
+        context = get_tenant_context(request)
+        request.organization = context.get_organization()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(IsOrganizationMember().has_permission(request, None))
+            self.assertTrue(IsDesigner().has_permission(request, None))
+            self.assertFalse(IsOrganizationAdmin().has_permission(request, None))
+            self.assertTrue(context.is_member())
+
+        self.assertEqual(len(membership_queries(queries)), 1)
+        self.assertEqual(request.role, 'designer')
+        self.assertIs(get_tenant_context(request), context)
+
+    def test_default_organization_primes_membership(self):
+        request = self.make_request()
+        context = get_tenant_context(request)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(context.get_organization(), self.organization)
+            self.assertEqual(context.get_role(), 'designer')
+
+        self.assertEqual(len(queries), 1)
+
+    @override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver'])
+    def test_request_resolves_membership_once(self):
+        self.client.force_login(self.user)
+
+        with CaptureQueriesContext(connection) as cold:
+            response = self.client.get('/api/members/', HTTP_X_ORGANIZATION='weavers')
+        self.assertEqual(response.status_code, 200)
+
+        with CaptureQueriesContext(connection) as warm:
+            response = self.client.get('/api/members/', HTTP_X_ORGANIZATION='weavers')
+        self.assertEqual(response.status_code, 200)
+
+        # Middleware and permission classes share one lookup on a cold cache, none once cached
+        self.assertEqual(len(membership_queries(cold)), 1, membership_queries(cold))
+        self.assertEqual(len(membership_queries(warm)), 0, membership_queries(warm))
@@ -9,10 +9,11 @@ import uuid
 import logging
 
 from .models import Organization, OrganizationMember, OrganizationInvitation
+from .tenant_context import get_tenant_context
 from .serializers import (
     OrganizationSerializer, OrganizationMemberSerializer,
     OrganizationInvitationSerializer, OrganizationCreateSerializer,
-    OrganizationUpdateSerializer
+    OrganizationUpdateSerializer, annotate_organizations, member_organizations
 )
 from users.models import User
 from users.permissions import (
@@ -41,23 +42,17 @@ class OrganizationViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Filter organizations based on user membership."""
         if self.action == 'list':
-            # Return organizations where user is a member
-            return Organization.objects.filter(
-                members__user=self.request.user,
-                members__is_active=True
-            ).distinct()
+            # Return organizations where user is a member, annotated with
+            # member counts and the user's role for the serializer
+            return member_organizations(self.request.user)
         elif self.action in ['retrieve', 'update', 'partial_update', 'destroy']:
             # For detail views, check if user is a member
             org_id = self.kwargs.get('pk')
             if org_id:
                 try:
                     org = Organization.objects.get(id=org_id)
-                    if OrganizationMember.objects.filter(
-                        organization=org,
-                        user=self.request.user,
-                        is_active=True
-                    ).exists():
-                        return Organization.objects.filter(id=org_id)
+                    if get_tenant_context(self.request).is_member(self.request.user, org):
+                        return annotate_organizations(Organization.objects.filter(id=org_id), self.request.user)
                 except Organization.DoesNotExist:
                     pass
             return Organization.objects.none()
@@ -195,11 +190,7 @@ class OrganizationViewSet(viewsets.ModelViewSet):
     
     def user_has_organization_access(self, organization):
         """Check if user has access to organization."""
-        return OrganizationMember.objects.filter(
-            organization=organization,
-            user=self.request.user,
-            is_active=True
-        ).exists()
+        return get_tenant_context(self.request).is_member(self.request.user, organization)
 
 
 class OrganizationMemberViewSet(viewsets.ModelViewSet):
@@ -218,11 +209,7 @@ class OrganizationMemberViewSet(viewsets.ModelViewSet):
             try:
                 organization = Organization.objects.get(id=org_id)
                 # Check if user is a member of this organization
-                if OrganizationMember.objects.filter(
-                    organization=organization,
-                    user=self.request.user,
-                    is_active=True
-                ).exists():
+                if get_tenant_context(self.request).is_member(self.request.user, organization):
                     return OrganizationMember.objects.filter(
                         organization=organization,
                         is_active=True
@@ -297,11 +284,7 @@ class OrganizationInvitationViewSet(viewsets.ModelViewSet):
             try:
                 organization = Organization.objects.get(id=org_id)
                 # Check if user is a member of this organization
-                if OrganizationMember.objects.filter(
-                    organization=organization,
-                    user=self.request.user,
-                    is_active=True
-                ).exists():
+                if get_tenant_context(self.request).is_member(self.request.user, organization):
                     return OrganizationInvitation.objects.filter(organization=organization)
             except Organization.DoesNotExist:
                 pass
@@ -6,6 +6,7 @@ from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth import get_user_model
 from organizations.models import Organization, OrganizationMember
+from .clerk_jwt import ClerkTokenError, get_clerk_verifier
 from .clerk_utils import get_or_create_user_from_clerk
 import logging
 
@@ -94,8 +95,6 @@ class ClerkAuthentication(BaseAuthentication):
         clerk_last_name = request.META.get('HTTP_X_CLERK_LAST_NAME')
         
         try:
-            # For now, implement a basic token validation
-            # In production, this should use Clerk's backend SDK
             user = self.validate_clerk_token(token, clerk_email, clerk_id, clerk_first_name, clerk_last_name)
             if user:
                 logger.info(f"ClerkAuthentication: Successfully authenticated user {user.email}")
@@ -113,11 +112,27 @@ class ClerkAuthentication(BaseAuthentication):
     def validate_clerk_token(self, token, clerk_email=None, clerk_id=None, clerk_first_name=None, clerk_last_name=None):
         """
         Validate Clerk JWT token and return user.
-        Automatically creates user in Django if they don't exist and Clerk info is provided.
-        This is a simplified implementation - in production, use Clerk's backend SDK.
+        
+        When a JWKS endpoint is configured the token signature is verified
+        locally (see users.clerk_jwt) and the user is upserted from its claims.
+        In DEBUG, tokens that fail verification fall back to the development
+        validation below, which trusts the X-Clerk-* headers.
         """
         from django.conf import settings
         
+        verifier = get_clerk_verifier()
+        if verifier.is_configured:
+            try:
+                return verifier.authenticate(token, fallback_profile={
+                    'email': clerk_email,
+                    'first_name': clerk_first_name,
+                    'last_name': clerk_last_name,
+                })
+            except ClerkTokenError as e:
+                if not settings.DEBUG:
+                    raise
+                logger.debug(f"Clerk token verification failed, using development validation: {e}")
+        
         # For development/testing, create a mock validation
         if settings.DEBUG:
             # Accept test_clerk_token or any token in development
@@ -173,7 +188,5 @@ class ClerkAuthentication(BaseAuthentication):
                     logger.error(f"Traceback: {traceback.format_exc()}")
                     return None
         
-        # TODO: Implement proper Clerk JWT validation using clerk-backend-python
-        # When implementing, decode JWT to get user info and auto-create users
-        # For now, return None to fall back to other authentication methods
-        return None
\ No newline at end of file
+        # No JWKS endpoint configured: fall back to other authentication methods
+        return None
@@ -0,0 +1,434 @@
+"""
+Local verification of Clerk session tokens
+
+Clerk signs session JWTs with RS256 keys published as a JWKS document. The
+document is kept in process and in the shared cache (Redis), refreshed in the
+background once it ages past CLERK_JWKS_REFRESH_SECONDS, and re-fetched
+immediately when a token names a key id it does not contain (key rotation).
+Verified tokens are remembered in a bounded in-process LRU as
+token -> user id until they expire, and the Django user is only upserted
+when the profile claims of a Clerk user change.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import jwt
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from .clerk_utils import get_or_create_user_from_clerk
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+JWKS_CACHE_KEY = 'clerk:jwks'
+
+# Claims copied onto the Django user; a change in any of them triggers an upsert
+PROFILE_CLAIMS = ('email', 'first_name', 'last_name', 'image_url', 'email_verified')
+
+
+class ClerkTokenError(Exception):
+    """Raised when a Clerk token cannot be verified"""
+    pass
+
+
+def _frontend_api_url() -> Optional[str]:
+    frontend_api = getattr(settings, 'NEXT_PUBLIC_CLERK_FRONTEND_API', None)
+    if not frontend_api:
+        return None
+    if not frontend_api.startswith(('http://', 'https://')):
+        frontend_api = f"https://{frontend_api}"
+    return frontend_api.rstrip('/')
+
+
+def default_jwks_url() -> Optional[str]:
+    """CLERK_JWKS_URL, or the JWKS endpoint of the Clerk frontend API"""
+    url = getattr(settings, 'CLERK_JWKS_URL', None)
+    if url:
+        return url
+    frontend_api = _frontend_api_url()
+    return f"{frontend_api}/.well-known/jwks.json" if frontend_api else None
+
+
+def default_issuer() -> Optional[str]:
+    """CLERK_ISSUER, or the Clerk frontend API URL that Clerk puts in `iss`"""
+    return getattr(settings, 'CLERK_ISSUER', None) or _frontend_api_url()
+
+
+def token_cache_key(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def profile_cache_key(clerk_id: str) -> str:
+    return f"clerk:profile:{clerk_id}"
+
+
+def profile_fingerprint(profile: Dict[str, Any]) -> str:
+    """Stable digest of the profile claims used to detect changes"""
+    payload = json.dumps([profile.get(name) for name in PROFILE_CLAIMS], default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class JWKSCache:
+    """Signing keys from a JWKS document, shared between processes through the cache"""
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        refresh_seconds: Optional[float] = None,
+        min_refresh_interval: Optional[float] = None,
+        timeout: Optional[float] = None,
+        session: Optional[requests.Session] = None,
+    ):
+        self.url = url or default_jwks_url()
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else getattr(
+            settings, 'CLERK_JWKS_REFRESH_SECONDS', 3600
+        )
+        self.min_refresh_interval = min_refresh_interval if min_refresh_interval is not None else getattr(
+            settings, 'CLERK_JWKS_MIN_REFRESH_INTERVAL', 30
+        )
+        self.timeout = timeout if timeout is not None else getattr(settings, 'CLERK_JWKS_TIMEOUT', 5)
+        self.session = session or requests.Session()
+
+        self._keys: Dict[str, jwt.PyJWK] = {}
+        self._fetched_at = 0.0
+        self._last_fetch_attempt = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get_signing_key(self, kid: Optional[str]) -> jwt.PyJWK:
+        """
+        Get the key a token was signed with.
+
+        Args:
+            kid: Key id from the token header
+
+        Returns:
+            PyJWK for the key id
+
+        Raises:
+            ClerkTokenError: If no key with that id is published
+        """
+        if not self._keys:
+            self.refresh()
+        elif time.time() - self._fetched_at > self.refresh_seconds:
+            self.refresh_in_background()
+
+        key = self._keys.get(kid)
+        if key is None and time.time() - self._last_fetch_attempt >= self.min_refresh_interval:
+            # Unknown key id: Clerk rotated its keys since the last fetch
+            self.refresh(require_kid=kid)
+            key = self._keys.get(kid)
+
+        if key is None:
+            raise ClerkTokenError(f"Unknown signing key: {kid}")
+        return key
+
+    def refresh(self, require_kid: Optional[str] = None) -> None:
+        """
+        Reload the keys, preferring a newer copy from the shared cache.
+
+        Args:
+            require_kid: Only accept the shared copy if it contains this key id
+        """
+        with self._lock:
+            shared = self._read_shared()
+            if shared and shared['fetched_at'] > self._fetched_at and (
+                require_kid is None or require_kid in {jwk.get('kid') for jwk in shared['jwks'].get('keys', [])}
+            ) and time.time() - shared['fetched_at'] <= self.refresh_seconds:
+                self._load(shared['jwks'], shared['fetched_at'])
+                return
+
+            self._last_fetch_attempt = time.time()
+            try:
+                jwks = self._fetch()
+            except Exception as e:
+                # Keep serving the keys we have; tokens signed by them stay valid
+                logger.error(f"Error fetching Clerk JWKS from {self.url}: {str(e)}")
+                return
+
+            fetched_at = time.time()
+            self._load(jwks, fetched_at)
+            self._write_shared(jwks, fetched_at)
+
+    def refresh_in_background(self) -> None:
+        """Refresh on a daemon thread, at most one at a time"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name='clerk-jwks-refresh', daemon=True).start()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys = {}
+            self._fetched_at = 0.0
+            self._last_fetch_attempt = 0.0
+
+    def _fetch(self) -> Dict[str, Any]:
+        if not self.url:
+            raise ClerkTokenError('CLERK_JWKS_URL is not configured')
+        response = self.session.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        jwks = response.json()
+        if not isinstance(jwks, dict) or not isinstance(jwks.get('keys'), list):
+            raise ClerkTokenError('JWKS document has no keys')
+        return jwks
+
+    def _load(self, jwks: Dict[str, Any], fetched_at: float) -> None:
+        keys = {}
+        for jwk in jwks.get('keys', []):
+            if jwk.get('use', 'sig') != 'sig' or not jwk.get('kid'):
+                continue
+            try:
+                keys[jwk['kid']] = jwt.PyJWK(jwk)
+            except jwt.PyJWKError as e:
+                logger.warning(f"Skipping unusable JWKS key {jwk.get('kid')}: {str(e)}")
+        self._keys = keys
+        self._fetched_at = fetched_at
+
+    def _read_shared(self) -> Optional[Dict[str, Any]]:
+        try:
+            return cache.get(JWKS_CACHE_KEY)
+        except Exception as e:
+            logger.warning(f"Could not read cached JWKS: {str(e)}")
+            return None
+
+    def _write_shared(self, jwks: Dict[str, Any], fetched_at: float) -> None:
+        try:
+            cache.set(
+                JWKS_CACHE_KEY,
+                {'jwks': jwks, 'fetched_at': fetched_at},
+                getattr(settings, 'CLERK_JWKS_CACHE_TIMEOUT', 24 * 3600)
+            )
+        except Exception as e:
+            logger.warning(f"Could not cache JWKS: {str(e)}")
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of verified token -> (user id, expiry)"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Tuple[Any, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Any]:
+        key = token_cache_key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user_id, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user_id
+
+    def set(self, token: str, user_id: Any, expires_at: float) -> None:
+        key = token_cache_key(token)
+        with self._lock:
+            self._entries[key] = (user_id, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, token: str) -> None:
+        with self._lock:
+            self._entries.pop(token_cache_key(token), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ClerkTokenVerifier:
+    """Verify Clerk session tokens and map them to Django users"""
+
+    def __init__(
+        self,
+        jwks: Optional[JWKSCache] = None,
+        issuer: Optional[str] = None,
+        authorized_parties: Optional[List[str]] = None,
+        leeway: Optional[float] = None,
+        token_cache_size: Optional[int] = None,
+    ):
+        self.jwks = jwks or JWKSCache()
+        self.issuer = issuer if issuer is not None else default_issuer()
+        self.authorized_parties = authorized_parties if authorized_parties is not None else getattr(
+            settings, 'CLERK_AUTHORIZED_PARTIES', []
+        )
+        self.leeway = leeway if leeway is not None else getattr(settings, 'CLERK_TOKEN_LEEWAY', 5)
+        self.tokens = VerifiedTokenCache(
+            token_cache_size if token_cache_size is not None else getattr(settings, 'CLERK_TOKEN_CACHE_SIZE', 10000)
+        )
+
+    @property
+    def is_configured(self) -> bool:
+        return bool(self.jwks.url)
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Verify a token's signature and registered claims.
+
+        Args:
+            token: Encoded JWT from the Authorization header
+
+        Returns:
+            Verified claims
+
+        Raises:
+            ClerkTokenError: If the token is malformed, expired or not signed by Clerk
+        """
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.PyJWTError as e:
+            raise ClerkTokenError(f"Malformed token: {str(e)}")
+
+        if header.get('alg') != 'RS256':
+            raise ClerkTokenError(f"Unsupported token algorithm: {header.get('alg')}")
+
+        signing_key = self.jwks.get_signing_key(header.get('kid'))
+        try:
+            claims = jwt.decode(
+                token,
+                signing_key.key,
+                algorithms=['RS256'],
+                issuer=self.issuer or None,
+                leeway=self.leeway,
+                options={'require': ['exp', 'iat', 'sub'], 'verify_aud': False},
+            )
+        except jwt.PyJWTError as e:
+            raise ClerkTokenError(f"Invalid token: {str(e)}")
+
+        if self.authorized_parties and claims.get('azp') and claims['azp'] not in self.authorized_parties:
+            raise ClerkTokenError(f"Token issued for unauthorized party: {claims['azp']}")
+        return claims
+
+    def authenticate(self, token: str, fallback_profile: Optional[Dict[str, Any]] = None):
+        """
+        Get the Django user for a Clerk token.
+
+        Args:
+            token: Encoded JWT from the Authorization header
+            fallback_profile: Unverified profile (X-Clerk-* headers), only used
+                to create a first-time user when the token carries no email
+
+        Returns:
+            Active Django user
+
+        Raises:
+            ClerkTokenError: If the token is invalid or maps to no active user
+        """
+        user_id = self.tokens.get(token)
+        if user_id is not None:
+            user = User.objects.filter(pk=user_id, is_active=True).first()
+            if user is not None:
+                return user
+            self.tokens.discard(token)
+
+        claims = self.verify(token)
+        user = sync_clerk_user(claims, fallback_profile)
+        if user is None or not user.is_active:
+            raise ClerkTokenError(f"No active user for Clerk id {claims['sub']}")
+
+        self.tokens.set(token, user.pk, float(claims['exp']))
+        return user
+
+
+def sync_clerk_user(claims: Dict[str, Any], fallback_profile: Optional[Dict[str, Any]] = None):
+    """
+    Upsert the Django user for verified claims, skipping the database write
+    when the profile claims are unchanged since the last sync.
+
+    Args:
+        claims: Verified token claims
+        fallback_profile: Unverified profile used only to create a new user
+
+    Returns:
+        Django user, or None if the user cannot be resolved
+    """
+    clerk_id = claims['sub']
+    profile = {name: claims.get(name) for name in PROFILE_CLAIMS}
+    fingerprint = profile_fingerprint(profile)
+
+    try:
+        synced = cache.get(profile_cache_key(clerk_id))
+    except Exception as e:
+        logger.warning(f"Could not read cached Clerk profile: {str(e)}")
+        synced = None
+
+    if synced and synced.get('fingerprint') == fingerprint:
+        user = User.objects.filter(pk=synced['user_id']).first()
+        if user is not None:
+            return user
+
+    if profile['email']:
+        user, created = get_or_create_user_from_clerk(
+            clerk_id=clerk_id,
+            email=profile['email'],
+            first_name=profile['first_name'],
+            last_name=profile['last_name'],
+            image_url=profile['image_url'],
+            verified=profile['email_verified'],
+        )
+        if created:
+            logger.info(f"Auto-created user from Clerk token: {user.email}")
+    else:
+        # Default Clerk session tokens carry no email: the verified sub is the only identity
+        user = User.objects.filter(clerk_id=clerk_id).first()
+        fallback_email = (fallback_profile or {}).get('email')
+        if user is None and fallback_email and not User.objects.filter(email=fallback_email).exists():
+            # Never link a verified sub to an existing account through an unverified header
+            user, _ = get_or_create_user_from_clerk(
+                clerk_id=clerk_id,
+                email=fallback_email,
+                first_name=fallback_profile.get('first_name'),
+                last_name=fallback_profile.get('last_name'),
+            )
+
+    if user is not None:
+        try:
+            cache.set(
+                profile_cache_key(clerk_id),
+                {'user_id': user.pk, 'fingerprint': fingerprint},
+                getattr(settings, 'CLERK_PROFILE_CACHE_TIMEOUT', 3600)
+            )
+        except Exception as e:
+            logger.warning(f"Could not cache Clerk profile: {str(e)}")
+    return user
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def get_clerk_verifier() -> ClerkTokenVerifier:
+    """Return the process-wide Clerk token verifier"""
+    global _verifier
+    if _verifier is not None:
+        return _verifier
+
+    with _verifier_lock:
+        if _verifier is None:
+            _verifier = ClerkTokenVerifier()
+    return _verifier
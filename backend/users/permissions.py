@@ -5,6 +5,7 @@ from rest_framework import permissions
 from django.contrib.auth.models import Permission
 from django.contrib.contenttypes.models import ContentType
 from organizations.models import OrganizationMember
+from organizations.tenant_context import get_membership, get_request_organization, get_tenant_context
 import os
 
 
@@ -12,18 +13,8 @@ def get_organization_from_request(request):
     """
     Helper function to get organization from request with fallbacks for testing.
     """
-    # Get organization from request (set by TenantMiddleware)
-    organization = getattr(request, 'organization', None)
-    if not organization:
-        # For testing, try to get organization from authenticated user
-        if hasattr(request, 'user') and request.user.is_authenticated:
-            organization = request.user.current_organization
-            if not organization:
-                # Get first organization the user belongs to
-                memberships = request.user.organization_memberships.filter(is_active=True)
-                if memberships.exists():
-                    organization = memberships.first().organization
-    return organization
+    # Organization set by TenantMiddleware, else the user's current organization
+    return get_request_organization(request)
 
 
 class IsOrganizationMember(permissions.BasePermission):
@@ -41,11 +32,7 @@ class IsOrganizationMember(permissions.BasePermission):
             return False
         
         # Check if user is a member of the organization
-        return OrganizationMember.objects.filter(
-            user=request.user,
-            organization=organization,
-            is_active=True
-        ).exists()
+        return get_tenant_context(request).is_member(request.user, organization)
 
 
 class IsOrganizationAdmin(permissions.BasePermission):
@@ -63,15 +50,8 @@ class IsOrganizationAdmin(permissions.BasePermission):
             return False
         
         # Check if user is an admin of the organization
-        try:
-            membership = OrganizationMember.objects.get(
-                user=request.user,
-                organization=organization,
-                is_active=True
-            )
-            return membership.role == 'admin'
-        except OrganizationMember.DoesNotExist:
-            return False
+        membership = get_tenant_context(request).get_membership(request.user, organization)
+        return membership is not None and membership.role == 'admin'
 
 
 class IsOrganizationManager(permissions.BasePermission):
@@ -89,15 +69,8 @@ class IsOrganizationManager(permissions.BasePermission):
             return False
         
         # Check if user is a manager or admin of the organization
-        try:
-            membership = OrganizationMember.objects.get(
-                user=request.user,
-                organization=organization,
-                is_active=True
-            )
-            return membership.role in ['admin', 'manager']
-        except OrganizationMember.DoesNotExist:
-            return False
+        membership = get_tenant_context(request).get_membership(request.user, organization)
+        return membership is not None and membership.role in ['admin', 'manager']
 
 
 class IsOrganizationDesigner(permissions.BasePermission):
@@ -115,15 +88,8 @@ class IsOrganizationDesigner(permissions.BasePermission):
             return False
         
         # Check if user has any role in the organization
-        try:
-            membership = OrganizationMember.objects.get(
-                user=request.user,
-                organization=organization,
-                is_active=True
-            )
-            return membership.role in ['admin', 'manager', 'designer']
-        except OrganizationMember.DoesNotExist:
-            return False
+        membership = get_tenant_context(request).get_membership(request.user, organization)
+        return membership is not None and membership.role in ['admin', 'manager', 'designer']
 
 
 class CanManageUsers(permissions.BasePermission):
@@ -136,29 +102,13 @@ class CanManageUsers(permissions.BasePermission):
             return False
         
         # Get organization from request
-        organization = getattr(request, 'organization', None)
-        if not organization:
-            # For testing, try to get organization from authenticated user
-            organization = request.user.current_organization
-            if not organization:
-                # Get first organization the user belongs to
-                memberships = request.user.organization_memberships.filter(is_active=True)
-                if memberships.exists():
-                    organization = memberships.first().organization
-        
+        organization = get_organization_from_request(request)
         if not organization:
             return False
         
         # Check if user can manage users
-        try:
-            membership = OrganizationMember.objects.get(
-                user=request.user,
-                organization=organization,
-                is_active=True
-            )
-            return membership.can_invite_users or membership.role == 'admin'
-        except OrganizationMember.DoesNotExist:
-            return False
+        membership = get_tenant_context(request).get_membership(request.user, organization)
+        return membership is not None and (membership.can_invite_users or membership.role == 'admin')
 
 
 class CanManageBilling(permissions.BasePermission):
@@ -176,15 +126,8 @@ class CanManageBilling(permissions.BasePermission):
             return False
         
         # Check if user can manage billing
-        try:
-            membership = OrganizationMember.objects.get(
-                user=request.user,
-                organization=organization,
-                is_active=True
-            )
-            return membership.can_manage_billing or membership.role == 'admin'
-        except OrganizationMember.DoesNotExist:
-            return False
+        membership = get_tenant_context(request).get_membership(request.user, organization)
+        return membership is not None and (membership.can_manage_billing or membership.role == 'admin')
 
 
 class CanExportData(permissions.BasePermission):
@@ -202,15 +145,8 @@ class CanExportData(permissions.BasePermission):
             return False
         
         # Check if user can export data
-        try:
-            membership = OrganizationMember.objects.get(
-                user=request.user,
-                organization=organization,
-                is_active=True
-            )
-            return membership.can_export_data or membership.role == 'admin'
-        except OrganizationMember.DoesNotExist:
-            return False
+        membership = get_tenant_context(request).get_membership(request.user, organization)
+        return membership is not None and (membership.can_export_data or membership.role == 'admin')
 
 
 class RoleBasedPermission(permissions.BasePermission):
@@ -231,41 +167,29 @@ class RoleBasedPermission(permissions.BasePermission):
             return False
         
         # Check if user has one of the allowed roles
-        try:
-            membership = OrganizationMember.objects.get(
-                user=request.user,
-                organization=organization,
-                is_active=True
-            )
-            return membership.role in self.allowed_roles
-        except OrganizationMember.DoesNotExist:
-            return False
+        membership = get_tenant_context(request).get_membership(request.user, organization)
+        return membership is not None and membership.role in self.allowed_roles
 
 
 def get_user_organization_permissions(user, organization):
     """
     Get all permissions for a user in a specific organization.
     """
-    try:
-        membership = OrganizationMember.objects.get(
-            user=user,
-            organization=organization,
-            is_active=True
-        )
-        
-        permissions = {
-            'role': membership.role,
-            'can_invite_users': membership.can_invite_users,
-            'can_manage_billing': membership.can_manage_billing,
-            'can_export_data': membership.can_export_data,
-            'is_admin': membership.role == 'admin',
-            'is_manager': membership.role in ['admin', 'manager'],
-            'is_designer': membership.role in ['admin', 'manager', 'designer'],
-        }
-        
-        return permissions
-    except OrganizationMember.DoesNotExist:
+    membership = get_membership(user, organization)
+    if membership is None:
         return None
+    
+    permissions = {
+        'role': membership.role,
+        'can_invite_users': membership.can_invite_users,
+        'can_manage_billing': membership.can_manage_billing,
+        'can_export_data': membership.can_export_data,
+        'is_admin': membership.role == 'admin',
+        'is_manager': membership.role in ['admin', 'manager'],
+        'is_designer': membership.role in ['admin', 'manager', 'designer'],
+    }
+    
+    return permissions
 
 
 class IsAdminRequest(permissions.BasePermission):
@@ -329,11 +253,7 @@ class IsOrganizationMemberOrAdmin(permissions.BasePermission):
         if not organization:
             return False
         
-        return OrganizationMember.objects.filter(
-            user=request.user,
-            organization=organization,
-            is_active=True
-        ).exists()
+        return get_tenant_context(request).is_member(request.user, organization)
 
 
 class CanManageUsersOrAdmin(permissions.BasePermission):
@@ -354,15 +274,8 @@ class CanManageUsersOrAdmin(permissions.BasePermission):
         if not organization:
             return False
         
-        try:
-            membership = OrganizationMember.objects.get(
-                user=request.user,
-                organization=organization,
-                is_active=True
-            )
-            return membership.can_invite_users or membership.role == 'admin'
-        except OrganizationMember.DoesNotExist:
-            return False
+        membership = get_tenant_context(request).get_membership(request.user, organization)
+        return membership is not None and (membership.can_invite_users or membership.role == 'admin')
 
 
 def create_role_permissions():
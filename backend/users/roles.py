@@ -4,7 +4,7 @@ Defines roles, permissions, and role-based access patterns.
 """
 
 from rest_framework import permissions
-from organizations.models import OrganizationMember
+from organizations.tenant_context import get_membership, get_tenant_context
 from django.core.exceptions import PermissionDenied
 import logging
 
@@ -111,22 +111,16 @@ class BaseRolePermission(permissions.BasePermission):
         if not organization:
             return False
         
-        # Get user's role in the organization
-        try:
-            membership = OrganizationMember.objects.get(
-                user=request.user,
-                organization=organization,
-                is_active=True
-            )
-            user_role = membership.role
-            
-            # Set role context in request
-            request.role = user_role
-            request.organization_membership = membership
-            
-        except OrganizationMember.DoesNotExist:
+        # Get user's role in the organization (memoized per request, cached across requests)
+        membership = get_tenant_context(request).get_membership(request.user, organization)
+        if membership is None:
             logger.warning(f"User {request.user.id} not found in organization {organization.id}")
             return False
+        user_role = membership.role
+        
+        # Set role context in request
+        request.role = user_role
+        request.organization_membership = membership
         
         # Check role-based access
         if self.allowed_roles and user_role not in self.allowed_roles:
@@ -236,53 +230,41 @@ def get_user_role_permissions(user, organization):
     """
     Get all permissions for a user in a specific organization.
     """
-    try:
-        membership = OrganizationMember.objects.get(
-            user=user,
-            organization=organization,
-            is_active=True
-        )
-        
-        role = membership.role
-        permissions = ROLE_PERMISSIONS.get(role, {}).copy()
-        
-        # Add role information
-        permissions.update({
-            'role': role,
-            'is_admin': role == 'admin',
-            'is_manager': role in ['admin', 'manager'],
-            'is_designer': role in ['admin', 'manager', 'designer'],
-        })
-        
-        return permissions
-        
-    except OrganizationMember.DoesNotExist:
+    membership = get_membership(user, organization)
+    if membership is None:
         return None
+    
+    role = membership.role
+    permissions = ROLE_PERMISSIONS.get(role, {}).copy()
+    
+    # Add role information
+    permissions.update({
+        'role': role,
+        'is_admin': role == 'admin',
+        'is_manager': role in ['admin', 'manager'],
+        'is_designer': role in ['admin', 'manager', 'designer'],
+    })
+    
+    return permissions
 
 
 def check_api_permission(user, organization, path, method='GET'):
     """
     Check if user has permission to access a specific API endpoint.
     """
-    try:
-        membership = OrganizationMember.objects.get(
-            user=user,
-            organization=organization,
-            is_active=True
-        )
-        
-        role = membership.role
-        
-        # Check if path matches any API permission patterns
-        for pattern, allowed_roles in API_PERMISSIONS.items():
-            if path.startswith(pattern):
-                return role in allowed_roles
-        
-        # Default: allow access if user is authenticated and in organization
-        return True
-        
-    except OrganizationMember.DoesNotExist:
+    membership = get_membership(user, organization)
+    if membership is None:
         return False
+    
+    role = membership.role
+    
+    # Check if path matches any API permission patterns
+    for pattern, allowed_roles in API_PERMISSIONS.items():
+        if path.startswith(pattern):
+            return role in allowed_roles
+    
+    # Default: allow access if user is authenticated and in organization
+    return True
 
 
 def get_role_hierarchy(role):
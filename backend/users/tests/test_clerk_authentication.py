@@ -0,0 +1,187 @@
+"""
+Unit tests for Clerk session token verification against a local JWKS server
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.exceptions import AuthenticationFailed
+from unittest import mock
+
+from users.authentication import ClerkAuthentication
+from users.clerk_jwt import ClerkTokenError, ClerkTokenVerifier, JWKSCache
+
+User = get_user_model()
+
+ISSUER = 'https://clerk.frameio.test'
+
+
+def make_key(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({'kid': kid, 'use': 'sig', 'alg': 'RS256'})
+    return private_key, jwk
+
+
+class JWKSHandler(BaseHTTPRequestHandler):
+    """Serves `server.jwks` and counts requests"""
+
+    def do_GET(self):
+        self.server.requests += 1
+        body = json.dumps(self.server.jwks).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@override_settings(
+    DEBUG=False,
+    CLERK_SECRET_KEY='sk_test',
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class ClerkTokenVerifierTestCase(TestCase):
+    """Test cases for JWKS caching, key rotation, the token LRU and claim-driven upserts"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.keys = {kid: make_key(kid) for kid in ('key-1', 'key-2')}
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), JWKSHandler)
+        cls.jwks_url = f'http://127.0.0.1:{cls.server.server_address[1]}/.well-known/jwks.json'
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.server.jwks = {'keys': [self.keys['key-1'][1]]}
+        self.server.requests = 0
+        self.verifier = self.make_verifier()
+        self.factory = RequestFactory()
+
+    def make_verifier(self, **jwks_options):
+        jwks = JWKSCache(url=self.jwks_url, min_refresh_interval=0, **jwks_options)
+        self.addCleanup(jwks.session.close)
+        return ClerkTokenVerifier(jwks=jwks, issuer=ISSUER, authorized_parties=['https://app.frameio.test'])
+
+    def make_token(self, kid='key-1', **claims):
+        now = int(time.time())
+        payload = {
+            'sub': 'user_clerk_1',
+            'iss': ISSUER,
+            'azp': 'https://app.frameio.test',
+            'iat': now,
+            'exp': now + 60,
+            'email': 'weaver@example.com',
+            'first_name': 'Asha',
+        }
+        payload.update(claims)
+        return jwt.encode(payload, self.keys[kid][0], algorithm='RS256', headers={'kid': kid})
+
+    def authenticate(self, token):
+        request = self.factory.get('/api/users/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        with mock.patch('users.authentication.get_clerk_verifier', return_value=self.verifier):
+            return ClerkAuthentication().authenticate(request)
+
+    def test_valid_token_creates_user(self):
+        user, _ = self.authenticate(self.make_token())
+        self.assertEqual(user.clerk_id, 'user_clerk_1')
+        self.assertEqual(user.email, 'weaver@example.com')
+        self.assertEqual(user.first_name, 'Asha')
+        self.assertEqual(self.server.requests, 1)
+
+    def test_repeated_token_skips_verification_and_writes(self):
+        token = self.make_token()
+        self.authenticate(token)
+
+        with mock.patch.object(self.verifier, 'verify') as verify, self.assertNumQueries(1):
+            user, _ = self.authenticate(token)
+        verify.assert_not_called()
+        self.assertEqual(user.clerk_id, 'user_clerk_1')
+
+    def test_unchanged_claims_skip_upsert(self):
+        self.authenticate(self.make_token())
+
+        # A refreshed token with the same profile only loads the user
+        with self.assertNumQueries(1):
+            self.authenticate(self.make_token(exp=int(time.time()) + 120))
+        self.assertEqual(self.server.requests, 1)
+
+    def test_changed_claims_update_user(self):
+        self.authenticate(self.make_token())
+        user, _ = self.authenticate(self.make_token(first_name='Meera'))
+        self.assertEqual(user.first_name, 'Meera')
+        self.assertEqual(User.objects.get(clerk_id='user_clerk_1').first_name, 'Meera')
+
+    def test_key_rotation_refetches_jwks_once(self):
+        self.authenticate(self.make_token())
+        self.server.jwks = {'keys': [self.keys['key-1'][1], self.keys['key-2'][1]]}
+
+        self.authenticate(self.make_token(kid='key-2', first_name='Rotated'))
+        self.authenticate(self.make_token(kid='key-2', first_name='Rotated again'))
+        self.assertEqual(self.server.requests, 2)
+
+    def test_jwks_is_shared_through_cache(self):
+        self.authenticate(self.make_token())
+
+        # A verifier in another process starts from the shared copy
+        other = self.make_verifier()
+        other.verify(self.make_token())
+        self.assertEqual(self.server.requests, 1)
+
+    def test_stale_jwks_refreshes_in_background(self):
+        verifier = self.make_verifier(refresh_seconds=0)
+        verifier.verify(self.make_token())
+
+        with mock.patch.object(verifier.jwks, 'refresh_in_background') as refresh:
+            verifier.verify(self.make_token())
+        refresh.assert_called_once()
+
+    def test_invalid_tokens_are_rejected(self):
+        other_key, _ = make_key('key-1')
+        forged = jwt.encode(
+            {'sub': 'user_clerk_1', 'iss': ISSUER, 'iat': int(time.time()), 'exp': int(time.time()) + 60},
+            other_key, algorithm='RS256', headers={'kid': 'key-1'}
+        )
+        cases = {
+            'forged': forged,
+            'expired': self.make_token(exp=int(time.time()) - 60),
+            'wrong issuer': self.make_token(iss='https://evil.example.com'),
+            'unauthorized party': self.make_token(azp='https://evil.example.com'),
+            'unknown key': self.make_token(kid='key-2'),
+            'hs256': jwt.encode({'sub': 'user_clerk_1'}, 'secret', algorithm='HS256'),
+            'garbage': 'not-a-jwt',
+        }
+        for name, token in cases.items():
+            with self.subTest(name):
+                with self.assertRaises(ClerkTokenError):
+                    self.verifier.verify(token)
+                with self.assertRaises(AuthenticationFailed):
+                    self.authenticate(token)
+        self.assertFalse(User.objects.exists())
+
+    def test_header_email_never_links_existing_account(self):
+        User.objects.create_user(username='victim', email='victim@example.com', password='testpass123')
+        token = self.make_token(email=None)
+
+        with self.assertRaises(ClerkTokenError):
+            self.verifier.authenticate(token, fallback_profile={'email': 'victim@example.com'})
+
+        user = self.verifier.authenticate(token, fallback_profile={'email': 'new@example.com'})
+        self.assertEqual((user.clerk_id, user.email), ('user_clerk_1', 'new@example.com'))
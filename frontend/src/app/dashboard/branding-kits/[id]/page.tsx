@@ -8,21 +8,14 @@ import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogDescription, Di
 import { Calendar, Download, Loader2, Trash2, ArrowLeft } from "lucide-react"
 import { useAuth } from "@/hooks/useAuth"
 import { useToastHelpers } from "@/components/common"
+import { BrandingKitImage, type KitImage } from "@/components/dashboard/branding-kit-image"
 
 interface BrandingKit {
   id: string
   prompt: string
   style: string
-  logo: {
-    data: string
-    format: string
-    url?: string
-  } | null
-  color_palette: {
-    data: string
-    format: string
-    url?: string
-  } | null
+  logo: KitImage | null
+  color_palette: KitImage | null
   colors: string[]
   created_at: string
 }
@@ -106,15 +99,22 @@ export default function BrandingKitPreviewPage() {
     }
   }
 
-  const downloadImage = (base64Data: string, filename: string, format: string) => {
+  const downloadImage = async (image: KitImage, filename: string) => {
     try {
-      const byteCharacters = atob(base64Data)
-      const byteNumbers = new Array(byteCharacters.length)
-      for (let i = 0; i < byteCharacters.length; i++) {
-        byteNumbers[i] = byteCharacters.charCodeAt(i)
+      let blob: Blob
+      if (image.data) {
+        const byteCharacters = atob(image.data)
+        const byteNumbers = new Array(byteCharacters.length)
+        for (let i = 0; i < byteCharacters.length; i++) {
+          byteNumbers[i] = byteCharacters.charCodeAt(i)
+        }
+        const byteArray = new Uint8Array(byteNumbers)
+        blob = new Blob([byteArray], { type: `image/${image.format.toLowerCase()}` })
+      } else {
+        const response = await fetch(image.url!)
+        if (!response.ok) throw new Error(`Download failed: ${response.status}`)
+        blob = await response.blob()
       }
-      const byteArray = new Uint8Array(byteNumbers)
-      const blob = new Blob([byteArray], { type: `image/${format.toLowerCase()}` })
       
       const url = URL.createObjectURL(blob)
       const link = document.createElement('a')
@@ -217,9 +217,8 @@ export default function BrandingKitPreviewPage() {
               <div className="space-y-3">
                 <h3 className="text-sm font-semibold text-foreground">Logo</h3>
                 <div className="w-full aspect-square bg-muted rounded-lg overflow-hidden border border-border flex items-center justify-center p-4">
-                  {/* eslint-disable-next-line @next/next/no-img-element */}
-                  <img
-                    src={`data:image/${kit.logo.format.toLowerCase()};base64,${kit.logo.data}`}
+                  <BrandingKitImage
+                    image={kit.logo}
                     alt={kit.prompt || 'Generated logo'}
                     className="max-w-full max-h-full w-auto h-auto object-contain"
                   />
@@ -227,9 +226,8 @@ export default function BrandingKitPreviewPage() {
                 <Button
                   variant="outline"
                   onClick={() => downloadImage(
-                    kit.logo!.data,
-                    `logo-${kit.id}.${kit.logo!.format.toLowerCase()}`,
-                    kit.logo!.format
+                    kit.logo!,
+                    `logo-${kit.id}.${kit.logo!.format.toLowerCase()}`
                   )}
                   className="w-full"
                 >
@@ -244,9 +242,8 @@ export default function BrandingKitPreviewPage() {
               <div className="space-y-3">
                 <h3 className="text-sm font-semibold text-foreground">Color Palette</h3>
                 <div className="w-full aspect-square bg-muted rounded-lg overflow-hidden border border-border flex items-center justify-center p-4">
-                  {/* eslint-disable-next-line @next/next/no-img-element */}
-                  <img
-                    src={`data:image/${kit.color_palette.format.toLowerCase()};base64,${kit.color_palette.data}`}
+                  <BrandingKitImage
+                    image={kit.color_palette}
                     alt="Color palette"
                     className="max-w-full max-h-full w-auto h-auto object-contain"
                   />
@@ -254,9 +251,8 @@ export default function BrandingKitPreviewPage() {
                 <Button
                   variant="outline"
                   onClick={() => downloadImage(
-                    kit.color_palette!.data,
-                    `palette-${kit.id}.${kit.color_palette!.format.toLowerCase()}`,
-                    kit.color_palette!.format
+                    kit.color_palette!,
+                    `palette-${kit.id}.${kit.color_palette!.format.toLowerCase()}`
                   )}
                   className="w-full"
                 >
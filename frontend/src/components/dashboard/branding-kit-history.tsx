@@ -9,21 +9,14 @@ import { Palette, Calendar, Download, Loader2, RefreshCw, Trash2 } from "lucide-
 import { useAuth } from "@/hooks/useAuth"
 import { useToastHelpers } from "@/components/common"
 import { useRouter } from "next/navigation"
+import { BrandingKitImage, type KitImage } from "@/components/dashboard/branding-kit-image"
 
 interface BrandingKit {
   id: string
   prompt: string
   style: string
-  logo: {
-    data: string
-    format: string
-    url?: string
-  } | null
-  color_palette: {
-    data: string
-    format: string
-    url?: string
-  } | null
+  logo: KitImage | null
+  color_palette: KitImage | null
   colors: string[]
   created_at: string
 }
@@ -195,15 +188,22 @@ export function BrandingKitHistory({ limit }: BrandingKitHistoryProps) {
     }
   }
 
-  const downloadImage = (base64Data: string, filename: string, format: string) => {
+  const downloadImage = async (image: KitImage, filename: string) => {
     try {
-      const byteCharacters = atob(base64Data)
-      const byteNumbers = new Array(byteCharacters.length)
-      for (let i = 0; i < byteCharacters.length; i++) {
-        byteNumbers[i] = byteCharacters.charCodeAt(i)
+      let blob: Blob
+      if (image.data) {
+        const byteCharacters = atob(image.data)
+        const byteNumbers = new Array(byteCharacters.length)
+        for (let i = 0; i < byteCharacters.length; i++) {
+          byteNumbers[i] = byteCharacters.charCodeAt(i)
+        }
+        const byteArray = new Uint8Array(byteNumbers)
+        blob = new Blob([byteArray], { type: `image/${image.format.toLowerCase()}` })
+      } else {
+        const response = await fetch(image.url!)
+        if (!response.ok) throw new Error(`Download failed: ${response.status}`)
+        blob = await response.blob()
       }
-      const byteArray = new Uint8Array(byteNumbers)
-      const blob = new Blob([byteArray], { type: `image/${format.toLowerCase()}` })
       
       const url = URL.createObjectURL(blob)
       const link = document.createElement('a')
@@ -333,9 +333,9 @@ export function BrandingKitHistory({ limit }: BrandingKitHistoryProps) {
                 onClick={() => router.push(`/dashboard/branding-kits/${kit.id}`)}
               >
                 {kit.logo ? (
-                  /* eslint-disable-next-line @next/next/no-img-element */
-                  <img
-                    src={`data:image/${kit.logo.format.toLowerCase()};base64,${kit.logo.data}`}
+                  <BrandingKitImage
+                    image={kit.logo}
+                    thumbnail
                     alt={kit.prompt || 'Generated logo'}
                     className="w-full h-full object-contain p-4 group-hover:scale-105 transition-transform duration-300"
                     onError={(e) => {
@@ -398,9 +398,8 @@ export function BrandingKitHistory({ limit }: BrandingKitHistoryProps) {
                       size="sm"
                       variant="outline"
                       onClick={() => downloadImage(
-                        kit.logo!.data,
-                        `logo-${kit.id}.${kit.logo!.format.toLowerCase()}`,
-                        kit.logo!.format
+                        kit.logo!,
+                        `logo-${kit.id}.${kit.logo!.format.toLowerCase()}`
                       )}
                       className="flex-1 h-8 text-xs"
                     >
@@ -413,9 +412,8 @@ export function BrandingKitHistory({ limit }: BrandingKitHistoryProps) {
                       size="sm"
                       variant="outline"
                       onClick={() => downloadImage(
-                        kit.color_palette!.data,
-                        `palette-${kit.id}.${kit.color_palette!.format.toLowerCase()}`,
-                        kit.color_palette!.format
+                        kit.color_palette!,
+                        `palette-${kit.id}.${kit.color_palette!.format.toLowerCase()}`
                       )}
                       className="flex-1 h-8 text-xs"
                     >
@@ -0,0 +1,22 @@
+import type { ImgHTMLAttributes } from "react"
+
+export interface KitImage {
+  data?: string
+  format: string
+  url?: string | null
+  thumbnail_url?: string | null
+}
+
+// Stored kits are served by URL; kits that were never offloaded still carry base64 data
+export const kitImageSrc = (image: KitImage, thumbnail = false) =>
+  (thumbnail && image.thumbnail_url) || image.url || `data:image/${image.format.toLowerCase()};base64,${image.data}`
+
+interface BrandingKitImageProps extends Omit<ImgHTMLAttributes<HTMLImageElement>, "src"> {
+  image: KitImage
+  thumbnail?: boolean
+}
+
+export function BrandingKitImage({ image, thumbnail = false, alt, ...props }: BrandingKitImageProps) {
+  /* eslint-disable-next-line @next/next/no-img-element */
+  return <img src={kitImageSrc(image, thumbnail)} alt={alt} {...props} />
+}
@@ -38,7 +38,7 @@ export function OverviewCards() {
       
       // Fetch generated posters count
       try {
-        const postersResponse = await fetch(`${baseUrl}/api/ai/ai-poster/posters/?limit=1`, {
+        const postersResponse = await fetch(`${baseUrl}/api/ai/ai-poster/posters/?limit=1&fields=id&count=approximate`, {
           method: 'GET',
           headers: {
             'Content-Type': 'application/json',